@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: batch.py
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Batch runner of the local backend for many regions of interest.
+
+    A job file lists ROIs with their dates and parameters. The jobs are grouped by
+    processing configuration (parameters.param_hash), the union of the scenes required
+    by the jobs of a group is processed once on the bounding window of their ROIs (plus
+    the halo of the filters), and the output of every job is cut from the shared result
+    and written in parallel. The run summary reports the throughput and the scenes and
+    pixels saved by the deduplication.
+
+    The scenes are local images written with local_helper.save to a catalog directory and
+    are co-registered (same transform and shape), as for the local tiled execution.
+    The ROIs are bounding boxes [xmin, ymin, xmax, ymax] in the coordinates of the scene
+    grid. Within a group the multi-temporal filter selects its temporal neighbours among
+    all the scenes of the group, like the filter on Earth Engine selects them among all
+    the scenes of the catalog.
+
+    Job file:
+        {"catalog": "scenes/", "output": "ard/",
+         "params": {"POLARIZATION": "VVVH", "SPECKLE_FILTER": "GAMMA MAP", ...,
+                    "DEM": "dem.npy"},
+         "jobs": [{"name": "site_a", "roi": [xmin, ymin, xmax, ymax],
+                   "start_date": "2021-01-01", "stop_date": "2021-07-01",
+                   "params": {"ORBIT": "DESCENDING"}}, ...]}
+    "params" of a job override the common ones; DEM is an .npy file on the scene grid.
+    The jobs of a group share the processing configuration and EXCLUDE_SCENES (the group
+    key), and must agree on the execution parameters (MEMORY_BUDGET_MB, WORKERS,
+    INCREMENTAL_STORE, ...); only the dates and the orbit of the jobs may differ.
+    With INCREMENTAL_STORE, every group window has its own store below it (the stored
+    outputs and ratios are cut to the window); the outputs of the scenes processed by an
+    earlier run are read from the store.
+    With "TRACK_AFFINE": true in the params, the tracks of every parameter set are processed
+    on pinned workers (see local_wrapper) with one TrackCache shared by all parameter sets,
+    and the summary reports its hit rate per track.
+    The outputs are written to <output>/<job name>/<scene id>.npz, or as Cloud-Optimized
+    GeoTIFFs <scene id>.tif (local_cog.py) with "output_format": "cog" in the job file
+    or in a job.
+
+    Usage:
+        python batch.py jobs.json --workers 4 --summary summary.json
+"""
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+import local_cog
+import local_helper
+import local_store
+import local_terrain_flattening as ltf
+import local_wrapper
+import parameters
+import scheduling
+
+# parameters read by check_params without a default
+PARAMETER_KEYS = ('APPLY_BORDER_NOISE_CORRECTION', 'APPLY_TERRAIN_FLATTENING', 'APPLY_SPECKLE_FILTERING',
+                   'POLARIZATION', 'ORBIT', 'SPECKLE_FILTER_FRAMEWORK', 'SPECKLE_FILTER',
+                   'SPECKLE_FILTER_KERNEL_SIZE', 'SPECKLE_FILTER_NR_OF_IMAGES', 'TERRAIN_FLATTENING_MODEL',
+                   'TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER', 'FORMAT', 'DEM')
+# parameters that only select the scenes of a job, they may differ within a group
+SELECTION_KEYS = ('START_DATE', 'STOP_DATE', 'ORBIT')
+# parameters of a group: the processing configuration and the excluded scenes
+GROUP_KEYS = parameters.OUTPUT_KEYS + ('EXCLUDE_SCENES',)
+
+# ---------------------------------------------------------------------------//
+# Catalog and windows
+# ---------------------------------------------------------------------------//
+
+def scan_catalog(folder):
+    """
+    Headers of the scenes of a catalog directory (see local_helper.read_header).
+
+    Returns
+    -------
+    list
+        One dictionary per scene with the 'path', 'properties', 'bands' and 'shape'
+
+    """
+    catalog = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith('.npz'):
+            path = os.path.join(folder, name)
+            catalog.append(dict(local_helper.read_header(path), path=path))
+    return catalog
+
+
+def roi_window(roi, transform, shape):
+    """
+    Pixel window of a bounding box on a grid.
+
+    Parameters
+    ----------
+    roi : list
+        [xmin, ymin, xmax, ymax] in the coordinates of the grid
+    transform : tuple
+        Affine transform of the grid (GDAL order, without rotation)
+    shape : tuple
+        (rows, cols) of the grid
+
+    Returns
+    -------
+    tuple
+        (row slice, col slice) of the pixels that intersect the box, None if there are none
+
+    """
+    xmin, ymin, xmax, ymax = roi
+    cols = sorted(((xmin - transform[0]) / transform[1], (xmax - transform[0]) / transform[1]))
+    rows = sorted(((ymin - transform[3]) / transform[5], (ymax - transform[3]) / transform[5]))
+    r0, r1 = max(int(math.floor(rows[0])), 0), min(int(math.ceil(rows[1])), shape[0])
+    c0, c1 = max(int(math.floor(cols[0])), 0), min(int(math.ceil(cols[1])), shape[1])
+    if r0 >= r1 or c0 >= c1:
+        return None
+    return (slice(r0, r1), slice(c0, c1))
+
+
+def _union(windows, HALO, shape):
+    """Bounding window of windows, extended by the halo and clipped to the grid."""
+    return (slice(max(min(w[0].start for w in windows) - HALO, 0), min(max(w[0].stop for w in windows) + HALO, shape[0])),
+            slice(max(min(w[1].start for w in windows) - HALO, 0), min(max(w[1].stop for w in windows) + HALO, shape[1])))
+
+
+def pixels(window):
+    """Number of pixels of a window."""
+    return (window[0].stop - window[0].start) * (window[1].stop - window[1].start)
+
+
+def millis(date):
+    """Milliseconds since the epoch of a 'YYYY-MM-DD' date, at 00:00 UTC."""
+    day = datetime.datetime.strptime(str(date)[:10], '%Y-%m-%d').replace(tzinfo=datetime.timezone.utc)
+    return int(day.timestamp() * 1000)
+
+
+def matches(entry, params, start, stop):
+    """Whether a catalog entry is selected by the checked params between start and stop (ms)."""
+    props = entry['properties']
+    if not start <= props['system:time_start'] < stop:
+        return False
+    if props.get('system:index') in params['EXCLUDE_SCENES']:
+        return False
+    if (params['ORBIT'] != 'BOTH' and props.get('orbitProperties_pass') != params['ORBIT']):
+        return False
+    bands = ['VV', 'VH'] if params['POLARIZATION'] == 'VVVH' else [params['POLARIZATION']]
+    return all(name in entry['bands'] for name in bands)
+
+
+# ---------------------------------------------------------------------------//
+# Planning
+# ---------------------------------------------------------------------------//
+
+def plan(jobs, catalog):
+    """
+    Resolve the scenes of every job and group the jobs by processing configuration.
+
+    Parameters
+    ----------
+    jobs : dict
+        Content of the job file
+    catalog : list
+        Scene headers, see scan_catalog
+
+    Returns
+    -------
+    list
+        One group per configuration: 'key' (hash of GROUP_KEYS), 'params' (checked),
+        'scenes' (ids of the union of the required scenes), 'window' (processed
+        window) and 'jobs', each with the 'name', 'window', 'scenes' and
+        'output_format' of a job
+
+    Raises
+    ------
+    ValueError
+        If the jobs of a group differ in an execution parameter
+
+    """
+    if not catalog:
+        raise ValueError("ERROR!!! The catalog has no scenes")
+    shape, transform = catalog[0]['shape'], catalog[0]['properties'].get('transform')
+    if any(entry['shape'] != shape or entry['properties'].get('transform') != transform for entry in catalog):
+        raise ValueError("ERROR!!! The batch runner needs co-registered scenes of the same shape")
+    if transform is None:
+        raise ValueError("ERROR!!! The scenes need a transform property to locate the ROIs")
+
+    groups = {}
+    for job in jobs['jobs']:
+        params = dict.fromkeys(PARAMETER_KEYS)
+        params.update(jobs.get('params', {}))
+        params.update(job.get('params', {}))
+        params.update({'START_DATE': job['start_date'], 'STOP_DATE': job['stop_date'],
+                       'ROI': None, 'CLIP_TO_ROI': False, 'SAVE_ASSET': False})
+        params = local_wrapper.check_params(params)
+        output_format = job.get('output_format', jobs.get('output_format', 'npz')).upper()
+        if output_format not in ('NPZ', 'COG'):
+            raise ValueError("ERROR!!! output_format must be 'npz' or 'cog'")
+        window = roi_window(job['roi'], transform, shape)
+        start, stop = millis(job['start_date']), millis(job['stop_date'])
+        scenes = [] if window is None else [entry['properties']['system:index'] for entry in catalog
+                                            if matches(entry, params, start, stop)]
+        key = parameters.param_hash(params, GROUP_KEYS)
+        group = groups.setdefault(key, {'key': key, 'params': params, 'jobs': [], 'scenes': set()})
+        # the group runs with the execution parameters of its first job
+        for name in params:
+            if (name not in GROUP_KEYS and name not in SELECTION_KEYS and params[name] != group['params'][name]):
+                raise ValueError("ERROR!!! The jobs {} and {} have the same configuration but a different {}".format(
+                    group['jobs'][0]['name'], job['name'], name))
+        group['jobs'].append({'name': job['name'], 'window': window, 'scenes': scenes,
+                              'output_format': output_format})
+        group['scenes'].update(scenes)
+
+    spacing = ltf.pixel_size({'properties': catalog[0]['properties']})
+    for group in groups.values():
+        group['scenes'] = sorted(group['scenes'])
+        windows = [job['window'] for job in group['jobs'] if job['scenes']]
+        group['window'] = _union(windows, local_wrapper.halo(group['params'], spacing), shape) if windows else None
+    return list(groups.values())
+
+
+# ---------------------------------------------------------------------------//
+# Execution
+# ---------------------------------------------------------------------------//
+
+def _load_dem(path):
+    return np.load(path, mmap_mode='r')
+
+
+def load_group(group, catalog, load=local_helper.load, load_dem=_load_dem):
+    """
+    Load the scenes of a group, cut to the window of the group, and its parameters.
+
+    Parameters
+    ----------
+    group : dict
+        A group returned by plan
+    catalog : list
+        Scene headers, see scan_catalog
+    load, load_dem : function, optional
+        Read a scene (local_helper.load) and a DEM from their paths, e.g. from a cache
+
+    Returns
+    -------
+    tuple
+        (parameters, local image collection) to pass to local_wrapper.run
+
+    """
+    params = dict(group['params'])
+    paths = {entry['properties']['system:index']: entry['path'] for entry in catalog}
+    rows, cols = group['window']
+    if (params['INCREMENTAL_STORE']):
+        # the stored outputs and ratios are cut to the window of the group
+        params['INCREMENTAL_STORE'] = os.path.join(params['INCREMENTAL_STORE'], 'window_{}_{}_{}_{}'.format(
+            rows.start, rows.stop, cols.start, cols.stop))
+    if (params['APPLY_TERRAIN_FLATTENING']):
+        params['DEM'] = np.array(load_dem(params['DEM'])[rows, cols])
+    tiles = []
+    for scene_id in group['scenes']:
+        image = load(paths[scene_id])
+        tiles += local_wrapper.cut([image], group['window'], local_wrapper.scene_headings(params, [image]))
+    # the window holds only the scenes of the group
+    params.update({'START_DATE': '1970-01-01', 'STOP_DATE': '2200-01-01', 'ORBIT': 'BOTH'})
+    return params, tiles
+
+
+def group_outputs(group, params, output):
+    """
+    Outputs of a group by scene id: the output of local_wrapper.run and, in incremental
+    mode, the stored outputs of the scenes processed by an earlier run.
+
+    Parameters
+    ----------
+    group : dict
+        A group returned by plan
+    params : Dictionary
+        The parameters of the run, see load_group
+    output : list
+        Output of local_wrapper.run
+
+    Returns
+    -------
+    dict
+        scene id -> local image
+
+    """
+    outputs = {image['properties']['system:index']: image for image in output}
+    missing = [scene_id for scene_id in group['scenes'] if scene_id not in outputs]
+    if missing and params['INCREMENTAL_STORE']:
+        store = local_store.Store(params['INCREMENTAL_STORE'])
+        key = parameters.param_hash(local_wrapper.check_params(params))
+        stored = store.output_ids(key)
+        for scene_id in missing:
+            if scene_id in stored:
+                outputs[scene_id] = store.load_output(key, scene_id)
+    return outputs
+
+
+def write_job(job, outputs, group_window, folder, callback=None):
+    """
+    Cut the outputs of a job from the outputs of its group and write them to
+    <folder>/<scene id>.npz, or <folder>/<scene id>.tif when the 'output_format' of the
+    job is 'COG'; callback(scene_id, path) is called after every scene.
+    """
+    os.makedirs(folder, exist_ok=True)
+    rows = slice(job['window'][0].start - group_window[0].start, job['window'][0].stop - group_window[0].start)
+    cols = slice(job['window'][1].start - group_window[1].start, job['window'][1].stop - group_window[1].start)
+    for scene_id in job['scenes']:
+        if scene_id not in outputs:
+            raise ValueError("ERROR!!! No output of scene {} for job {}".format(scene_id, job['name']))
+        image = local_wrapper.cut([outputs[scene_id]], (rows, cols))[0]
+        image['properties'].pop('heading', None)
+        if (job.get('output_format') == 'COG'):
+            path = os.path.join(folder, scene_id + '.tif')
+            local_cog.write_cog(image, path)
+        else:
+            path = os.path.join(folder, scene_id + '.npz')
+            local_helper.save(image, path)
+        if callback is not None:
+            callback(scene_id, path)
+    return len(job['scenes'])
+
+
+def run_batch(jobs, WORKERS=1):
+    """
+    Run the jobs of a job file.
+
+    Parameters
+    ----------
+    jobs : dict
+        Content of the job file
+    WORKERS : integer
+        Number of threads writing the job outputs
+
+    Returns
+    -------
+    dict
+        Run summary
+
+    """
+    t0 = time.perf_counter()
+    catalog = scan_catalog(jobs['catalog'])
+    groups = plan(jobs, catalog)
+    summary = {'jobs': len(jobs['jobs']), 'parameter_sets': len(groups), 'scene_requests': 0,
+               'scenes_processed': 0, 'pixels_requested': 0, 'pixels_processed': 0,
+               'processing_seconds': 0.0, 'writing_seconds': 0.0}
+    # the parameter sets of the same window share the terrain geometry of the tracks
+    cache = scheduling.TrackCache()
+
+    for group in groups:
+        requested = sum(len(job['scenes']) for job in group['jobs'])
+        summary['scene_requests'] += requested
+        summary['pixels_requested'] += sum(pixels(job['window']) * len(job['scenes'])
+                                           for job in group['jobs'] if job['scenes'])
+        print('Parameter set {}: {} job(s), {} scene request(s), {} distinct scene(s)'.format(
+            group['key'], len(group['jobs']), requested, len(group['scenes'])))
+        if not group['scenes']:
+            continue
+
+        t1 = time.perf_counter()
+        params, tiles = load_group(group, catalog)
+        if (params['TRACK_AFFINE']):
+            params['TRACK_CACHE'] = cache
+        output, _ = local_wrapper.run(params, tiles)
+        outputs = group_outputs(group, params, output)
+        summary['scenes_processed'] += len(output)
+        summary['pixels_processed'] += pixels(group['window']) * len(output)
+        t2 = time.perf_counter()
+        summary['processing_seconds'] += t2 - t1
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            futures = [pool.submit(write_job, job, outputs, group['window'],
+                                   os.path.join(jobs['output'], job['name']))
+                       for job in group['jobs'] if job['scenes']]
+            for future in futures:
+                future.result()
+        summary['writing_seconds'] += time.perf_counter() - t2
+
+    seconds = time.perf_counter() - t0
+    requests = max(summary['scene_requests'], 1)
+    summary.update({'seconds': seconds,
+                    'scenes_saved': summary['scene_requests'] - summary['scenes_processed'],
+                    'dedup_savings': 1.0 - summary['scenes_processed'] / float(requests),
+                    'throughput_mpx_s': summary['pixels_requested'] / 1e6 / seconds if seconds else 0.0})
+    if any(group['params']['TRACK_AFFINE'] for group in groups):
+        summary['tracks'] = cache.stats()
+    return summary
+
+
+def print_summary(summary):
+    print('{} job(s), {} parameter set(s): {} scene request(s), {} scene(s) processed '
+          '({} saved, {:.0%} deduplication savings)'.format(
+              summary['jobs'], summary['parameter_sets'], summary['scene_requests'],
+              summary['scenes_processed'], summary['scenes_saved'], summary['dedup_savings']))
+    print('{:.1f} Mpx requested, {:.1f} Mpx processed in {:.1f} s (processing {:.1f} s, writing {:.1f} s): '
+          '{:.2f} Mpx/s'.format(summary['pixels_requested'] / 1e6, summary['pixels_processed'] / 1e6,
+                                summary['seconds'], summary['processing_seconds'],
+                                summary['writing_seconds'], summary['throughput_mpx_s']))
+    for name, stats in sorted(summary.get('tracks', {}).items()):
+        print('Track {}: cache hit rate {:.0%} ({} hits, {} misses)'.format(
+            name, stats['hit_rate'], stats['hits'], stats['misses']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the local ARD backend for many regions of interest.')
+    parser.add_argument('jobs', help='JSON job file')
+    parser.add_argument('--workers', type=int, default=1, help='threads writing the job outputs')
+    parser.add_argument('--summary', help='write the run summary as JSON')
+    args = parser.parse_args(argv)
+
+    with open(args.jobs) as f:
+        jobs = json.load(f)
+    summary = run_batch(jobs, args.workers)
+    print_summary(summary)
+    if args.summary:
+        with open(args.summary, 'w') as f:
+            json.dump(summary, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: benchmark.py
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Benchmark suite of the local backend on synthetic scenes (see synthetic.py).
+             Every speckle filter is timed for every kernel size and scene size, the
+             multi-temporal filter with every filter and kernel size on the smallest scenes,
+             and the terrain flattening (exact and lookup table). For every case the
+             throughput (Mpx/s), the peak memory and quality metrics (ENL, edge preservation)
+             are reported. Compared against a baseline file the script exits with status 1
+             when a case regressed, so it can be used as a CI gate.
+
+    The peak memory (tracemalloc) does not depend on the machine: the CI workflow
+    (.github/workflows/benchmark.yml) compares it with benchmark_baseline.json on every
+    pull request. The throughput does, so its gate is manual: record a baseline with
+    --output on the benchmark machine and compare later runs on the same machine.
+
+    Usage:
+        python benchmark.py --output results.json
+        python benchmark.py --baseline results.json --tolerance 0.25
+        python benchmark.py --sizes 256 --kernels 5 7 --baseline benchmark_baseline.json --metrics memory
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import local_helper
+import local_speckle_filter as lsf
+import local_terrain_flattening as ltf
+import synthetic
+
+FILTERS = ['BOXCAR', 'LEE', 'GAMMA MAP', 'REFINED LEE', 'LEE SIGMA']
+KERNEL_SIZES = [3, 5, 7, 9]
+SCENE_SIZES = [256, 512, 1024]
+
+# ---------------------------------------------------------------------------//
+# Quality metrics
+# ---------------------------------------------------------------------------//
+
+def _homogeneous(truth, points, KERNEL_SIZE=11):
+    _, variance, _ = lsf.neighborhood_stats(truth.astype(np.float64), KERNEL_SIZE)
+    near_point = lsf._box_sum(points, KERNEL_SIZE) > 0
+    return (variance == 0) & ~near_point
+
+
+def enl(filtered, truth, points):
+    """
+    Equivalent number of looks, mean^2/variance, averaged over the homogeneous
+    areas of every reflectivity level.
+
+    Parameters
+    ----------
+    filtered : numpy array
+        Filtered band
+    truth : numpy array
+        Noise free reflectivity
+    points : numpy array
+        Boolean array of the point scatterers
+
+    Returns
+    -------
+    float
+        The ENL, larger is smoother
+
+    """
+    mask = _homogeneous(truth, points) & ~np.isnan(filtered)
+    values = []
+    for level in np.unique(truth[mask]):
+        sample = filtered[mask & (truth == level)]
+        if sample.size > 100 and sample.var() > 0:
+            values.append(sample.mean()**2 / sample.var())
+    return float(np.mean(values)) if values else float('nan')
+
+
+def edge_preservation(filtered, truth, points):
+    """
+    Edge preservation index: the summed absolute gradient of the filtered band
+    over the edge pixels relative to that of the noise free reflectivity.
+
+    Parameters
+    ----------
+    filtered : numpy array
+        Filtered band
+    truth : numpy array
+        Noise free reflectivity
+    points : numpy array
+        Boolean array of the point scatterers
+
+    Returns
+    -------
+    float
+        The index, 1 means the edge contrast is fully preserved
+
+    """
+    near_point = lsf._box_sum(points, 5) > 0
+    dy_t, dx_t = np.abs(np.diff(truth, axis=0))[:, :-1], np.abs(np.diff(truth, axis=1))[:-1, :]
+    dy_f, dx_f = np.abs(np.diff(filtered, axis=0))[:, :-1], np.abs(np.diff(filtered, axis=1))[:-1, :]
+    edges = ((dy_t > 0) | (dx_t > 0)) & ~near_point[:-1, :-1]
+    edges &= ~np.isnan(dy_f) & ~np.isnan(dx_f)
+    reference = (dy_t + dx_t)[edges].sum()
+    return float((dy_f + dx_f)[edges].sum() / reference) if reference > 0 else float('nan')
+
+
+# ---------------------------------------------------------------------------//
+# Cases
+# ---------------------------------------------------------------------------//
+
+def _speckle_case(SPECKLE_FILTER, KERNEL_SIZE, size):
+    def setup():
+        image, truth = synthetic.synthetic_scene((size, size), seed=size)
+        _, points = synthetic.reflectivity((size, size), seed=size, band='VV')
+        return image, truth, points
+
+    def run(args):
+        return lsf.MonoTemporal_Filter([args[0]], KERNEL_SIZE, SPECKLE_FILTER)[0]
+
+    def quality(output, args):
+        _, truth, points = args
+        return {'enl': enl(output['bands']['VV'], truth['VV'], points),
+                'edge_preservation': edge_preservation(output['bands']['VV'], truth['VV'], points)}
+
+    name = 'speckle/{}/k{}/{}px'.format(SPECKLE_FILTER.replace(' ', '_').lower(), KERNEL_SIZE, size)
+    return {'name': name, 'pixels': size * size * 2, 'setup': setup, 'run': run, 'quality': quality}
+
+
+def _multitemporal_case(SPECKLE_FILTER, KERNEL_SIZE, size, NR_OF_IMAGES=10):
+    def setup():
+        coll, truth = synthetic.synthetic_stack(NR_OF_IMAGES, (size, size), seed=size)
+        _, points = synthetic.reflectivity((size, size), seed=size, band='VV')
+        return coll, truth, points
+
+    def run(args):
+        return lsf.MultiTemporal_Filter(args[0], KERNEL_SIZE, SPECKLE_FILTER, NR_OF_IMAGES)
+
+    def quality(output, args):
+        _, truth, points = args
+        band = output[-1]['bands']['VV']
+        return {'enl': enl(band, truth['VV'], points),
+                'edge_preservation': edge_preservation(band, truth['VV'], points)}
+
+    name = 'multitemporal/{}/k{}/n{}/{}px'.format(SPECKLE_FILTER.replace(' ', '_').lower(),
+                                                  KERNEL_SIZE, NR_OF_IMAGES, size)
+    return {'name': name, 'pixels': size * size * 2 * NR_OF_IMAGES,
+            'setup': setup, 'run': run, 'quality': quality}
+
+
+def _terrain_flattening_case(TERRAIN_FLATTENING_MODEL, size, use_lut=False, DEM_BUFFER=30):
+    def setup():
+        image, _ = synthetic.synthetic_scene((size, size), seed=size)
+        return image, synthetic.synthetic_dem((size, size), seed=size)
+
+    def run(args):
+        return ltf.slope_correction([args[0]], TERRAIN_FLATTENING_MODEL, args[1], DEM_BUFFER,
+                                    use_lut=use_lut)[0]
+
+    def quality(output, args):
+        return {'masked_fraction': float(np.isnan(output['bands']['VV']).mean())}
+
+    name = 'terrain/{}{}/{}px'.format(TERRAIN_FLATTENING_MODEL.lower(), '_lut' if use_lut else '', size)
+    return {'name': name, 'pixels': size * size * 2, 'setup': setup, 'run': run, 'quality': quality}
+
+
+def _encoding_case(size):
+    def setup():
+        image, _ = synthetic.synthetic_scene((size, size), seed=size)
+        return (local_helper.lin_to_db(image),)
+
+    def run(args):
+        return local_helper.quantize(args[0])
+
+    def quality(output, args):
+        errors = local_helper.quantization_error(args[0])
+        raw = sum(band.nbytes for band in args[0]['bands'].values())
+        return {'max_error_db': max(errors[name][0] for name in local_helper.band_names(args[0])),
+                'masks_preserved': all(preserved for _, preserved in errors.values()),
+                'size_ratio': raw / sum(band.nbytes for band in output['bands'].values())}
+
+    return {'name': 'encoding/quantized/{}px'.format(size), 'pixels': size * size * 3,
+            'setup': setup, 'run': run, 'quality': quality}
+
+
+def build_cases(sizes=SCENE_SIZES, kernels=KERNEL_SIZES, filters=FILTERS):
+    """
+    Build the benchmark cases.
+
+    Parameters
+    ----------
+    sizes : list
+        Scene sizes (square, in pixels)
+    kernels : list
+        Speckle filter kernel sizes
+    filters : list
+        Speckle filters
+
+    Returns
+    -------
+    list
+        Case dictionaries with name, pixels, setup, run and quality
+
+    """
+    cases = []
+    for size in sizes:
+        for SPECKLE_FILTER in filters:
+            # the refined Lee filter uses fixed 7x7 directional windows
+            for KERNEL_SIZE in ([7] if SPECKLE_FILTER == 'REFINED LEE' else kernels):
+                cases.append(_speckle_case(SPECKLE_FILTER, KERNEL_SIZE, size))
+    size = min(sizes)
+    for SPECKLE_FILTER in filters:
+        for KERNEL_SIZE in ([7] if SPECKLE_FILTER == 'REFINED LEE' else kernels):
+            cases.append(_multitemporal_case(SPECKLE_FILTER, KERNEL_SIZE, size))
+    for size in sizes:
+        for TERRAIN_FLATTENING_MODEL in ['VOLUME', 'DIRECT']:
+            for use_lut in [False, True]:
+                cases.append(_terrain_flattening_case(TERRAIN_FLATTENING_MODEL, size, use_lut))
+        cases.append(_encoding_case(size))
+    return cases
+
+
+# ---------------------------------------------------------------------------//
+# Runner
+# ---------------------------------------------------------------------------//
+
+def run_case(case, repeat=3):
+    """
+    Time one case and measure its peak memory and quality.
+
+    The wall time is the minimum over repeat runs; the peak memory is measured
+    with tracemalloc in a separate run, relative to the inputs of the case.
+
+    Parameters
+    ----------
+    case : dict
+        As returned by build_cases
+    repeat : integer
+        Number of timed runs
+
+    Returns
+    -------
+    dict
+        name, seconds, throughput_mpx_s, peak_memory_mb and the quality metrics
+
+    """
+    args = case['setup']()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        output = case['run'](args)
+        times.append(time.perf_counter() - t0)
+    del output
+
+    tracemalloc.start()
+    output = case['run'](args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    seconds = min(times)
+    result = {'name': case['name'],
+              'seconds': seconds,
+              'throughput_mpx_s': case['pixels'] / seconds / 1e6,
+              'peak_memory_mb': peak / 2**20}
+    result.update(case['quality'](output, args))
+    return result
+
+
+def compare(results, baseline, tolerance=0.25, metrics=('throughput', 'memory')):
+    """
+    Compare benchmark results against a baseline.
+
+    Parameters
+    ----------
+    results : list
+        Results of run_case
+    baseline : list
+        Results of an earlier run
+    tolerance : float
+        Allowed relative loss of throughput or growth of peak memory
+    metrics : tuple
+        Compared metrics, 'throughput' (only meaningful against a baseline of the
+        same machine) and 'memory'
+
+    Returns
+    -------
+    list
+        Descriptions of the regressions, empty if there are none
+
+    """
+    reference = {entry['name']: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        base = reference.get(entry['name'])
+        if base is None:
+            continue
+        if ('throughput' in metrics and entry['throughput_mpx_s'] < base['throughput_mpx_s'] * (1 - tolerance)):
+            regressions.append('{}: throughput {:.2f} Mpx/s < baseline {:.2f} Mpx/s'.format(
+                entry['name'], entry['throughput_mpx_s'], base['throughput_mpx_s']))
+        if ('memory' in metrics and entry['peak_memory_mb'] > base['peak_memory_mb'] * (1 + tolerance)):
+            regressions.append('{}: peak memory {:.1f} MB > baseline {:.1f} MB'.format(
+                entry['name'], entry['peak_memory_mb'], base['peak_memory_mb']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the local ARD backend on synthetic scenes.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SCENE_SIZES)
+    parser.add_argument('--kernels', type=int, nargs='+', default=KERNEL_SIZES)
+    parser.add_argument('--filters', nargs='+', default=FILTERS)
+    parser.add_argument('--match', default='', help='only run cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--metrics', nargs='+', choices=['throughput', 'memory'], default=['throughput', 'memory'],
+                        help='metrics compared against the baseline')
+    args = parser.parse_args(argv)
+
+    results = []
+    print('{:<44}{:>10}{:>12}{:>10}{:>8}{:>8}'.format('case', 'seconds', 'Mpx/s', 'peak MB', 'ENL', 'EPI'))
+    for case in build_cases(args.sizes, args.kernels, args.filters):
+        if args.match not in case['name']:
+            continue
+        result = run_case(case, args.repeat)
+        results.append(result)
+        print('{:<44}{:>10.3f}{:>12.2f}{:>10.1f}{:>8.2f}{:>8.2f}'.format(
+            result['name'], result['seconds'], result['throughput_mpx_s'], result['peak_memory_mb'],
+            result.get('enl', float('nan')), result.get('edge_preservation', float('nan'))))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'machine': platform.platform(), 'python': platform.python_version(),
+                       'numpy': np.__version__, 'results': results}, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance, args.metrics)
+        for regression in regressions:
+            print('REGRESSION!!! ' + regression)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Temporal composites of a processed collection (the output of wrapper.s1_preproc),
+             the counterpart of local_composite.py.
+
+    The reducers are count, mean, variance, stdDev, median and pNN (percentile NN), combined
+    in one ee.Reducer so that the collection is read once. The composite is computed in
+    linear power or in dB (SPACE) whatever the format of the collection (FORMAT); mean and
+    quantiles are returned in FORMAT, variance and stdDev in SPACE. The bands are named
+    VV_mean, VV_median, VV_p90, ...
+"""
+
+import ee
+
+import helper
+
+MOMENTS = ['count', 'mean', 'variance', 'stdDev']
+SPACES = ['LINEAR', 'DB']
+
+
+def _reducer(name):
+    if name == 'median':
+        return ee.Reducer.median()
+    if name.startswith('p') and name[1:].isdigit() and 0 <= int(name[1:]) <= 100:
+        return ee.Reducer.percentile([int(name[1:])])
+    if name in MOMENTS:
+        return getattr(ee.Reducer, name)()
+    raise ValueError("ERROR!!! REDUCERS not correctly defined")
+
+
+def temporal_composite(collection, REDUCERS=('mean',), SPACE='LINEAR', FORMAT='DB'):
+    """
+    Temporal composite of a processed collection.
+
+    Parameters
+    ----------
+    collection : ee.ImageCollection
+        Processed collection
+    REDUCERS : list
+        Reducers among count, mean, variance, stdDev, median and pNN
+    SPACE : string
+        'LINEAR' or 'DB', the space in which the statistics are computed
+    FORMAT : string
+        'LINEAR' or 'DB', the format of the collection and of the mean and quantile outputs
+
+    Returns
+    -------
+    ee.Image
+        The composite with the bands <band>_<reducer>
+
+    """
+    if SPACE not in SPACES:
+        raise ValueError("ERROR!!! SPACE not correctly defined")
+    if FORMAT not in SPACES:
+        raise ValueError("ERROR!!! FORMAT not correctly defined")
+    reducers = [_reducer(name) for name in REDUCERS]
+    reducer = reducers[0]
+    for other in reducers[1:]:
+        reducer = reducer.combine(other, None, True)
+
+    bands = collection.first().bandNames().remove('angle')
+    images = collection.select(bands)
+    if (SPACE != FORMAT):
+        images = images.map(helper.db_to_lin if SPACE == 'LINEAR' else helper.lin_to_db)
+    composite = images.reduce(reducer)
+
+    if (SPACE != FORMAT):
+        # mean and quantiles back to the format of the collection
+        converted = [name for name in REDUCERS if name not in ('count', 'variance', 'stdDev')]
+        names = bands.map(lambda band: ee.List(converted).map(lambda r: ee.String(band).cat('_').cat(r))).flatten()
+        values = composite.select(names)
+        if SPACE == 'LINEAR':
+            values = values.log10().multiply(10)
+        else:
+            values = ee.Image.constant(10).pow(values.divide(10))
+        composite = composite.addBands(values.rename(names), None, True)
+    return composite.set({'system:time_start': collection.aggregate_min('system:time_start'),
+                          'system:time_end': collection.aggregate_max('system:time_start'),
+                          'SPACE': SPACE})
+
+
+def period_composites(collection, START_DATE, STOP_DATE, MONTHS=1, REDUCERS=('mean',), SPACE='LINEAR', FORMAT='DB'):
+    """
+    Composites of consecutive periods of MONTHS months, e.g. monthly (1) or seasonal (3).
+
+    Returns
+    -------
+    ee.ImageCollection
+        One composite per period with at least one image
+
+    """
+    start = ee.Date(START_DATE)
+    n = ee.Date(STOP_DATE).difference(start, 'month').divide(MONTHS).ceil()
+
+    def period(i):
+        begin = start.advance(ee.Number(i).multiply(MONTHS), 'month')
+        images = collection.filterDate(begin, begin.advance(MONTHS, 'month'))
+        return ee.Algorithms.If(images.size().gt(0),
+                                temporal_composite(images, REDUCERS, SPACE, FORMAT).set('period_start', begin.millis()),
+                                None)
+    return ee.ImageCollection(ee.List.sequence(0, n.subtract(1)).map(period, True))
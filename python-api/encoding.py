@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Quantized output encoding shared by the Earth Engine exports (helper.quantize)
+             and the local writes (local_helper.quantize).
+
+    backscatter (dB):  int16,  value = stored * 0.01 + 0,   nodata -32768
+    angle (degrees):   uint16, value = stored * 0.001 + 0,  nodata 65535
+    The quantization error is at most half a step: 0.005 dB and 0.0005 degrees.
+    The scale, offset and nodata are attached to the image properties (see metadata),
+    so that the files can be decoded without this module.
+"""
+
+ENCODING = 'QUANTIZED'
+
+BACKSCATTER = {'type': 'int16', 'scale': 0.01, 'offset': 0.0, 'nodata': -32768,
+               'min': -32767, 'max': 32767}
+ANGLE = {'type': 'uint16', 'scale': 0.001, 'offset': 0.0, 'nodata': 65535,
+         'min': 0, 'max': 65534}
+
+
+def band_encoding(name):
+    """Return the encoding of a band, the angle or a backscatter band."""
+    return ANGLE if name == 'angle' else BACKSCATTER
+
+
+def metadata():
+    """
+    Image properties describing the encoding.
+
+    Returns
+    -------
+    dict
+        'encoding' and the scale, offset and nodata of the backscatter and angle bands
+
+    """
+    properties = {'encoding': ENCODING}
+    for prefix, enc in (('backscatter', BACKSCATTER), ('angle', ANGLE)):
+        properties.update({prefix + '_scale': enc['scale'],
+                           prefix + '_offset': enc['offset'],
+                           prefix + '_nodata': enc['nodata']})
+    return properties
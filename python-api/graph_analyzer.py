@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Size and complexity analysis of the expression graph submitted by s1_preproc.
+             The analysis works offline on the serialized graph (ee.ComputedObject.serialize())
+             and reports node counts, depth, nesting of mapped functions and repeated
+             subexpressions per stage. It warns when a configuration is likely to fail with
+             "computation too complex" before anything is submitted.
+
+    Usage:
+        python graph_analyzer.py graph.json [graph2.json ...] [--fanout N]
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+
+# ---------------------------------------------------------------------------//
+# Limits
+# ---------------------------------------------------------------------------//
+
+# Empirical thresholds above which the server frequently rejects or times out
+# on a request. Earth Engine does not publish hard limits, so these are
+# deliberately conservative and can be overridden per call.
+LIMITS = {'nodes': 50000,
+          'expanded_nodes': 2000000,
+          'depth': 1500,
+          'evaluated_nodes': 50000000}
+
+
+# ---------------------------------------------------------------------------//
+# Graph walking
+# ---------------------------------------------------------------------------//
+
+class _Graph:
+    """
+    Memoized walk over a serialized graph in the Cloud API format
+    ({'result': id, 'values': {id: value node}}).
+    """
+
+    def __init__(self, graph, fanout):
+        self.values = graph.get('values', {})
+        self.result = graph.get('result')
+        self.fanout = fanout
+        self.references = {}
+        self._memo = {}
+
+    def _count_references(self, node):
+        if isinstance(node, dict):
+            if 'valueReference' in node:
+                ref = node['valueReference']
+                self.references[ref] = self.references.get(ref, 0) + 1
+                return
+            for key, child in node.items():
+                if key == 'constantValue':
+                    continue
+                self._count_references(child)
+        elif isinstance(node, list):
+            for child in node:
+                self._count_references(child)
+
+    def count_references(self):
+        for node in self.values.values():
+            self._count_references(node)
+
+    def _walk(self, node):
+        """
+        Return (expanded size, depth, evaluated size, nesting, hash) of a node.
+        """
+        if isinstance(node, dict) and 'valueReference' in node:
+            return self.walk_reference(node['valueReference'])
+
+        if isinstance(node, list):
+            children = [self._walk(child) for child in node]
+            return self._combine(children, 0, 'list')
+
+        if not isinstance(node, dict):
+            return 0, 0, 0, 0, hashlib.sha1(json.dumps(node).encode()).hexdigest()
+
+        if 'constantValue' in node or 'integerValue' in node or 'bytesValue' in node \
+                or 'argumentReference' in node:
+            digest = hashlib.sha1(json.dumps(node, sort_keys=True).encode()).hexdigest()
+            return 1, 1, 1, 0, digest
+
+        if 'functionDefinitionValue' in node:
+            definition = node['functionDefinitionValue']
+            size, depth, evaluated, nesting, digest = self.walk_reference(definition['body'])
+            digest = hashlib.sha1(('def' + str(definition.get('argumentNames')) + digest).encode()).hexdigest()
+            # a mapped function body is evaluated once per collection element
+            return size + 1, depth + 1, 1 + self.fanout * evaluated, nesting + 1, digest
+
+        if 'functionInvocationValue' in node:
+            invocation = node['functionInvocationValue']
+            arguments = invocation.get('arguments', {})
+            names = sorted(arguments)
+            children = [self._walk(arguments[name]) for name in names]
+            if 'functionReference' in invocation:
+                children.append(self.walk_reference(invocation['functionReference']))
+            label = invocation.get('functionName', 'call') + str(names)
+            return self._combine(children, 1, label)
+
+        if 'arrayValue' in node:
+            return self._combine([self._walk(child) for child in node['arrayValue'].get('values', [])],
+                                 1, 'array')
+
+        if 'dictionaryValue' in node:
+            values = node['dictionaryValue'].get('values', {})
+            names = sorted(values)
+            return self._combine([self._walk(values[name]) for name in names], 1, 'dict' + str(names))
+
+        return 1, 1, 1, 0, hashlib.sha1(json.dumps(node, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def _combine(children, own, label):
+        size = own + sum(child[0] for child in children)
+        depth = own + max([child[1] for child in children] or [0])
+        evaluated = own + sum(child[2] for child in children)
+        nesting = max([child[3] for child in children] or [0])
+        digest = hashlib.sha1((label + ''.join(child[4] for child in children)).encode()).hexdigest()
+        return size, depth, evaluated, nesting, digest
+
+    def _direct_references(self, node, out):
+        if isinstance(node, dict):
+            if 'valueReference' in node:
+                out.append(node['valueReference'])
+                return out
+            if 'functionDefinitionValue' in node:
+                out.append(node['functionDefinitionValue']['body'])
+                return out
+            if 'functionInvocationValue' in node and 'functionReference' in node['functionInvocationValue']:
+                out.append(node['functionInvocationValue']['functionReference'])
+            for key, child in node.items():
+                if key != 'constantValue':
+                    self._direct_references(child, out)
+        elif isinstance(node, list):
+            for child in node:
+                self._direct_references(child, out)
+        return out
+
+    def walk_reference(self, ref):
+        # iterative post-order over the references so that deep graphs do not
+        # hit the recursion limit; only inline (shallow) nodes are recursed
+        stack = [ref]
+        visiting = set()
+        while stack:
+            current = stack[-1]
+            if current in self._memo:
+                stack.pop()
+                continue
+            pending = [child for child in self._direct_references(self.values[current], [])
+                       if child not in self._memo]
+            if pending and current not in visiting:
+                visiting.add(current)
+                for child in pending:
+                    if child in visiting:
+                        raise ValueError("ERROR!!! cyclic reference {} in serialized graph".format(child))
+                stack.extend(pending)
+            elif pending:
+                raise ValueError("ERROR!!! cyclic reference {} in serialized graph".format(current))
+            else:
+                self._memo[current] = self._walk(self.values[current])
+                visiting.discard(current)
+                stack.pop()
+        return self._memo[ref]
+
+
+def _function_name(node):
+    if isinstance(node, dict):
+        if 'functionInvocationValue' in node:
+            return node['functionInvocationValue'].get('functionName', '<function call>')
+        if 'functionDefinitionValue' in node:
+            return '<function definition>'
+        for key in ('arrayValue', 'dictionaryValue', 'constantValue'):
+            if key in node:
+                return '<{}>'.format(key[:-5])
+    return '<value>'
+
+
+def analyze(graph, fanout=10, top=10):
+    """
+    Analyze a serialized Earth Engine expression graph.
+
+    Parameters
+    ----------
+    graph : dict or string
+        The serialized graph, as JSON text or decoded
+    fanout : integer
+        Assumed number of elements every mapped function is evaluated for,
+        used for the evaluated_nodes estimate
+    top : integer
+        Number of repeated subexpressions to report
+
+    Returns
+    -------
+    dict
+        nodes : number of unique value nodes as submitted
+        expanded_nodes : size of the graph with all shared references expanded
+        depth : longest path from the result to a leaf
+        nesting : maximum nesting of function definitions (mapped functions)
+        evaluated_nodes : expanded size with every function body multiplied by fanout
+        functions : number of invocations per algorithm name
+        repeated : the subexpressions referenced most often, with their size
+        hashes : structural hashes of all value nodes (used for stage attribution)
+
+    """
+    if isinstance(graph, str):
+        graph = json.loads(graph)
+
+    g = _Graph(graph, fanout)
+    g.count_references()
+    size, depth, evaluated, nesting, _ = g.walk_reference(g.result)
+
+    functions = {}
+    for node in g.values.values():
+        name = _function_name(node)
+        functions[name] = functions.get(name, 0) + 1
+
+    hashes = {ref: g.walk_reference(ref)[4] for ref in g.values}
+    repeated = []
+    for ref, count in g.references.items():
+        if count < 2:
+            continue
+        node_size = g.walk_reference(ref)[0]
+        repeated.append({'function': _function_name(g.values[ref]),
+                         'references': count,
+                         'size': node_size,
+                         'saved_nodes': (count - 1) * node_size,
+                         'hash': hashes[ref]})
+    repeated.sort(key=lambda entry: entry['saved_nodes'], reverse=True)
+
+    return {'nodes': len(g.values),
+            'expanded_nodes': size,
+            'depth': depth,
+            'nesting': nesting,
+            'evaluated_nodes': evaluated,
+            'functions': functions,
+            'repeated': repeated[:top],
+            'hashes': set(hashes.values())}
+
+
+def check_limits(stats, limits=None):
+    """
+    Compare the statistics of a graph against the complexity limits.
+
+    Parameters
+    ----------
+    stats : dict
+        As returned by analyze
+    limits : dict, optional
+        Overrides for LIMITS
+
+    Returns
+    -------
+    list
+        Human readable warnings, empty if the graph is within all limits
+
+    """
+    merged = dict(LIMITS)
+    merged.update(limits or {})
+    warnings = []
+    for key, limit in merged.items():
+        if stats.get(key, 0) > limit:
+            warnings.append('{} = {:,} exceeds the limit of {:,}; the request is likely to fail '
+                            'with "computation too complex"'.format(key, stats[key], limit))
+    return warnings
+
+
+def analyze_stages(stage_graphs, fanout=10, top=5):
+    """
+    Attribute graph size to the stages of the pipeline.
+
+    Parameters
+    ----------
+    stage_graphs : list
+        Ordered (stage name, serialized graph) tuples where each graph is the
+        cumulative result after the stage (see wrapper.preproc_stages)
+    fanout : integer
+        See analyze
+    top : integer
+        Number of repeated subexpressions reported per stage
+
+    Returns
+    -------
+    list
+        One dictionary per stage with the statistics of analyze, the nodes
+        added by the stage and the repeated subexpressions first introduced by it
+
+    """
+    report = []
+    previous = None
+    for stage, graph in stage_graphs:
+        stats = analyze(graph, fanout=fanout, top=100)
+        seen = set() if previous is None else previous['hashes']
+        entry = {key: value for key, value in stats.items() if key not in ('hashes', 'repeated')}
+        entry['stage'] = stage
+        entry['added_nodes'] = stats['nodes'] - (0 if previous is None else previous['nodes'])
+        entry['added_expanded_nodes'] = stats['expanded_nodes'] - (0 if previous is None else previous['expanded_nodes'])
+        entry['repeated'] = [r for r in stats['repeated'] if r['hash'] not in seen][:top]
+        entry['warnings'] = check_limits(stats)
+        report.append(entry)
+        previous = stats
+    return report
+
+
+def format_report(report):
+    """
+    Render a stage report of analyze_stages as text.
+
+    Parameters
+    ----------
+    report : list
+        As returned by analyze_stages
+
+    Returns
+    -------
+    string
+        The formatted report
+
+    """
+    lines = ['{:<26}{:>10}{:>10}{:>14}{:>8}{:>8}{:>16}'.format(
+        'stage', 'nodes', '+nodes', 'expanded', 'depth', 'nest', 'evaluated')]
+    for entry in report:
+        lines.append('{:<26}{:>10,}{:>10,}{:>14,}{:>8}{:>8}{:>16,}'.format(
+            entry['stage'], entry['nodes'], entry['added_nodes'], entry['expanded_nodes'],
+            entry['depth'], entry['nesting'], entry['evaluated_nodes']))
+        for r in entry['repeated']:
+            lines.append('    repeated {}x {} ({:,} nodes)'.format(r['references'], r['function'], r['size']))
+    warnings = report[-1]['warnings'] if report else []
+    for warning in warnings:
+        lines.append('WARNING!!! ' + warning)
+    return '\n'.join(lines)
+
+
+def serialize_stages(params):
+    """
+    Serialize the cumulative graph after every stage of s1_preproc.
+
+    Building the graph needs an initialised Earth Engine session but issues
+    no computation; the result can be saved and analysed offline.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by wrapper.s1_preproc
+
+    Returns
+    -------
+    list
+        Ordered (stage name, serialized graph as JSON text) tuples
+
+    """
+    # wrapper initialises Earth Engine on import, the analysis above works offline
+    import wrapper
+
+    params = wrapper.check_params(params)
+    return [(stage, collection.serialize()) for stage, collection in wrapper.preproc_stages(params)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze serialized Earth Engine graphs.')
+    parser.add_argument('graphs', nargs='+',
+                        help='serialized graphs, one per stage in pipeline order')
+    parser.add_argument('--fanout', type=int, default=10,
+                        help='assumed number of elements per mapped function')
+    args = parser.parse_args(argv)
+
+    stage_graphs = []
+    for path in args.graphs:
+        with open(path) as f:
+            stage_graphs.append((path, f.read()))
+    report = analyze_stages(stage_graphs, fanout=args.fanout)
+    print(format_report(report))
+    return 1 if report and report[-1]['warnings'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
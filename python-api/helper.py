@@ -7,6 +7,7 @@ Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Go
 """
 
 import ee
+import encoding
 
 # ---------------------------------------------------------------------------//
 # Linear to db scale
@@ -91,3 +92,83 @@ def add_ratio_lin(image):
     ratio = image.addBands(image.select('VV').divide(image.select('VH')).rename('VVVH_ratio'))
     
     return ratio.set('system:time_start', image.get('system:time_start'))
+
+# ---------------------------------------------------------------------------//
+# Downsampling
+# ---------------------------------------------------------------------------//
+
+def downsample(image, FACTOR):
+    """
+    Image at a FACTOR times coarser resolution, like a multilook of the backscatter.
+
+    Parameters
+    ----------
+    image : ee.Image
+        Image in linear power
+    FACTOR : integer
+        Downsampling factor
+
+    Returns
+    -------
+    ee.Image
+        The mean of every FACTOR x FACTOR block of pixels of the image projection,
+        with the image properties
+
+    """
+    proj = image.select(0).projection()
+    reduced = image.reduceResolution(ee.Reducer.mean(), False, max(64, FACTOR * FACTOR)) \
+        .reproject(proj.scale(FACTOR, FACTOR))
+    return ee.Image(reduced.copyProperties(image, image.propertyNames()))
+
+
+# ---------------------------------------------------------------------------//
+# Quantized output
+# ---------------------------------------------------------------------------//
+
+def quantize(image):
+    """
+    Encode dB backscatter as scaled int16 and the angle as scaled uint16 (see encoding.py).
+    The masks are kept as the image masks.
+
+    Parameters
+    ----------
+    image : ee.Image
+        Image in dB to encode
+
+    Returns
+    -------
+    ee.Image
+        Encoded image with the scale and offset in its properties
+
+    """
+    bs = encoding.BACKSCATTER
+    ang = encoding.ANGLE
+    bandNames = image.bandNames().remove('angle')
+    backscatter = image.select(bandNames).subtract(bs['offset']).divide(bs['scale']).round() \
+        .clamp(bs['min'], bs['max']).toInt16()
+    angle = image.select('angle').subtract(ang['offset']).divide(ang['scale']).round() \
+        .clamp(ang['min'], ang['max']).toUint16()
+    return image.addBands(backscatter, None, True).addBands(angle, None, True).set(encoding.metadata())
+
+
+def dequantize(image):
+    """
+    Decode an image encoded with quantize.
+
+    Parameters
+    ----------
+    image : ee.Image
+        Encoded image
+
+    Returns
+    -------
+    ee.Image
+        Image with float backscatter (dB) and angle bands
+
+    """
+    bandNames = image.bandNames().remove('angle')
+    backscatter = image.select(bandNames).toFloat().multiply(ee.Number(image.get('backscatter_scale'))) \
+        .add(ee.Number(image.get('backscatter_offset')))
+    angle = image.select('angle').toFloat().multiply(ee.Number(image.get('angle_scale'))) \
+        .add(ee.Number(image.get('angle_offset')))
+    return image.addBands(backscatter, None, True).addBands(angle, None, True)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Adopted from Hird et al. 2017 Remote Sensing (supplementary material): http://www.mdpi.com/2072-4292/9/12/1315)
+Description: NumPy implementation of the additional border noise correction of
+             border_noise_correction.py for local execution.
+
+    The incidence angle increases (or decreases) monotonically across range, so the pixels
+    with 30.63993 < angle < 45.23993 form a single run of columns in every row. The run is
+    found with a binary search on the angle band, O(rows * log(cols)) angle lookups, and
+    the pixels outside of it are masked with two slice assignments per row. No full
+    resolution boolean raster is built and interior pixels are not touched.
+"""
+
+import numpy as np
+
+import local_helper
+from local_mask import PackedMask
+
+# incidence angle limits of the valid swath in degrees
+ANGLE_MIN = 30.63993
+ANGLE_MAX = 45.23993
+
+# ---------------------------------------------------------------------------//
+# Run-length spans
+# ---------------------------------------------------------------------------//
+
+def _first_true(predicate, n_rows, n_cols):
+    """
+    Vectorized binary search of the first column where a per row monotonic
+    (False ... True) predicate holds, n_cols where it never holds.
+    """
+    rows = np.arange(n_rows)
+    lo = np.zeros(n_rows, np.int64)
+    hi = np.full(n_rows, n_cols, np.int64)
+    active = lo < hi
+    while active.any():
+        r = rows[active]
+        mid = (lo[active] + hi[active]) // 2
+        hit = predicate(r, mid)
+        hi[r[hit]] = mid[hit]
+        lo[r[~hit]] = mid[~hit] + 1
+        active = lo < hi
+    return lo
+
+
+def border_spans(image, ANGLE_MIN=ANGLE_MIN, ANGLE_MAX=ANGLE_MAX):
+    """
+    Column run of the valid swath in every row, the run-length equivalent of
+    maskAngGT30 and maskAngLT452.
+
+    Parameters
+    ----------
+    image : dict
+        Local image with an angle band (array or local_helper.CompactAngle)
+    ANGLE_MIN, ANGLE_MAX : float
+        Pixels with ANGLE_MIN < angle < ANGLE_MAX are valid
+
+    Returns
+    -------
+    tuple
+        (starts, stops) integer arrays of length rows; columns starts[r] up to
+        stops[r] (exclusive) of row r are valid, the run is empty where start >= stop
+
+    """
+    rows, cols = local_helper.image_shape(image)
+    all_rows = np.arange(rows)
+    first = local_helper.angle_at(image, all_rows, np.zeros(rows, np.int64))
+    last = local_helper.angle_at(image, all_rows, np.full(rows, cols - 1))
+    increasing = last >= first
+
+    # increasing rows: angle > min from the start on, angle >= max from the stop on
+    # decreasing rows: angle < max from the start on, angle <= min from the stop on
+    def start(r, c):
+        value = local_helper.angle_at(image, r, c)
+        return np.where(increasing[r], value > ANGLE_MIN, value < ANGLE_MAX)
+
+    def stop(r, c):
+        value = local_helper.angle_at(image, r, c)
+        return np.where(increasing[r], value >= ANGLE_MAX, value <= ANGLE_MIN)
+
+    with np.errstate(invalid='ignore'):
+        starts = _first_true(start, rows, cols)
+        stops = _first_true(stop, rows, cols)
+    return starts, stops
+
+
+def apply_spans(array, starts, stops, fill=np.nan):
+    """
+    Set the pixels outside of the run of every row to fill, in place.
+
+    Parameters
+    ----------
+    array : numpy array
+        2-D band
+    starts, stops : numpy arrays
+        The runs, as returned by border_spans
+    fill : scalar
+        Value of the masked pixels
+
+    Returns
+    -------
+    numpy array
+        The same array
+
+    """
+    cols = array.shape[1]
+    empty = starts >= stops
+    array[empty] = fill
+    # the runs change slowly along azimuth, rows with the same bound are masked together
+    for bounds, sel in ((starts, (starts > 0) & ~empty), (stops, (stops < cols) & ~empty)):
+        rows = np.nonzero(sel)[0]
+        values, groups = np.unique(bounds[rows], return_inverse=True)
+        order = np.argsort(groups, kind='stable')
+        splits = np.split(rows[order], np.cumsum(np.bincount(groups, minlength=len(values)))[:-1])
+        for value, group in zip(values, splits):
+            if bounds is starts:
+                array[group, :value] = fill
+            else:
+                array[group, value:] = fill
+    return array
+
+
+def border_mask(image):
+    """
+    Valid swath of a local image as a bit-packed mask, for stages that combine
+    it with other masks.
+
+    Parameters
+    ----------
+    image : dict
+        Local image with an angle band
+
+    Returns
+    -------
+    PackedMask
+        True where the pixel is valid
+
+    """
+    starts, stops = border_spans(image)
+    return PackedMask.from_spans(starts, stops, local_helper.image_shape(image)[1])
+
+
+# ---------------------------------------------------------------------------//
+# Additional Border Noise Removal
+# ---------------------------------------------------------------------------//
+
+def f_mask_edges(image, inplace=False):
+    """
+    Function to mask out border noise artefacts
+
+    Parameters
+    ----------
+    image : dict
+        Local image to apply the border noise correction to
+    inplace : boolean
+        Mask the band arrays of the image itself instead of copies
+
+    Returns
+    -------
+    dict
+        Corrected image
+
+    """
+    starts, stops = border_spans(image)
+    bands = {}
+    for name in local_helper.band_names(image):
+        band = image['bands'][name]
+        bands[name] = apply_spans(band if inplace else band.copy(), starts, stops)
+    return local_helper.add_bands(image, bands)
+
+
+def mask_edges(collection, inplace=False):
+    """
+    Apply the additional border noise correction to a local image collection.
+
+    Parameters
+    ----------
+    collection : list
+        Local image collection
+    inplace : boolean
+        See f_mask_edges
+
+    Returns
+    -------
+    list
+        The corrected local image collection
+
+    """
+    return [f_mask_edges(image, inplace) for image in collection]
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Cloud-Optimized GeoTIFF writer of the local backend.
+
+    write_cog writes the backscatter bands of a local image as a tiled GeoTIFF with
+    pixel interleaved samples, compressed with DEFLATE (zlib) or ZSTD (the optional
+    zstandard package, or imagecodecs without it) after the horizontal (integer) or
+    floating point predictor. The
+    tiles are encoded in parallel threads, both codecs release the GIL. The overviews are
+    block means (2 x 2, ignoring the masked pixels) of the level before, computed from the
+    arrays in memory, until a level fits in one tile. The file has the COG layout: the
+    image file directories of all levels first, then the tiles of the smallest overview up
+    to those of the full resolution, so that a reader fetches a level with one request per
+    tile.
+
+    The georeferencing comes from the 'transform' and 'crs' (EPSG code) properties, the
+    band names are written as band descriptions and system:index, system:time_start and
+    the other scalar properties as metadata (GDAL_METADATA tag), together with the scale
+    and offset of quantized images (OUTPUT_ENCODING: 'QUANTIZED'), and masked pixels as
+    the nodata value (NaN or the nodata of encoding.py). The angle band is written to
+    '<name>_angle.tif' when its type differs from that of the backscatter (quantized
+    images), like the ANGLE_SCALE exports on Earth Engine. Files larger than 4 GB are
+    written as BigTIFF.
+
+    Usage:
+        python local_cog.py scenes/*.npz --output cogs/ --compression ZSTD --workers 8
+"""
+
+import argparse
+import concurrent.futures
+import os
+import struct
+import sys
+import time
+import zlib
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    # ZSTD compression is optional
+    zstandard = None
+try:
+    # the ZSTD codec of imagecodecs (installed with tifffile[all]) without zstandard
+    import imagecodecs
+except ImportError:
+    imagecodecs = None
+
+import encoding
+import local_helper
+
+COMPRESSIONS = {'NONE': 1, 'DEFLATE': 8, 'ZSTD': 50000}
+TILE_SIZE = 512
+# files from this size on are written as BigTIFF
+BIGTIFF_BYTES = 2**32 - 2**24
+
+# TIFF field types
+_SHORT, _LONG, _ASCII, _DOUBLE, _LONG8 = 3, 4, 2, 12, 16
+_FORMATS = {_SHORT: 'H', _LONG: 'I', _DOUBLE: 'd', _LONG8: 'Q'}
+_SAMPLE_FORMATS = {'u': 1, 'i': 2, 'f': 3}
+
+# ---------------------------------------------------------------------------//
+# Tiles
+# ---------------------------------------------------------------------------//
+
+def _predict(tile, spp):
+    """Apply the TIFF predictor to a (rows, cols, samples) tile, returns the bytes to compress."""
+    rows = tile.shape[0]
+    if tile.dtype.kind == 'f':
+        # floating point predictor: the bytes of every row are split into planes,
+        # most significant first, then differenced with a stride of one pixel
+        size = tile.dtype.itemsize
+        planes = tile.astype(tile.dtype.newbyteorder('<'), copy=False).view(np.uint8)
+        planes = planes.reshape(rows, -1, size)[:, :, ::-1].transpose(0, 2, 1).reshape(rows, -1)
+        out = planes.copy()
+        out[:, spp:] -= planes[:, :-spp]
+        return out.tobytes()
+    # horizontal differencing of the samples of adjacent pixels, modulo the type range
+    values = tile.reshape(rows, -1).astype(tile.dtype.newbyteorder('<'), copy=False)
+    out = values.copy()
+    out[:, spp:] -= values[:, :-spp]
+    return out.tobytes()
+
+
+def _compressor(COMPRESSION, LEVEL):
+    if COMPRESSION == 'DEFLATE':
+        return lambda data: zlib.compress(data, LEVEL)
+    if COMPRESSION == 'ZSTD':
+        if zstandard is not None:
+            # a compressor object is not thread safe, one per call
+            return lambda data: zstandard.ZstdCompressor(level=LEVEL).compress(data)
+        if imagecodecs is not None and imagecodecs.ZSTD.available:
+            return lambda data: imagecodecs.zstd_encode(data, level=LEVEL)
+        raise ValueError("ERROR!!! ZSTD compression requires zstandard or imagecodecs: pip install zstandard")
+    return lambda data: data
+
+
+def _tiles(array, TILE, fill):
+    """The (rows, cols, samples) tiles of a level in row major order, edge tiles padded with fill."""
+    rows, cols = array.shape[:2]
+    for r0 in range(0, rows, TILE):
+        for c0 in range(0, cols, TILE):
+            tile = array[r0:r0 + TILE, c0:c0 + TILE]
+            if tile.shape[:2] != (TILE, TILE):
+                padded = np.full((TILE, TILE) + array.shape[2:], fill, array.dtype)
+                padded[:tile.shape[0], :tile.shape[1]] = tile
+                tile = padded
+            yield tile
+
+
+def _overview(array, nodata):
+    """2 x 2 block mean of a (rows, cols, samples) level, masked pixels ignored."""
+    out = []
+    for s in range(array.shape[2]):
+        band = array[:, :, s]
+        if band.dtype.kind != 'f':
+            band = np.where(band == nodata, np.nan, band.astype(np.float32))
+        mean = local_helper.block_mean(band, 2)
+        if array.dtype.kind != 'f':
+            mean = np.where(np.isnan(mean), nodata, np.rint(mean))
+        out.append(mean.astype(array.dtype))
+    return np.stack(out, axis=-1)
+
+
+def levels(array, TILE, nodata, OVERVIEWS=None):
+    """
+    The full resolution and the overviews of a (rows, cols, samples) array.
+
+    Parameters
+    ----------
+    array : numpy array
+        Full resolution
+    TILE : integer
+        Tile size; without OVERVIEWS, overviews are added until a level fits in one tile
+    nodata : scalar
+        Value of the masked pixels of integer arrays
+    OVERVIEWS : integer, optional
+        Number of overviews
+
+    Returns
+    -------
+    list
+        The levels, each half the size of the one before
+
+    """
+    out = [array]
+    while (len(out) - 1 < OVERVIEWS if OVERVIEWS is not None else max(out[-1].shape[:2]) > TILE):
+        if min(out[-1].shape[:2]) < 2:
+            break
+        out.append(_overview(out[-1], nodata))
+    return out
+
+
+# ---------------------------------------------------------------------------//
+# Tags
+# ---------------------------------------------------------------------------//
+
+def _epsg(crs):
+    if isinstance(crs, str) and crs.upper().startswith('EPSG:'):
+        return int(crs.split(':')[1])
+    return None
+
+
+def _geotags(properties):
+    """GeoTIFF tags of the transform and the crs of an image."""
+    transform = properties.get('transform')
+    if transform is None:
+        return {}
+    x0, sx, rx, y0, ry, sy = transform
+    tags = {}
+    if rx == 0 and ry == 0:
+        tags[33550] = (_DOUBLE, [sx, -sy, 0.0])
+        tags[33922] = (_DOUBLE, [0.0, 0.0, 0.0, x0, y0, 0.0])
+    else:
+        tags[34264] = (_DOUBLE, [sx, rx, 0.0, x0, ry, sy, 0.0, y0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0])
+    epsg = _epsg(properties.get('crs'))
+    if epsg is not None:
+        geographic = epsg == 4326
+        keys = [(1024, 0, 1, 2 if geographic else 1),      # GTModelTypeGeoKey
+                (1025, 0, 1, 1),                           # GTRasterTypeGeoKey: PixelIsArea
+                (2048 if geographic else 3072, 0, 1, epsg)]  # Geographic/ProjectedCSTypeGeoKey
+        tags[34735] = (_SHORT, [1, 1, 0, len(keys)] + [value for key in keys for value in key])
+    return tags
+
+
+def gdal_metadata(properties, names, scales=None):
+    """
+    GDAL_METADATA XML of an image: the scalar properties and the description (band name),
+    scale and offset of every sample.
+    """
+    items = []
+    for key, value in sorted(properties.items()):
+        if key in ('transform', 'crs') or isinstance(value, (dict, list, tuple)) or value is None:
+            continue
+        items.append('<Item name="{}">{}</Item>'.format(escape(key, {'"': '&quot;'}), escape(str(value))))
+    for sample, name in enumerate(names):
+        items.append('<Item name="DESCRIPTION" sample="{}" role="description">{}</Item>'.format(sample, escape(name)))
+        if scales is not None:
+            scale, offset = scales[sample]
+            items.append('<Item name="SCALE" sample="{}" role="scale">{}</Item>'.format(sample, scale))
+            items.append('<Item name="OFFSET" sample="{}" role="offset">{}</Item>'.format(sample, offset))
+    return '<GDALMetadata>' + ''.join(items) + '</GDALMetadata>'
+
+
+def _ifd(tags):
+    """Encode an IFD: (entries, values stored after the entries) with placeholders for the offsets."""
+    entries, values = [], []
+    for tag in sorted(tags):
+        field, data = tags[tag]
+        if field == _ASCII:
+            raw = data.encode('utf-8') + b'\0'
+            count = len(raw)
+        else:
+            data = list(data)
+            raw = struct.pack('<{}{}'.format(len(data), _FORMATS[field]), *data)
+            count = len(data)
+        entries.append((tag, field, count, raw))
+    return entries
+
+
+def _ifd_size(entries, big):
+    inline = 8 if big else 4
+    size = (8 if big else 2) + len(entries) * (20 if big else 12) + (8 if big else 4)
+    return size + sum(len(raw) + len(raw) % 2 for _, _, _, raw in entries if len(raw) > inline)
+
+
+def _pack_ifd(entries, offset, next_offset, big):
+    """Bytes of an IFD written at offset, its out-of-line values following the entries."""
+    inline = 8 if big else 4
+    head = struct.pack('<Q' if big else '<H', len(entries))
+    data_offset = offset + (8 if big else 2) + len(entries) * (20 if big else 12) + (8 if big else 4)
+    body, extra = [], []
+    for tag, field, count, raw in entries:
+        if len(raw) <= inline:
+            value = raw.ljust(inline, b'\0')
+        else:
+            value = struct.pack('<Q' if big else '<I', data_offset)
+            extra.append(raw + b'\0' * (len(raw) % 2))
+            data_offset += len(extra[-1])
+        body.append(struct.pack('<HHQ' if big else '<HHI', tag, field, count) + value)
+    return head + b''.join(body) + struct.pack('<Q' if big else '<I', next_offset) + b''.join(extra)
+
+
+# ---------------------------------------------------------------------------//
+# Writer
+# ---------------------------------------------------------------------------//
+
+def _samples(image, names):
+    """(rows, cols, samples) array, nodata, scales of the named bands of an image."""
+    bands = [local_helper.angle(image) if name == 'angle' else image['bands'][name] for name in names]
+    array = np.stack(bands, axis=-1)
+    quantized = image['properties'].get('encoding') == encoding.ENCODING
+    if array.dtype.kind == 'f':
+        return array, np.nan, None
+    encodings = [encoding.band_encoding(name) for name in names]
+    scales = [(enc['scale'], enc['offset']) for enc in encodings] if quantized else None
+    return array, encodings[0]['nodata'], scales
+
+
+def _write(path, array, nodata, names, properties, scales, COMPRESSION, PREDICTOR, LEVEL, TILE, OVERVIEWS, pool):
+    spp = array.shape[2]
+    compress = _compressor(COMPRESSION, LEVEL)
+    predict = PREDICTOR and COMPRESSION != 'NONE'
+
+    def encode(tile):
+        return compress(_predict(tile, spp) if predict else tile.astype(tile.dtype.newbyteorder('<'),
+                                                                        copy=False).tobytes())
+
+    # the tiles of every level are encoded in parallel
+    pyramid = levels(array, TILE, nodata, OVERVIEWS)
+    encoded = [list(pool.map(encode, _tiles(level, TILE, nodata))) for level in pyramid]
+    data_bytes = sum(len(tile) for tiles in encoded for tile in tiles)
+    big = data_bytes >= BIGTIFF_BYTES
+
+    base = {258: (_SHORT, [array.dtype.itemsize * 8] * spp),
+            259: (_SHORT, [COMPRESSIONS[COMPRESSION]]),
+            262: (_SHORT, [1]),
+            277: (_SHORT, [spp]),
+            284: (_SHORT, [1]),
+            322: (_SHORT, [TILE]),
+            323: (_SHORT, [TILE]),
+            339: (_SHORT, [_SAMPLE_FORMATS[array.dtype.kind]] * spp)}
+    if predict:
+        base[317] = (_SHORT, [3 if array.dtype.kind == 'f' else 2])
+    base[42113] = (_ASCII, 'nan' if array.dtype.kind == 'f' else str(nodata))
+    offsets_type = _LONG8 if big else _LONG
+
+    def tags(index, offsets, counts):
+        level = pyramid[index]
+        t = dict(base)
+        t.update({254: (_LONG, [0 if index == 0 else 1]),
+                  256: (_LONG, [level.shape[1]]),
+                  257: (_LONG, [level.shape[0]]),
+                  324: (offsets_type, offsets),
+                  325: (offsets_type, counts)})
+        if index == 0:
+            t.update(_geotags(properties))
+            t[42112] = (_ASCII, gdal_metadata(properties, names, scales))
+        return t
+
+    # layout: header, ghost area, the IFDs of all levels, the tiles from the smallest level up
+    structure = 'LAYOUT=IFDS_BEFORE_DATA\nBLOCK_ORDER=ROW_MAJOR\nKNOWN_INCOMPATIBLE_EDITION=NO\n'
+    # padded so that the first IFD starts on a word boundary
+    structure += ' ' * ((len(structure) + 1) % 2)
+    ghost = 'GDAL_STRUCTURAL_METADATA_SIZE={:06d} bytes\n'.format(len(structure)) + structure
+    header_size = (16 if big else 8) + len(ghost)
+    counts = [[len(tile) for tile in tiles] for tiles in encoded]
+    placeholder = [tags(i, [0] * len(c), c) for i, c in enumerate(counts)]
+    sizes = [_ifd_size(_ifd(t), big) for t in placeholder]
+    ifd_offsets = [header_size + sum(sizes[:i]) for i in range(len(sizes))]
+    position = header_size + sum(sizes)
+    offsets = [None] * len(pyramid)
+    for index in reversed(range(len(pyramid))):
+        offsets[index] = list(np.cumsum([position] + counts[index][:-1]))
+        position += sum(counts[index])
+
+    with open(path + '.tmp', 'wb') as f:
+        if big:
+            f.write(b'II' + struct.pack('<HHHQ', 43, 8, 0, ifd_offsets[0]))
+        else:
+            f.write(b'II' + struct.pack('<HI', 42, ifd_offsets[0]))
+        f.write(ghost.encode('ascii'))
+        for index in range(len(pyramid)):
+            following = ifd_offsets[index + 1] if index + 1 < len(pyramid) else 0
+            f.write(_pack_ifd(_ifd(tags(index, [int(o) for o in offsets[index]], counts[index])),
+                              ifd_offsets[index], following, big))
+        for index in reversed(range(len(pyramid))):
+            for tile in encoded[index]:
+                f.write(tile)
+    os.replace(path + '.tmp', path)
+    return position
+
+
+def write_cog(image, path, COMPRESSION='DEFLATE', PREDICTOR=True, LEVEL=6, TILE=TILE_SIZE, OVERVIEWS=None,
+              WORKERS=None, pool=None):
+    """
+    Write a local image as a Cloud-Optimized GeoTIFF.
+
+    Parameters
+    ----------
+    image : dict
+        Local image, in linear or dB scale, float or quantized
+    path : string
+        Output file; the angle band goes to '<path without .tif>_angle.tif' when its type
+        differs from the type of the backscatter bands
+    COMPRESSION : string
+        'DEFLATE', 'ZSTD' or 'NONE'
+    PREDICTOR : boolean
+        Apply the horizontal (integer) or floating point predictor before compressing
+    LEVEL : integer
+        Compression level
+    TILE : integer
+        Tile size in pixels, a multiple of 16
+    OVERVIEWS : integer, optional
+        Number of overviews, by default until a level fits in one tile
+    WORKERS : integer, optional
+        Threads encoding the tiles, one per core by default
+    pool : concurrent.futures.Executor, optional
+        Executor to encode the tiles with, shared by the writes of a collection
+
+    Raises
+    ------
+    ValueError
+
+    Returns
+    -------
+    list
+        The written files
+
+    """
+    if COMPRESSION not in COMPRESSIONS:
+        raise ValueError("ERROR!!! COMPRESSION not correctly defined")
+    if TILE % 16:
+        raise ValueError("ERROR!!! TILE must be a multiple of 16")
+    names = local_helper.band_names(image)
+    groups = [names + ['angle']]
+    angle_type = local_helper.angle(image, slice(0, 1), slice(0, 1)).dtype
+    if names and angle_type != image['bands'][names[0]].dtype:
+        groups = [names, ['angle']]
+    own = pool is None
+    if own:
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS)
+    try:
+        paths = []
+        for group in groups:
+            target = path if group is groups[0] else os.path.splitext(path)[0] + '_angle.tif'
+            array, nodata, scales = _samples(image, group)
+            _write(target, array, nodata, group, image['properties'], scales, COMPRESSION, PREDICTOR, LEVEL,
+                   TILE, OVERVIEWS, pool)
+            paths.append(target)
+    finally:
+        if own:
+            pool.shutdown()
+    return paths
+
+
+def write_collection(collection, folder, WORKERS=None, **kwargs):
+    """
+    Write every image of a local collection to <folder>/<system:index>.tif.
+
+    Parameters
+    ----------
+    collection : list
+        Local image collection
+    folder : string
+        Output directory
+    WORKERS : integer, optional
+        Threads encoding the tiles, shared by all images
+    kwargs :
+        Options of write_cog
+
+    Returns
+    -------
+    dict
+        'files', 'bytes', 'seconds' and 'mpx_s' (megapixels per band per second)
+
+    """
+    os.makedirs(folder, exist_ok=True)
+    t0 = time.perf_counter()
+    files, pixels = [], 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for image in collection:
+            files += write_cog(image, os.path.join(folder, image['properties']['system:index'] + '.tif'),
+                               pool=pool, **kwargs)
+            rows, cols = local_helper.image_shape(image)
+            pixels += rows * cols
+    seconds = time.perf_counter() - t0
+    size = sum(os.path.getsize(path) for path in files)
+    print('{} file(s), {:.1f} MB in {:.2f} s ({:.1f} Mpx/s)'.format(
+        len(files), size / 2**20, seconds, pixels / 1e6 / seconds if seconds else 0.0))
+    return {'files': files, 'bytes': size, 'seconds': seconds, 'mpx_s': pixels / 1e6 / seconds if seconds else 0.0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write local images (.npz) as Cloud-Optimized GeoTIFFs.')
+    parser.add_argument('scenes', nargs='+', help='local images written with local_helper.save')
+    parser.add_argument('--output', required=True, help='output directory')
+    parser.add_argument('--compression', default='DEFLATE', choices=sorted(COMPRESSIONS))
+    parser.add_argument('--level', type=int, default=6)
+    parser.add_argument('--tile', type=int, default=TILE_SIZE)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args(argv)
+
+    collection = [local_helper.load(path) for path in args.scenes]
+    write_collection(collection, args.output, args.workers, COMPRESSION=args.compression, LEVEL=args.level,
+                     TILE=args.tile)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
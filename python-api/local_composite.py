@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Streaming temporal composites of the local backend, the counterpart of composite.py.
+
+    The scenes are reduced over time as they stream in, so that the state is independent of
+    the number of scenes:
+        count, mean, variance, stdDev : Welford's running mean and sum of squared deviations
+                                        (16 bytes per pixel and band)
+        median, pNN                   : P-square quantile estimator of Jain and Chlamtac (1985),
+                                        five markers per pixel and quantile (32 bytes per pixel,
+                                        band and quantile); exact for less than five scenes
+    Masked (NaN) pixels are skipped per pixel. The composite is computed in linear power or
+    in dB (SPACE) whatever the format of the scenes (FORMAT); mean and quantiles are returned
+    in FORMAT, variance and stdDev in SPACE. The bands are named like the bands of
+    ee.ImageCollection.reduce: VV_mean, VV_median, VV_p90, ...
+
+    composite_processed runs the pipeline and the composite tile by tile; the scenes of a
+    tile are processed and reduced one at a time, so the memory is O(tile) with the MONO
+    framework and O(NR_OF_IMAGES x tile) with MULTI instead of O(time x tile).
+"""
+
+import numpy as np
+
+import local_helper
+import local_speckle_filter as lsf
+import local_terrain_flattening as ltf
+import local_wrapper
+
+# reducers of the running moments, median and pNN are quantiles
+MOMENTS = ['count', 'mean', 'variance', 'stdDev']
+SPACES = ['LINEAR', 'DB']
+
+
+def _quantile(reducer):
+    """Quantile of a reducer name, 0.5 for median and 0.NN for pNN, None otherwise."""
+    if reducer == 'median':
+        return 0.5
+    if reducer.startswith('p') and reducer[1:].isdigit() and 0 <= int(reducer[1:]) <= 100:
+        return int(reducer[1:]) / 100.0
+    return None
+
+
+# ---------------------------------------------------------------------------//
+# Streaming estimators
+# ---------------------------------------------------------------------------//
+
+class Welford(object):
+    """Running count, mean and sum of squared deviations of every pixel, NaN skipped."""
+
+    def __init__(self, shape):
+        self.count = np.zeros(shape, np.int32)
+        self.mean = np.zeros(shape, np.float64)
+        self.m2 = np.zeros(shape, np.float64)
+
+    def update(self, x):
+        valid = ~np.isnan(x)
+        self.count += valid
+        delta = np.where(valid, x - self.mean, 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mean += np.where(valid, delta / self.count, 0)
+        self.m2 += np.where(valid, delta * (x - self.mean), 0)
+
+    def result(self, reducer):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if reducer == 'count':
+                return self.count.astype(np.float32)
+            if reducer == 'mean':
+                return np.where(self.count > 0, self.mean, np.nan)
+            # sample variance, like ee.Reducer.variance
+            variance = np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+            return variance if reducer == 'variance' else np.sqrt(variance)
+
+
+class PSquare(object):
+    """
+    P-square estimator of the quantile p of every pixel, NaN skipped.
+
+    The markers hold the minimum, the p/2, p and (1+p)/2 quantiles and the maximum;
+    the positions of the first and last markers are 1 and count and are not stored.
+    """
+
+    def __init__(self, shape, p):
+        self.p = p
+        self.count = np.zeros(shape, np.int32)
+        self.heights = np.zeros((5,) + tuple(shape), np.float32)
+        self.positions = np.zeros((3,) + tuple(shape), np.int32)
+        self.increments = np.array([0.0, p / 2, p, (1 + p) / 2, 1.0])
+
+    def update(self, x):
+        valid = ~np.isnan(x)
+        # the first five values are stored, sorted once the fifth arrives
+        start = valid & (self.count < 5)
+        if start.any():
+            for c in range(5):
+                sel = start & (self.count == c)
+                self.heights[c][sel] = x[sel]
+            self.count += start
+            full = start & (self.count == 5)
+            if full.any():
+                self.heights[:, full] = np.sort(self.heights[:, full], axis=0)
+                self.positions[:, full] = np.array([2, 3, 4])[:, None]
+        sel = valid & ~start
+        if sel.any():
+            self._update(x[sel], sel)
+
+    def _update(self, x, sel):
+        q = self.heights[:, sel].astype(np.float64)
+        n = np.empty(q.shape, np.float64)
+        n[0] = 1
+        n[1:4] = self.positions[:, sel]
+        count = self.count[sel] + 1
+        n[4] = count
+
+        # cell of x and extremes
+        k = (x[None, :] >= q[1:4]).sum(axis=0)
+        q[0] = np.minimum(q[0], x)
+        q[4] = np.maximum(q[4], x)
+        n[1:4] += np.arange(1, 4)[:, None] > k[None, :]
+
+        desired = 1 + (count - 1) * self.increments[:, None]
+        for i in (1, 2, 3):
+            d = desired[i] - n[i]
+            move = ((d >= 1) & (n[i + 1] - n[i] > 1)) | ((d <= -1) & (n[i - 1] - n[i] < -1))
+            if not move.any():
+                continue
+            s = np.sign(d)
+            parabolic = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+            neighbour = np.where(s > 0, q[i + 1], q[i - 1])
+            n_neighbour = np.where(s > 0, n[i + 1], n[i - 1])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                linear = q[i] + s * (neighbour - q[i]) / (n_neighbour - n[i])
+            ok = (q[i - 1] < parabolic) & (parabolic < q[i + 1])
+            q[i] = np.where(move, np.where(ok, parabolic, linear), q[i])
+            n[i] += np.where(move, s, 0)
+
+        self.heights[:, sel] = q
+        self.positions[:, sel] = n[1:4]
+        self.count[sel] = count
+
+    def result(self):
+        out = np.full(self.count.shape, np.nan, np.float64)
+        full = self.count >= 5
+        out[full] = self.heights[2][full]
+        # exact quantile of the stored values with linear interpolation, like numpy
+        for c in range(1, 5):
+            sel = self.count == c
+            if sel.any():
+                values = np.sort(self.heights[:c, sel].astype(np.float64), axis=0)
+                pos = self.p * (c - 1)
+                lo = int(np.floor(pos))
+                hi = min(lo + 1, c - 1)
+                out[sel] = values[lo] + (pos - lo) * (values[hi] - values[lo])
+        return out
+
+
+# ---------------------------------------------------------------------------//
+# Composites
+# ---------------------------------------------------------------------------//
+
+class Compositor(object):
+    """
+    Temporal composite of a stream of images.
+
+    Parameters
+    ----------
+    bands : list
+        Bands to composite
+    shape : tuple
+        (rows, cols) of the images, or of the window composited
+    REDUCERS : list
+        Reducers among count, mean, variance, stdDev, median and pNN (percentile NN)
+    SPACE : string
+        'LINEAR' or 'DB', the space in which the statistics are computed
+    FORMAT : string
+        'LINEAR' or 'DB', the format of the images and of the mean and quantile outputs
+    """
+
+    def __init__(self, bands, shape, REDUCERS=('mean',), SPACE='LINEAR', FORMAT='DB'):
+        for reducer in REDUCERS:
+            if reducer not in MOMENTS and _quantile(reducer) is None:
+                raise ValueError("ERROR!!! REDUCERS not correctly defined")
+        if SPACE not in SPACES:
+            raise ValueError("ERROR!!! SPACE not correctly defined")
+        if FORMAT not in SPACES:
+            raise ValueError("ERROR!!! FORMAT not correctly defined")
+        self.bands = list(bands)
+        self.REDUCERS = list(REDUCERS)
+        self.SPACE = SPACE
+        self.FORMAT = FORMAT
+        moments = any(_quantile(reducer) is None for reducer in REDUCERS)
+        self.welford = {name: Welford(shape) for name in self.bands} if moments else {}
+        self.quantiles = {name: {reducer: PSquare(shape, _quantile(reducer)) for reducer in REDUCERS
+                                 if _quantile(reducer) is not None} for name in self.bands}
+        self.properties = {}
+
+    def _to_space(self, x):
+        x = np.asarray(x, np.float64)
+        if self.FORMAT == self.SPACE:
+            return x
+        if self.SPACE == 'LINEAR':
+            return np.power(10.0, x / 10.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 10.0 * np.log10(x)
+
+    def _to_format(self, x):
+        if self.FORMAT == self.SPACE:
+            return x
+        if self.FORMAT == 'DB':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return 10.0 * np.log10(x)
+        return np.power(10.0, x / 10.0)
+
+    def update(self, image, window=None):
+        """Add an image (or a window (row slice, col slice) of it) to the composite."""
+        for name in self.bands:
+            band = image['bands'][name]
+            x = self._to_space(band if window is None else band[window])
+            if self.welford:
+                self.welford[name].update(x)
+            for estimator in self.quantiles[name].values():
+                estimator.update(x)
+        props = image['properties']
+        start = props.get('system:time_start')
+        if start is not None:
+            self.properties['system:time_start'] = min(self.properties.get('system:time_start', start), start)
+            self.properties['system:time_end'] = max(self.properties.get('system:time_end', start), start)
+        self.properties['images'] = self.properties.get('images', 0) + 1
+        for key in ('transform', 'crs'):
+            if key in props and window is None:
+                self.properties[key] = props[key]
+
+    def result(self):
+        """
+        Returns
+        -------
+        dict
+            Local image with the bands <band>_<reducer>, float32
+        """
+        bands = {}
+        for name in self.bands:
+            for reducer in self.REDUCERS:
+                if _quantile(reducer) is not None:
+                    value = self._to_format(self.quantiles[name][reducer].result())
+                elif reducer == 'mean':
+                    value = self._to_format(self.welford[name].result(reducer))
+                else:
+                    value = self.welford[name].result(reducer)
+                bands[name + '_' + reducer] = np.asarray(value, np.float32)
+        return local_helper.make_image(bands, dict(self.properties, SPACE=self.SPACE))
+
+
+
+def composite(images, REDUCERS=('mean',), SPACE='LINEAR', FORMAT='DB', bands=None):
+    """
+    Temporal composite of processed images, reduced as they are read.
+
+    Parameters
+    ----------
+    images : iterable
+        Local images on one grid, e.g. a generator reading them one at a time
+    REDUCERS, SPACE, FORMAT :
+        See Compositor
+    bands : list, optional
+        Bands to composite, the backscatter bands of the first image by default
+
+    Returns
+    -------
+    dict
+        The composite local image, None if there are no images
+
+    """
+    compositor = None
+    for image in images:
+        if compositor is None:
+            compositor = Compositor(bands or local_helper.band_names(image), local_helper.image_shape(image),
+                                    REDUCERS, SPACE, FORMAT)
+        compositor.update(image)
+    return compositor.result() if compositor is not None else None
+
+
+def composite_processed(params, collection, REDUCERS=('mean',), SPACE='LINEAR', TILE=512):
+    """
+    Run the pipeline and the temporal composite tile by tile.
+
+    Every scene of a tile is processed and added to the composite on its own, in
+    time order. With the MULTI framework the ratio records of the temporal neighbours
+    of the scene (see local_speckle_filter.temporal_neighbours) are passed as the
+    history of the multi-temporal filter; a sliding window keeps the records until
+    the last scene that needs them, at most about NR_OF_IMAGES per track.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by local_wrapper.s1_preproc
+    collection : list
+        Local image collection of co-registered scenes
+    REDUCERS, SPACE :
+        See Compositor; the composite is returned in the FORMAT of params
+    TILE : integer
+        Side of the tiles in pixels, without the halo
+
+    Returns
+    -------
+    dict
+        The composite local image, None if no scene is selected
+
+    """
+    params = local_wrapper.check_params(params)
+    selected = local_wrapper.select(collection, params['START_DATE'], params['STOP_DATE'],
+                                    params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])
+    if not selected:
+        return None
+    if params['OUTPUT_ENCODING'] != 'FLOAT':
+        raise ValueError("ERROR!!! The composite needs OUTPUT_ENCODING FLOAT")
+    shape = local_helper.image_shape(selected[0])
+    if any(local_helper.image_shape(image) != shape for image in selected):
+        raise ValueError("ERROR!!! The composite needs co-registered scenes of the same shape")
+
+    HALO = local_wrapper.halo(params, ltf.pixel_size(selected[0]))
+    headings, dems = local_wrapper.scene_constants(params, selected)
+    names = local_helper.band_names(selected[0])
+    order = sorted(range(len(selected)), key=lambda t: selected[t]['properties']['system:time_start'])
+    multi = params['APPLY_SPECKLE_FILTERING'] and params['SPECKLE_FILTER_FRAMEWORK'] == 'MULTI'
+    neighbours, last_use = {}, {}
+    if multi:
+        for position, t in enumerate(order):
+            neighbours[t] = [i for i in lsf.temporal_neighbours(selected, t, params['SPECKLE_FILTER_NR_OF_IMAGES'])
+                             if i != t]
+            for i in neighbours[t] + [t]:
+                last_use[i] = position
+    output = None
+    for inner, outer in local_wrapper.tile_windows(shape, (TILE, TILE), HALO):
+        crop = (slice(inner[0].start - outer[0].start, inner[0].stop - outer[0].start),
+                slice(inner[1].start - outer[1].start, inner[1].stop - outer[1].start))
+        compositor = Compositor(names, (inner[0].stop - inner[0].start, inner[1].stop - inner[1].start),
+                                REDUCERS, SPACE, params['FORMAT'])
+        # ratio records of the window: scene index -> band name -> ratio
+        records = {}
+        for position, t in enumerate(order):
+            history = []
+            for i in neighbours.get(t, []):
+                if i not in records:
+                    # a later acquisition, its ratio record needs its spatial filter only
+                    _window_ratios(params, selected, outer, headings, dems, i, records)
+                history.append({'properties': selected[i]['properties'], 'load': lambda ratios=records[i]: ratios})
+            sink = (lambda image, ratios, t=t: records.__setitem__(t, ratios)) if multi else None
+            tile = local_wrapper.process_window(params, selected[t:t + 1], outer, headings[t:t + 1],
+                                                dems[t:t + 1], history, sink)
+            compositor.update(tile[0], crop)
+            # the sliding window: drop the records no later scene needs
+            for i in [i for i in records if last_use[i] <= position]:
+                del records[i]
+        result = compositor.result()
+        if output is None:
+            output = local_helper.make_image({name: np.empty(shape, np.float32) for name in result['bands']},
+                                             result['properties'])
+        for name, band in result['bands'].items():
+            output['bands'][name][inner] = band
+    for key in ('transform', 'crs'):
+        if key in selected[0]['properties']:
+            output['properties'][key] = selected[0]['properties'][key]
+    return output
+
+
+def _window_ratios(params, selected, window, headings, dems, t, records):
+    """Store the ratio record of the window of scene t in records, see composite_processed."""
+    local_wrapper.process_window(dict(params, APPLY_TERRAIN_FLATTENING=False), selected[t:t + 1], window,
+                                 headings[t:t + 1], dems[t:t + 1],
+                                 ratio_sink=lambda image, ratios: records.__setitem__(t, ratios))
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Dask backend of the local pipeline.
+
+    s1_preproc takes the parameters of local_wrapper.s1_preproc and expresses the stages
+    as a chunked Dask graph on the (time, band, rows, cols) stack of the selected
+    co-registered scenes, so that the same parameters run on the threads of a laptop or
+    on the processes of a local cluster (local_cluster, with the scheduler dashboard for
+    profiling):
+
+        border noise correction : the valid swath of every row (a run of columns, see
+                                  local_border_noise_correction.border_spans) is found per
+                                  scene and the chunks are masked blockwise
+        speckle filter          : map_overlap with the halo of the filter, the chunks of
+                                  every time chunk are filtered as stacks
+                                  (local_speckle_filter.filter_stack)
+        multi-temporal filter   : the ratios of every scene to its filtered image are one
+                                  array chunked like the stack; the output of a scene
+                                  gathers the time chunks of its temporal neighbours
+        terrain flattening      : map_overlap with the halo of the DEM gradient and the
+                                  layover/shadow buffer, with the heading of the whole scene
+        output                  : dB conversion blockwise, the quantized encoding per scene
+
+    The chunks are not padded at the edges of the scenes (boundary 'none'), so every chunk
+    sees the pixels a whole-scene run sees and the results equal those of local_wrapper.run
+    up to the rounding of the neighbourhood sums. The bands may be any array that supports
+    slicing (NumPy, memory-mapped .npy, zarr), they are read chunk by chunk; in-memory bands
+    are sent with the graph, so on a cluster the scenes are best stored as zarr arrays that
+    the workers read themselves.
+
+    Additional parameters:
+        CHUNK_SHAPE : (Optional) (rows, cols) of the chunks, (1024, 1024) by default
+        TIME_CHUNK : (Optional) Scenes per chunk along time, 1 by default
+
+    Dask is an optional dependency: pip install "dask[array]" distributed (and bokeh for
+    the dashboard).
+"""
+
+import numpy as np
+
+try:
+    import dask
+    import dask.array as da
+except ImportError:
+    dask = None
+    da = None
+
+import local_border_noise_correction as lbnc
+import local_helper
+import local_precision
+import local_speckle_filter as lsf
+import local_terrain_flattening as ltf
+import local_wrapper
+
+CHUNK_SHAPE = (1024, 1024)
+TIME_CHUNK = 1
+
+
+def _require():
+    if da is None:
+        raise ValueError("ERROR!!! The Dask backend requires dask: pip install \"dask[array]\" distributed")
+
+
+def local_cluster(WORKERS=None, THREADS_PER_WORKER=1, DASHBOARD=':8787'):
+    """
+    Start a local multi-process cluster and connect a client to it.
+
+    Parameters
+    ----------
+    WORKERS : integer, optional
+        Number of worker processes, one per core by default
+    THREADS_PER_WORKER : integer
+        Threads of every worker; the kernels release the GIL only partly, so processes
+        scale better than threads
+    DASHBOARD : string
+        Address of the scheduler dashboard, None to disable it
+
+    Returns
+    -------
+    distributed.Client
+        The client, the default scheduler of s1_preproc until it is closed
+
+    """
+    _require()
+    try:
+        import distributed
+    except ImportError:
+        raise ValueError("ERROR!!! A local cluster requires dask.distributed: pip install distributed")
+    cluster = distributed.LocalCluster(n_workers=WORKERS, threads_per_worker=THREADS_PER_WORKER,
+                                       dashboard_address=DASHBOARD, processes=True)
+    client = distributed.Client(cluster)
+    print('Dask cluster with {} worker(s), dashboard at {}'.format(
+        len(cluster.workers), client.dashboard_link if DASHBOARD else 'disabled'))
+    return client
+
+
+# ---------------------------------------------------------------------------//
+# Chunks
+# ---------------------------------------------------------------------------//
+
+def _overlap(function, depth, *arrays, **kwargs):
+    """map_overlap over the rows and cols of (time, band, rows, cols) arrays, without padding at the edges."""
+    if depth == 0:
+        return da.map_blocks(function, *arrays, dtype=arrays[0].dtype, **kwargs)
+    return da.map_overlap(function, *arrays, depth={0: 0, 1: 0, 2: depth, 3: depth}, boundary='none',
+                          dtype=arrays[0].dtype, **kwargs)
+
+
+def stack(selected, names, CHUNK_SHAPE=CHUNK_SHAPE, TIME_CHUNK=TIME_CHUNK):
+    """
+    (time, band, rows, cols) Dask array of the backscatter bands of co-registered scenes.
+    """
+    chunks = tuple(min(c, n) for c, n in zip(CHUNK_SHAPE, local_helper.image_shape(selected[0])))
+    layers = [da.stack([da.from_array(image['bands'][name], chunks=chunks) for name in names])
+              for image in selected]
+    return da.stack(layers).rechunk({0: TIME_CHUNK, 1: -1})
+
+
+def angle_stack(selected, chunks):
+    """(time, 1, rows, cols) Dask array of the incidence angle, compact angle bands are evaluated per chunk."""
+    layers = [da.from_array(image['bands']['angle'], chunks=chunks[2:], meta=np.empty((0, 0), np.float32))
+              for image in selected]
+    return da.stack(layers)[:, None].rechunk(chunks[:1] + ((1,),) + chunks[2:])
+
+
+# ---------------------------------------------------------------------------//
+# Stages
+# ---------------------------------------------------------------------------//
+
+def _mask_block(block, starts, stops, block_info=None):
+    c0 = block_info[0]['array-location'][3][0]
+    width = block.shape[3]
+    out = block.copy()
+    for t in range(block.shape[0]):
+        first = np.clip(starts[t, 0, :, 0] - c0, 0, width)
+        last = np.clip(stops[t, 0, :, 0] - c0, 0, width)
+        for b in range(block.shape[1]):
+            lbnc.apply_spans(out[t, b], first, last)
+    return out
+
+
+def border_noise_correction(x, selected):
+    """Mask the border noise of a (time, band, rows, cols) stack, see lbnc.f_mask_edges."""
+    spans = [lbnc.border_spans(image) for image in selected]
+    starts = np.stack([s for s, _ in spans])[:, None, :, None]
+    stops = np.stack([s for _, s in spans])[:, None, :, None]
+    chunks = (x.chunks[0], (1,), x.chunks[2], (1,))
+    return da.map_blocks(_mask_block, x, da.from_array(starts, chunks=chunks), da.from_array(stops, chunks=chunks),
+                         dtype=x.dtype)
+
+
+def _filter_block(block, KERNEL_SIZE, SPECKLE_FILTER):
+    if SPECKLE_FILTER in lsf._STACK_KERNELS:
+        return lsf.filter_stack(block, KERNEL_SIZE, SPECKLE_FILTER)
+    out = np.empty_like(block)
+    for index in np.ndindex(block.shape[:2]):
+        out[index] = lsf._refined_lee_band(lsf._compute(block[index]))
+    return out
+
+
+def _ratio_block(block, filtered):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = (lsf._compute(block) / filtered).astype(block.dtype, copy=False)
+    ratio[np.isnan(ratio)] = 0
+    ratio[np.isnan(block)] = np.nan
+    return ratio
+
+
+def _quegan_block(filtered, ratios):
+    isum = np.zeros(filtered.shape, np.float64)
+    count_img = np.zeros(filtered.shape, np.float64)
+    for ratio in ratios:
+        valid = ~np.isnan(ratio)
+        isum += np.where(valid, ratio, 0)
+        count_img += valid
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = filtered / count_img * isum
+    return out.astype(filtered.dtype)
+
+
+def speckle_filter(x, params, selected, spacing):
+    """Speckle filter of a (time, band, rows, cols) stack, see local_speckle_filter."""
+    KERNEL_SIZE = params['SPECKLE_FILTER_KERNEL_SIZE']
+    SPECKLE_FILTER = params['SPECKLE_FILTER']
+    HALO = local_wrapper.halo(dict(params, APPLY_TERRAIN_FLATTENING=False), spacing)
+    filtered = _overlap(_filter_block, HALO, x, KERNEL_SIZE=KERNEL_SIZE, SPECKLE_FILTER=SPECKLE_FILTER)
+    if (params['SPECKLE_FILTER_FRAMEWORK'] == 'MONO'):
+        return filtered
+
+    ratios = da.map_blocks(_ratio_block, x, filtered, dtype=x.dtype)
+    output = []
+    for index in range(len(selected)):
+        neighbours = lsf.temporal_neighbours(selected, index, params['SPECKLE_FILTER_NR_OF_IMAGES'])
+        # the neighbours of a scene are gathered from their time chunks
+        gathered = ratios[neighbours].rechunk({0: -1})
+        output.append(da.blockwise(_quegan_block, 'tbrc', filtered[index:index + 1], 'tbrc', gathered, 'nbrc',
+                                   concatenate=True, dtype=x.dtype))
+    return da.concatenate(output).rechunk({0: x.chunks[0]})
+
+
+def _terrain_block(block, angle, dem, properties, names, TERRAIN_FLATTENING_MODEL, BUFFER, block_info=None):
+    out = np.empty_like(block)
+    for t, props in enumerate(properties[block_info[0]['chunk-location'][0]]):
+        bands = {name: block[t, b] for b, name in enumerate(names)}
+        bands['angle'] = angle[t, 0]
+        image = ltf.slope_correction([local_helper.make_image(bands, props)], TERRAIN_FLATTENING_MODEL,
+                                     dem[t, 0], BUFFER)[0]
+        for b, name in enumerate(names):
+            out[t, b] = image['bands'][name]
+    return out
+
+
+def terrain_flattening(x, params, selected, spacing, headings, dems):
+    """Radiometric terrain normalization of a (time, band, rows, cols) stack, see local_terrain_flattening."""
+    HALO = local_wrapper.halo(dict(params, APPLY_SPECKLE_FILTERING=False), spacing)
+    angle = angle_stack(selected, x.chunks)
+    if all(dem is dems[0] for dem in dems):
+        dem = da.broadcast_to(da.from_array(np.asarray(dems[0]), chunks=x.chunks[2:])[None, None],
+                              (len(selected), 1) + x.shape[2:], chunks=(x.chunks[0], (1,)) + x.chunks[2:])
+    else:
+        dem = da.stack([da.from_array(np.asarray(d), chunks=x.chunks[2:]) for d in dems])[:, None]
+        dem = dem.rechunk((x.chunks[0], (1,)) + x.chunks[2:])
+    # the properties of the scenes of every time chunk, with the heading of the whole scene
+    properties, start = [], 0
+    for size in x.chunks[0]:
+        properties.append([dict(image['properties'], heading=heading)
+                           for image, heading in zip(selected[start:start + size], headings[start:start + size])])
+        start += size
+    # the angle and the DEM are broadcast over the bands, so that all arrays have the chunks of the stack
+    angle = da.broadcast_to(angle, x.shape, chunks=x.chunks)
+    dem = da.broadcast_to(dem, x.shape, chunks=x.chunks)
+    return _overlap(_terrain_block, HALO, x, angle, dem, properties=properties,
+                    names=local_helper.band_names(selected[0]),
+                    TERRAIN_FLATTENING_MODEL=params['TERRAIN_FLATTENING_MODEL'],
+                    BUFFER=params['TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER'])
+
+
+def _db_block(block):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (10 * np.log10(block)).astype(block.dtype)
+
+
+# ---------------------------------------------------------------------------//
+# Pipeline
+# ---------------------------------------------------------------------------//
+
+def graph(params, collection):
+    """
+    Build the Dask graph of the pipeline without computing it.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by local_wrapper.s1_preproc, CHUNK_SHAPE and TIME_CHUNK
+    collection : list
+        Local image collection of co-registered scenes
+
+    Returns
+    -------
+    tuple
+        ((time, band, rows, cols) Dask array of the output in linear or dB scale,
+        selected scenes, checked parameters)
+
+    """
+    _require()
+    params = local_wrapper.check_params(params)
+    selected = local_wrapper.select(collection, params['START_DATE'], params['STOP_DATE'],
+                                    params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])
+    selected = local_precision.cast(selected, params['PRECISION'])
+    print('Number of images in collection: ', len(selected))
+    if not selected:
+        return None, selected, params
+    shape = local_helper.image_shape(selected[0])
+    if any(local_helper.image_shape(image) != shape for image in selected):
+        raise ValueError("ERROR!!! The Dask backend needs co-registered scenes of the same shape")
+
+    names = local_helper.band_names(selected[0])
+    x = stack(selected, names, params.get('CHUNK_SHAPE') or CHUNK_SHAPE, params.get('TIME_CHUNK') or TIME_CHUNK)
+    spacing = ltf.pixel_size(selected[0])
+    if (params['APPLY_BORDER_NOISE_CORRECTION']):
+        x = border_noise_correction(x, selected)
+    if (params['APPLY_SPECKLE_FILTERING']):
+        x = speckle_filter(x, params, selected, spacing)
+    if (params['APPLY_TERRAIN_FLATTENING']):
+        headings, dems = local_wrapper.scene_constants(params, selected)
+        x = terrain_flattening(x, params, selected, spacing, headings, dems)
+    if (params['FORMAT'] == 'DB'):
+        x = da.map_blocks(_db_block, x, dtype=x.dtype)
+    return x, selected, params
+
+
+def s1_preproc(params, collection, scheduler=None):
+    """
+    Applies preprocessing to a local collection of S1 images with Dask.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by local_wrapper.s1_preproc, CHUNK_SHAPE and TIME_CHUNK
+    collection : list
+        Local image collection of co-registered scenes
+    scheduler : string or distributed.Client, optional
+        The Dask scheduler ('threads', 'processes', 'synchronous' or a client, see
+        local_cluster); the default scheduler of Dask by default
+
+    Raises
+    ------
+    ValueError
+
+    Returns
+    -------
+    list
+        A processed local image collection
+
+    """
+    x, selected, params = graph(params, collection)
+    if x is None:
+        return []
+    print('Dask graph: {} task(s), chunks of {} scene(s) x {} x {} pixels'.format(
+        len(x.__dask_graph__()), x.chunksize[0], x.chunksize[2], x.chunksize[3]))
+    output = x.compute(scheduler=scheduler) if scheduler is not None else x.compute()
+    names = local_helper.band_names(selected[0])
+    s1 = [local_helper.add_bands(image, dict(zip(names, layers))) for image, layers in zip(selected, output)]
+    if (params['OUTPUT_ENCODING'] == 'QUANTIZED'):
+        s1 = [local_helper.quantize(image) for image in s1]
+    return s1
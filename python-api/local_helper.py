@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Image model and helper functions of the local (NumPy) backend.
+
+    A local image mirrors an ee.Image: a dictionary with
+        'bands': band name -> 2-D float array (masked pixels are NaN)
+        'properties': image properties, e.g. 'system:index', 'system:time_start',
+                      'relativeOrbitNumber_start', 'orbitProperties_pass' and the
+                      affine 'transform' (GDAL order) and 'crs' of the pixel grid
+    A local image collection is a list of local images.
+
+    The incidence angle varies smoothly across range, so the 'angle' band may be held
+    as a CompactAngle (a coarse grid or per-row polynomials) instead of a full raster.
+    Stages read it with angle(image, rows, cols), which interpolates only the window
+    they need.
+"""
+
+import json
+import zipfile
+
+import numpy as np
+
+import encoding
+
+# ---------------------------------------------------------------------------//
+# Image model
+# ---------------------------------------------------------------------------//
+
+def make_image(bands, properties=None):
+    """
+    Create a local image.
+
+    Parameters
+    ----------
+    bands : dict
+        Band name -> 2-D array
+    properties : dict, optional
+        Image properties
+
+    Returns
+    -------
+    dict
+        The local image
+
+    """
+    return {'bands': dict(bands), 'properties': dict(properties or {})}
+
+
+def band_names(image):
+    """
+    Return the backscatter band names of a local image (all bands but angle).
+
+    Parameters
+    ----------
+    image : dict
+        Local image
+
+    Returns
+    -------
+    list
+        Band names
+
+    """
+    return [name for name in image['bands'] if name != 'angle']
+
+
+def add_bands(image, bands):
+    """
+    Return a copy of the image with the given bands added or replaced,
+    the equivalent of ee.Image.addBands(bands, None, True).
+
+    Parameters
+    ----------
+    image : dict
+        Local image
+    bands : dict
+        Band name -> 2-D array
+
+    Returns
+    -------
+    dict
+        The new local image sharing the untouched band arrays
+
+    """
+    out = make_image(image['bands'], image['properties'])
+    out['bands'].update(bands)
+    return out
+
+
+def image_shape(image):
+    """Return the (rows, cols) shape of a local image."""
+    return tuple(next(iter(image['bands'].values())).shape)
+
+
+# ---------------------------------------------------------------------------//
+# Incidence angle
+# ---------------------------------------------------------------------------//
+
+def _indices(key, n):
+    return np.arange(n)[key if key is not None else slice(None)]
+
+
+def _linear_weights(nodes, index):
+    i = np.clip(np.searchsorted(nodes, index, side='right') - 1, 0, len(nodes) - 2)
+    w = (index - nodes[i]) / (nodes[i + 1] - nodes[i])
+    return i, w.astype(np.float32)
+
+
+class CompactAngle(object):
+    """
+    Incidence angle band stored as a coarse grid or as per-row polynomials.
+
+    'GRID' keeps every step-th row and column (and the last ones) and is
+    interpolated bilinearly, 'POLY' keeps the coefficients of a polynomial in
+    the column for every row. Both are read with window(rows, cols); the object
+    also converts to a full numpy array when one is really needed.
+    """
+
+    def __init__(self, shape, method, values, step=32, error=float('nan')):
+        self.shape = tuple(shape)
+        self.method = method
+        self.values = values
+        self.step = step
+        # maximum absolute deviation in degrees from the full raster
+        self.error = error
+
+    ndim = 2
+    dtype = np.dtype(np.float32)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def _nodes(self):
+        return [np.unique(np.r_[np.arange(0, n, self.step), n - 1]) for n in self.shape]
+
+    def window(self, rows=None, cols=None):
+        """
+        Interpolate the incidence angle on a window of the image.
+
+        Parameters
+        ----------
+        rows, cols : slice, optional
+            Rows and columns of the window, the whole image by default
+
+        Returns
+        -------
+        numpy array
+            float32 incidence angle in degrees
+
+        """
+        r = _indices(rows, self.shape[0])
+        c = _indices(cols, self.shape[1])
+        if self.method == 'POLY':
+            x = (c / max(self.shape[1] - 1, 1)).astype(np.float32)
+            coeffs = self.values[r]
+            out = np.repeat(coeffs[:, :1], len(c), axis=1)
+            for k in range(1, coeffs.shape[1]):
+                out *= x
+                out += coeffs[:, k:k + 1]
+            return out
+        row_nodes, col_nodes = self._nodes()
+        i, wr = _linear_weights(row_nodes, r)
+        coarse = self.values[i] * (1 - wr)[:, None] + self.values[i + 1] * wr[:, None]
+        j, wc = _linear_weights(col_nodes, c)
+        return coarse[:, j] * (1 - wc) + coarse[:, j + 1] * wc
+
+    def at(self, r, c):
+        """Interpolate the incidence angle at the pixels (r, c), given as integer arrays."""
+        r, c = np.asarray(r), np.asarray(c)
+        if self.method == 'POLY':
+            x = (c / max(self.shape[1] - 1, 1)).astype(np.float32)
+            coeffs = self.values[r]
+            out = coeffs[..., 0].copy()
+            for k in range(1, coeffs.shape[-1]):
+                out *= x
+                out += coeffs[..., k]
+            return out
+        row_nodes, col_nodes = self._nodes()
+        i, wr = _linear_weights(row_nodes, r)
+        j, wc = _linear_weights(col_nodes, c)
+        v = self.values
+        # same order of operations as window, so both give identical values
+        left = v[i, j] * (1 - wr) + v[i + 1, j] * wr
+        right = v[i, j + 1] * (1 - wr) + v[i + 1, j + 1] * wr
+        return left * (1 - wc) + right * wc
+
+    def __array__(self, dtype=None, copy=None):
+        out = self.window()
+        return out if dtype is None else out.astype(dtype)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple) and len(key) == 2 and all(isinstance(k, slice) for k in key):
+            return self.window(*key)
+        if isinstance(key, slice):
+            return self.window(key)
+        return np.asarray(self)[key]
+
+    def to_dict(self):
+        """Serializable description, e.g. to store the band as metadata on export."""
+        return {'shape': list(self.shape), 'method': self.method, 'step': self.step,
+                'error': self.error, 'values': self.values.tolist()}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['shape'], d['method'], np.asarray(d['values'], np.float32), d['step'], d['error'])
+
+
+def compress_angle(angle, method='GRID', step=32, degree=3):
+    """
+    Build the compact representation of an incidence angle raster.
+
+    Parameters
+    ----------
+    angle : numpy array
+        Incidence angle in degrees
+    method : string
+        'GRID' (coarse grid, bilinear interpolation) or 'POLY' (polynomial per row)
+    step : integer
+        Grid spacing in pixels
+    degree : integer
+        Degree of the polynomials
+
+    Returns
+    -------
+    CompactAngle
+        The compact incidence angle, with its maximum interpolation error
+
+    """
+    if isinstance(angle, CompactAngle):
+        return angle
+    angle = np.asarray(angle)
+    rows, cols = angle.shape
+    if method == 'GRID':
+        if min(rows, cols) < 2:
+            raise ValueError("ERROR!!! Angle grid needs at least 2 x 2 pixels")
+        row_nodes = np.unique(np.r_[np.arange(0, rows, step), rows - 1])
+        col_nodes = np.unique(np.r_[np.arange(0, cols, step), cols - 1])
+        values = angle[np.ix_(row_nodes, col_nodes)].astype(np.float32)
+    elif method == 'POLY':
+        x = np.arange(cols) / max(cols - 1, 1)
+        # highest power first, as in np.polyval
+        values = np.polyfit(x, angle.T.astype(np.float64), degree).T.astype(np.float32)
+    else:
+        raise ValueError("ERROR!!! Angle compression method not correctly defined")
+    compact = CompactAngle(angle.shape, method, values, step)
+    with np.errstate(invalid='ignore'):
+        compact.error = float(np.nanmax(np.abs(compact.window() - angle))) if angle.size else 0.0
+    return compact
+
+
+def angle(image, rows=None, cols=None):
+    """
+    Incidence angle of a local image on a window, whatever its representation.
+
+    Parameters
+    ----------
+    image : dict
+        Local image
+    rows, cols : slice, optional
+        Rows and columns of the window, the whole image by default
+
+    Returns
+    -------
+    numpy array
+        Incidence angle in degrees
+
+    """
+    band = image['bands']['angle']
+    if isinstance(band, CompactAngle):
+        return band.window(rows, cols)
+    return band[rows if rows is not None else slice(None), cols if cols is not None else slice(None)]
+
+
+def angle_at(image, r, c):
+    """
+    Incidence angle of a local image at the pixels (r, c), whatever its representation.
+
+    Parameters
+    ----------
+    image : dict
+        Local image
+    r, c : numpy arrays
+        Integer row and column indices
+
+    Returns
+    -------
+    numpy array
+        Incidence angle in degrees
+
+    """
+    band = image['bands']['angle']
+    if isinstance(band, CompactAngle):
+        return band.at(r, c)
+    return band[r, c]
+
+
+def compact_angle(image, method='GRID', step=32, degree=3):
+    """
+    Return a copy of the image with its angle band replaced by a CompactAngle.
+
+    Parameters
+    ----------
+    image : dict
+        Local image
+    method, step, degree :
+        See compress_angle
+
+    Returns
+    -------
+    dict
+        The new local image
+
+    """
+    return add_bands(image, {'angle': compress_angle(image['bands']['angle'], method, step, degree)})
+
+
+# ---------------------------------------------------------------------------//
+# Linear to db scale
+# ---------------------------------------------------------------------------//
+
+def lin_to_db(image):
+    """
+    Convert backscatter from linear to dB.
+
+    Parameters
+    ----------
+    image : dict
+        Local image to convert
+
+    Returns
+    -------
+    dict
+        output image
+
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return add_bands(image, {name: (10 * np.log10(image['bands'][name])).astype(image['bands'][name].dtype)
+                                 for name in band_names(image)})
+
+
+def db_to_lin(image):
+    """
+    Convert backscatter from dB to linear.
+
+    Parameters
+    ----------
+    image : dict
+        Local image to convert
+
+    Returns
+    -------
+    dict
+        output image
+
+    """
+    return add_bands(image, {name: np.power(10, image['bands'][name] / 10).astype(image['bands'][name].dtype)
+                             for name in band_names(image)})
+
+
+# ---------------------------------------------------------------------------//
+# Downsampling
+# ---------------------------------------------------------------------------//
+
+def block_mean(array, FACTOR):
+    """
+    Mean of the valid (not NaN) pixels of every FACTOR x FACTOR block.
+
+    Parameters
+    ----------
+    array : numpy array
+        2-D raster
+    FACTOR : integer
+        Block size; the last blocks of a side that is not a multiple are partial
+
+    Returns
+    -------
+    numpy array
+        float32 raster of ceil(rows / FACTOR) x ceil(cols / FACTOR) pixels,
+        NaN where a block has no valid pixel
+
+    """
+    valid = ~np.isnan(array)
+    rows = np.arange(0, array.shape[0], FACTOR)
+    cols = np.arange(0, array.shape[1], FACTOR)
+    sums = np.add.reduceat(np.add.reduceat(np.where(valid, array, 0).astype(np.float64), rows, axis=0), cols, axis=1)
+    counts = np.add.reduceat(np.add.reduceat(valid.astype(np.int32), rows, axis=0), cols, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan).astype(np.float32)
+
+
+def downsample(image, FACTOR):
+    """
+    Local image at a FACTOR times coarser resolution, like a multilook of the backscatter.
+
+    The backscatter (linear power) is averaged over FACTOR x FACTOR blocks, ignoring
+    the masked pixels, the angle band is sampled at the block centres and the pixel
+    size of the transform is scaled; the origin is kept.
+
+    Parameters
+    ----------
+    image : dict
+        Local image in linear power
+    FACTOR : integer
+        Downsampling factor
+
+    Returns
+    -------
+    dict
+        The downsampled image
+
+    """
+    rows, cols = image_shape(image)
+    bands = {name: block_mean(image['bands'][name], FACTOR) for name in band_names(image)}
+    r = np.minimum(np.arange(0, rows, FACTOR) + FACTOR // 2, rows - 1)
+    c = np.minimum(np.arange(0, cols, FACTOR) + FACTOR // 2, cols - 1)
+    r, c = np.meshgrid(r, c, indexing='ij')
+    bands['angle'] = angle_at(image, r, c).astype(np.float32)
+    props = dict(image['properties'])
+    transform = props.get('transform')
+    if transform is not None:
+        props['transform'] = (transform[0], transform[1] * FACTOR, transform[2] * FACTOR,
+                              transform[3], transform[4] * FACTOR, transform[5] * FACTOR)
+    return make_image(bands, props)
+
+
+# ---------------------------------------------------------------------------//
+# Quantized output
+# ---------------------------------------------------------------------------//
+
+def _quantize_band(band, enc):
+    with np.errstate(invalid='ignore'):
+        stored = np.rint((band - enc['offset']) / enc['scale'])
+        np.clip(stored, enc['min'], enc['max'], out=stored)
+    stored[np.isnan(band)] = enc['nodata']
+    return stored.astype(enc['type'])
+
+
+def _dequantize_band(band, enc):
+    out = band.astype(np.float32) * np.float32(enc['scale']) + np.float32(enc['offset'])
+    out[band == enc['nodata']] = np.nan
+    return out
+
+
+def quantize(image):
+    """
+    Encode dB backscatter as scaled int16 and the angle as scaled uint16, with
+    masked (NaN) pixels set to the nodata value (see encoding.py). A compact
+    angle band is kept as it is.
+
+    Parameters
+    ----------
+    image : dict
+        Local image in dB
+
+    Returns
+    -------
+    dict
+        Encoded image with the scale, offset and nodata in its properties
+
+    """
+    bands = {name: _quantize_band(band, encoding.band_encoding(name))
+             for name, band in image['bands'].items() if not isinstance(band, CompactAngle)}
+    out = add_bands(image, bands)
+    out['properties'].update(encoding.metadata())
+    return out
+
+
+def dequantize(image):
+    """
+    Decode an image encoded with quantize, using the scale, offset and nodata
+    of its properties.
+
+    Parameters
+    ----------
+    image : dict
+        Encoded local image
+
+    Returns
+    -------
+    dict
+        Image with float32 bands, masked pixels are NaN
+
+    """
+    props = image['properties']
+    if props.get('encoding') != encoding.ENCODING:
+        return image
+    bands = {}
+    for name, band in image['bands'].items():
+        if isinstance(band, CompactAngle):
+            continue
+        prefix = 'angle' if name == 'angle' else 'backscatter'
+        enc = {key: props[prefix + '_' + key] for key in ('scale', 'offset', 'nodata')}
+        bands[name] = _dequantize_band(band, enc)
+    out = add_bands(image, bands)
+    for key in encoding.metadata():
+        out['properties'].pop(key, None)
+    return out
+
+
+def quantization_error(image):
+    """
+    Maximum absolute round trip error of quantize per band, and whether the
+    masks are preserved.
+
+    Parameters
+    ----------
+    image : dict
+        Local image in dB
+
+    Returns
+    -------
+    dict
+        Band name -> (maximum absolute error, masks identical)
+
+    """
+    decoded = dequantize(quantize(image))
+    errors = {}
+    for name, band in image['bands'].items():
+        if isinstance(band, CompactAngle):
+            continue
+        valid = ~np.isnan(band)
+        diff = np.abs(decoded['bands'][name][valid] - band[valid])
+        errors[name] = (float(diff.max()) if diff.size else 0.0,
+                        bool(np.array_equal(valid, ~np.isnan(decoded['bands'][name]))))
+    return errors
+
+
+# ---------------------------------------------------------------------------//
+# Local files
+# ---------------------------------------------------------------------------//
+
+def save(image, path, QUANTIZE=False):
+    """
+    Write a local image to a compressed .npz file.
+
+    Parameters
+    ----------
+    image : dict
+        Local image
+    path : string
+        Output file
+    QUANTIZE : boolean
+        Encode the bands with quantize before writing
+
+    """
+    if QUANTIZE:
+        image = quantize(image)
+    arrays = {}
+    compact = {}
+    for name, band in image['bands'].items():
+        if isinstance(band, CompactAngle):
+            description = band.to_dict()
+            arrays['band:' + name] = description.pop('values')
+            compact[name] = description
+        else:
+            arrays['band:' + name] = band
+    header = {'properties': image['properties'], 'compact': compact}
+    np.savez_compressed(path, header=np.array(json.dumps(header, default=float)), **arrays)
+
+
+def load(path, DECODE=True):
+    """
+    Read a local image written by save.
+
+    Parameters
+    ----------
+    path : string
+        Input file
+    DECODE : boolean
+        Decode quantized bands to float
+
+    Returns
+    -------
+    dict
+        The local image
+
+    """
+    with np.load(path) as data:
+        header = json.loads(str(data['header']))
+        bands = {}
+        for key in data.files:
+            if not key.startswith('band:'):
+                continue
+            name = key[len('band:'):]
+            if name in header['compact']:
+                description = dict(header['compact'][name], values=data[key])
+                bands[name] = CompactAngle.from_dict(description)
+            else:
+                bands[name] = data[key]
+    image = make_image(bands, header['properties'])
+    return dequantize(image) if DECODE else image
+
+
+def read_header(path):
+    """
+    Read the properties, band names and shape of a local image written by save,
+    without reading the bands.
+
+    Parameters
+    ----------
+    path : string
+        Input file
+
+    Returns
+    -------
+    dict
+        'properties', 'bands' (list of band names) and 'shape' (rows, cols)
+
+    """
+    with np.load(path) as data:
+        header = json.loads(str(data['header']))
+        names = [key[len('band:'):] for key in data.files if key.startswith('band:')]
+    shape = None
+    with zipfile.ZipFile(path) as archive:
+        for name in names:
+            if name in header['compact']:
+                shape = tuple(header['compact'][name]['shape'])
+                continue
+            with archive.open('band:' + name + '.npy') as f:
+                version = np.lib.format.read_magic(f)
+                if version == (1, 0):
+                    shape = np.lib.format.read_array_header_1_0(f)[0]
+                else:
+                    shape = np.lib.format.read_array_header_2_0(f)[0]
+            break
+    return {'properties': header['properties'], 'bands': names, 'shape': shape}
@@ -0,0 +1,638 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Fused block kernels of the local backend for the Lee, Gamma MAP and Lee sigma filters.
+
+    A direct NumPy port of the filters materialises a dozen scene sized temporaries
+    (mean, variance, ci, alpha, q, rHat, the masked branches, ...). Here the image is
+    processed in cache sized tiles: the neighbourhood statistics of a tile (plus its halo)
+    are computed from small summed-area tables, the pointwise formula of the filter is
+    evaluated with in-place ufuncs on preallocated workspace buffers and the branches
+    are selected in place. Only the input and the output are scene sized.
+
+    The kernels also take a stack of co-registered bands, e.g. (time, band, rows, cols):
+    every tile is then reduced for all the layers with the same ufunc calls, which
+    amortizes the per-call overhead that dominates on small scenes and tiles. The
+    layers are processed on the same tiles with the same operations as a single band,
+    so the result of every layer is identical to the result of the band alone.
+"""
+
+import math
+import threading
+
+import numpy as np
+
+# tile shape (rows, cols); one float64 tile buffer is 256 KiB
+TILE_SHAPE = (128, 256)
+
+# ---------------------------------------------------------------------------//
+# Workspace
+# ---------------------------------------------------------------------------//
+
+class Workspace:
+    """
+    Named scratch buffers that are allocated once and reused for every tile.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=np.float64):
+        """
+        Return a buffer of the given shape, growing the underlying storage if needed.
+        The content of the buffer is undefined.
+        """
+        size = int(np.prod(shape))
+        buf = self._buffers.get(name)
+        if buf is None or buf.size < size or buf.dtype != dtype:
+            buf = self._buffers[name] = np.empty(size, dtype)
+        return buf[:size].reshape(shape)
+
+    def nbytes(self):
+        """Total size of the allocated buffers in bytes."""
+        return sum(buf.nbytes for buf in self._buffers.values())
+
+
+_local = threading.local()
+
+
+def workspace():
+    """Return the workspace of the calling thread."""
+    ws = getattr(_local, 'workspace', None)
+    if ws is None:
+        ws = _local.workspace = Workspace()
+    return ws
+
+
+def release_workspace():
+    """Drop the workspace of the calling thread, the next kernel allocates new buffers."""
+    _local.workspace = None
+
+
+def tiles(shape, tile_shape=None):
+    """
+    Iterate over the tiles of an image.
+
+    Yields
+    ------
+    tuple
+        (y0, y1, x0, x1) bounds of the tile
+
+    """
+    rows, cols = shape
+    th, tw = tile_shape or TILE_SHAPE
+    for y0 in range(0, rows, th):
+        for x0 in range(0, cols, tw):
+            yield y0, min(y0 + th, rows), x0, min(x0 + tw, cols)
+
+
+def batch_layers(shape, tile_shape=None):
+    """
+    Number of co-registered layers of a (rows, cols) shape to filter at once, so that
+    a tile of the stack holds about as many pixels as a full tile of a single band.
+    Scenes at least as large as a tile gain nothing from batching (1).
+    """
+    th, tw = tile_shape or TILE_SHAPE
+    return max(1, (th * tw) // (min(shape[0], th) * min(shape[1], tw)))
+
+
+# ---------------------------------------------------------------------------//
+# Neighbourhood statistics of a tile
+# ---------------------------------------------------------------------------//
+
+def _tile_box_sum(slab, bounds, r, name, ws):
+    """
+    Box sums over (2r+1)^2 windows of the pixels of a tile.
+
+    Parameters
+    ----------
+    slab : numpy array
+        Values of the tile extended by the halo, clipped to the image; the sums are
+        computed over the last two axes
+    bounds : tuple
+        (h, w, oy, ox): tile shape and offset of the slab in the padded tile
+    r : integer
+        Kernel radius
+    name : string
+        Prefix of the workspace buffers
+    ws : Workspace
+
+    Returns
+    -------
+    numpy array
+        (..., h, w) workspace view with the sums
+
+    """
+    h, w, oy, ox = bounds
+    k = 2 * r + 1
+    lead = slab.shape[:-2]
+    sat = ws.get(name + '_sat', lead + (h + k, w + k))
+    sat.fill(0)
+    sat[..., 1 + oy:1 + oy + slab.shape[-2], 1 + ox:1 + ox + slab.shape[-1]] = slab
+    np.cumsum(sat, axis=-2, out=sat)
+    np.cumsum(sat, axis=-1, out=sat)
+    out = ws.get(name + '_box', lead + (h, w))
+    np.subtract(sat[..., k:k + h, k:k + w], sat[..., :h, k:k + w], out=out)
+    out -= sat[..., k:k + h, :w]
+    out += sat[..., :h, :w]
+    return out
+
+
+def tile_stats(x, tile, KERNEL_SIZE, ws, valid=None, prefix='s'):
+    """
+    Local mean and population variance of the valid pixels of one tile, like
+    reduceNeighborhood(mean + variance) on ee.Kernel.square(KERNEL_SIZE/2).
+
+    Parameters
+    ----------
+    x : numpy array
+        The full image band, NaN where masked, or a stack of co-registered bands
+        (..., rows, cols) whose layers are all reduced at once
+    tile : tuple
+        (y0, y1, x0, x1) bounds of the tile
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+    ws : Workspace
+    valid : numpy array, optional
+        Additional boolean mask of the tile extended by the halo of the kernel and
+        clipped to the image, see sigma_range; pixels where it is False are treated
+        as masked
+    prefix : string
+        Prefix of the workspace buffers, to keep the statistics of two kernels
+
+    Returns
+    -------
+    tuple
+        (mean, variance) as (..., h, w) workspace views
+
+    """
+    y0, y1, x0, x1 = tile
+    r = KERNEL_SIZE // 2
+    rows, cols = x.shape[-2:]
+    lead = x.shape[:-2]
+    sy0, sy1, sx0, sx1 = max(0, y0 - r), min(rows, y1 + r), max(0, x0 - r), min(cols, x1 + r)
+    h, w = y1 - y0, x1 - x0
+    bounds = (h, w, sy0 - (y0 - r), sx0 - (x0 - r))
+    shape = lead + (sy1 - sy0, sx1 - sx0)
+
+    slab = x[..., sy0:sy1, sx0:sx1]
+    masked = ws.get(prefix + '_masked', shape, bool)
+    np.isnan(slab, out=masked)
+    if valid is not None:
+        invalid = ws.get(prefix + '_invalid', shape, bool)
+        np.logical_not(valid, out=invalid)
+        masked |= invalid
+    values = ws.get(prefix + '_values', shape)
+    np.copyto(values, slab)
+    np.copyto(values, 0, where=masked)
+    np.logical_not(masked, out=masked)
+
+    count = _tile_box_sum(masked, bounds, r, prefix + '_count', ws)
+    mean = _tile_box_sum(values, bounds, r, prefix + '_sum', ws)
+    np.multiply(values, values, out=values)
+    variance = _tile_box_sum(values, bounds, r, prefix + '_sum2', ws)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean /= count
+        variance /= count
+    tmp = ws.get(prefix + '_tmp', lead + (h, w))
+    np.multiply(mean, mean, out=tmp)
+    variance -= tmp
+    np.maximum(variance, 0, out=variance)
+    return mean, variance
+
+
+def tile_stats_multi(x, tile, KERNEL_SIZES, ws, valid=None, prefix='m'):
+    """
+    Local mean and population variance of one tile for several kernel sizes, from one
+    summed-area table per moment built on the halo of the largest kernel.
+
+    Parameters
+    ----------
+    x, tile, ws :
+        See tile_stats
+    valid : numpy array, optional
+        See tile_stats, with the halo of the largest kernel
+    KERNEL_SIZES : list
+        Positive odd kernel sizes
+    prefix : string
+        Prefix of the workspace buffers
+
+    Returns
+    -------
+    dict
+        kernel size -> (mean, variance) as (..., h, w) workspace views
+
+    """
+    y0, y1, x0, x1 = tile
+    R = max(KERNEL_SIZES) // 2
+    rows, cols = x.shape[-2:]
+    lead = x.shape[:-2]
+    sy0, sy1, sx0, sx1 = max(0, y0 - R), min(rows, y1 + R), max(0, x0 - R), min(cols, x1 + R)
+    h, w = y1 - y0, x1 - x0
+    oy, ox = sy0 - (y0 - R), sx0 - (x0 - R)
+    shape = lead + (sy1 - sy0, sx1 - sx0)
+
+    slab = x[..., sy0:sy1, sx0:sx1]
+    masked = ws.get(prefix + '_masked', shape, bool)
+    np.isnan(slab, out=masked)
+    if valid is not None:
+        invalid = ws.get(prefix + '_invalid', shape, bool)
+        np.logical_not(valid, out=invalid)
+        masked |= invalid
+    values = ws.get(prefix + '_values', shape)
+    np.copyto(values, slab)
+    np.copyto(values, 0, where=masked)
+    np.logical_not(masked, out=masked)
+
+    sats = {}
+    for moment in ('count', 'sum', 'sum2'):
+        if moment == 'sum2':
+            np.multiply(values, values, out=values)
+        sat = sats[moment] = ws.get(prefix + '_' + moment + '_sat', lead + (h + 2 * R + 1, w + 2 * R + 1))
+        sat.fill(0)
+        sat[..., 1 + oy:1 + oy + shape[-2], 1 + ox:1 + ox + shape[-1]] = masked if moment == 'count' else values
+        np.cumsum(sat, axis=-2, out=sat)
+        np.cumsum(sat, axis=-1, out=sat)
+
+    stats = {}
+    for K in sorted(set(KERNEL_SIZES)):
+        r = K // 2
+        a0, a1 = R - r, R + r + 1
+        box = {}
+        for moment, sat in sats.items():
+            out = box[moment] = ws.get('{}_{}_{}'.format(prefix, K, moment), lead + (h, w))
+            np.subtract(sat[..., a1:a1 + h, a1:a1 + w], sat[..., a0:a0 + h, a1:a1 + w], out=out)
+            out -= sat[..., a1:a1 + h, a0:a0 + w]
+            out += sat[..., a0:a0 + h, a0:a0 + w]
+        mean, variance = box['sum'], box['sum2']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean /= box['count']
+            variance /= box['count']
+        tmp = ws.get(prefix + '_tmp', lead + (h, w))
+        np.multiply(mean, mean, out=tmp)
+        variance -= tmp
+        np.maximum(variance, 0, out=variance)
+        stats[K] = (mean, variance)
+    return stats
+
+
+# ---------------------------------------------------------------------------//
+# Fused filters
+# ---------------------------------------------------------------------------//
+
+def _output(x, out):
+    return np.empty_like(x) if out is None else out
+
+
+def boxcar(x, KERNEL_SIZE, out=None, tile_shape=None):
+    """
+    Boxcar filter of one band.
+
+    Parameters
+    ----------
+    x : numpy array
+        Band, NaN where masked, or a stack of co-registered bands (..., rows, cols)
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+    out : numpy array, optional
+        Output array, may not be x
+    tile_shape : tuple, optional
+        Overrides TILE_SHAPE
+
+    Returns
+    -------
+    numpy array
+        Filtered band
+
+    """
+    out = _output(x, out)
+    ws = workspace()
+    for tile in tiles(x.shape[-2:], tile_shape):
+        y0, y1, x0, x1 = tile
+        mean, _ = tile_stats(x, tile, KERNEL_SIZE, ws)
+        out[..., y0:y1, x0:x1] = mean
+    return out
+
+
+def _mmse(z_bar, varz, x, eta2, clip, ws, out):
+    """
+    out = (1 - b) * |z_bar| + b * x with b = (varz - |z_bar|^2 eta^2) / (1 + eta^2) / varz,
+    optionally with negative b set to zero. z_bar and varz are overwritten.
+    """
+    b = varz
+    tmp = ws.get('mmse_tmp', z_bar.shape)
+    np.abs(z_bar, out=z_bar)
+    np.multiply(z_bar, z_bar, out=tmp)
+    tmp *= eta2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # b = (varz - tmp) / (1 + eta2) / varz
+        np.subtract(1.0, np.divide(tmp, varz, out=tmp), out=tmp)
+        np.divide(tmp, 1 + eta2, out=b)
+    if clip:
+        # if b is negative set it to zero (NaN is kept)
+        negative = ws.get('mmse_negative', b.shape, bool)
+        np.less(b, 0, out=negative)
+        np.copyto(b, 0, where=negative)
+    # (1 - b) * |z_bar| + b * x
+    np.subtract(1.0, b, out=tmp)
+    tmp *= z_bar
+    np.multiply(b, x, out=b)
+    np.add(tmp, b, out=out)
+    return out
+
+
+def lee(x, KERNEL_SIZE, out=None, tile_shape=None):
+    """
+    Lee filter of one band, see speckle_filter.leefilter.
+
+    Parameters
+    ----------
+    x : numpy array
+        Band, NaN where masked, or a stack of co-registered bands (..., rows, cols)
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+    out : numpy array, optional
+        Output array, may not be x
+    tile_shape : tuple, optional
+        Overrides TILE_SHAPE
+
+    Returns
+    -------
+    numpy array
+        Filtered band
+
+    """
+    # S1-GRD images are multilooked 5 times in range
+    enl = 5
+    eta2 = 1.0/enl
+    out = _output(x, out)
+    ws = workspace()
+    for tile in tiles(x.shape[-2:], tile_shape):
+        y0, y1, x0, x1 = tile
+        z_bar, varz = tile_stats(x, tile, KERNEL_SIZE, ws)
+        result = ws.get('result', z_bar.shape)
+        _mmse(z_bar, varz, x[..., y0:y1, x0:x1], eta2, True, ws, result)
+        out[..., y0:y1, x0:x1] = result
+    return out
+
+
+def gammamap(x, KERNEL_SIZE, out=None, tile_shape=None):
+    """
+    Gamma MAP filter of one band, see speckle_filter.gammamap.
+
+    Parameters
+    ----------
+    x : numpy array
+        Band, NaN where masked, or a stack of co-registered bands (..., rows, cols)
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+    out : numpy array, optional
+        Output array, may not be x
+    tile_shape : tuple, optional
+        Overrides TILE_SHAPE
+
+    Returns
+    -------
+    numpy array
+        Filtered band
+
+    """
+    out = _output(x, out)
+    ws = workspace()
+    for tile in tiles(x.shape[-2:], tile_shape):
+        y0, y1, x0, x1 = tile
+        z, ci = tile_stats(x, tile, KERNEL_SIZE, ws)
+        out[..., y0:y1, x0:x1] = _gamma_map(z, ci, x[..., y0:y1, x0:x1], ws)
+    return out
+
+
+def _gamma_map(z, ci, xt, ws):
+    """
+    Gamma MAP estimate of a tile from the local mean z and variance ci, which is
+    overwritten; returns a workspace view.
+    """
+    enl = 5
+    #noise coefficient of variation (or noise sigma)
+    cu = 1.0/math.sqrt(enl)
+    #threshold for the observed coefficient of variation
+    cmax = math.sqrt(2.0) * cu
+    shape = z.shape
+    alpha = ws.get('alpha', shape)
+    q = ws.get('q', shape)
+    branch = ws.get('branch', shape, bool)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        #local observed coefficient of variation
+        np.sqrt(ci, out=ci)
+        ci /= z
+        # alpha = (1 + cu^2) / (ci^2 - cu^2)
+        np.multiply(ci, ci, out=alpha)
+        alpha -= cu**2
+        np.divide(1 + cu**2, alpha, out=alpha)
+        # q = z^2 (z alpha - enl - 1)^2 + 4 alpha enl x z
+        np.multiply(z, alpha, out=q)
+        q -= enl + 1
+        q *= z
+        np.multiply(q, q, out=q)
+        rhat = ws.get('rhat', shape)
+        np.multiply(alpha, 4 * enl, out=rhat)
+        rhat *= xt
+        rhat *= z
+        q += rhat
+        # rHat = (z (alpha - enl - 1) + sqrt(q)) / (2 alpha)
+        np.sqrt(q, out=q)
+        np.subtract(alpha, enl + 1, out=rhat)
+        rhat *= z
+        rhat += q
+        alpha *= 2
+        rhat /= alpha
+
+    #if ci <= cu then its a homogenous region ->> boxcar filter
+    np.less_equal(ci, cu, out=branch)
+    np.copyto(rhat, z, where=branch)
+    #ci>cmax then its strong signal ->> retain
+    np.greater_equal(ci, cmax, out=branch)
+    np.copyto(rhat, xt, where=branch)
+    np.isnan(ci, out=branch)
+    np.copyto(rhat, np.nan, where=branch)
+    return rhat
+
+
+# sigma -> (I1, I2, eta), Lookup table (J.S.Lee et al 2009) for 4 look intensity
+SIGMA_LUT = {0.5: (0.694, 1.385, 0.1921),
+             0.6: (0.630, 1.495, 0.2348),
+             0.7: (0.560, 1.627, 0.2825),
+             0.8: (0.480, 1.804, 0.3354),
+             0.9: (0.378, 2.094, 0.3991),
+             0.95: (0.302, 2.360, 0.4391)}
+
+
+def leesigma(x, KERNEL_SIZE, out=None, tile_shape=None, sigma=0.9):
+    """
+    Improved Lee sigma filter of one band, see speckle_filter.leesigma.
+
+    The filter runs in two passes over every tile. The first pass evaluates the
+    a-priori mean in a 3x3 window on the tile extended by the halo of the kernel
+    and keeps only the boolean sigma range mask of that slab, the second pass
+    applies the MMSE filter to the pixels in the sigma range. No scene sized mask
+    is kept; the first pass is recomputed on the halo of the neighbouring tiles.
+
+    The retained strong scatterers of the Earth Engine implementation are
+    selected with ee.Reducer.countDistinctNonNull() on a boolean image, which
+    counts at most 2 distinct values in a window and therefore never reaches
+    the threshold Tk = 7. No pixel is retained, so that step is skipped here.
+
+    Parameters
+    ----------
+    x : numpy array
+        Band, NaN where masked, or a stack of co-registered bands (..., rows, cols)
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+    out : numpy array, optional
+        Output array, may not be x
+    tile_shape : tuple, optional
+        Overrides TILE_SHAPE
+    sigma : float
+        Sigma of the lookup table
+
+    Returns
+    -------
+    numpy array
+        Filtered band
+
+    """
+    _, _, nEta = SIGMA_LUT[sigma]
+    out = _output(x, out)
+    ws = workspace()
+    for tile in tiles(x.shape[-2:], tile_shape):
+        y0, y1, x0, x1 = tile
+        in_range, (oy, ox) = sigma_range(x, tile, KERNEL_SIZE // 2, ws, sigma)
+        # pass 2: MMSE filter of the pixels in the sigma range
+        z_bar, varz = tile_stats(x, tile, KERNEL_SIZE, ws, valid=in_range)
+        inner = in_range[..., oy:oy + y1 - y0, ox:ox + x1 - x0]
+        out[..., y0:y1, x0:x1] = _sigma_mmse(x, inner, tile, z_bar, varz, nEta, ws)
+    return out
+
+
+def sigma_range(x, tile, r, ws, sigma=0.9):
+    """
+    Pass 1 of leesigma: the boolean mask of the pixels within the sigma range of the
+    a-priori mean in a 3x3 window, on a tile extended by the halo of a kernel of
+    radius r and clipped to the image. The 3x3 statistics read a 1 px halo around
+    that slab. The mask does not depend on the kernel size.
+
+    Returns
+    -------
+    tuple
+        (mask, (oy, ox)): (..., slab rows, slab cols) workspace view and the offset
+        of the tile in the slab
+
+    """
+    enl = 4
+    target_kernel = 3
+    eta2 = 1.0/enl
+    I1, I2, _ = SIGMA_LUT[sigma]
+    y0, y1, x0, x1 = tile
+    rows, cols = x.shape[-2:]
+    slab = (max(0, y0 - r), min(rows, y1 + r), max(0, x0 - r), min(cols, x1 + r))
+    sy0, sy1, sx0, sx1 = slab
+    xt = x[..., sy0:sy1, sx0:sx1]
+    # the statistics buffers of pass 2 are free until the mask is computed
+    z_bar, varz = tile_stats(x, slab, target_kernel, ws)
+    xtilde = ws.get('xtilde', z_bar.shape)
+    _mmse(z_bar, varz, xt, eta2, False, ws, xtilde)
+    bound = ws.get('bound', z_bar.shape)
+    branch = ws.get('range_branch', z_bar.shape, bool)
+    in_range = ws.get('range', z_bar.shape, bool)
+    np.multiply(xtilde, I1, out=bound)
+    np.greater_equal(xt, bound, out=in_range)
+    np.multiply(xtilde, I2, out=bound)
+    np.less_equal(xt, bound, out=branch)
+    in_range |= branch
+    return in_range, (y0 - sy0, x0 - sx0)
+
+
+def _sigma_mmse(x, in_range, tile, z_bar, varz, nEta, ws):
+    """
+    Pass 2 of leesigma on a tile, in_range is the sigma range mask of the tile; z_bar
+    and varz are overwritten; returns a workspace view.
+    """
+    y0, y1, x0, x1 = tile
+    zt = ws.get('z', z_bar.shape)
+    np.copyto(zt, x[..., y0:y1, x0:x1])
+    branch = ws.get('branch', z_bar.shape, bool)
+    np.logical_not(in_range, out=branch)
+    np.copyto(zt, np.nan, where=branch)
+    result = ws.get('result', z_bar.shape)
+    return _mmse(z_bar, varz, zt, nEta**2, True, ws, result)
+
+
+# ---------------------------------------------------------------------------//
+# Parameter sweep
+# ---------------------------------------------------------------------------//
+
+def filter_variants(x, variants, tile_shape=None):
+    """
+    Filter a band with several filters and kernel sizes in one pass over the tiles.
+
+    The local mean and variance of every kernel size are derived from the same
+    summed-area tables (tile_stats_multi) and shared by the boxcar, Lee and Gamma MAP
+    filters; the Lee sigma filters share the sigma range mask, which does not depend
+    on the kernel size, and the summed-area tables of the pixels in the range. The
+    results equal those of the individual filters up to the rounding of the sums
+    (the tables start at the halo of the largest kernel).
+
+    Parameters
+    ----------
+    x : numpy array
+        Band, NaN where masked, or a stack of co-registered bands (..., rows, cols)
+    variants : list
+        (SPECKLE_FILTER, KERNEL_SIZE) pairs with the filters 'BOXCAR', 'LEE',
+        'GAMMA MAP' and 'LEE SIGMA'
+    tile_shape : tuple, optional
+        Overrides TILE_SHAPE
+
+    Returns
+    -------
+    dict
+        (SPECKLE_FILTER, KERNEL_SIZE) -> filtered band
+
+    """
+    outs = {variant: np.empty_like(x) for variant in variants}
+    plain = sorted({K for F, K in outs if F != 'LEE SIGMA'})
+    sigma = sorted({K for F, K in outs if F == 'LEE SIGMA'})
+    _, _, nEta = SIGMA_LUT[0.9]
+    ws = workspace()
+    for tile in tiles(x.shape[-2:], tile_shape):
+        y0, y1, x0, x1 = tile
+        xt = x[..., y0:y1, x0:x1]
+        stats = tile_stats_multi(x, tile, plain, ws) if plain else {}
+        if sigma:
+            in_range, (oy, ox) = sigma_range(x, tile, max(sigma) // 2, ws)
+            stats.update({('LEE SIGMA', K): value for K, value in
+                          tile_stats_multi(x, tile, sigma, ws, valid=in_range, prefix='ms').items()})
+            in_range = in_range[..., oy:oy + y1 - y0, ox:ox + x1 - x0]
+        for (F, K), out in outs.items():
+            mean, variance = stats[('LEE SIGMA', K) if F == 'LEE SIGMA' else K]
+            if F == 'BOXCAR':
+                out[..., y0:y1, x0:x1] = mean
+                continue
+            # the filters overwrite the statistics, which serve the next variants
+            z = ws.get('variant_mean', mean.shape)
+            v = ws.get('variant_var', mean.shape)
+            np.copyto(z, mean)
+            np.copyto(v, variance)
+            if F == 'LEE':
+                # S1-GRD images are multilooked 5 times in range, as in lee
+                out[..., y0:y1, x0:x1] = _mmse(z, v, xt, 1.0/5, True, ws, ws.get('result', z.shape))
+            elif F == 'GAMMA MAP':
+                out[..., y0:y1, x0:x1] = _gamma_map(z, v, xt, ws)
+            elif F == 'LEE SIGMA':
+                out[..., y0:y1, x0:x1] = _sigma_mmse(x, in_range, tile, z, v, nEta, ws)
+            else:
+                raise ValueError("ERROR!!! SPECKLE_FILTER not correctly defined")
+    return outs
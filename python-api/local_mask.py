@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Bit-packed boolean masks for the local backend.
+
+    A PackedMask stores 8 pixels per byte (np.packbits along the rows, little bit order)
+    and supports AND/OR/XOR/NOT, row windows, shifts, erosion with a disc, conversion from
+    and to row runs (slices) and masking of float bands block by block, so that a full
+    resolution boolean raster is never needed. The padding bits after the last column of
+    every row are always zero.
+"""
+
+import math
+
+import numpy as np
+
+# rows unpacked at once
+BLOCK_ROWS = 256
+
+# number of set bits of every byte value
+_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+class PackedMask(object):
+    """
+    Boolean raster of shape (rows, cols), True where the pixel is valid.
+
+    Parameters
+    ----------
+    bits : numpy array
+        uint8 array of shape (rows, ceil(cols / 8))
+    cols : integer
+        Number of columns
+    """
+
+    def __init__(self, bits, cols):
+        self.bits = bits
+        self.cols = cols
+
+    # -----------------------------------------------------------------------//
+    # Construction and conversion
+    # -----------------------------------------------------------------------//
+
+    @classmethod
+    def from_bool(cls, mask):
+        mask = np.asarray(mask, bool)
+        return cls(np.packbits(mask, axis=1, bitorder='little'), mask.shape[1])
+
+    @classmethod
+    def full(cls, shape, value=True):
+        rows, cols = shape
+        bits = np.full((rows, (cols + 7) // 8), 0xFF if value else 0, np.uint8)
+        out = cls(bits, cols)
+        out._clear_tail()
+        return out
+
+    @classmethod
+    def from_spans(cls, starts, stops, cols):
+        """Mask that is True on columns starts[r] up to stops[r] (exclusive) of every row r."""
+        out = cls.full((len(starts), cols), False)
+        for r0 in range(0, len(starts), BLOCK_ROWS):
+            block = slice(r0, r0 + BLOCK_ROWS)
+            c = np.arange(cols)
+            out[block] = cls.from_bool((c >= starts[block, None]) & (c < stops[block, None]))
+        return out
+
+    def to_bool(self, rows=None):
+        """Unpack the mask, or a window of rows of it, to a boolean array."""
+        bits = self.bits if rows is None else self.bits[rows]
+        return np.unpackbits(bits, axis=1, count=self.cols, bitorder='little').view(bool)
+
+    def to_slices(self):
+        """
+        Runs of valid pixels.
+
+        Returns
+        -------
+        tuple
+            (row, start, stop) integer arrays, one entry per run; columns start
+            up to stop (exclusive) of the row are valid
+
+        """
+        rows, starts, stops = [], [], []
+        for r0 in range(0, self.shape[0], BLOCK_ROWS):
+            block = self.to_bool(slice(r0, r0 + BLOCK_ROWS)).astype(np.int8)
+            edges = np.diff(np.pad(block, ((0, 0), (1, 1))), axis=1)
+            r, c = np.nonzero(edges == 1)
+            _, e = np.nonzero(edges == -1)
+            rows.append(r + r0)
+            starts.append(c)
+            stops.append(e)
+        return np.concatenate(rows), np.concatenate(starts), np.concatenate(stops)
+
+    # -----------------------------------------------------------------------//
+    # Properties
+    # -----------------------------------------------------------------------//
+
+    @property
+    def shape(self):
+        return (self.bits.shape[0], self.cols)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def count(self):
+        """Number of valid pixels."""
+        return int(_POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    def copy(self):
+        return PackedMask(self.bits.copy(), self.cols)
+
+    def _clear_tail(self):
+        if self.cols % 8:
+            self.bits[:, -1] &= np.uint8((1 << (self.cols % 8)) - 1)
+        return self
+
+    # -----------------------------------------------------------------------//
+    # Logical operations
+    # -----------------------------------------------------------------------//
+
+    def _other(self, other):
+        if isinstance(other, PackedMask):
+            return other.bits
+        return PackedMask.from_bool(other).bits
+
+    def __and__(self, other):
+        return PackedMask(self.bits & self._other(other), self.cols)
+
+    def __or__(self, other):
+        return PackedMask(self.bits | self._other(other), self.cols)
+
+    def __xor__(self, other):
+        return PackedMask(self.bits ^ self._other(other), self.cols)
+
+    def __iand__(self, other):
+        self.bits &= self._other(other)
+        return self
+
+    def __ior__(self, other):
+        self.bits |= self._other(other)
+        return self
+
+    def __invert__(self):
+        return PackedMask(~self.bits, self.cols)._clear_tail()
+
+    def __eq__(self, other):
+        return isinstance(other, PackedMask) and self.cols == other.cols and np.array_equal(self.bits, other.bits)
+
+    def __getitem__(self, rows):
+        if not isinstance(rows, slice):
+            raise ValueError("ERROR!!! PackedMask can only be indexed by a slice of rows")
+        return PackedMask(self.bits[rows], self.cols)
+
+    def __setitem__(self, rows, value):
+        if isinstance(value, (bool, np.bool_)):
+            self.bits[rows] = 0xFF if value else 0
+            self._clear_tail()
+        else:
+            self.bits[rows] = self._other(value)
+
+    # -----------------------------------------------------------------------//
+    # Shifts and erosion
+    # -----------------------------------------------------------------------//
+
+    def shift_columns(self, s, fill=True):
+        """
+        Mask whose column c holds column c + s of this mask; columns shifted in
+        from outside of the image take the value fill.
+        """
+        rows, nb = self.bits.shape
+        q, b = s // 8, s % 8
+        pad = abs(q) + 1
+        src = np.full((rows, nb + 2 * pad), 0xFF if fill else 0, np.uint8)
+        src[:, pad:pad + nb] = self.bits
+        if fill and self.cols % 8:
+            src[:, pad + nb - 1] |= np.uint8(0xFF << (self.cols % 8) & 0xFF)
+        lo = src[:, pad + q:pad + q + nb]
+        if b == 0:
+            out = lo.copy()
+        else:
+            hi = src[:, pad + q + 1:pad + q + 1 + nb]
+            out = (lo >> np.uint8(b)) | (hi << np.uint8(8 - b))
+        return PackedMask(out, self.cols)._clear_tail()
+
+    def erode_rows(self, w):
+        """AND over the columns c - w up to c + w of every row, pixels outside of the image count as valid."""
+        return self._row_eroder(w)(w)
+
+    def _row_eroder(self, max_w):
+        # valid padding on the left, whole bytes so that the data is not shifted;
+        # columns shifted in from the right are filled as valid anyway
+        pad = (max(max_w, 0) + 7) // 8
+        rows = self.shape[0]
+        padded = PackedMask(np.concatenate([np.full((rows, pad), 0xFF, np.uint8), self.bits], axis=1),
+                            self.cols + 8 * pad)
+        # levels[k][c] holds the AND of the columns c up to c + 2^k - 1
+        levels = [padded]
+
+        def erode(w):
+            if w <= 0:
+                return self.copy()
+            length = 2 * w + 1
+            while 2 ** len(levels) <= length:
+                span = 2 ** (len(levels) - 1)
+                levels.append(levels[-1] & levels[-1].shift_columns(span))
+            span = 2 ** (len(levels) - 1)
+            while span > length:
+                span //= 2
+            acc = levels[int(math.log2(span))]
+            # two overlapping windows of 2^k columns cover the 2w + 1 columns
+            out = acc.shift_columns(-w) & acc.shift_columns(w - span + 1)
+            return PackedMask(np.ascontiguousarray(out.bits[:, pad:]), self.cols)._clear_tail()
+        return erode
+
+    def erode(self, radius):
+        """
+        Remove the pixels closer than radius (pixels) to an invalid pixel; pixels
+        outside of the image count as valid.
+
+        The disc is decomposed in horizontal runs, every run is a row erosion
+        computed from doubling windows, O(log radius) shifts per distinct run length.
+
+        Parameters
+        ----------
+        radius : float
+            Radius of the disc in pixels
+
+        Returns
+        -------
+        PackedMask
+            The eroded mask
+
+        """
+        R = int(math.floor(radius))
+        rows = self.shape[0]
+        erode_rows = self._row_eroder(int(math.floor(radius)))
+        runs = {}
+        out = self.copy()
+        for dy in range(-R, R + 1):
+            if abs(dy) >= rows:
+                # the row is outside of the mask for every pixel
+                continue
+            w = int(math.floor(math.sqrt(max(radius * radius - dy * dy, 0))))
+            if w not in runs:
+                runs[w] = erode_rows(w).bits
+            # pixel i is affected by row i + dy
+            src = slice(max(dy, 0), rows + min(dy, 0))
+            dst = slice(max(-dy, 0), rows - max(dy, 0))
+            out.bits[dst] &= runs[w][src]
+        return out
+
+    # -----------------------------------------------------------------------//
+    # Masking of bands
+    # -----------------------------------------------------------------------//
+
+    def apply(self, array, fill=np.nan):
+        """
+        Set the pixels of a band where the mask is False to fill, in place and
+        block by block.
+
+        Parameters
+        ----------
+        array : numpy array
+            2-D band with the shape of the mask
+        fill : scalar
+            Value of the masked pixels
+
+        Returns
+        -------
+        numpy array
+            The same array
+
+        """
+        for r0 in range(0, self.shape[0], BLOCK_ROWS):
+            block = slice(r0, r0 + BLOCK_ROWS)
+            np.copyto(array[block], fill, where=~self.to_bool(block))
+        return array
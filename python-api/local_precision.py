@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Reduced precision mode of the local backend (PRECISION: 'HALF').
+
+    The stages keep the dtype of the backscatter bands: the filters compute in float32 at
+    least, with their neighbourhood statistics from float64 summed-area tables, the
+    multi-temporal filter sums the ratios in float64 and the terrain flattening evaluates
+    the slope correction factor in float64 block by block, and only the results are cast
+    back to the dtype of the input. With PRECISION 'HALF' the backscatter bands of the
+    selected scenes are cast to float16 before the first stage, so that the scenes, the
+    filtered images, the stored ratios and the outputs take half the memory of float32.
+
+    float16 has an 11 bit significand (a relative step of 0.05 %, about 0.002 dB in linear
+    power) and its normal range starts at 6.1e-5 (-42 dB); weaker pixels are stored as
+    subnormal numbers with a coarser relative step. dB outputs are stored with a step of
+    0.016 dB between 16 and 32 dB. The angle band and the DEM keep their precision: the
+    angle is usually compact (local_helper.CompactAngle) and elevations above 2048 m
+    would be stored in steps of 2 m or more. The filters that select a branch per pixel
+    (Gamma MAP, refined Lee) may take another branch, or find a zero variance, at the few
+    pixels where the rounding of the input matters. compare runs a configuration in both
+    precisions and reports the errors of the reduced precision outputs, including the
+    pixels masked in one output only.
+"""
+
+import time
+import tracemalloc
+
+import numpy as np
+
+import local_helper
+import local_wrapper
+
+PRECISIONS = {'FULL': None, 'HALF': np.float16}
+
+
+def cast(collection, PRECISION):
+    """
+    Cast the backscatter bands of a local collection to the dtype of a precision mode.
+
+    Parameters
+    ----------
+    collection : list
+        Local image collection
+    PRECISION : string
+        'FULL' (the collection is returned unchanged) or 'HALF'
+
+    Returns
+    -------
+    list
+        The images with their backscatter bands in float16; the angle band is kept
+
+    """
+    dtype = PRECISIONS[PRECISION]
+    if dtype is None:
+        return collection
+    return [local_helper.add_bands(image, {name: image['bands'][name].astype(dtype, copy=False)
+                                           for name in local_helper.band_names(image)})
+            for image in collection]
+
+
+def stack_bytes(collection):
+    """Memory of the backscatter bands of a local collection in bytes."""
+    return sum(image['bands'][name].nbytes for image in collection for name in local_helper.band_names(image))
+
+
+def error_report(reference, reduced, FORMAT='DB'):
+    """
+    Errors of reduced precision outputs against the full precision outputs.
+
+    Parameters
+    ----------
+    reference, reduced : list
+        Processed local collections of the same scenes; outputs encoded with
+        OUTPUT_ENCODING 'QUANTIZED' are decoded first (local_helper.dequantize)
+    FORMAT : string
+        'DB' or 'LINEAR', the format of the outputs
+
+    Returns
+    -------
+    dict
+        band name -> {'max_abs_db', 'mean_abs_db', 'p99_abs_db', 'max_rel_linear',
+        'mask_mismatch' (pixels valid in one output only), 'valid'}
+
+    """
+    report = {}
+    for ref, red in zip(reference, reduced):
+        # the counts of a quantized output are not dB and its nodata is not NaN
+        ref, red = local_helper.dequantize(ref), local_helper.dequantize(red)
+        for name in local_helper.band_names(ref):
+            a = ref['bands'][name].astype(np.float64)
+            b = red['bands'][name].astype(np.float64)
+            valid = np.isfinite(a) & np.isfinite(b)
+            if FORMAT == 'DB':
+                db = np.abs(b[valid] - a[valid])
+                rel = np.abs(10 ** (db / 10) - 1)
+            else:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    rel = np.abs(b[valid] / a[valid] - 1)
+                    db = np.abs(10 * np.log10(b[valid] / a[valid]))
+                rel, db = rel[np.isfinite(rel)], db[np.isfinite(db)]
+            entry = report.setdefault(name, {'max_abs_db': 0.0, 'sum_abs_db': 0.0, 'p99': [],
+                                             'max_rel_linear': 0.0, 'mask_mismatch': 0, 'valid': 0})
+            if db.size:
+                entry['max_abs_db'] = max(entry['max_abs_db'], float(db.max()))
+                entry['sum_abs_db'] += float(db.sum())
+                entry['p99'].append(float(np.percentile(db, 99)))
+            if rel.size:
+                entry['max_rel_linear'] = max(entry['max_rel_linear'], float(rel.max()))
+            entry['mask_mismatch'] += int((np.isfinite(a) != np.isfinite(b)).sum())
+            entry['valid'] += int(valid.sum())
+    for entry in report.values():
+        entry['mean_abs_db'] = entry.pop('sum_abs_db') / max(entry['valid'], 1)
+        p99 = entry.pop('p99')
+        entry['p99_abs_db'] = max(p99) if p99 else 0.0
+    return report
+
+
+def _traced_run(run, params, collection):
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    output, _ = run(params, collection)
+    seconds = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1] - base
+    if started:
+        tracemalloc.stop()
+    return output, seconds, peak
+
+
+def compare(params, collection):
+    """
+    Run a configuration in full and in half precision and report the errors.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by local_wrapper.s1_preproc; PRECISION and
+        INCREMENTAL_STORE are ignored
+    collection : list
+        Local image collection
+
+    Returns
+    -------
+    dict
+        'errors': see error_report; 'seconds', 'peak_mb' and 'output_mb' of
+        both runs as {'FULL': ..., 'HALF': ...}
+
+    """
+    params = dict(params, INCREMENTAL_STORE=None)
+    outputs, report = {}, {'seconds': {}, 'peak_mb': {}, 'output_mb': {}}
+    for PRECISION in ('FULL', 'HALF'):
+        output, seconds, peak = _traced_run(local_wrapper.run, dict(params, PRECISION=PRECISION), collection)
+        outputs[PRECISION] = output
+        report['seconds'][PRECISION] = seconds
+        report['peak_mb'][PRECISION] = peak / 2**20
+        report['output_mb'][PRECISION] = stack_bytes(output) / 2**20
+    report['errors'] = error_report(outputs['FULL'], outputs['HALF'], params.get('FORMAT', 'DB'))
+    for name, entry in report['errors'].items():
+        print('{}: max {:.4f} dB, mean {:.4f} dB, p99 {:.4f} dB, {} mask mismatch(es)'.format(
+            name, entry['max_abs_db'], entry['mean_abs_db'], entry['p99_abs_db'], entry['mask_mismatch']))
+    print('Peak memory {:.1f} MB (full) / {:.1f} MB (half), {:.2f} s / {:.2f} s'.format(
+        report['peak_mb']['FULL'], report['peak_mb']['HALF'], report['seconds']['FULL'], report['seconds']['HALF']))
+    return report
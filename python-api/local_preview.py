@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Progressive preview of the local pipeline, the counterpart of preview.py.
+
+    A level of the pyramid runs local_wrapper.run with PREVIEW_FACTOR: the scenes are
+    averaged over F x F blocks (local_helper.downsample, a multilook in linear power), the
+    DEM is averaged to the same grid and the speckle filter kernel is scaled to about the
+    same ground size (parameters.preview_params), so a level costs about 1 / F**2 of the
+    full resolution run. The levels are yielded coarsest first; a finer level can be
+    restricted to a window of the scenes, which is processed with the halo of the level
+    and aligned on the blocks of the level so that the window matches the same pixels of
+    a level of the whole scene.
+"""
+
+import time
+
+import local_helper
+import local_terrain_flattening as ltf
+import local_wrapper
+import parameters
+
+
+def _outer(window, HALO, FACTOR, n):
+    """The window extended by the halo, aligned on the blocks of the level and clipped to the scene."""
+    start = max(window.start - HALO, 0) // FACTOR * FACTOR
+    stop = min(-(-(window.stop + HALO) // FACTOR) * FACTOR, n)
+    return slice(start, stop)
+
+
+def level(params, collection, FACTOR, window=None):
+    """
+    Run the local pipeline at one level of the pyramid.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by local_wrapper.s1_preproc; INCREMENTAL_STORE is ignored
+    collection : list
+        Local image collection
+    FACTOR : integer
+        Downsampling factor, 1 for the full resolution
+    window : tuple, optional
+        (row slice, col slice) of the co-registered scenes to refine, in full
+        resolution pixels; the whole scenes by default
+
+    Returns
+    -------
+    tuple
+        (processed collection at the resolution of the level, report of local_wrapper.run)
+
+    """
+    params = local_wrapper.check_params(dict(params, PREVIEW_FACTOR=FACTOR, INCREMENTAL_STORE=None))
+    if window is None:
+        return local_wrapper.run(params, collection)
+
+    selected = local_wrapper.select(collection, params['START_DATE'], params['STOP_DATE'],
+                                    params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])
+    if not selected:
+        return [], {'tiles': 0}
+    shape = local_helper.image_shape(selected[0])
+    if any(local_helper.image_shape(image) != shape for image in selected):
+        raise ValueError("ERROR!!! A preview window needs co-registered scenes of the same shape")
+    rows, cols = window
+    if not (0 <= rows.start < rows.stop <= shape[0] and 0 <= cols.start < cols.stop <= shape[1]):
+        raise ValueError("ERROR!!! window not correctly defined")
+
+    spacing = ltf.pixel_size(selected[0])
+    HALO = local_wrapper.halo(parameters.preview_params(params), (spacing[0] * FACTOR, spacing[1] * FACTOR)) * FACTOR
+    outer = (_outer(rows, HALO, FACTOR, shape[0]), _outer(cols, HALO, FACTOR, shape[1]))
+    headings, dems = local_wrapper.scene_constants(params, selected)
+    if (params['APPLY_TERRAIN_FLATTENING']):
+        by_index = {image['properties']['system:index']: dem[outer] for image, dem in zip(selected, dems)}
+        params['DEM'] = lambda tile: by_index[tile['properties']['system:index']]
+
+    output, report = local_wrapper.run(params, local_wrapper.cut(selected, outer, headings))
+    inner = (slice((rows.start - outer[0].start) // FACTOR, -(-(rows.stop - outer[0].start) // FACTOR)),
+             slice((cols.start - outer[1].start) // FACTOR, -(-(cols.stop - outer[1].start) // FACTOR)))
+    report['window'] = ((outer[0].start // FACTOR + inner[0].start, outer[0].start // FACTOR + inner[0].stop),
+                        (outer[1].start // FACTOR + inner[1].start, outer[1].start // FACTOR + inner[1].stop))
+    return local_wrapper.cut(output, inner), report
+
+
+def levels(params, collection, FACTORS=(16, 4, 1), window=None):
+    """
+    Levels of the pyramid from the coarsest to the finest, each computed when the
+    previous one has been consumed.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by local_wrapper.s1_preproc
+    collection : list
+        Local image collection
+    FACTORS : list
+        Downsampling factors of the levels
+    window : tuple, optional
+        Window to refine, see level
+
+    Yields
+    ------
+    tuple
+        (factor, processed collection, report with the 'seconds' of the level)
+
+    """
+    for FACTOR in sorted(set(FACTORS), reverse=True):
+        t0 = time.perf_counter()
+        output, report = level(params, collection, FACTOR, window)
+        report.update({'factor': FACTOR, 'seconds': time.perf_counter() - t0})
+        if output:
+            print('Preview level 1/{}: {} image(s) of {} x {} pixels in {:.2f} s'.format(
+                FACTOR, len(output), *local_helper.image_shape(output[0]), report['seconds']))
+        yield FACTOR, output, report
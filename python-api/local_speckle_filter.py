@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: NumPy implementation of the mono-temporal and multi-temporal speckle filters
+             of speckle_filter.py for local execution. The filters follow the Earth Engine
+             implementation step by step; masked pixels are NaN and are ignored by the
+             neighbourhood statistics like masked pixels in ee.Image.reduceNeighborhood.
+             The boxcar, Lee, Gamma MAP and Lee sigma filters run on the fused tile kernels
+             of local_kernels.py, which also filter a (time, band, rows, cols) stack of
+             co-registered scenes at once (filter_stack).
+"""
+import datetime
+
+import numpy as np
+
+import local_helper
+import local_kernels
+
+# ---------------------------------------------------------------------------//
+# 0. NEIGHBOURHOOD STATISTICS
+# ---------------------------------------------------------------------------//
+
+def _box_sum(x, KERNEL_SIZE):
+    """
+    Sum of x over a square window centred on every pixel, using a summed-area table.
+    Pixels outside of the image contribute zero.
+
+    Parameters
+    ----------
+    x : numpy array
+        Values, the window is applied over the last two axes
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+
+    Returns
+    -------
+    numpy array
+        Window sums (float64) with the shape of x
+
+    """
+    r = KERNEL_SIZE // 2
+    rows, cols = x.shape[-2:]
+    pad = [(0, 0)] * (x.ndim - 2) + [(r + 1, r), (r + 1, r)]
+    sat = np.pad(x.astype(np.float64), pad)
+    sat = sat.cumsum(axis=-2).cumsum(axis=-1)
+    k = 2 * r + 1
+    return (sat[..., k:k + rows, k:k + cols] - sat[..., :rows, k:k + cols]
+            - sat[..., k:k + rows, :cols] + sat[..., :rows, :cols])
+
+
+def neighborhood_stats(x, KERNEL_SIZE):
+    """
+    Local mean and (population) variance of the valid pixels in a square window,
+    the equivalent of reduceNeighborhood with ee.Reducer.mean() combined with
+    ee.Reducer.variance() on ee.Kernel.square(KERNEL_SIZE/2).
+
+    Parameters
+    ----------
+    x : numpy array
+        Image band, NaN where masked
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+
+    Returns
+    -------
+    tuple
+        (mean, variance, count) as float64 arrays, NaN where the window has no
+        valid pixel
+
+    """
+    valid = ~np.isnan(x)
+    values = np.where(valid, x, 0)
+    count = _box_sum(valid, KERNEL_SIZE)
+    s1 = _box_sum(values, KERNEL_SIZE)
+    s2 = _box_sum(values * values, KERNEL_SIZE)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s1 / count
+        variance = np.maximum(s2 / count - mean * mean, 0)
+    return mean, variance, count
+
+
+def _shift(x, dy, dx):
+    """
+    Return y with y[i, j] = x[i + dy, j + dx], NaN outside of the image.
+    """
+    out = np.full_like(x, np.nan)
+    rows, cols = x.shape[-2:]
+    ys, yd = (slice(dy, rows), slice(0, rows - dy)) if dy >= 0 else (slice(0, rows + dy), slice(-dy, rows))
+    xs, xd = (slice(dx, cols), slice(0, cols - dx)) if dx >= 0 else (slice(0, cols + dx), slice(-dx, cols))
+    out[..., yd, xd] = x[..., ys, xs]
+    return out
+
+
+def _kernel_stats(x, weights):
+    """
+    Mean and variance of the valid pixels selected by a fixed 0/1 kernel,
+    the equivalent of reduceNeighborhood with ee.Kernel.fixed.
+    """
+    cy, cx = weights.shape[0] // 2, weights.shape[1] // 2
+    s1 = np.zeros(x.shape, np.float64)
+    s2 = np.zeros(x.shape, np.float64)
+    count = np.zeros(x.shape, np.float64)
+    for i, j in zip(*np.nonzero(weights)):
+        shifted = _shift(x, i - cy, j - cx)
+        valid = ~np.isnan(shifted)
+        shifted = np.where(valid, shifted, 0)
+        s1 += shifted
+        s2 += shifted * shifted
+        count += valid
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = s1 / count
+        variance = np.maximum(s2 / count - mean * mean, 0)
+    return mean, variance
+
+
+# ---------------------------------------------------------------------------//
+# 1.SPECKLE FILTERS
+# ---------------------------------------------------------------------------//
+
+def _compute(band):
+    """The band in at least float32, float16 bands (PRECISION 'HALF') are computed in float32."""
+    return band.astype(np.promote_types(band.dtype, np.float32), copy=False)
+
+
+def _apply(image, band_filter):
+    bands = {name: band_filter(_compute(image['bands'][name])).astype(image['bands'][name].dtype)
+             for name in local_helper.band_names(image)}
+    return local_helper.add_bands(image, bands)
+
+
+def boxcar(image, KERNEL_SIZE):
+    """
+    Apply boxcar filter on every band of a local image.
+
+    Parameters
+    ----------
+    image : dict
+        Local image to be filtered
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+
+    Returns
+    -------
+    dict
+        Filtered local image
+
+    """
+    return _apply(image, lambda band: local_kernels.boxcar(band, KERNEL_SIZE))
+
+
+def leefilter(image, KERNEL_SIZE):
+    """
+    Lee Filter applied to one local image.
+    It is implemented as described in
+    J. S. Lee, “Digital image enhancement and noise filtering by use of local statistics,”
+    IEEE Pattern Anal. Machine Intell., vol. PAMI-2, pp. 165–168, Mar. 1980.
+
+    Parameters
+    ----------
+    image : dict
+        Local image to be filtered
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+
+    Returns
+    -------
+    dict
+        Filtered local image
+
+    """
+    return _apply(image, lambda band: local_kernels.lee(band, KERNEL_SIZE))
+
+
+def gammamap(image, KERNEL_SIZE):
+    """
+    Gamma Maximum a-posterior Filter applied to one local image. It is implemented as described in
+    Lopes A., Nezry, E., Touzi, R., and Laur, H., 1990.
+    Maximum A Posteriori Speckle Filtering and First Order texture Models in SAR Images.
+    International  Geoscience  and  Remote  Sensing  Symposium (IGARSS).
+
+    Parameters
+    ----------
+    image : dict
+        Local image to be filtered
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+
+    Returns
+    -------
+    dict
+        Filtered local image
+
+    """
+    return _apply(image, lambda band: local_kernels.gammamap(band, KERNEL_SIZE))
+
+
+# Use a sample of the 3x3 windows inside a 7x7 windows to determine gradients and directions
+_SAMPLE_OFFSETS = [(dy, dx) for dy in (-2, 0, 2) for dx in (-2, 0, 2)]
+# Set up the 7*7 kernels for directional statistics
+_RECT_WEIGHTS = np.array([[0]*7]*3 + [[1]*7]*4)
+_DIAG_WEIGHTS = np.tril(np.ones((7, 7), int))
+
+
+def _refined_lee_band(img):
+    # img must be linear, i.e. not in dB!
+    mean3, variance3, _ = neighborhood_stats(img, 3)
+
+    # Calculate mean and variance for the sampled windows and store as 9 bands
+    sample_mean = np.stack([_shift(mean3, dy, dx) for dy, dx in _SAMPLE_OFFSETS])
+    sample_var = np.stack([_shift(variance3, dy, dx) for dy, dx in _SAMPLE_OFFSETS])
+
+    # Determine the 4 gradients for the sampled windows
+    gradients = np.stack([np.abs(sample_mean[1] - sample_mean[7]),
+                          np.abs(sample_mean[6] - sample_mean[2]),
+                          np.abs(sample_mean[3] - sample_mean[5]),
+                          np.abs(sample_mean[0] - sample_mean[8])])
+
+    # And find the maximum gradient amongst gradient bands
+    max_gradient = gradients.max(axis=0)
+    # Create a mask for band pixels that are the maximum gradient,
+    # each gradient represents 2 directions
+    gradmask = gradients == max_gradient
+    gradmask = np.concatenate([gradmask, gradmask])
+
+    # Determine the 8 directions
+    m4 = sample_mean[4]
+    directions = np.stack([(sample_mean[1] - m4 > m4 - sample_mean[7]) * 1,
+                           (sample_mean[6] - m4 > m4 - sample_mean[2]) * 2,
+                           (sample_mean[3] - m4 > m4 - sample_mean[5]) * 3,
+                           (sample_mean[0] - m4 > m4 - sample_mean[8]) * 4]).astype(np.float64)
+    # The next 4 are the not() of the previous 4
+    directions = np.concatenate([directions, (directions == 0) * np.arange(5, 9)[:, None, None]])
+
+    # "collapse" the stack into a singe band image (due to masking, each pixel has just one value (1-8)
+    # in it's directional band, and is otherwise masked)
+    directions = np.where(gradmask, directions, 0).sum(axis=0)
+    directions[~gradmask.any(axis=0)] = np.nan
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sample_stats = sample_var / (sample_mean * sample_mean)
+
+    #Calculate localNoiseVariance
+    sigmaV = np.sort(sample_stats, axis=0)[:5].mean(axis=0)
+    sigmaV[np.isnan(sample_stats).any(axis=0)] = np.nan
+
+    # Create stacks for mean and variance using the original kernels. Mask with relevant direction.
+    dir_mean = np.full(img.shape, np.nan)
+    dir_var = np.full(img.shape, np.nan)
+    for i in range(0, 4):
+        for k, weights in ((2*i+1, _RECT_WEIGHTS), (2*i+2, _DIAG_WEIGHTS)):
+            selected = directions == k
+            if not selected.any():
+                continue
+            # Kernel.rotate turns clockwise
+            mean, var = _kernel_stats(img, np.rot90(weights, -i))
+            dir_mean[selected] = mean[selected]
+            dir_var[selected] = var[selected]
+
+    # A finally generate the filtered value
+    with np.errstate(divide='ignore', invalid='ignore'):
+        varX = (dir_var - dir_mean * dir_mean * sigmaV) / (sigmaV + 1.0)
+        b = varX / dir_var
+    return dir_mean + b * (img - dir_mean)
+
+
+def RefinedLee(image):
+    """
+    This filter is modified from the implementation by Guido Lemoine
+    Source: Lemoine et al. https://code.earthengine.google.com/5d1ed0a0f0417f098fdfd2fa137c3d0c
+
+    Parameters
+    ----------
+    image: dict
+        Local image to be filtered
+
+    Returns
+    -------
+    result: dict
+        Filtered local image
+
+    """
+    return _apply(image, _refined_lee_band)
+
+
+def leesigma(image, KERNEL_SIZE):
+    """
+    Implements the improved lee sigma filter to one local image.
+    It is implemented as described in, Lee, J.-S. Wen, J.-H. Ainsworth, T.L. Chen, K.-S. Chen, A.J.
+    Improved sigma filter for speckle filtering of SAR imagery.
+    IEEE Trans. Geosci. Remote Sens. 2009, 47, 202–213.
+
+    Parameters
+    ----------
+    image : dict
+        Local image to be filtered
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+
+    Returns
+    -------
+    dict
+        Filtered local image
+
+    """
+    return _apply(image, lambda band: local_kernels.leesigma(band, KERNEL_SIZE))
+
+
+def _filter(image, KERNEL_SIZE, SPECKLE_FILTER):
+    if (SPECKLE_FILTER=='BOXCAR'):
+        return boxcar(image, KERNEL_SIZE)
+    elif (SPECKLE_FILTER=='LEE'):
+        return leefilter(image, KERNEL_SIZE)
+    elif (SPECKLE_FILTER=='GAMMA MAP'):
+        return gammamap(image, KERNEL_SIZE)
+    elif (SPECKLE_FILTER=='REFINED LEE'):
+        return RefinedLee(image)
+    elif (SPECKLE_FILTER=='LEE SIGMA'):
+        return leesigma(image, KERNEL_SIZE)
+    raise ValueError("ERROR!!! SPECKLE_FILTER not correctly defined")
+
+
+# filters of local_kernels, which accept a stack of co-registered bands
+_STACK_KERNELS = {'BOXCAR': local_kernels.boxcar,
+                  'LEE': local_kernels.lee,
+                  'GAMMA MAP': local_kernels.gammamap,
+                  'LEE SIGMA': local_kernels.leesigma}
+
+
+def filter_stack(stack, KERNEL_SIZE, SPECKLE_FILTER):
+    """
+    Filter every layer of a stack of co-registered bands.
+
+    The layers are filtered in groups of local_kernels.batch_layers, every group with
+    one pass of the tile kernels, and the result of every layer is identical to the
+    result of filtering the band alone.
+
+    Parameters
+    ----------
+    stack : numpy array
+        (time, band, rows, cols) or any (..., rows, cols) array, NaN where masked
+    KERNEL_SIZE : positive odd integer
+        Neighbourhood window size
+    SPECKLE_FILTER : String
+        'BOXCAR', 'LEE', 'GAMMA MAP' or 'LEE SIGMA'
+
+    Returns
+    -------
+    numpy array
+        The filtered stack, with the dtype of the input
+
+    """
+    kernel = _STACK_KERNELS.get(SPECKLE_FILTER)
+    if kernel is None:
+        raise ValueError("ERROR!!! SPECKLE_FILTER not correctly defined for a stack")
+    rows, cols = stack.shape[-2:]
+    layers = stack.reshape((-1, rows, cols))
+    out = np.empty(layers.shape, stack.dtype)
+    n = local_kernels.batch_layers((rows, cols))
+    for i in range(0, len(layers), n):
+        out[i:i + n] = kernel(_compute(layers[i:i + n]), KERNEL_SIZE)
+    return out.reshape(stack.shape)
+
+
+def _stackable(coll, SPECKLE_FILTER):
+    """Whether the collection gains from filter_stack: small co-registered scenes with the same bands."""
+    if SPECKLE_FILTER not in _STACK_KERNELS or len(coll) < 2:
+        return False
+    shape = local_helper.image_shape(coll[0])
+    names = local_helper.band_names(coll[0])
+    dtype = coll[0]['bands'][names[0]].dtype
+    if local_kernels.batch_layers(shape) < 2:
+        return False
+    return all(local_helper.image_shape(image) == shape and local_helper.band_names(image) == names
+               and all(image['bands'][name].dtype == dtype for name in names) for image in coll)
+
+
+#---------------------------------------------------------------------------//
+# 2. MONO-TEMPORAL SPECKLE FILTER (WRAPPER)
+#---------------------------------------------------------------------------//
+
+def MonoTemporal_Filter(coll, KERNEL_SIZE, SPECKLE_FILTER):
+    """
+    A wrapper function for monotemporal filter
+
+    Co-registered scenes smaller than a tile of local_kernels (small scenes, or the
+    tiles of local_wrapper) are stacked and filtered together with filter_stack.
+
+    Parameters
+    ----------
+    coll : list
+        the local image collection to be filtered
+    KERNEL_SIZE : odd integer
+        Spatial Neighbourhood window
+    SPECKLE_FILTER : String
+        Type of speckle filter
+
+    Returns
+    -------
+    list
+        A local image collection where a mono-temporal filter is applied to each
+        image individually
+
+    """
+    if not _stackable(coll, SPECKLE_FILTER):
+        return [_filter(image, KERNEL_SIZE, SPECKLE_FILTER) for image in coll]
+    names = local_helper.band_names(coll[0])
+    n = max(1, local_kernels.batch_layers(local_helper.image_shape(coll[0])) // len(names))
+    output = []
+    for i in range(0, len(coll), n):
+        chunk = coll[i:i + n]
+        stack = np.stack([[image['bands'][name] for name in names] for image in chunk])
+        filtered = filter_stack(stack, KERNEL_SIZE, SPECKLE_FILTER)
+        for image, layers in zip(chunk, filtered):
+            output.append(local_helper.add_bands(image, dict(zip(names, layers))))
+    return output
+
+
+def MonoTemporal_Variants(coll, variants):
+    """
+    Apply several speckle filters and kernel sizes to every image of a collection.
+
+    The boxcar, Lee, Gamma MAP and Lee sigma variants of a band are computed in one
+    pass of local_kernels.filter_variants, which derives the local statistics of all
+    kernel sizes from the same summed-area tables; the refined Lee filter, which has a
+    fixed window, is computed once for all its kernel sizes.
+
+    Parameters
+    ----------
+    coll : list
+        the local image collection to be filtered
+    variants : list
+        (SPECKLE_FILTER, KERNEL_SIZE) pairs
+
+    Returns
+    -------
+    dict
+        (SPECKLE_FILTER, KERNEL_SIZE) -> local image collection filtered as by
+        MonoTemporal_Filter
+
+    """
+    variants = list(dict.fromkeys(variants))
+    for SPECKLE_FILTER, _ in variants:
+        if SPECKLE_FILTER not in _STACK_KERNELS and SPECKLE_FILTER != 'REFINED LEE':
+            raise ValueError("ERROR!!! SPECKLE_FILTER not correctly defined")
+    kernels = [variant for variant in variants if variant[0] in _STACK_KERNELS]
+    output = {variant: [] for variant in variants}
+    for image in coll:
+        bands = {variant: {} for variant in kernels}
+        for name in local_helper.band_names(image):
+            band = image['bands'][name]
+            for variant, out in local_kernels.filter_variants(_compute(band), kernels).items():
+                bands[variant][name] = out.astype(band.dtype, copy=False)
+        for variant in kernels:
+            output[variant].append(local_helper.add_bands(image, bands[variant]))
+        refined = None
+        for variant in variants:
+            if variant[0] == 'REFINED LEE':
+                refined = refined or RefinedLee(image)
+                output[variant].append(refined)
+    return output
+
+
+# ---------------------------------------------------------------------------//
+# 3. MULTI-TEMPORAL SPECKLE FILTER
+# ---------------------------------------------------------------------------//
+
+def _date(image):
+    millis = image['properties']['system:time_start']
+    return datetime.datetime.fromtimestamp(millis / 1000.0, datetime.timezone.utc).date()
+
+
+def _same_track(image, other):
+    props, other_props = image['properties'], other['properties']
+    if 'relativeOrbitNumber_stop' not in other_props:
+        return True
+    return other_props['relativeOrbitNumber_stop'] in (props.get('relativeOrbitNumber_stop'),
+                                                       props.get('relativeOrbitNumber_start'))
+
+
+def temporal_neighbours(coll, index, NR_OF_IMAGES):
+    """
+    Select the images used to filter coll[index] in the multi-temporal framework,
+    following get_filtered_collection of speckle_filter.MultiTemporal_Filter:
+    the acquisition dates of the same relative orbit up to and including the
+    image date, most recent first; if there are not enough, dates after the
+    image are added and the earliest NR_OF_IMAGES dates are kept.
+
+    The local collection is assumed to be co-registered, so every acquisition
+    fully overlaps the image.
+
+    Parameters
+    ----------
+    coll : list
+        Local image collection with 'system:time_start' properties
+    index : integer
+        Index of the image to filter
+    NR_OF_IMAGES : positive integer
+        Number of acquisition dates to use
+
+    Returns
+    -------
+    list
+        Indices into coll of the images acquired on the selected dates
+
+    """
+    image = coll[index]
+    day = _date(image)
+    track = [i for i, other in enumerate(coll) if _same_track(image, other)]
+    dates = sorted({_date(coll[i]) for i in track})
+
+    dates_before = [d for d in reversed(dates) if d <= day]
+    if len(dates_before) >= NR_OF_IMAGES:
+        selected = dates_before[:NR_OF_IMAGES]
+    else:
+        dates_after = [d for d in dates if d >= day][:5*NR_OF_IMAGES]
+        selected = sorted(set(dates_after) | set(dates_before))[:NR_OF_IMAGES]
+    selected = set(selected)
+    return [i for i in track if _date(coll[i]) in selected]
+
+
+def ratio_record(image, filtered):
+    """
+    Ratio of an image to its spatially filtered image, as used by the multi-temporal
+    filter: NaN where the input is masked and 0 where the input is valid but the ratio
+    is not, so that the record gives both the sum of the ratios and the count of the
+    valid inputs.
+    """
+    ratios = {}
+    for name in local_helper.band_names(image):
+        band = image['bands'][name]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = (_compute(band) / filtered['bands'][name]).astype(band.dtype, copy=False)
+        ratio[np.isnan(ratio)] = 0
+        ratio[np.isnan(band)] = np.nan
+        ratios[name] = ratio
+    return ratios
+
+
+def MultiTemporal_Filter(coll, KERNEL_SIZE, SPECKLE_FILTER, NR_OF_IMAGES, history=None, ratio_sink=None,
+                         filtered=None):
+    """
+    A wrapper function for multi-temporal filter
+
+    Every image of the collection is spatially filtered once and its ratio to the
+    filtered image is reused for all images it is a temporal neighbour of.
+
+    Parameters
+    ----------
+    coll : list
+        the local image collection to be filtered
+    KERNEL_SIZE : odd integer
+        Spatial Neighbourhood window
+    SPECKLE_FILTER : String
+        Type of speckle filter
+    NR_OF_IMAGES : positive integer
+        Number of images to use in multi-temporal filtering
+    history : list, optional
+        Ratio records of earlier acquisitions that are not in coll, on the same
+        pixel grid: {'properties': dict, 'load': function returning the ratios}
+        (see local_store.Store.history). They are candidate temporal neighbours
+        and are loaded only when selected.
+    ratio_sink : function, optional
+        Called as ratio_sink(image, ratios) with the ratio record of every image
+        of coll, to store it for later runs
+    filtered : list, optional
+        The images of coll already filtered with MonoTemporal_Filter (or
+        MonoTemporal_Variants), which are then not filtered again
+
+    Returns
+    -------
+    list
+        A local image collection where a multi-temporal filter is applied to each
+        image individually
+
+    """
+    history = history or []
+    if filtered is None:
+        filtered = MonoTemporal_Filter(coll, KERNEL_SIZE, SPECKLE_FILTER)
+    ratios = [ratio_record(image, _filtered) for image, _filtered in zip(coll, filtered)]
+    if ratio_sink is not None:
+        for image, ratio in zip(coll, ratios):
+            ratio_sink(image, ratio)
+
+    # the candidate neighbours are the images of coll followed by the history
+    candidates = list(coll) + list(history)
+    loaded = {}
+
+    def ratio_of(i):
+        if i < len(coll):
+            return ratios[i]
+        if i not in loaded:
+            loaded[i] = history[i - len(coll)]['load']()
+        return loaded[i]
+
+    output = []
+    for index, image in enumerate(coll):
+        neighbours = temporal_neighbours(candidates, index, NR_OF_IMAGES)
+        bands = {}
+        for name in local_helper.band_names(image):
+            isum = np.zeros(image['bands'][name].shape, np.float64)
+            count_img = np.zeros(image['bands'][name].shape, np.float64)
+            for i in neighbours:
+                ratio = ratio_of(i)[name]
+                valid = ~np.isnan(ratio)
+                isum += np.where(valid, ratio, 0)
+                count_img += valid
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out = filtered[index]['bands'][name] / count_img * isum
+            bands[name] = out.astype(image['bands'][name].dtype)
+        output.append(local_helper.add_bands(image, bands))
+    return output
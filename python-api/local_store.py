@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: On-disk store of the incremental mode of the local backend (INCREMENTAL_STORE).
+
+    <path>/outputs/<output hash>/<scene id>.npz
+        processed scenes, written with local_helper.save
+    <path>/ratios/<ratio hash>/<scene id>/<band>.npy
+        ratio of the scene to its spatially filtered image, the intermediate of the
+        multi-temporal filter; NaN where the input is masked and 0 where the input is
+        valid but the ratio is not, so that one array gives both the sum and the count
+    <path>/ratios/<ratio hash>/<scene id>/properties.json
+        properties of the scene, written last: a record without it is incomplete
+
+    The hashes are parameters.param_hash of the run parameters (OUTPUT_KEYS and RATIO_KEYS).
+    The ratio arrays are memory mapped, so that the tiles of a run read and write their
+    window only.
+"""
+
+import json
+import os
+
+import numpy as np
+
+import local_helper
+
+PROPERTIES = 'properties.json'
+
+
+class Store(object):
+    """
+    Store of processed scenes and multi-temporal ratios.
+
+    Parameters
+    ----------
+    path : string
+        Root directory, created if needed
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _dir(self, *parts):
+        return os.path.join(self.path, *parts)
+
+    # -----------------------------------------------------------------------//
+    # Processed scenes
+    # -----------------------------------------------------------------------//
+
+    def output_ids(self, key):
+        """Ids of the scenes stored under an output hash."""
+        folder = self._dir('outputs', key)
+        if not os.path.isdir(folder):
+            return set()
+        return {name[:-len('.npz')] for name in os.listdir(folder) if name.endswith('.npz')}
+
+    def save_output(self, key, image):
+        folder = self._dir('outputs', key)
+        os.makedirs(folder, exist_ok=True)
+        scene_id = image['properties']['system:index']
+        # write and rename, an interrupted run leaves no partial scene behind
+        tmp = os.path.join(folder, scene_id + '.tmp.npz')
+        local_helper.save(image, tmp)
+        os.replace(tmp, os.path.join(folder, scene_id + '.npz'))
+
+    def load_output(self, key, scene_id, DECODE=False):
+        return local_helper.load(self._dir('outputs', key, scene_id + '.npz'), DECODE)
+
+    # -----------------------------------------------------------------------//
+    # Multi-temporal ratios
+    # -----------------------------------------------------------------------//
+
+    def create_ratios(self, key, properties, names, shape, dtype):
+        """Allocate the ratio arrays of a scene, to be filled window by window with write_ratios."""
+        folder = self._dir('ratios', key, properties['system:index'])
+        os.makedirs(folder, exist_ok=True)
+        if os.path.exists(os.path.join(folder, PROPERTIES)):
+            os.remove(os.path.join(folder, PROPERTIES))
+        for name in names:
+            np.lib.format.open_memmap(os.path.join(folder, name + '.npy'), mode='w+',
+                                      dtype=dtype, shape=shape).flush()
+
+    def write_ratios(self, key, scene_id, ratios, window=None):
+        """Write ratio arrays (band name -> array) to a window (row slice, col slice) of a scene."""
+        folder = self._dir('ratios', key, scene_id)
+        for name, ratio in ratios.items():
+            array = np.load(os.path.join(folder, name + '.npy'), mmap_mode='r+')
+            array[window if window is not None else Ellipsis] = ratio
+            array.flush()
+            del array
+
+    def commit_ratios(self, key, properties):
+        """Mark the ratios of a scene as complete."""
+        path = self._dir('ratios', key, properties['system:index'], PROPERTIES)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(properties, f, default=float)
+        os.replace(path + '.tmp', path)
+
+    def save_ratios(self, key, properties, ratios):
+        """Store the full ratio arrays of a scene."""
+        first = next(iter(ratios.values()))
+        self.create_ratios(key, properties, list(ratios), first.shape, first.dtype)
+        self.write_ratios(key, properties['system:index'], ratios)
+        self.commit_ratios(key, properties)
+
+    def history(self, key, exclude=()):
+        """
+        Stored ratio records, the history of the multi-temporal filter.
+
+        Parameters
+        ----------
+        key : string
+            Ratio hash
+        exclude : iterable
+            Scene ids to leave out, the scenes recomputed by the run
+
+        Returns
+        -------
+        list
+            Records {'properties': dict, 'load': function}; load(window=None) returns
+            the ratio arrays (band name -> array) of a window of the scene
+
+        """
+        folder = self._dir('ratios', key)
+        if not os.path.isdir(folder):
+            return []
+        exclude = set(exclude)
+        records = []
+        for scene_id in sorted(os.listdir(folder)):
+            path = os.path.join(folder, scene_id, PROPERTIES)
+            if scene_id in exclude or not os.path.exists(path):
+                continue
+            with open(path) as f:
+                properties = json.load(f)
+            records.append({'properties': properties,
+                            'load': _loader(os.path.join(folder, scene_id))})
+        return records
+
+
+def _loader(folder):
+    def load(window=None):
+        ratios = {}
+        for name in os.listdir(folder):
+            if name.endswith('.npy'):
+                array = np.load(os.path.join(folder, name), mmap_mode='r')
+                ratios[name[:-len('.npy')]] = np.array(array[window if window is not None else Ellipsis])
+        return ratios
+    return load
+
+
+def window_record(record, window):
+    """A history record restricted to a window (row slice, col slice) of the scene."""
+    return {'properties': record['properties'], 'load': lambda: record['load'](window)}
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Parameter sweep of the speckle filter settings with the local backend.
+
+    sweep processes a collection with a grid of (SPECKLE_FILTER, SPECKLE_FILTER_KERNEL_SIZE,
+    SPECKLE_FILTER_FRAMEWORK) settings and computes what the variants have in common once:
+    the data selection and the border noise correction, the local statistics of all kernel
+    sizes (one summed-area table per moment serves every kernel size, and the mean and
+    variance are shared by the boxcar, Lee and Gamma MAP filters, see
+    local_kernels.filter_variants), the mono-temporal results that the MULTI variants start
+    from, and the slope correction factor of the terrain flattening, which does not depend
+    on the backscatter. The outputs equal those of local_wrapper.run with the same settings
+    up to the rounding of the neighbourhood sums.
+
+    The report has one row per variant with the seconds of its own stages, the bias of the
+    filtered backscatter against the input and, given the noise free reflectivity (synthetic
+    scenes), the ENL and the edge preservation of benchmark.py.
+"""
+
+import time
+
+import numpy as np
+
+import benchmark
+import local_helper
+import local_precision
+import local_speckle_filter as lsf
+import local_terrain_flattening as ltf
+import local_wrapper
+
+# ---------------------------------------------------------------------------//
+# Grid
+# ---------------------------------------------------------------------------//
+
+def variant_params(params, variant):
+    """
+    Parameters of one variant of the grid, checked with local_wrapper.check_params.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by local_wrapper.s1_preproc
+    variant : tuple
+        (SPECKLE_FILTER, SPECKLE_FILTER_KERNEL_SIZE, SPECKLE_FILTER_FRAMEWORK)
+
+    Returns
+    -------
+    Dictionary
+
+    """
+    SPECKLE_FILTER, KERNEL_SIZE, FRAMEWORK = variant
+    return local_wrapper.check_params(dict(params, APPLY_SPECKLE_FILTERING=True, SPECKLE_FILTER=SPECKLE_FILTER,
+                                           SPECKLE_FILTER_KERNEL_SIZE=KERNEL_SIZE,
+                                           SPECKLE_FILTER_FRAMEWORK=FRAMEWORK))
+
+
+def _bias_db(filtered, reference):
+    total, count = 0.0, 0.0
+    for image, ref in zip(filtered, reference):
+        for name in local_helper.band_names(image):
+            a = image['bands'][name].astype(np.float64)
+            b = ref['bands'][name].astype(np.float64)
+            valid = np.isfinite(a) & np.isfinite(b)
+            total += a[valid].sum() / max(b[valid].sum(), np.finfo(np.float64).tiny)
+            count += 1
+    return float(10 * np.log10(total / count)) if count else float('nan')
+
+
+def _quality(filtered, reference, truth):
+    row = {'bias_db': _bias_db(filtered, reference)}
+    if truth is not None:
+        reflectivity, points = truth
+        enl, edge = [], []
+        for image in filtered:
+            for name in local_helper.band_names(image):
+                if name in reflectivity:
+                    band = image['bands'][name].astype(np.float64)
+                    enl.append(benchmark.enl(band, reflectivity[name], points))
+                    edge.append(benchmark.edge_preservation(band, reflectivity[name], points))
+        row['enl'] = float(np.nanmean(enl)) if enl else float('nan')
+        row['edge_preservation'] = float(np.nanmean(edge)) if edge else float('nan')
+    return row
+
+
+# ---------------------------------------------------------------------------//
+# Sweep
+# ---------------------------------------------------------------------------//
+
+def _factors(params, s1):
+    """The slope correction factor of every image, as a local image with a single 'factor' band."""
+    ones = []
+    for image in s1:
+        # the factor is multiplied with ones in float64, so it is kept exactly
+        bands = {'factor': np.ones(local_helper.image_shape(image), np.float64), 'angle': image['bands']['angle']}
+        ones.append(local_helper.make_image(bands, image['properties']))
+    factors = ltf.slope_correction(ones, params['TERRAIN_FLATTENING_MODEL'], params['DEM'],
+                                   params['TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER'])
+    return [factor['bands']['factor'] for factor in factors]
+
+
+def _flatten(s1, factors):
+    output = []
+    for image, factor in zip(s1, factors):
+        bands = {}
+        for name in local_helper.band_names(image):
+            band = image['bands'][name]
+            bands[name] = np.empty_like(band)
+            np.multiply(band, factor, out=bands[name], casting='unsafe')
+        output.append(local_helper.add_bands(image, bands))
+    return output
+
+
+def _output(params, s1):
+    if (params['FORMAT'] == 'DB'):
+        s1 = [local_helper.lin_to_db(image) for image in s1]
+    if (params['OUTPUT_ENCODING'] == 'QUANTIZED'):
+        s1 = [local_helper.quantize(image) for image in s1]
+    return s1
+
+
+def sweep(params, collection, GRID, truth=None):
+    """
+    Process a collection with every speckle filter setting of a grid.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by local_wrapper.s1_preproc; the speckle filter settings
+        are taken from GRID. MEMORY_BUDGET_MB, WORKERS, INCREMENTAL_STORE and
+        PREVIEW_FACTOR are ignored, the whole scenes are processed.
+    collection : list
+        Local image collection
+    GRID : list
+        (SPECKLE_FILTER, SPECKLE_FILTER_KERNEL_SIZE, SPECKLE_FILTER_FRAMEWORK) tuples
+    truth : tuple, optional
+        (dict band name -> noise free reflectivity, boolean array of the point
+        scatterers) of co-registered synthetic scenes (see synthetic.py), to report
+        the ENL and the edge preservation
+
+    Raises
+    ------
+    ValueError
+        If a setting of the grid is not correctly defined
+
+    Returns
+    -------
+    dict
+        'outputs': variant -> processed local image collection; 'table': one row per
+        variant ('variant', 'seconds', 'bias_db' and, with truth, 'enl' and
+        'edge_preservation'); 'shared_seconds': seconds of the shared stages;
+        'seconds': of the whole sweep
+
+    """
+    GRID = list(dict.fromkeys(tuple(variant) for variant in GRID))
+    if not GRID:
+        raise ValueError("ERROR!!! GRID must contain at least one setting")
+    checked = {variant: variant_params(params, variant) for variant in GRID}
+    params = checked[GRID[0]]
+    t_start = time.perf_counter()
+    shared = {}
+
+    # 1. selection and border noise correction, once for all variants
+    t0 = time.perf_counter()
+    base = dict(params, APPLY_SPECKLE_FILTERING=False, APPLY_TERRAIN_FLATTENING=False,
+                FORMAT='LINEAR', OUTPUT_ENCODING='FLOAT')
+    s1 = local_precision.cast(local_wrapper.select(collection, params['START_DATE'], params['STOP_DATE'],
+                                                   params['POLARIZATION'], params['ORBIT'],
+                                                   params['EXCLUDE_SCENES']),
+                              params['PRECISION'])
+    for stage, s1 in local_wrapper.preproc_stages(base, s1):
+        pass
+    shared['preprocessing'] = time.perf_counter() - t0
+
+    # 2. the spatial filters of all kernel sizes from shared statistics
+    t0 = time.perf_counter()
+    mono = lsf.MonoTemporal_Variants(s1, [(F, K) for F, K, _ in GRID])
+    shared['spatial_filters'] = time.perf_counter() - t0
+
+    # 3. the slope correction factors, once per image
+    factors = None
+    if (params['APPLY_TERRAIN_FLATTENING']):
+        t0 = time.perf_counter()
+        factors = _factors(params, s1)
+        shared['terrain_factors'] = time.perf_counter() - t0
+    print('Shared stages of {} variant(s) in {:.2f} s'.format(len(GRID), sum(shared.values())))
+
+    outputs, table = {}, []
+    for variant in GRID:
+        SPECKLE_FILTER, KERNEL_SIZE, FRAMEWORK = variant
+        t0 = time.perf_counter()
+        filtered = mono[(SPECKLE_FILTER, KERNEL_SIZE)]
+        if (FRAMEWORK == 'MULTI'):
+            filtered = lsf.MultiTemporal_Filter(s1, KERNEL_SIZE, SPECKLE_FILTER,
+                                                checked[variant]['SPECKLE_FILTER_NR_OF_IMAGES'],
+                                                filtered=filtered)
+        output = _flatten(filtered, factors) if factors is not None else filtered
+        outputs[variant] = _output(params, output)
+        row = {'variant': variant, 'seconds': time.perf_counter() - t0}
+        row.update(_quality(filtered, s1, truth))
+        table.append(row)
+        print('{} {} {}: {:.2f} s, bias {:+.3f} dB{}'.format(
+            FRAMEWORK, SPECKLE_FILTER, KERNEL_SIZE, row['seconds'], row['bias_db'],
+            ', ENL {:.1f}, edge preservation {:.2f}'.format(row['enl'], row['edge_preservation'])
+            if truth is not None else ''))
+    return {'outputs': outputs, 'table': table, 'shared_seconds': shared,
+            'seconds': time.perf_counter() - t_start}
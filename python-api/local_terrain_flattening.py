@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: NumPy implementation of the angular-based radiometric slope correction of
+             terrain_flattening.py for local execution, adopted from
+             Vollrath, A., Mullissa, A., & Reiche, J. (2020).
+             Angular-Based Radiometric Slope Correction for Sentinel-1 on Google Earth Engine.
+             Remote Sensing, 12(11), [1867]. https://doi.org/10.3390/rs12111867
+
+    The tan/cos/atan chain of the Earth Engine version is rewritten in terms of the DEM
+    gradient, t = tan(alpha_r), u = tan(alpha_az) and T = tan(theta_i):
+        tan(alpha_r)  = -cos(phi_i) dz/dnorth + sin(phi_i) dz/deast
+        tan(alpha_az) = -sin(phi_i) dz/dnorth - cos(phi_i) dz/deast
+        volume model:  SCF = T (1 + T t) / (T - t)
+        direct model:  SCF = T sqrt((1 + t^2)(1 + u^2)) / (T - t)
+        layover:       alpha_r < theta_i        <=>  t < T
+        shadow:        alpha_r > -(90 - theta_i) <=>  t > -1/T
+    so that no trigonometric function is evaluated per pixel apart from tan(theta_i).
+    Optionally the SCF is read from a precomputed (theta_i, tan(alpha_r)) lookup table with
+    bilinear interpolation; its maximum relative error is given by lut_max_error (about 0.5 %
+    with the default grid).
+"""
+
+import math
+
+import numpy as np
+
+import local_helper
+import scheduling
+from local_mask import PackedMask
+
+# rows processed at once
+BLOCK_ROWS = 256
+
+# ---------------------------------------------------------------------------//
+# Terrain geometry
+# ---------------------------------------------------------------------------//
+
+def pixel_size(image):
+    """Return the (x, y) pixel size in meters of a local image, 10 m by default."""
+    transform = image['properties'].get('transform')
+    if transform is None:
+        return 10.0, 10.0
+    return abs(transform[1]), abs(transform[5])
+
+
+def gradient(z, spacing=(10.0, 10.0)):
+    """
+    Gradient of a raster from the 4-connected neighbours of each pixel, like
+    ee.Terrain.slope and ee.Terrain.aspect. Edge pixels use one sided differences.
+
+    Parameters
+    ----------
+    z : numpy array
+        Elevation (or any smooth raster), rows run from north to south
+    spacing : tuple
+        (x, y) pixel size in meters
+
+    Returns
+    -------
+    tuple
+        (dz/deast, dz/dnorth) as float64 arrays
+
+    """
+    z = z.astype(np.float64)
+    dx, dy = spacing
+    d_east = np.gradient(z, dx, axis=1)
+    # rows increase towards the south
+    d_north = -np.gradient(z, dy, axis=0)
+    return d_east, d_north
+
+
+def slope_aspect(dem, spacing=(10.0, 10.0)):
+    """
+    Slope and aspect in degrees, the equivalent of ee.Terrain.slope and ee.Terrain.aspect.
+
+    Parameters
+    ----------
+    dem : numpy array
+        Elevation in meters
+    spacing : tuple
+        (x, y) pixel size in meters
+
+    Returns
+    -------
+    tuple
+        (slope, aspect) where aspect is measured clockwise from north in [0, 360)
+
+    """
+    d_east, d_north = gradient(dem, spacing)
+    slope = np.degrees(np.arctan(np.hypot(d_east, d_north)))
+    # the slope faces downhill
+    aspect = np.degrees(np.arctan2(-d_east, -d_north)) % 360
+    return slope, aspect
+
+
+def heading(angle, spacing=(10.0, 10.0)):
+    """
+    Look direction of the scene from the aspect of the incidence angle band,
+    as in terrain_flattening.slope_correction.
+
+    Parameters
+    ----------
+    angle : numpy array
+        Incidence angle in degrees
+    spacing : tuple
+        (x, y) pixel size in meters
+
+    Returns
+    -------
+    float
+        The heading in degrees in (-180, 180]
+
+    """
+    _, aspect = slope_aspect(angle, spacing)
+    value = np.nanmean(aspect) if np.isfinite(aspect).any() else 0.0
+    #in case of null values for heading replace with 0
+    if not np.isfinite(value):
+        value = 0.0
+    return value - 360 if value > 180 else value
+
+
+# ---------------------------------------------------------------------------//
+# Slope correction factor
+# ---------------------------------------------------------------------------//
+
+def scf_exact(T, t, u, TERRAIN_FLATTENING_MODEL):
+    """
+    Slope correction factor from T = tan(theta_i), t = tan(alpha_r) and u = tan(alpha_az).
+
+    Parameters
+    ----------
+    T, t, u : numpy arrays
+        Tangents of the incidence angle and of the slope in range and azimuth
+    TERRAIN_FLATTENING_MODEL : string
+        'VOLUME' or 'DIRECT'
+
+    Returns
+    -------
+    numpy array
+        The slope correction factor
+
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if TERRAIN_FLATTENING_MODEL == 'VOLUME':
+            # tan(90 - theta + alpha_r) / tan(90 - theta)
+            return T * (1 + T * t) / (T - t)
+        # cos(90 - theta) / (cos(alpha_az) cos(90 - theta + alpha_r))
+        return T * np.sqrt((1 + t * t) * (1 + u * u)) / (T - t)
+
+
+def build_scf_lut(TERRAIN_FLATTENING_MODEL, theta_range=(29.0, 47.0), theta_step=0.1,
+                  t_range=(-2.0, 1.0), t_step=0.002, margin=1.0):
+    """
+    Precompute the slope correction factor on a regular (theta_i, tan(alpha_r)) grid.
+
+    For the direct model the table holds the factor without the azimuth term
+    sqrt(1 + u^2), which is applied per pixel. Close to the layover and shadow
+    limits the factor is singular; cells closer than margin degrees are left
+    empty (NaN) and those pixels are evaluated with the closed form.
+
+    Parameters
+    ----------
+    TERRAIN_FLATTENING_MODEL : string
+        'VOLUME' or 'DIRECT'
+    theta_range : tuple
+        Incidence angles in degrees covered by the table
+    theta_step : float
+        Grid step of the incidence angle in degrees
+    t_range : tuple
+        Range of tan(alpha_r) covered by the table
+    t_step : float
+        Grid step of tan(alpha_r)
+    margin : float
+        Distance in degrees of alpha_r from the layover/shadow limits below
+        which the table is not used
+
+    Returns
+    -------
+    dict
+        The table and its grid
+
+    """
+    theta = np.arange(theta_range[0], theta_range[1] + theta_step / 2, theta_step)
+    t = np.arange(t_range[0], t_range[1] + t_step / 2, t_step)
+    T = np.tan(np.radians(theta))[:, None]
+    table = scf_exact(T, t[None, :], np.zeros(1), TERRAIN_FLATTENING_MODEL)
+    alpha_r = np.degrees(np.arctan(t))[None, :]
+    table[(alpha_r >= theta[:, None] - margin) | (alpha_r <= theta[:, None] - 90 + margin)] = np.nan
+    return {'model': TERRAIN_FLATTENING_MODEL, 'margin': margin,
+            'theta0': theta[0], 'theta_step': theta_step, 'n_theta': len(theta),
+            't0': t[0], 't_step': t_step, 'n_t': len(t),
+            'table': table}
+
+
+def scf_from_lut(lut, theta, t):
+    """
+    Bilinear interpolation of the slope correction factor table.
+
+    Parameters
+    ----------
+    lut : dict
+        As returned by build_scf_lut
+    theta : numpy array
+        Incidence angle in degrees
+    t : numpy array
+        tan(alpha_r)
+
+    Returns
+    -------
+    numpy array
+        The interpolated factor, NaN outside of the table or where a corner of
+        the cell lies in layover or shadow
+
+    """
+    fi = (theta - lut['theta0']) / lut['theta_step']
+    fj = (t - lut['t0']) / lut['t_step']
+    inside = (fi >= 0) & (fi <= lut['n_theta'] - 1) & (fj >= 0) & (fj <= lut['n_t'] - 1)
+    fi = np.where(inside, fi, 0)
+    fj = np.where(inside, fj, 0)
+    i = np.minimum(fi.astype(np.intp), lut['n_theta'] - 2)
+    j = np.minimum(fj.astype(np.intp), lut['n_t'] - 2)
+    wi = fi - i
+    wj = fj - j
+    table = lut['table']
+    out = (table[i, j] * (1 - wi) * (1 - wj) + table[i + 1, j] * wi * (1 - wj)
+           + table[i, j + 1] * (1 - wi) * wj + table[i + 1, j + 1] * wi * wj)
+    out[~inside] = np.nan
+    return out
+
+
+def lut_max_error(lut):
+    """
+    Maximum relative error of the lookup table, evaluated at the cell centres
+    where bilinear interpolation is least accurate. Pixels outside of the
+    table are evaluated with the closed form and have no table error.
+
+    Parameters
+    ----------
+    lut : dict
+        As returned by build_scf_lut
+
+    Returns
+    -------
+    float
+        The maximum relative error
+
+    """
+    theta = lut['theta0'] + (np.arange(lut['n_theta'] - 1) + 0.5) * lut['theta_step']
+    t = lut['t0'] + (np.arange(lut['n_t'] - 1) + 0.5) * lut['t_step']
+    theta, t = np.meshgrid(theta, t, indexing='ij')
+    exact = scf_exact(np.tan(np.radians(theta)), t, np.zeros(1), lut['model'])
+    approx = scf_from_lut(lut, theta, t)
+    return float(np.nanmax(np.abs(approx - exact) / np.abs(exact)))
+
+
+# ---------------------------------------------------------------------------//
+# Layover / shadow mask
+# ---------------------------------------------------------------------------//
+
+def layover_shadow_mask(T, t, buffer=0, spacing=(10.0, 10.0)):
+    """
+    Passive layover and shadow mask, see _masking in terrain_flattening.
+
+    Parameters
+    ----------
+    T : numpy array
+        tan(theta_i)
+    t : numpy array
+        tan(alpha_r)
+    buffer : float
+        Additional buffer in meters
+    spacing : tuple
+        (x, y) pixel size in meters
+
+    Returns
+    -------
+    numpy array
+        Boolean no_data_mask, True where the pixel is valid
+
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # layover, where slope > radar viewing angle; shadow
+        mask = (t < T) & (t > -1 / T)
+    # add buffer to final mask
+    if (buffer > 0):
+        mask = PackedMask.from_bool(mask).erode(buffer / spacing[0]).to_bool()
+    return mask
+
+
+# ---------------------------------------------------------------------------//
+# Terrain Flattening
+# ---------------------------------------------------------------------------//
+
+def _grid(image):
+    return (tuple(image['properties'].get('transform') or ()), local_helper.image_shape(image))
+
+
+def _geometry(slopes, phi_i):
+    """tan(alpha_r) and tan(alpha_az) from the DEM gradient and the heading phi_i (radians)."""
+    cos_phi_i, sin_phi_i = math.cos(phi_i), math.sin(phi_i)
+    d_east, d_north = slopes
+
+    # 2.1.3 Model geometry: slope steepness in range (eq. 2) and azimuth (eq. 3)
+    t = -cos_phi_i * d_north + sin_phi_i * d_east
+    u = -sin_phi_i * d_north - cos_phi_i * d_east
+    return t, u
+
+
+def _correct(image, dem, TERRAIN_FLATTENING_MODEL, buffer, lut, cache=None):
+    bands = local_helper.band_names(image)
+    spacing = pixel_size(image)
+    rows, cols = local_helper.image_shape(image)
+
+    # 2.1.1 Radar geometry, from a subsample of the smooth angle band
+    if 'heading' in image['properties']:
+        phi_i = math.radians(image['properties']['heading'])
+    else:
+        step = getattr(image['bands']['angle'], 'step', 1)
+        sample = local_helper.angle(image, slice(None, None, step), slice(None, None, step))
+        phi_i = math.radians(heading(sample, (spacing[0] * step, spacing[1] * step)))
+
+    # 2.1.2 Terrain geometry
+    if cache is None:
+        t, u = _geometry(gradient(dem, spacing), phi_i)
+    else:
+        # the DEM gradient of the footprint of a track and its geometry seen from the heading
+        key, grid = scheduling.track(image['properties']), _grid(image)
+        t, u = cache.get(key, ('geometry', grid, phi_i), lambda: _geometry(
+            cache.get(key, ('gradient', grid), lambda: gradient(dem, spacing)), phi_i))
+
+    # the incidence angle is interpolated block by block
+    def tan_theta(block):
+        return np.tan(np.radians(local_helper.angle(image, block), dtype=np.float64))
+
+    # the no_data_mask is kept bit-packed
+    mask = PackedMask.full((rows, cols), False)
+    for r0 in range(0, rows, BLOCK_ROWS):
+        block = slice(r0, min(r0 + BLOCK_ROWS, rows))
+        mask[block] = layover_shadow_mask(tan_theta(block), t[block], 0, spacing)
+    # add buffer to final mask
+    if (buffer > 0):
+        mask = mask.erode(buffer / spacing[0])
+
+    out = {name: np.empty_like(image['bands'][name]) for name in bands}
+    for r0 in range(0, rows, BLOCK_ROWS):
+        block = slice(r0, min(r0 + BLOCK_ROWS, rows))
+        Tb = tan_theta(block)
+        if lut is None:
+            factor = scf_exact(Tb, t[block], u[block], TERRAIN_FLATTENING_MODEL)
+        else:
+            factor = scf_from_lut(lut, local_helper.angle(image, block), t[block])
+            if TERRAIN_FLATTENING_MODEL == 'DIRECT':
+                factor *= np.sqrt(1 + u[block] * u[block])
+            # outside of the table or close to the layover/shadow limits
+            missing = np.isnan(factor)
+            if missing.any():
+                factor[missing] = scf_exact(Tb[missing], t[block][missing], u[block][missing],
+                                            TERRAIN_FLATTENING_MODEL)
+        # 2.2 Gamma_nought = sigma0 / cos(theta_i), 1 / cos = sqrt(1 + tan^2)
+        factor *= np.sqrt(1 + Tb * Tb)
+        factor[~mask.to_bool(block)] = np.nan
+        for name in bands:
+            np.multiply(image['bands'][name][block], factor, out=out[name][block], casting='unsafe')
+    return local_helper.add_bands(image, out)
+
+
+def slope_correction(collection, TERRAIN_FLATTENING_MODEL, DEM,
+                     TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER, use_lut=False, cache=None):
+    """
+    Radiometric terrain normalization of a local image collection.
+
+    Parameters
+    ----------
+    collection : list
+        Local image collection
+    TERRAIN_FLATTENING_MODEL : string
+        The radiometric terrain normalization model, either volume or direct
+    DEM : numpy array or callable
+        The DEM on the pixel grid of the images, or a function returning the
+        DEM for a given local image
+    TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER : integer
+        The additional buffer to account for the passive layover and shadow
+    use_lut : boolean or dict
+        Evaluate the slope correction factor from a lookup table instead of the
+        closed form; a table of build_scf_lut can be passed directly
+    cache : scheduling.TrackCache, optional
+        Cache of the DEM (of a DEM function), its gradient and the terrain geometry
+        of every track, keyed by pixel grid and heading; the caller scopes it to the DEM
+        (TrackCache.scoped), see TRACK_AFFINE in local_wrapper
+
+    Notes
+    -----
+    The heading is estimated from the angle band of every image unless the image
+    has a 'heading' property (in degrees), as set on the tiles of a scene by
+    local_wrapper so that all tiles use the heading of the whole scene.
+
+    Returns
+    -------
+    list
+        A local image collection where radiometric terrain normalization is
+        implemented on each image
+
+    """
+    lut = use_lut if isinstance(use_lut, dict) else (build_scf_lut(TERRAIN_FLATTENING_MODEL) if use_lut else None)
+    output = []
+    for image in collection:
+        if callable(DEM) and cache is not None:
+            dem = cache.get(scheduling.track(image['properties']), ('dem', _grid(image)), lambda: DEM(image))
+        else:
+            dem = DEM(image) if callable(DEM) else DEM
+        output.append(_correct(image, dem, TERRAIN_FLATTENING_MODEL,
+                               TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER, lut, cache))
+    return output
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Point time series extraction of the local backend, the counterpart of
+             timeseries.py.
+
+    The points are (x, y) coordinates in the coordinate system of the co-registered scenes
+    and are converted once to pixel indices with the transform of the grid. The values of
+    all the points are then gathered from every band with a single fancy index.
+
+    extract reads processed scenes (a list, or the .npz files of a directory written by
+    local_helper.save, e.g. the outputs of batch.py or local_store). extract_processed
+    runs the pipeline on the tiles that contain points only, with their halo, instead of
+    on the whole scenes.
+"""
+
+import concurrent.futures
+import os
+
+import numpy as np
+
+import local_helper
+import local_terrain_flattening as ltf
+import local_wrapper
+
+# side of the tiles processed by extract_processed
+TILE = 256
+
+
+def point_pixels(points, transform, shape):
+    """
+    Pixel indices of points.
+
+    Parameters
+    ----------
+    points : array
+        (P, 2) x, y coordinates
+    transform : tuple
+        Affine transform of the grid (GDAL order, without rotation)
+    shape : tuple
+        (rows, cols) of the grid
+
+    Returns
+    -------
+    tuple
+        (rows, cols, inside) arrays of length P; rows and cols of the points outside
+        of the grid are 0 and inside is False
+
+    """
+    points = np.asarray(points, np.float64).reshape(-1, 2)
+    cols = np.floor((points[:, 0] - transform[0]) / transform[1]).astype(np.int64)
+    rows = np.floor((points[:, 1] - transform[3]) / transform[5]).astype(np.int64)
+    inside = (rows >= 0) & (rows < shape[0]) & (cols >= 0) & (cols < shape[1])
+    return np.where(inside, rows, 0), np.where(inside, cols, 0), inside
+
+
+def _gather(image, bands, rows, cols, inside):
+    """(P, B) values of the points in one image, NaN outside of the grid."""
+    values = np.full((len(rows), len(bands)), np.nan, np.float32)
+    gathered = {name: image['bands'][name][rows, cols] for name in bands}
+    if image['properties'].get('encoding'):
+        # decode quantized bands, on the gathered values only
+        gathered = local_helper.dequantize(local_helper.make_image(
+            {name: value[None, :] for name, value in gathered.items()}, image['properties']))['bands']
+        gathered = {name: value[0] for name, value in gathered.items()}
+    for b, name in enumerate(bands):
+        values[:, b] = np.where(inside, gathered[name], np.nan)
+    return values
+
+
+def _images(stack):
+    if isinstance(stack, str):
+        for name in sorted(os.listdir(stack)):
+            if name.endswith('.npz'):
+                yield local_helper.load(os.path.join(stack, name), DECODE=False)
+    else:
+        for image in stack:
+            yield image
+
+
+def extract(stack, points, bands=None):
+    """
+    Time series of points in processed scenes.
+
+    Parameters
+    ----------
+    stack : list or string
+        Local image collection, or a directory of local_helper.save files, on one grid
+    points : array
+        (P, 2) x, y coordinates in the coordinate system of the scenes
+    bands : list, optional
+        Bands to extract, all backscatter bands of the first scene by default
+
+    Returns
+    -------
+    dict
+        'values': (P, T, B) float32 array, NaN where masked or outside of the scene;
+        'times': (T,) system:time_start in milliseconds, in increasing order;
+        'ids': (T,) system:index; 'bands': the B band names
+
+    """
+    series = []
+    pixels = None
+    for image in _images(stack):
+        if bands is None:
+            bands = local_helper.band_names(image)
+        if pixels is None:
+            pixels = point_pixels(points, image['properties']['transform'], local_helper.image_shape(image))
+        series.append((image['properties']['system:time_start'], image['properties']['system:index'],
+                       _gather(image, bands, *pixels)))
+    return _result(series, len(np.asarray(points).reshape(-1, 2)), bands or [])
+
+
+def _result(series, n_points, bands):
+    series.sort(key=lambda item: item[0])
+    values = np.full((n_points, len(series), len(bands)), np.nan, np.float32)
+    for t, (_, _, value) in enumerate(series):
+        values[:, t, :] = value
+    return {'values': values, 'times': np.array([item[0] for item in series], np.int64),
+            'ids': [item[1] for item in series], 'bands': list(bands)}
+
+
+def extract_processed(params, collection, points, TILE=TILE, WORKERS=1):
+    """
+    Time series of points, processing only the tiles of the scenes that contain points.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by local_wrapper.s1_preproc
+    collection : list
+        Local image collection of co-registered scenes
+    points : array
+        (P, 2) x, y coordinates in the coordinate system of the scenes
+    TILE : integer
+        Side of the tiles in pixels, without the halo
+    WORKERS : integer
+        Number of tiles processed in parallel threads
+
+    Returns
+    -------
+    dict
+        As returned by extract, with a 'tiles' entry: (tiles processed, tiles of the scene)
+
+    """
+    params = local_wrapper.check_params(params)
+    selected = local_wrapper.select(collection, params['START_DATE'], params['STOP_DATE'],
+                                    params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])
+    n_points = len(np.asarray(points).reshape(-1, 2))
+    if not selected:
+        return dict(_result([], n_points, []), tiles=(0, 0))
+    shape = local_helper.image_shape(selected[0])
+    if any(local_helper.image_shape(image) != shape for image in selected):
+        raise ValueError("ERROR!!! Point extraction needs co-registered scenes of the same shape")
+    bands = local_helper.band_names(selected[0])
+    rows, cols, inside = point_pixels(points, selected[0]['properties']['transform'], shape)
+
+    HALO = local_wrapper.halo(params, ltf.pixel_size(selected[0]))
+    windows = local_wrapper.tile_windows(shape, (TILE, TILE), HALO)
+    # tile of every point
+    tile_cols = (shape[1] + TILE - 1) // TILE
+    tile_of = np.where(inside, rows // TILE * tile_cols + cols // TILE, -1)
+    used = np.unique(tile_of[tile_of >= 0])
+    headings, dems = local_wrapper.scene_constants(params, selected)
+    values = np.full((n_points, len(selected), len(bands)), np.nan, np.float32)
+
+    def process(index):
+        inner, outer = windows[index]
+        tiles = local_wrapper.process_window(params, selected, outer, headings, dems)
+        members = np.nonzero(tile_of == index)[0]
+        r, c = rows[members] - outer[0].start, cols[members] - outer[1].start
+        for t, tile in enumerate(tiles):
+            values[members, t, :] = _gather(tile, bands, r, c, np.ones(len(members), bool))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for future in [pool.submit(process, index) for index in used]:
+            future.result()
+
+    series = [(image['properties']['system:time_start'], image['properties']['system:index'], values[:, t, :])
+              for t, image in enumerate(selected)]
+    return dict(_result(series, n_points, bands), tiles=(len(used), len(windows)))
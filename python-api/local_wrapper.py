@@ -0,0 +1,995 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: A wrapper function to derive the Sentinel-1 ARD with the local (NumPy) backend.
+
+    The parameters are those of wrapper.s1_preproc (see s1_ard.py), applied to a local image
+    collection (see local_helper.py) instead of the Earth Engine catalog. DEM is an array on
+    the pixel grid of the scenes or a function returning it for a local image. ROI and
+    CLIP_TO_ROI are ignored, local scenes are already cut to the area of interest.
+
+    Additional parameters of the local backend:
+        MEMORY_BUDGET_MB : (Optional) Memory budget per worker. The co-registered scenes are
+                           then processed in tiles with halos, the largest tiles whose
+                           estimated peak memory fits the budget.
+        WORKERS : (Optional) Number of tiles processed in parallel threads, 1 by default.
+        INCREMENTAL_STORE : (Optional) Directory of the incremental mode (see local_store.py).
+                            Scenes already processed with the same parameters
+                            (parameters.param_hash) are skipped and the new outputs are
+                            stored. With the MULTI framework the ratio of every processed
+                            scene to its filtered image is stored as well and the stored
+                            ratios of earlier scenes serve as temporal neighbours, so an
+                            earlier acquisition is not loaded or filtered again.
+        PRECISION : (Optional) 'FULL' (default) or 'HALF'. HALF stores the backscatter of the
+                    scenes, the intermediates and the outputs in float16, the statistics
+                    are still accumulated in float64 (see local_precision.py).
+        TRACK_AFFINE : (Optional) Process every track (relative orbit and pass) as a separate
+                       run, its scenes in time order, each track pinned to one of WORKERS
+                       threads (see scheduling.py). The outputs are those of a single run,
+                       the multi-temporal neighbours are taken from the same track anyway.
+        TRACK_CACHE : (Optional) scheduling.TrackCache of the DEM, its gradient and the
+                      terrain geometry of every track, e.g. kept by a resident service across
+                      runs; created for the run with TRACK_AFFINE. The report has its hit
+                      rate per track.
+
+    The estimate is calibrated per configuration: all stages are run on two small windows of
+    the actual scenes under tracemalloc and the peak of every stage is fitted as
+    constant + bytes per pixel, so that the filter, the temporal stack depth and the halos
+    are accounted for. The measured peak of the run is reported against the estimate.
+"""
+
+import concurrent.futures
+import datetime
+import math
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+import local_border_noise_correction as lbnc
+import local_helper
+import local_kernels
+import local_precision
+import local_speckle_filter as lsf
+import local_store
+import local_terrain_flattening as ltf
+import parameters
+import scheduling
+import tracing
+
+# windows used to calibrate the memory model, larger than the tiles of
+# local_kernels so that its workspace is part of the constant
+PROBE_SHAPES = ((160, 320), (320, 640))
+# smallest tile side considered by plan_tiles
+MIN_TILE = 32
+# fraction of the budget planned for, the estimate is typically within 15 % of the measured peak
+BUDGET_FRACTION = 0.9
+# parameters that determine the entries of a TrackCache, besides the grid and the heading
+CACHE_KEYS = ('APPLY_TERRAIN_FLATTENING', 'DEM', 'PREVIEW_FACTOR')
+
+
+###########################################
+# DO THE JOB
+###########################################
+
+def s1_preproc(params, collection):
+    """
+    Applies preprocessing to a local collection of S1 images to return analysis ready sentinel-1 data.
+
+    Parameters
+    ----------
+    params : Dictionary
+        These parameters determine the data selection and image processing parameters.
+    collection : list
+        Local image collection
+
+    Raises
+    ------
+    ValueError
+
+
+    Returns
+    -------
+    list
+        A processed local image collection
+
+    """
+    with tracing.span('s1_preproc', kind='run', backend='local') as run_span:
+        output, report = run(params, collection)
+        run_span.set(**{key: value for key, value in report.items() if key != 'stages'})
+    return output
+
+
+def check_params(params):
+    """
+    Fill in the defaults and validate the parameters, including those of the local backend.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by s1_preproc
+
+    Raises
+    ------
+    ValueError
+        If a parameter is not correctly defined
+
+    Returns
+    -------
+    Dictionary
+        A copy of the parameters with the defaults filled in
+
+    """
+    checked = parameters.check_params(params)
+    MEMORY_BUDGET_MB = params.get('MEMORY_BUDGET_MB')
+    WORKERS = params.get('WORKERS') or 1
+    INCREMENTAL_STORE = params.get('INCREMENTAL_STORE')
+    PRECISION = params.get('PRECISION') or 'FULL'
+    if (MEMORY_BUDGET_MB is not None and MEMORY_BUDGET_MB <= 0):
+        raise ValueError("ERROR!!! MEMORY_BUDGET_MB not correctly defined")
+    if (WORKERS < 1):
+        raise ValueError("ERROR!!! WORKERS not correctly defined")
+    if (PRECISION not in local_precision.PRECISIONS):
+        raise ValueError("ERROR!!! PRECISION not correctly defined")
+    checked.update({'MEMORY_BUDGET_MB': MEMORY_BUDGET_MB, 'WORKERS': int(WORKERS),
+                    'INCREMENTAL_STORE': INCREMENTAL_STORE, 'PRECISION': PRECISION,
+                    'TRACK_CACHE': params.get('TRACK_CACHE')})
+    return checked
+
+
+def _millis(date):
+    day = datetime.datetime.strptime(str(date)[:10], '%Y-%m-%d').replace(tzinfo=datetime.timezone.utc)
+    return int(day.timestamp() * 1000)
+
+
+def select(collection, START_DATE, STOP_DATE, POLARIZATION, ORBIT, EXCLUDE_SCENES=()):
+    """
+    Select the scenes of a local collection matching the parameters, like wrapper._select.
+    Scenes whose system:index is in EXCLUDE_SCENES are left out.
+
+    Returns
+    -------
+    list
+        The selected scenes with the requested polarization and angle bands
+
+    """
+    start, stop = _millis(START_DATE), _millis(STOP_DATE)
+    EXCLUDE_SCENES = set(EXCLUDE_SCENES)
+    if POLARIZATION == 'VVVH':
+        bands = ['VV', 'VH']
+    else:
+        bands = [POLARIZATION]
+
+    s1 = []
+    for image in collection:
+        props = image['properties']
+        if not start <= props['system:time_start'] < stop:
+            continue
+        if (ORBIT != 'BOTH' and props.get('orbitProperties_pass') != ORBIT):
+            continue
+        if not all(name in image['bands'] for name in bands):
+            continue
+        if props.get('system:index') in EXCLUDE_SCENES:
+            continue
+        s1.append(local_helper.make_image({name: image['bands'][name] for name in bands + ['angle']},
+                                          props))
+    return s1
+
+
+def preproc_stages(params, collection, history=None, ratio_sink=None):
+    """
+    Run the processing chain stage by stage.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by s1_preproc, already passed through check_params
+    collection : list
+        Local image collection
+    history, ratio_sink : optional
+        Stored ratio records and ratio callback of the multi-temporal filter,
+        see local_speckle_filter.MultiTemporal_Filter
+
+    Yields
+    ------
+    tuple
+        (stage name, list) where the collection is the cumulative result of
+        all stages up to and including the named one
+
+    """
+
+    APPLY_BORDER_NOISE_CORRECTION = params['APPLY_BORDER_NOISE_CORRECTION']
+    APPLY_TERRAIN_FLATTENING = params['APPLY_TERRAIN_FLATTENING']
+    APPLY_SPECKLE_FILTERING = params['APPLY_SPECKLE_FILTERING']
+    SPECKLE_FILTER_FRAMEWORK = params['SPECKLE_FILTER_FRAMEWORK']
+    SPECKLE_FILTER = params['SPECKLE_FILTER']
+    SPECKLE_FILTER_KERNEL_SIZE = params['SPECKLE_FILTER_KERNEL_SIZE']
+    SPECKLE_FILTER_NR_OF_IMAGES = params['SPECKLE_FILTER_NR_OF_IMAGES']
+    TERRAIN_FLATTENING_MODEL = params['TERRAIN_FLATTENING_MODEL']
+    DEM = params['DEM']
+    TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER = params['TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER']
+    FORMAT = params['FORMAT']
+
+    ###########################################
+    # 1. DATA SELECTION
+    ###########################################
+
+    with tracing.span('data_selection'):
+        s1 = select(collection, params['START_DATE'], params['STOP_DATE'],
+                    params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])
+    yield 'data_selection', s1
+
+    ###########################################
+    # 2. ADDITIONAL BORDER NOISE CORRECTION
+    ###########################################
+
+    if (APPLY_BORDER_NOISE_CORRECTION):
+        with tracing.span('border_noise_correction'):
+            s1 = lbnc.mask_edges(s1)
+        yield 'border_noise_correction', s1
+
+    ########################
+    # 3. SPECKLE FILTERING
+    #######################
+
+    if (APPLY_SPECKLE_FILTERING):
+        with tracing.span('speckle_filtering', framework=SPECKLE_FILTER_FRAMEWORK,
+                          filter=SPECKLE_FILTER, kernel_size=SPECKLE_FILTER_KERNEL_SIZE):
+            if (SPECKLE_FILTER_FRAMEWORK == 'MONO'):
+                s1 = lsf.MonoTemporal_Filter(s1, SPECKLE_FILTER_KERNEL_SIZE, SPECKLE_FILTER)
+            else:
+                s1 = lsf.MultiTemporal_Filter(s1, SPECKLE_FILTER_KERNEL_SIZE, SPECKLE_FILTER, SPECKLE_FILTER_NR_OF_IMAGES,
+                                              history, ratio_sink)
+        yield 'speckle_filtering', s1
+
+    ########################
+    # 4. TERRAIN CORRECTION
+    #######################
+
+    if (APPLY_TERRAIN_FLATTENING):
+        with tracing.span('terrain_flattening', model=TERRAIN_FLATTENING_MODEL):
+            s1 = ltf.slope_correction(s1, TERRAIN_FLATTENING_MODEL, DEM,
+                                      TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER,
+                                      cache=params.get('TRACK_CACHE'))
+        yield 'terrain_flattening', s1
+
+    ########################
+    # 5. OUTPUT
+    #######################
+
+    with tracing.span('output', format=FORMAT):
+        if (FORMAT == 'DB'):
+            s1 = [local_helper.lin_to_db(image) for image in s1]
+
+        if (params['OUTPUT_ENCODING'] == 'QUANTIZED'):
+            s1 = [local_helper.quantize(image) for image in s1]
+    yield 'output', s1
+
+
+# ---------------------------------------------------------------------------//
+# Tiles
+# ---------------------------------------------------------------------------//
+
+def halo(params, spacing=(10.0, 10.0)):
+    """
+    Number of pixels around a tile needed to compute the tile exactly.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Checked parameters
+    spacing : tuple
+        (x, y) pixel size in meters
+
+    Returns
+    -------
+    integer
+        The halo in pixels
+
+    """
+    h = 0
+    if (params['APPLY_SPECKLE_FILTERING']):
+        K = params['SPECKLE_FILTER_KERNEL_SIZE']
+        if params['SPECKLE_FILTER'] == 'REFINED LEE':
+            # 3x3 statistics sampled 2 pixels apart, 7x7 directional windows
+            h += 3
+        elif params['SPECKLE_FILTER'] == 'LEE SIGMA':
+            # the sigma range of the 3x3 target window enters the KxK statistics
+            h += K // 2 + 1
+        else:
+            h += K // 2
+    if (params['APPLY_TERRAIN_FLATTENING']):
+        # the DEM gradient and the layover/shadow buffer
+        buffer = params['TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER']
+        h += 1 + int(math.floor(buffer / min(spacing)))
+    return h
+
+
+def tile_windows(shape, tile_shape, HALO):
+    """
+    Split a scene in tiles.
+
+    Parameters
+    ----------
+    shape : tuple
+        (rows, cols) of the scene
+    tile_shape : tuple
+        (rows, cols) of the tiles without the halo
+    HALO : integer
+        Halo in pixels
+
+    Returns
+    -------
+    list
+        (inner, outer) windows as (row slice, col slice) tuples; outer is the inner
+        window extended by the halo and clipped to the scene
+
+    """
+    rows, cols = shape
+    th, tw = tile_shape
+    windows = []
+    for r0 in range(0, rows, th):
+        for c0 in range(0, cols, tw):
+            inner = (slice(r0, min(r0 + th, rows)), slice(c0, min(c0 + tw, cols)))
+            outer = (slice(max(r0 - HALO, 0), min(r0 + th + HALO, rows)),
+                     slice(max(c0 - HALO, 0), min(c0 + tw + HALO, cols)))
+            windows.append((inner, outer))
+    return windows
+
+
+def cut(collection, window, headings=None):
+    """
+    Local images of a window of every scene.
+
+    Parameters
+    ----------
+    collection : list
+        Local image collection
+    window : tuple
+        (row slice, col slice)
+    headings : list, optional
+        Heading of every whole scene (see scene_headings), so that the terrain
+        flattening of the window uses the heading of the scene
+
+    Returns
+    -------
+    list
+        The windows, with the angle band materialized and the transform shifted
+
+    """
+    rows, cols = window
+    tiles = []
+    for image, heading in zip(collection, headings or [None] * len(collection)):
+        bands = {name: band[rows, cols] for name, band in image['bands'].items() if name != 'angle'}
+        bands['angle'] = local_helper.angle(image, rows, cols)
+        props = dict(image['properties'])
+        transform = props.get('transform')
+        if transform is not None:
+            props['transform'] = (transform[0] + cols.start * transform[1] + rows.start * transform[2],
+                                  transform[1], transform[2],
+                                  transform[3] + cols.start * transform[4] + rows.start * transform[5],
+                                  transform[4], transform[5])
+        if heading is not None:
+            props['heading'] = heading
+        tiles.append(local_helper.make_image(bands, props))
+    return tiles
+
+
+def _tile_params(params, selected, dems, window):
+    tile_params = dict(params)
+    if (params['APPLY_TERRAIN_FLATTENING']):
+        rows, cols = window
+        by_index = {image['properties']['system:index']: dem[rows, cols]
+                    for image, dem in zip(selected, dems)}
+        tile_params['DEM'] = lambda tile: by_index[tile['properties']['system:index']]
+    return tile_params
+
+
+def process_window(params, selected, window, headings, dems, history=None, ratio_sink=None):
+    """
+    Run the stages on a window of the selected co-registered scenes, like a tile of run.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Checked parameters
+    selected : list
+        The selected scenes
+    window : tuple
+        (row slice, col slice), including the halo
+    headings, dems : list
+        Scene heading and DEM of every selected scene, see scene_constants
+    history, ratio_sink : optional
+        Ratio records of the window and ratio callback of the multi-temporal
+        filter, see local_speckle_filter.MultiTemporal_Filter
+
+    Returns
+    -------
+    list
+        The processed window of every scene
+
+    """
+    return _process(_tile_params(params, selected, dems, window), cut(selected, window, headings),
+                    None, history, ratio_sink)
+
+
+def _process(params, tiles, peaks=None, history=None, ratio_sink=None):
+    """Run the stages on a tile collection; with peaks, record the traced peak of every stage."""
+    base = tracemalloc.get_traced_memory()[0] if peaks is not None else 0
+    stages = preproc_stages(params, tiles, history, ratio_sink)
+    while True:
+        if peaks is not None:
+            tracemalloc.reset_peak()
+        try:
+            stage, s1 = next(stages)
+        except StopIteration:
+            return s1
+        if peaks is not None:
+            peaks[stage] = max(peaks.get(stage, 0), tracemalloc.get_traced_memory()[1] - base)
+
+
+# ---------------------------------------------------------------------------//
+# Memory model
+# ---------------------------------------------------------------------------//
+
+def measure_stages(params, selected, headings, dems, HALO, shapes=PROBE_SHAPES, history=None):
+    """
+    Calibrate the memory model: run the stages on two windows of the scenes and fit
+    the traced peak of every stage as constant + bytes per pixel.
+
+    Every window starts with an empty kernel workspace, so that its buffers, which a
+    worker thread keeps for all its tiles, are part of the constant. On scenes smaller
+    than the probes the windows are the scene and its upper half instead of probes
+    clipped to the scene.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Checked parameters
+    selected : list
+        The selected scenes
+    headings, dems : list
+        Scene heading and DEM of every selected scene
+    HALO : integer
+        Halo in pixels
+    shapes : tuple
+        Two tile shapes, without the halo
+    history : list, optional
+        Stored ratio records of the incremental mode
+
+    Returns
+    -------
+    dict
+        Stage name -> (bytes per pixel, constant bytes), for tiles including the halo
+
+    """
+    rows, cols = local_helper.image_shape(selected[0])
+    windows = [(th + 2 * HALO, tw + 2 * HALO) for th, tw in shapes]
+    if any(h > rows or w > cols for h, w in windows):
+        windows = [((rows + 1) // 2, cols), (rows, cols)]
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    samples = []
+    try:
+        for h, w in windows:
+            outer = (slice(0, h), slice(0, w))
+            peaks = {}
+            # the buffers of a previous window would not be traced
+            local_kernels.release_workspace()
+            tile_params = _tile_params(params, selected, dems, outer)
+            _process(tile_params, cut(selected, outer, headings), peaks,
+                     [local_store.window_record(record, outer) for record in history or []])
+            samples.append((h * w, peaks))
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    (p0, peaks0), (p1, peaks1) = samples
+    model = {}
+    for stage in peaks1:
+        if p1 > p0:
+            slope = max((peaks1[stage] - peaks0[stage]) / float(p1 - p0), 0.0)
+        else:
+            slope = peaks1[stage] / float(p1)
+        model[stage] = (slope, max(peaks1[stage] - slope * p1, 0.0))
+    return model
+
+
+def estimate_peak(model, tile_shape, HALO):
+    """
+    Estimated peak memory in bytes of one tile, the maximum over the stages.
+
+    Parameters
+    ----------
+    model : dict
+        As returned by measure_stages
+    tile_shape : tuple
+        (rows, cols) of the tile without the halo
+    HALO : integer
+        Halo in pixels
+
+    Returns
+    -------
+    float
+        Bytes
+
+    """
+    pixels = (tile_shape[0] + 2 * HALO) * (tile_shape[1] + 2 * HALO)
+    return max(slope * pixels + constant for slope, constant in model.values())
+
+
+def plan_tiles(model, shape, HALO, MEMORY_BUDGET_MB):
+    """
+    Largest tile whose estimated peak memory fits the budget.
+
+    Full width strips are tried first, then the width is halved until a tile of at
+    least MIN_TILE rows fits; among the candidates the largest area wins.
+
+    Parameters
+    ----------
+    model : dict
+        As returned by measure_stages
+    shape : tuple
+        (rows, cols) of the scenes
+    HALO : integer
+        Halo in pixels
+    MEMORY_BUDGET_MB : float
+        Memory budget per worker
+
+    Raises
+    ------
+    ValueError
+        If not even a MIN_TILE x MIN_TILE tile fits, or the constant of a stage alone
+        exceeds the budget
+
+    Returns
+    -------
+    tuple
+        (rows, cols) of the tiles without the halo
+
+    """
+    rows, cols = shape
+    budget = MEMORY_BUDGET_MB * 2**20 * BUDGET_FRACTION
+    slope = max(model.values(), key=lambda m: m[0])[0]
+    if any(constant > budget for _, constant in model.values()):
+        # no tile is small enough, whatever its shape
+        raise ValueError("ERROR!!! MEMORY_BUDGET_MB too small for this configuration")
+    best = None
+    width = cols
+    while True:
+        # the tallest tile of this width that fits the budget of every stage
+        heights = []
+        for s, constant in model.values():
+            if s <= 0:
+                continue
+            heights.append(int((budget - constant) / (s * (width + 2 * HALO))) - 2 * HALO)
+        height = min([rows] + heights)
+        if height >= min(MIN_TILE, rows):
+            # balance the tiles, no thin remainder strip
+            height = int(math.ceil(rows / math.ceil(rows / float(height))))
+            if best is None or height * width > best[0] * best[1]:
+                best = (height, width)
+        if width <= MIN_TILE or slope <= 0:
+            break
+        width = int(math.ceil(width / 2.0))
+    if best is None or estimate_peak(model, best, HALO) > budget:
+        raise ValueError("ERROR!!! MEMORY_BUDGET_MB too small for this configuration")
+    return best
+
+
+def _max_rss():
+    if resource is None:
+        return float('nan')
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024.0
+
+
+# ---------------------------------------------------------------------------//
+# Execution
+# ---------------------------------------------------------------------------//
+
+def scene_headings(params, collection):
+    """Heading of every scene, None unless terrain flattening is applied."""
+    return scene_constants(dict(params, DEM=None), collection)[0]
+
+
+def scene_constants(params, selected):
+    """Heading and DEM of every scene; a DEM function is evaluated once per pixel grid."""
+    headings, dems, cache = [], [], {}
+    for image in selected:
+        heading = None
+        dem = None
+        if (params['APPLY_TERRAIN_FLATTENING']):
+            angle = image['bands']['angle']
+            step = getattr(angle, 'step', 1)
+            sample = local_helper.angle(image, slice(None, None, step), slice(None, None, step))
+            spacing = ltf.pixel_size(image)
+            heading = ltf.heading(sample, (spacing[0] * step, spacing[1] * step))
+            DEM = params['DEM']
+            if callable(DEM):
+                key = (tuple(image['properties'].get('transform') or ()), local_helper.image_shape(image))
+                if key not in cache:
+                    cache[key] = DEM(image)
+                dem = cache[key]
+            else:
+                dem = DEM
+        headings.append(heading)
+        dems.append(dem)
+    return headings, dems
+
+
+def run(params, collection):
+    """
+    Run the local pipeline, in tiles if a memory budget is given.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by s1_preproc
+    collection : list
+        Local image collection
+
+    Returns
+    -------
+    tuple
+        (processed local image collection, report dictionary with the tile shape,
+        the halo, the estimated and measured peak memory; with TRACK_AFFINE, the
+        report of every track and the peak memory of all workers together)
+
+    """
+    params = check_params(params)
+    if (params['TRACK_AFFINE'] and params['TRACK_CACHE'] is None):
+        params['TRACK_CACHE'] = scheduling.TrackCache()
+    if (params['TRACK_CACHE'] is not None):
+        # the entries are specific to the DEM
+        params['TRACK_CACHE'] = params['TRACK_CACHE'].scoped(parameters.param_hash(params, CACHE_KEYS))
+    if (params['TRACK_AFFINE']):
+        return _run_tracks(params, collection)
+    return _run(params, collection)
+
+
+def _run_tracks(params, collection):
+    """Run every track on the worker it is pinned to, see TRACK_AFFINE."""
+    selected = select(collection, params['START_DATE'], params['STOP_DATE'],
+                      params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])
+    tracks = scheduling.partition(selected)
+    WORKERS = max(min(params['WORKERS'], len(tracks)), 1)
+    # the threads of a worker process the tiles of its tracks
+    track_params = dict(params, TRACK_AFFINE=False, WORKERS=max(params['WORKERS'] // WORKERS, 1))
+    cache = params['TRACK_CACHE']
+    before = cache.stats()
+
+    # the memory model of every track is measured before the workers start, the trace
+    # of a calibration would otherwise include the tiles of the other tracks
+    prepared = {}
+    for key, scenes in tracks.items():
+        track_run = _prepare(dict(track_params), scenes)
+        prepared[key] = track_run + (_calibrate(*track_run),)
+
+    # one trace of the memory of all workers
+    traced = params['MEMORY_BUDGET_MB'] is not None
+    started = traced and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    if traced:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    try:
+        results = scheduling.run_pinned(tracks, lambda key, scenes: _execute(*prepared[key], trace=False), WORKERS)
+        if traced:
+            peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        if started:
+            tracemalloc.stop()
+
+    # the scenes in the order of the selection
+    order = {image['properties']['system:index']: i for i, image in enumerate(selected)}
+    output = sorted((image for result in results.values() for image in result['result'][0]),
+                    key=lambda image: order[image['properties']['system:index']])
+    after = cache.stats()
+    report = {'tiles': sum(result['result'][1]['tiles'] for result in results.values()),
+              'workers': WORKERS, 'tracks': {}}
+    for key, result in results.items():
+        name = scheduling.track_name(key)
+        # the lookups of this run, the cache may be shared by several runs
+        counts = {c: after.get(name, {}).get(c, 0) - before.get(name, {}).get(c, 0) for c in ('hits', 'misses')}
+        lookups = counts['hits'] + counts['misses']
+        hits = dict(counts, hit_rate=counts['hits'] / float(lookups) if lookups else 0.0)
+        report['tracks'][name] = dict(result['result'][1], scenes=result['scenes'], worker=result['worker'],
+                                      seconds=result['seconds'], cache=hits)
+        print('Track {}: {} scene(s) on worker {} in {:.2f} s, cache hit rate {:.0%} ({} hits, {} misses)'.format(
+            name, result['scenes'], result['worker'], result['seconds'], hits['hit_rate'],
+            hits['hits'], hits['misses']))
+    if traced:
+        # the tracks of a worker run one after the other: the estimate of a worker is the
+        # largest of its tracks, each track with the threads processing its tiles
+        workers = {}
+        for result in results.values():
+            track_report = result['result'][1]
+            estimated = track_report.get('estimated_peak_mb', 0.0) * track_report.get('workers', 1)
+            workers[result['worker']] = max(workers.get(result['worker'], 0.0), estimated)
+        output_bytes = sum(band.nbytes for image in output for band in image['bands'].values()
+                           if isinstance(band, np.ndarray))
+        report.update({'budget_mb': params['MEMORY_BUDGET_MB'],
+                       'estimated_peak_mb': sum(workers.values()),
+                       'measured_peak_mb': max(peak - output_bytes, 0) / 2**20,
+                       'max_rss_mb': _max_rss() / 2**20})
+        print('{} track(s) on {} worker(s): estimated peak {:.1f} MB, measured {:.1f} MB '
+              'for all workers, max RSS {:.1f} MB'.format(
+                  len(results), WORKERS, report['estimated_peak_mb'], report['measured_peak_mb'],
+                  report['max_rss_mb']))
+    return output, report
+
+
+def _run(params, collection):
+    """Body of run, on checked parameters."""
+    prepared = _prepare(params, collection)
+    return _execute(*prepared, tiling=_calibrate(*prepared))
+
+
+def _prepare(params, collection):
+    """Incremental mode, preview and precision of run (params is modified)."""
+    incremental = _incremental(params, collection) if params['INCREMENTAL_STORE'] else None
+    if (params['PREVIEW_FACTOR'] > 1):
+        collection, params = _preview(params, collection)
+    if (params['PRECISION'] != 'FULL'):
+        collection = local_precision.cast(select(collection, params['START_DATE'], params['STOP_DATE'],
+                                                 params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES']),
+                                          params['PRECISION'])
+    return params, collection, incremental
+
+
+def _calibrate(params, collection, incremental):
+    """
+    Selected scenes, halo, scene constants and memory model of the tiled execution,
+    None without MEMORY_BUDGET_MB.
+    """
+    if (params['MEMORY_BUDGET_MB'] is None):
+        return None
+    selected = select(collection, params['START_DATE'], params['STOP_DATE'],
+                      params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])
+    _print_stage(params, 'data_selection', selected)
+    if not selected:
+        return {'selected': []}
+    shape = local_helper.image_shape(selected[0])
+    if any(local_helper.image_shape(image) != shape for image in selected):
+        raise ValueError("ERROR!!! Tiled execution needs co-registered scenes of the same shape")
+
+    HALO = halo(params, ltf.pixel_size(selected[0]))
+    headings, dems = scene_constants(params, selected)
+    history = incremental['history'] if incremental else None
+    model = measure_stages(params, selected, headings, dems, HALO, history=history)
+    return {'selected': selected, 'shape': shape, 'halo': HALO, 'headings': headings, 'dems': dems,
+            'model': model}
+
+
+def _execute(params, collection, incremental, tiling=None, trace=True):
+    """
+    Run the prepared collection, in tiles with the tiling of _calibrate; with trace
+    False the peak memory is not measured (the caller traces several runs at once).
+    """
+    report = {'tiles': 1}
+    history = incremental['history'] if incremental else None
+    if (tiling is None):
+        sink = None
+        if incremental and incremental['multi']:
+            store, key = incremental['store'], incremental['ratio_key']
+            sink = lambda image, ratios: store.save_ratios(key, image['properties'], ratios)
+        for stage, s1 in preproc_stages(params, collection, history, sink):
+            _print_stage(params, stage, s1)
+        _store_outputs(incremental, s1, report)
+        return s1, report
+
+    selected = tiling['selected']
+    if not selected:
+        _store_outputs(incremental, [], report)
+        return [], report
+    shape, HALO, model = tiling['shape'], tiling['halo'], tiling['model']
+    headings, dems = tiling['headings'], tiling['dems']
+    tile_shape = plan_tiles(model, shape, HALO, params['MEMORY_BUDGET_MB'])
+    windows = tile_windows(shape, tile_shape, HALO)
+    WORKERS = min(params['WORKERS'], len(windows))
+
+    store = None
+    if incremental and incremental['multi']:
+        # the ratios are written tile by tile into arrays of the full scene
+        store, key = incremental['store'], incremental['ratio_key']
+        for image in selected:
+            names = local_helper.band_names(image)
+            store.create_ratios(key, image['properties'], names, shape, image['bands'][names[0]].dtype)
+
+    def process(window):
+        inner, outer = window
+        with tracing.get_tracer().span('tile', kind='tile', parent=run_span,
+                                       rows=(inner[0].start, inner[0].stop),
+                                       cols=(inner[1].start, inner[1].stop)):
+            tile_params = _tile_params(params, selected, dems, outer)
+            tile_history, sink = None, None
+            if store is not None:
+                tile_history = [local_store.window_record(record, outer) for record in history]
+                crop = _crop(inner, outer)
+                sink = lambda image, ratios: store.write_ratios(
+                    key, image['properties']['system:index'],
+                    {name: ratio[crop] for name, ratio in ratios.items()}, inner)
+            return _process(tile_params, cut(selected, outer, headings), None, tile_history, sink)
+
+    run_span = tracing.get_tracer().current()
+    started = trace and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    if trace:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+
+    output = None
+    with concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        pending = set()
+        queue = list(windows)
+        while queue or pending:
+            # no more tiles in flight than workers, to stay within the budget
+            while queue and len(pending) < WORKERS:
+                window = queue.pop(0)
+                future = pool.submit(process, window)
+                future.window = window
+                pending.add(future)
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                tiles = future.result()
+                if output is None:
+                    output = _allocate(selected, tiles, shape)
+                _paste(output, tiles, *future.window)
+            # release the pasted tiles before the next ones are processed
+            del done, future, tiles
+
+    elapsed = time.perf_counter() - t0
+    # the assembled output is not part of the working set of the workers
+    output_bytes = sum(band.nbytes for image in output for band in image['bands'].values()
+                       if isinstance(band, np.ndarray))
+    measured = tracemalloc.get_traced_memory()[1] - base - output_bytes if trace else None
+    if started:
+        tracemalloc.stop()
+    if store is not None:
+        for image in selected:
+            store.commit_ratios(key, image['properties'])
+
+    estimated = estimate_peak(model, tile_shape, HALO)
+    report.update({'tiles': len(windows), 'tile_shape': tile_shape, 'halo': HALO, 'workers': WORKERS,
+                   'budget_mb': params['MEMORY_BUDGET_MB'],
+                   'estimated_peak_mb': estimated / 2**20,
+                   'measured_peak_mb': measured / 2**20 / WORKERS if trace else None,
+                   'max_rss_mb': _max_rss() / 2**20,
+                   'seconds': elapsed,
+                   'stages': {stage: {'bytes_per_pixel': slope, 'constant_mb': constant / 2**20}
+                              for stage, (slope, constant) in model.items()}})
+    for stage in ('border_noise_correction', 'speckle_filtering', 'terrain_flattening'):
+        if stage in model:
+            _print_stage(params, stage, output)
+    # without a trace of its own, the peak is measured by the caller for all runs at once
+    measured = 'measured {:.1f} MB per worker'.format(report['measured_peak_mb']) if trace else 'not measured'
+    print('{} tiles of {} x {} pixels (halo {}) on {} worker(s): estimated peak {:.1f} MB, '
+          '{} (budget {} MB), max RSS {:.1f} MB'.format(
+              len(windows), tile_shape[0], tile_shape[1], HALO, WORKERS, report['estimated_peak_mb'],
+              measured, params['MEMORY_BUDGET_MB'], report['max_rss_mb']))
+    _store_outputs(incremental, output, report)
+    return output, report
+
+
+def _incremental(params, collection):
+    """
+    Prepare the incremental mode: add the scenes already stored under the output
+    hash to EXCLUDE_SCENES (params is modified) and collect the stored ratios of
+    the scenes that are not processed again.
+    """
+    store = local_store.Store(params['INCREMENTAL_STORE'])
+    output_key = parameters.param_hash(params)
+    ratio_key = parameters.param_hash(params, parameters.RATIO_KEYS)
+    done = store.output_ids(output_key)
+    candidates = [image['properties']['system:index']
+                  for image in select(collection, params['START_DATE'], params['STOP_DATE'],
+                                      params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])]
+    skipped = [scene_id for scene_id in candidates if scene_id in done]
+    params['EXCLUDE_SCENES'] = sorted(set(params['EXCLUDE_SCENES']) | set(skipped))
+    multi = params['APPLY_SPECKLE_FILTERING'] and params['SPECKLE_FILTER_FRAMEWORK'] != 'MONO'
+    history = None
+    if multi:
+        history = store.history(ratio_key, exclude=[i for i in candidates if i not in done])
+    print('Incremental mode: {} scene(s) already processed ({}), {} stored ratio(s)'.format(
+        len(skipped), output_key, len(history or [])))
+    return {'store': store, 'output_key': output_key, 'ratio_key': ratio_key,
+            'skipped': len(skipped), 'history': history, 'multi': multi}
+
+
+def _preview(params, collection):
+    """
+    Downsample the selected scenes and their DEM by PREVIEW_FACTOR and scale the
+    kernel accordingly (see parameters.preview_params). The scenes keep the heading
+    of the full resolution scene.
+    """
+    FACTOR = params['PREVIEW_FACTOR']
+    selected = select(collection, params['START_DATE'], params['STOP_DATE'],
+                      params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])
+    headings, dems = scene_constants(params, selected)
+    level = []
+    for image, heading in zip(selected, headings):
+        image = local_helper.downsample(image, FACTOR)
+        if heading is not None:
+            image['properties'].setdefault('heading', heading)
+        level.append(image)
+    params = parameters.preview_params(params)
+    if (params['APPLY_TERRAIN_FLATTENING']):
+        averaged = {}
+        by_index = {}
+        for image, dem in zip(selected, dems):
+            if id(dem) not in averaged:
+                averaged[id(dem)] = local_helper.block_mean(dem, FACTOR)
+            by_index[image['properties']['system:index']] = averaged[id(dem)]
+        params['DEM'] = lambda image: by_index[image['properties']['system:index']]
+    print('Preview at 1/{} resolution, kernel size {}'.format(FACTOR, params['SPECKLE_FILTER_KERNEL_SIZE']))
+    return level, params
+
+
+def _store_outputs(incremental, output, report):
+    if incremental is None:
+        return
+    for image in output:
+        incremental['store'].save_output(incremental['output_key'], image)
+    report.update({'skipped': incremental['skipped'], 'processed': len(output),
+                   'output_hash': incremental['output_key']})
+
+
+def _allocate(selected, tiles, shape):
+    output = []
+    for image, tile in zip(selected, tiles):
+        bands = {}
+        for name, band in tile['bands'].items():
+            if name == 'angle' and isinstance(image['bands']['angle'], local_helper.CompactAngle):
+                # the stages pass the angle through, keep the compact band of the scene
+                bands[name] = image['bands']['angle']
+            else:
+                bands[name] = np.empty(shape, band.dtype)
+        props = dict(tile['properties'])
+        props.pop('heading', None)
+        for key in ('transform',):
+            if key in image['properties']:
+                props[key] = image['properties'][key]
+        output.append(local_helper.make_image(bands, props))
+    return output
+
+
+def _crop(inner, outer):
+    """The inner window in the coordinates of the outer window."""
+    return (slice(inner[0].start - outer[0].start, inner[0].stop - outer[0].start),
+            slice(inner[1].start - outer[1].start, inner[1].stop - outer[1].start))
+
+
+def _paste(output, tiles, inner, outer):
+    rows, cols = _crop(inner, outer)
+    for image, tile in zip(output, tiles):
+        for name, band in image['bands'].items():
+            if isinstance(band, np.ndarray):
+                band[inner] = tile['bands'][name][rows, cols]
+
+
+def _print_stage(params, stage, s1):
+    if stage == 'data_selection':
+        print('Number of images in collection: ', len(s1))
+    elif stage == 'border_noise_correction':
+        print('Additional border noise correction is completed')
+    elif stage == 'speckle_filtering':
+        if (params['SPECKLE_FILTER_FRAMEWORK'] == 'MONO'):
+            print('Mono-temporal speckle filtering is completed')
+        else:
+            print('Multi-temporal speckle filtering is completed')
+    elif stage == 'terrain_flattening':
+        print('Radiometric terrain normalization is completed')
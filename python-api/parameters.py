@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Defaults and validation of the s1_preproc parameters, shared by the Earth Engine
+             (wrapper.py) and the local (local_wrapper.py) pipelines. Does not import ee.
+             param_hash identifies the processing configuration of the stored outputs
+             of the incremental mode.
+"""
+
+import hashlib
+import json
+
+import numpy as np
+
+# parameters that determine the processed image of a scene; the data selection
+# (dates, orbit, ROI without clipping) and the execution parameters are excluded
+OUTPUT_KEYS = ('POLARIZATION', 'APPLY_BORDER_NOISE_CORRECTION', 'APPLY_SPECKLE_FILTERING',
+               'SPECKLE_FILTER_FRAMEWORK', 'SPECKLE_FILTER', 'SPECKLE_FILTER_KERNEL_SIZE',
+               'SPECKLE_FILTER_NR_OF_IMAGES', 'APPLY_TERRAIN_FLATTENING', 'TERRAIN_FLATTENING_MODEL',
+               'DEM', 'TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER', 'FORMAT',
+               'OUTPUT_ENCODING', 'CLIP_TO_ROI', 'ROI', 'ANGLE_SCALE', 'PREVIEW_FACTOR',
+               'PRECISION')
+# parameters that determine the ratio of a scene to its spatially filtered image,
+# the intermediate reused by the multi-temporal filter (independent of NR_OF_IMAGES)
+RATIO_KEYS = ('POLARIZATION', 'APPLY_BORDER_NOISE_CORRECTION', 'SPECKLE_FILTER',
+              'SPECKLE_FILTER_KERNEL_SIZE', 'PREVIEW_FACTOR', 'PRECISION')
+# parameters left out of the hash when they have their default value
+_HASH_DEFAULTS = {'PREVIEW_FACTOR': 1, 'PRECISION': 'FULL'}
+
+def check_params(params):
+    """
+    Fill in the defaults of the optional parameters and validate them.
+
+    Parameters
+    ----------
+    params : Dictionary
+        These parameters determine the data selection and image processing parameters.
+
+    Raises
+    ------
+    ValueError
+        If a parameter is not correctly defined
+
+    Returns
+    -------
+    Dictionary
+        A copy of the parameters with the defaults filled in
+
+    """
+
+    APPLY_BORDER_NOISE_CORRECTION = params['APPLY_BORDER_NOISE_CORRECTION']
+    APPLY_TERRAIN_FLATTENING = params['APPLY_TERRAIN_FLATTENING']
+    APPLY_SPECKLE_FILTERING = params['APPLY_SPECKLE_FILTERING']
+    POLARIZATION = params['POLARIZATION']
+    ORBIT = params['ORBIT']
+    SPECKLE_FILTER_FRAMEWORK = params['SPECKLE_FILTER_FRAMEWORK']
+    SPECKLE_FILTER = params['SPECKLE_FILTER']
+    SPECKLE_FILTER_KERNEL_SIZE = params['SPECKLE_FILTER_KERNEL_SIZE']
+    SPECKLE_FILTER_NR_OF_IMAGES = params['SPECKLE_FILTER_NR_OF_IMAGES']
+    TERRAIN_FLATTENING_MODEL = params['TERRAIN_FLATTENING_MODEL']
+    TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER = params['TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER']
+    FORMAT = params['FORMAT']
+
+    ###########################################
+    # 0. CHECK PARAMETERS
+    ###########################################
+
+    if APPLY_BORDER_NOISE_CORRECTION is None:
+        APPLY_BORDER_NOISE_CORRECTION = True
+    if APPLY_TERRAIN_FLATTENING is None:
+        APPLY_TERRAIN_FLATTENING = True
+    if APPLY_SPECKLE_FILTERING is None:
+        APPLY_SPECKLE_FILTERING = True
+    if POLARIZATION is None:
+        POLARIZATION = 'VVVH'
+    if ORBIT is None:
+        ORBIT = 'BOTH'
+    if SPECKLE_FILTER_FRAMEWORK is None:
+        SPECKLE_FILTER_FRAMEWORK = 'MULTI BOXCAR'
+    if SPECKLE_FILTER is None:
+        SPECKLE_FILTER = 'GAMMA MAP'
+    if SPECKLE_FILTER_KERNEL_SIZE is None:
+        SPECKLE_FILTER_KERNEL_SIZE = 7
+    if SPECKLE_FILTER_NR_OF_IMAGES is None:
+        SPECKLE_FILTER_NR_OF_IMAGES = 10
+    if TERRAIN_FLATTENING_MODEL is None:
+        TERRAIN_FLATTENING_MODEL = 'VOLUME'
+    if TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER is None:
+        TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER = 0
+    if FORMAT is None:
+        FORMAT = 'DB'
+    if ORBIT is None:
+        ORBIT = 'DESCENDING'
+
+    pol_required = ['VV', 'VH', 'VVVH']
+    if (POLARIZATION not in pol_required):
+        raise ValueError("ERROR!!! Parameter POLARIZATION not correctly defined")
+
+    orbit_required = ['ASCENDING', 'DESCENDING', 'BOTH']
+    if (ORBIT not in orbit_required):
+        raise ValueError("ERROR!!! Parameter ORBIT not correctly defined")
+
+    model_required = ['DIRECT', 'VOLUME']
+    if (TERRAIN_FLATTENING_MODEL not in model_required):
+        raise ValueError("ERROR!!! Parameter TERRAIN_FLATTENING_MODEL not correctly defined")
+
+    format_required = ['LINEAR', 'DB']
+    if (FORMAT not in format_required):
+        raise ValueError("ERROR!!! FORMAT not correctly defined")
+
+    frame_needed = ['MONO', 'MULTI']
+    if (SPECKLE_FILTER_FRAMEWORK not in frame_needed):
+        raise ValueError("ERROR!!! SPECKLE_FILTER_FRAMEWORK not correctly defined")
+
+    format_sfilter = ['BOXCAR', 'LEE', 'GAMMA MAP'
+              ,'REFINED LEE', 'LEE SIGMA']
+    if (SPECKLE_FILTER not in format_sfilter):
+        raise ValueError("ERROR!!! SPECKLE_FILTER not correctly defined")
+
+    if (TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER < 0):
+        raise ValueError("ERROR!!! TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER not correctly defined")
+
+    if (SPECKLE_FILTER_KERNEL_SIZE <= 0):
+        raise ValueError("ERROR!!! SPECKLE_FILTER_KERNEL_SIZE not correctly defined")
+
+    OUTPUT_ENCODING = params.get('OUTPUT_ENCODING') or 'FLOAT'
+    encoding_required = ['FLOAT', 'QUANTIZED']
+    if (OUTPUT_ENCODING not in encoding_required):
+        raise ValueError("ERROR!!! OUTPUT_ENCODING not correctly defined")
+    if (OUTPUT_ENCODING == 'QUANTIZED' and FORMAT != 'DB'):
+        raise ValueError("ERROR!!! OUTPUT_ENCODING QUANTIZED requires FORMAT DB")
+
+    EXCLUDE_SCENES = params.get('EXCLUDE_SCENES') or []
+    if isinstance(EXCLUDE_SCENES, str) or not all(isinstance(i, str) for i in EXCLUDE_SCENES):
+        raise ValueError("ERROR!!! EXCLUDE_SCENES must be a list of scene ids")
+
+    INCREMENTAL = params.get('INCREMENTAL') or False
+    if (INCREMENTAL and not (params.get('SAVE_ASSET') and params.get('ASSET_ID'))):
+        raise ValueError("ERROR!!! INCREMENTAL requires SAVE_ASSET and ASSET_ID")
+
+    SHARD_DEGREES = params.get('SHARD_DEGREES')
+    if (SHARD_DEGREES is not None and not 0 < SHARD_DEGREES <= 90):
+        raise ValueError("ERROR!!! SHARD_DEGREES not correctly defined")
+    if (SHARD_DEGREES and params.get('ANGLE_SCALE')):
+        raise ValueError("ERROR!!! ANGLE_SCALE is not supported with SHARD_DEGREES")
+
+    PREVIEW_FACTOR = params.get('PREVIEW_FACTOR') or 1
+    if (int(PREVIEW_FACTOR) != PREVIEW_FACTOR or PREVIEW_FACTOR < 1):
+        raise ValueError("ERROR!!! PREVIEW_FACTOR must be a positive integer")
+
+    TRACK_AFFINE = params.get('TRACK_AFFINE') or False
+
+    checked = dict(params)
+    checked.update({'APPLY_BORDER_NOISE_CORRECTION': APPLY_BORDER_NOISE_CORRECTION,
+                    'APPLY_TERRAIN_FLATTENING': APPLY_TERRAIN_FLATTENING,
+                    'APPLY_SPECKLE_FILTERING': APPLY_SPECKLE_FILTERING,
+                    'POLARIZATION': POLARIZATION,
+                    'ORBIT': ORBIT,
+                    'SPECKLE_FILTER_FRAMEWORK': SPECKLE_FILTER_FRAMEWORK,
+                    'SPECKLE_FILTER': SPECKLE_FILTER,
+                    'SPECKLE_FILTER_KERNEL_SIZE': SPECKLE_FILTER_KERNEL_SIZE,
+                    'SPECKLE_FILTER_NR_OF_IMAGES': SPECKLE_FILTER_NR_OF_IMAGES,
+                    'TERRAIN_FLATTENING_MODEL': TERRAIN_FLATTENING_MODEL,
+                    'TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER': TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER,
+                    'FORMAT': FORMAT,
+                    'OUTPUT_ENCODING': OUTPUT_ENCODING,
+                    'EXCLUDE_SCENES': sorted(EXCLUDE_SCENES),
+                    'INCREMENTAL': INCREMENTAL,
+                    'SHARD_DEGREES': SHARD_DEGREES,
+                    'TRACK_AFFINE': TRACK_AFFINE,
+                    'PREVIEW_FACTOR': int(PREVIEW_FACTOR)})
+    return checked
+
+
+def preview_params(params):
+    """
+    Parameters of the pipeline on scenes downsampled by PREVIEW_FACTOR.
+
+    The speckle filter kernel covers about the same ground as at full resolution:
+    its size is divided by the factor and rounded to an odd size of at least 3.
+    The fixed 7x7 windows of the refined Lee filter are not scaled.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Checked parameters
+
+    Returns
+    -------
+    Dictionary
+        A copy of the parameters with the scaled kernel size
+
+    """
+    FACTOR = params['PREVIEW_FACTOR']
+    K = int(round(params['SPECKLE_FILTER_KERNEL_SIZE'] / FACTOR))
+    if K % 2 == 0:
+        K += 1
+    return dict(params, SPECKLE_FILTER_KERNEL_SIZE=max(K, 3))
+
+
+def _canonical(value):
+    """JSON representation of a parameter value that is stable across runs."""
+    if hasattr(value, 'serialize'):
+        # Earth Engine objects (DEM image, ROI geometry)
+        return {'ee': value.serialize()}
+    if isinstance(value, np.ndarray):
+        digest = hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return {'array': digest, 'shape': list(value.shape), 'dtype': str(value.dtype)}
+    if callable(value):
+        # a function (local DEM) is identified by its name
+        return {'function': getattr(value, '__module__', '') + '.' + getattr(value, '__qualname__', repr(value))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items())}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def param_hash(params, keys=OUTPUT_KEYS):
+    """
+    Short hash of the processing configuration.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Checked parameters
+    keys : tuple
+        Parameters included in the hash, OUTPUT_KEYS or RATIO_KEYS
+
+    Returns
+    -------
+    string
+        16 hexadecimal digits, equal for runs whose outputs (or ratios) are interchangeable
+
+    """
+    config = {key: _canonical(params.get(key)) for key in keys}
+    if not config.get('CLIP_TO_ROI'):
+        config.pop('ROI', None)
+    if not config.get('APPLY_TERRAIN_FLATTENING'):
+        config.pop('DEM', None)
+    for key, default in _HASH_DEFAULTS.items():
+        if config.get(key) in (None, default):
+            # the hashes of the runs made before the parameter existed stay valid
+            config.pop(key, None)
+    text = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
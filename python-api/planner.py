@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: planner.py
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Pre-flight cost estimate of an s1_preproc parameter dictionary.
+
+    The planner resolves the parameters against a local metadata catalog (the scene headers
+    of batch.scan_catalog, or a JSON file with a list of them) without reading any band,
+    and reports the selected scenes per track, the processed and exported pixels, the
+    output bytes, the estimated peak memory of a whole-scene local run and the compute
+    cost of every stage. The cost model holds the seconds per megapixel (one band) of
+    every stage; DEFAULT_COST_MODEL was measured with benchmark.py and calibrate derives a
+    model from the results file of a benchmark run on the target machine. On Earth Engine
+    the seconds are not EECU-seconds, but the shares of the stages and the savings of the
+    suggestions carry over.
+
+    The planner also suggests cheaper settings with the same result in the region of
+    interest: pushing the ROI down to the processed and exported window, tiled execution
+    within a memory budget, sharded export of large images and the quantized encoding.
+
+    On Earth Engine, reduceNeighborhood with optimization='window' (a running window) already
+    computes the statistics of the boxcar, Lee, Gamma MAP and Lee sigma filters in
+    speckle_filter.py. It is not an s1_preproc parameter, so it is not suggested. It needs a
+    homogeneous kernel and a single input reducer: the directional windows of the refined Lee
+    filter (rect_kernel, diag_kernel, fixed kernels with zero weights) do not qualify. Its 3x3
+    mean and variance and the 3x3 bright pixel count of Lee sigma would, but the EECU they
+    would save cannot be estimated offline (profiler.py measures them on Earth Engine).
+
+    ROI is a bounding box [xmin, ymin, xmax, ymax] in the coordinates of the scene grid, as
+    in the job files of batch.py; other ROI values (ee.Geometry) cover the whole scenes.
+
+    Usage:
+        python planner.py params.json --catalog scenes/ --benchmark results.json
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import batch
+import local_terrain_flattening as ltf
+import local_wrapper
+import scheduling
+
+# seconds per megapixel of one band, measured with benchmark.py (1024 px scenes)
+DEFAULT_COST_MODEL = {'border_noise_correction': 0.0012,
+                      'speckle/boxcar': 0.062,
+                      'speckle/lee': 0.055,
+                      'speckle/gamma_map': 0.068,
+                      'speckle/refined_lee': 2.0,
+                      'speckle/lee_sigma': 0.12,
+                      # per temporal neighbour, on top of the spatial filter
+                      'multitemporal/neighbour': 0.0054,
+                      'terrain/volume': 0.060,
+                      'terrain/direct': 0.063,
+                      'output/db': 0.0012,
+                      'encoding/quantized': 0.0025}
+
+# largest exported image, in pixels per band, before sharding is suggested
+SHARD_PIXELS = 2.5e8
+# shard sizes considered, in degrees
+SHARD_SIZES = (0.1, 0.25, 0.5, 1.0, 2.0)
+# meters per degree of latitude
+METERS_PER_DEGREE = 111320.0
+
+# ---------------------------------------------------------------------------//
+# Cost model
+# ---------------------------------------------------------------------------//
+
+def _case_key(name):
+    """('speckle/lee', 'k7', 1024) for 'speckle/lee/k7/1024px', the key of the cost model first."""
+    parts = name.split('/')
+    size = int(parts[-1][:-2]) if parts[-1].endswith('px') else 0
+    return '/'.join(parts[:2]), parts[2:-1], size
+
+
+def calibrate(results, model=None):
+    """
+    Cost model from the results of benchmark.py.
+
+    Parameters
+    ----------
+    results : list
+        The 'results' of a benchmark results file (see benchmark.run_case)
+    model : dict, optional
+        Model whose entries are kept where the results have no case, DEFAULT_COST_MODEL
+        by default
+
+    Returns
+    -------
+    dict
+        Stage -> seconds per megapixel, averaged over the kernel sizes of the largest
+        scene size of every case
+
+    """
+    model = dict(DEFAULT_COST_MODEL if model is None else model)
+    cases = [_case_key(entry['name']) + (1.0 / entry['throughput_mpx_s'],)
+             for entry in results if entry.get('throughput_mpx_s', 0) > 0]
+    largest = {}
+    for key, options, size, cost in cases:
+        largest[key] = max(largest.get(key, 0), size)
+    costs = {}
+    for key, options, size, cost in cases:
+        if size == largest[key] and not key.startswith('multitemporal/'):
+            costs.setdefault(key, []).append(cost)
+    for key, values in costs.items():
+        model[key] = sum(values) / len(values)
+
+    # a multi-temporal case costs the spatial filter of every image plus the neighbours
+    spatial = {(key, tuple(options), size): cost for key, options, size, cost in cases}
+    neighbours = []
+    for key, options, size, cost in cases:
+        if not key.startswith('multitemporal/'):
+            continue
+        kernel = tuple(option for option in options if option.startswith('k'))
+        count = [int(option[1:]) for option in options if option.startswith('n')]
+        mono = spatial.get(('speckle/' + key.split('/')[1], kernel, size))
+        if mono is not None and count:
+            neighbours.append(max(cost - mono, 0.0) / count[0])
+    if neighbours:
+        model['multitemporal/neighbour'] = sum(neighbours) / len(neighbours)
+    return model
+
+
+def load_cost_model(path=None):
+    """DEFAULT_COST_MODEL, calibrated with a benchmark results file if given."""
+    if path is None:
+        return dict(DEFAULT_COST_MODEL)
+    with open(path) as f:
+        return calibrate(json.load(f)['results'])
+
+
+def stage_costs(params, model):
+    """
+    Seconds per megapixel (one band) of every stage of a parameter set.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Checked parameters
+    model : dict
+        Cost model, see calibrate
+
+    Returns
+    -------
+    dict
+        Stage name -> seconds per megapixel, in processing order
+
+    """
+    costs = {}
+    if (params['APPLY_BORDER_NOISE_CORRECTION']):
+        costs['border_noise_correction'] = model['border_noise_correction']
+    if (params['APPLY_SPECKLE_FILTERING']):
+        cost = model['speckle/' + params['SPECKLE_FILTER'].lower().replace(' ', '_')]
+        if (params['SPECKLE_FILTER_FRAMEWORK'] == 'MULTI'):
+            cost += params['SPECKLE_FILTER_NR_OF_IMAGES'] * model['multitemporal/neighbour']
+        costs['speckle_filtering'] = cost
+    if (params['APPLY_TERRAIN_FLATTENING']):
+        costs['terrain_flattening'] = model['terrain/' + params['TERRAIN_FLATTENING_MODEL'].lower()]
+    costs['output'] = ((model['output/db'] if params['FORMAT'] == 'DB' else 0.0) +
+                       (model['encoding/quantized'] if params['OUTPUT_ENCODING'] == 'QUANTIZED' else 0.0))
+    return costs
+
+
+# ---------------------------------------------------------------------------//
+# Catalog
+# ---------------------------------------------------------------------------//
+
+def load_catalog(source):
+    """
+    Scene headers of a metadata catalog.
+
+    Parameters
+    ----------
+    source : string or list
+        A scene directory (see batch.scan_catalog), a JSON file with a list of headers
+        ({'properties', 'bands', 'shape'}), or the list of headers itself
+
+    Returns
+    -------
+    list
+
+    """
+    if isinstance(source, list):
+        return source
+    if os.path.isdir(source):
+        return batch.scan_catalog(source)
+    with open(source) as f:
+        catalog = json.load(f)
+    for entry in catalog:
+        entry['shape'] = tuple(entry['shape'])
+    return catalog
+
+
+def _window(params, entry):
+    """Pixel window of the ROI on a scene, the whole scene without a bounding box ROI, None if outside."""
+    rows, cols = entry['shape']
+    roi, transform = params.get('ROI'), entry['properties'].get('transform')
+    if isinstance(roi, (list, tuple)) and len(roi) == 4 and transform is not None:
+        return batch.roi_window(roi, transform, (rows, cols))
+    return (slice(0, rows), slice(0, cols))
+
+
+def _grow(window, HALO, shape):
+    return (slice(max(window[0].start - HALO, 0), min(window[0].stop + HALO, shape[0])),
+            slice(max(window[1].start - HALO, 0), min(window[1].stop + HALO, shape[1])))
+
+
+def _track(entry):
+    return scheduling.track_name(scheduling.track(entry['properties']))
+
+
+# ---------------------------------------------------------------------------//
+# Plan
+# ---------------------------------------------------------------------------//
+
+def _bytes_per_pixel(params, names, ANGLE_FACTOR=1.0):
+    """Output bytes per exported pixel: backscatter bands and the angle band."""
+    if (params['OUTPUT_ENCODING'] == 'QUANTIZED'):
+        return 2 * len(names) + 2 * ANGLE_FACTOR
+    backscatter = 2 if params.get('PRECISION') == 'HALF' else 4
+    return backscatter * len(names) + 4 * ANGLE_FACTOR
+
+
+def _peak_copies(params):
+    """Copies of the backscatter stack held at the peak of a whole-scene local run."""
+    copies = 2
+    if (params['APPLY_SPECKLE_FILTERING'] and params['SPECKLE_FILTER_FRAMEWORK'] == 'MULTI'):
+        # the filtered images and the ratios of all scenes
+        copies += 2
+    if (params['APPLY_TERRAIN_FLATTENING']):
+        copies += 1
+    return copies
+
+
+def _memory_mb():
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / 2**20
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _shard_degrees(pixels, spacing, SHARD_PIXELS):
+    """Largest shard size whose shards have at most SHARD_PIXELS pixels."""
+    candidates = [degrees for degrees in SHARD_SIZES
+                  if (degrees * METERS_PER_DEGREE) ** 2 / (spacing[0] * spacing[1]) <= SHARD_PIXELS]
+    return max(candidates) if candidates else min(SHARD_SIZES)
+
+
+def plan(params, catalog, model=None, MEMORY_MB=None, SHARD_PIXELS=SHARD_PIXELS):
+    """
+    Estimate the cost of a parameter set without processing.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by s1_preproc (wrapper or local_wrapper)
+    catalog : list or string
+        Metadata catalog, see load_catalog
+    model : dict, optional
+        Cost model, see calibrate; DEFAULT_COST_MODEL by default
+    MEMORY_MB : float, optional
+        Memory of the machine of a local run, the physical memory by default
+    SHARD_PIXELS : float
+        Largest exported image, in pixels per band, before sharding is suggested
+
+    Returns
+    -------
+    dict
+        'scenes', 'tracks' (track -> scenes), 'bands', 'processed_pixels' and
+        'exported_pixels' (per band, all scenes), 'output_bytes', 'peak_memory_mb'
+        (whole-scene local run), 'stages' (stage -> {'seconds', 'share'}), 'seconds'
+        and 'suggestions', each {'setting', 'reason', 'seconds_saved', 'bytes_saved'}
+
+    """
+    model = dict(DEFAULT_COST_MODEL if model is None else model)
+    params = local_wrapper.check_params(dict(dict.fromkeys(batch.PARAMETER_KEYS), **params))
+    catalog = load_catalog(catalog)
+    start, stop = batch.millis(params['START_DATE']), batch.millis(params['STOP_DATE'])
+    names = ['VV', 'VH'] if params['POLARIZATION'] == 'VVVH' else [params['POLARIZATION']]
+    F2 = params['PREVIEW_FACTOR'] ** 2
+    ANGLE_FACTOR = 1.0
+    if params.get('ANGLE_SCALE'):
+        ANGLE_FACTOR = (10.0 * params['PREVIEW_FACTOR'] / params['ANGLE_SCALE']) ** 2
+
+    report = {'scenes': 0, 'tracks': {}, 'bands': names, 'processed_pixels': 0, 'exported_pixels': 0,
+              'output_bytes': 0, 'peak_memory_mb': 0.0, 'stages': {}, 'seconds': 0.0, 'suggestions': []}
+    # processed and exported pixels of the current settings and of the ROI window
+    window_processed, window_exported, largest, spacing = 0, 0, 0, (10.0, 10.0)
+    for entry in catalog:
+        if not batch.matches(entry, params, start, stop):
+            continue
+        window = _window(params, entry)
+        if window is None:
+            # the scene does not intersect the ROI (filterBounds)
+            continue
+        shape = entry['shape']
+        spacing = ltf.pixel_size({'properties': entry['properties']})
+        HALO = local_wrapper.halo(params, spacing)
+        full = shape[0] * shape[1]
+        roi = batch.pixels(window)
+        # the sharded export covers the footprint within the ROI, the other exports the whole footprint
+        exported = roi if params.get('SHARD_DEGREES') else full
+        processed = batch.pixels(_grow(window, HALO, shape)) if params.get('SHARD_DEGREES') else full
+        track = _track(entry)
+        report['scenes'] += 1
+        report['tracks'][track] = report['tracks'].get(track, 0) + 1
+        report['processed_pixels'] += processed // F2
+        report['exported_pixels'] += exported // F2
+        window_processed += batch.pixels(_grow(window, HALO, shape)) // F2
+        window_exported += roi // F2
+        largest = max(largest, exported // F2)
+
+    bands = len(names)
+    report['output_bytes'] = int(report['exported_pixels'] * _bytes_per_pixel(params, names, ANGLE_FACTOR))
+    costs = stage_costs(params, model)
+    for stage, cost in costs.items():
+        report['stages'][stage] = {'seconds': report['processed_pixels'] * bands / 1e6 * cost}
+    report['seconds'] = sum(stage['seconds'] for stage in report['stages'].values())
+    for stage in report['stages'].values():
+        stage['share'] = stage['seconds'] / report['seconds'] if report['seconds'] else 0.0
+    itemsize = 2 if params.get('PRECISION') == 'HALF' else 4
+    report['peak_memory_mb'] = report['processed_pixels'] * bands * itemsize * _peak_copies(params) / 2**20
+    seconds_per_pixel = report['seconds'] / report['processed_pixels'] if report['processed_pixels'] else 0.0
+    bytes_per_pixel = report['output_bytes'] / report['exported_pixels'] if report['exported_pixels'] else 0.0
+
+    # 1. ROI pushdown: process and export the ROI window instead of the whole footprint
+    if window_exported < report['exported_pixels']:
+        report['suggestions'].append({
+            'setting': {'SHARD_DEGREES': _shard_degrees(largest, spacing, SHARD_PIXELS)},
+            'reason': 'the ROI covers {:.0%} of the exported pixels: export only the footprint within the ROI '
+                      '(sharded export on Earth Engine, a batch.py job with the ROI locally)'.format(
+                          window_exported / float(report['exported_pixels'])),
+            'seconds_saved': (report['processed_pixels'] - window_processed) * seconds_per_pixel,
+            'bytes_saved': int((report['exported_pixels'] - window_exported) * bytes_per_pixel)})
+    # 2. sharded export of images too large for one task
+    elif not params.get('SHARD_DEGREES') and largest > SHARD_PIXELS:
+        report['suggestions'].append({
+            'setting': {'SHARD_DEGREES': _shard_degrees(largest, spacing, SHARD_PIXELS)},
+            'reason': 'the largest image has {:.0f} Mpx per band: export it in independent shards'.format(
+                largest / 1e6),
+            'seconds_saved': 0.0, 'bytes_saved': 0})
+    # 3. tiled execution when the whole scenes do not fit in memory
+    MEMORY_MB = MEMORY_MB or _memory_mb()
+    if MEMORY_MB and report['peak_memory_mb'] > MEMORY_MB and not params['MEMORY_BUDGET_MB']:
+        report['suggestions'].append({
+            'setting': {'MEMORY_BUDGET_MB': max(int(MEMORY_MB // 2), 1)},
+            'reason': 'a whole-scene local run needs about {:.0f} MB of {:.0f} MB: process the scenes in '
+                      'tiles with halos within a memory budget'.format(report['peak_memory_mb'], MEMORY_MB),
+            'seconds_saved': 0.0, 'bytes_saved': 0})
+    # 4. quantized encoding of dB outputs
+    if (params['FORMAT'] == 'DB' and params['OUTPUT_ENCODING'] == 'FLOAT'):
+        quantized = dict(params, OUTPUT_ENCODING='QUANTIZED')
+        saved = report['exported_pixels'] * (bytes_per_pixel - _bytes_per_pixel(quantized, names, ANGLE_FACTOR))
+        report['suggestions'].append({
+            'setting': {'OUTPUT_ENCODING': 'QUANTIZED'},
+            'reason': 'int16 dB in 0.01 dB steps and uint16 angle instead of float32',
+            'seconds_saved': -report['processed_pixels'] * bands / 1e6 * model['encoding/quantized'],
+            'bytes_saved': int(saved)})
+    return report
+
+
+def format_report(report):
+    lines = ['{} scene(s) in {} track(s): {}'.format(
+        report['scenes'], len(report['tracks']),
+        ', '.join('{} ({})'.format(track, count) for track, count in sorted(report['tracks'].items())))]
+    lines.append('{:.1f} Mpx processed, {:.1f} Mpx exported per band ({}), {:.1f} MB output, '
+                 'peak memory of a whole-scene local run {:.0f} MB'.format(
+                     report['processed_pixels'] / 1e6, report['exported_pixels'] / 1e6,
+                     '/'.join(report['bands']), report['output_bytes'] / 2**20, report['peak_memory_mb']))
+    lines.append('{:<28}{:>12}{:>8}'.format('stage', 'seconds', 'share'))
+    for stage, entry in report['stages'].items():
+        lines.append('{:<28}{:>12.1f}{:>8.0%}'.format(stage, entry['seconds'], entry['share']))
+    lines.append('{:<28}{:>12.1f}'.format('total', report['seconds']))
+    for suggestion in report['suggestions']:
+        lines.append('SUGGESTION: {} - {} (saves {:.1f} s, {:.1f} MB)'.format(
+            json.dumps(suggestion['setting']), suggestion['reason'], suggestion['seconds_saved'],
+            suggestion['bytes_saved'] / 2**20))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Estimate the cost of an s1_preproc parameter set.')
+    parser.add_argument('params', help='JSON parameter file')
+    parser.add_argument('--catalog', required=True, help='scene directory or JSON list of scene headers')
+    parser.add_argument('--benchmark', help='benchmark.py results to calibrate the cost model')
+    parser.add_argument('--memory-mb', type=float, help='memory of the machine of a local run')
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args(argv)
+
+    with open(args.params) as f:
+        params = json.load(f)
+    report = plan(params, args.catalog, load_cost_model(args.benchmark), args.memory_mb)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
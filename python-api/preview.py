@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Progressive preview of the processed collection over a large region of interest,
+             the counterpart of local_preview.py.
+
+    The processing chain of wrapper.preproc_stages is built on a pyramid of resolutions
+    (PREVIEW_FACTOR, see s1_ard.py): at a factor F the scenes are the means of F x F blocks
+    of 10 m pixels, the DEM is averaged to the same resolution and the speckle filter kernel
+    is scaled to about the same ground size (parameters.preview_params). A level at F = 16
+    reads 256 times fewer pixels than the full resolution. Building a level is lazy, the
+    work is done at the scale of the level when it is displayed (getMapId, thumbnails) or
+    sampled, so the levels are yielded coarsest first and a finer level, possibly of a
+    smaller region, is only computed when asked for.
+"""
+
+import parameters
+import tracing
+import wrapper
+
+
+def level(params, FACTOR, ROI=None):
+    """
+    Processed collection at one level of the pyramid.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by wrapper.s1_preproc; nothing is exported
+    FACTOR : integer
+        Downsampling factor, 1 for the full resolution
+    ROI : ee.Geometry, optional
+        Region to refine, the ROI of params by default
+
+    Returns
+    -------
+    ee.ImageCollection
+        The processed collection at 10 x FACTOR meters
+
+    """
+    params = dict(params, PREVIEW_FACTOR=FACTOR, SAVE_ASSET=False)
+    if ROI is not None:
+        params['ROI'] = ROI
+    params = parameters.check_params(params)
+    with tracing.span('preview_level', factor=FACTOR):
+        for stage, s1 in wrapper.preproc_stages(params):
+            pass
+    return s1
+
+
+def levels(params, FACTORS=(16, 4, 1), ROI=None):
+    """
+    Levels of the pyramid from the coarsest to the finest, built on demand.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by wrapper.s1_preproc
+    FACTORS : list
+        Downsampling factors of the levels
+    ROI : ee.Geometry, optional
+        Region of the levels, the ROI of params by default
+
+    Yields
+    ------
+    tuple
+        (factor, ee.ImageCollection)
+
+    """
+    for FACTOR in sorted(set(FACTORS), reverse=True):
+        yield FACTOR, level(params, FACTOR, ROI)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Opt-in Earth Engine profiling of s1_preproc. A representative evaluation is run
+             after every stage with EE profiling enabled and the EECU cost of each stage is
+             obtained as the difference to the previous stage. Parsing and aggregation of the
+             profile tables are pure functions so recorded profiles can be analysed offline.
+"""
+
+import csv
+import io
+import re
+
+import ee
+import tracing
+
+# ---------------------------------------------------------------------------//
+# Profile parsing
+# ---------------------------------------------------------------------------//
+
+# normalised column names of the EE profile table
+_COLUMNS = {'description': 'description',
+            'count': 'count',
+            'eecu·s': 'eecu_s',
+            'eecu-s': 'eecu_s',
+            'eecu_s': 'eecu_s',
+            'compute': 'eecu_s',
+            'compute[eecu-s]': 'eecu_s',
+            'peakmem': 'peak_mem',
+            'peak mem': 'peak_mem',
+            'peak_mem': 'peak_mem'}
+
+_UNITS = {'': 1, 'k': 1e3, 'm': 1e6, 'g': 1e9, 't': 1e12}
+
+
+def _to_bytes(value):
+    match = re.match(r'^\s*([0-9.]+)\s*([kmgtKMGT]?)[bB]?\s*$', value)
+    if match is None:
+        return 0.0
+    return float(match.group(1)) * _UNITS[match.group(2).lower()]
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+def _normalise_row(row):
+    out = {'description': '', 'count': 0, 'eecu_s': 0.0, 'peak_mem': 0.0}
+    for key, value in row.items():
+        column = _COLUMNS.get(key.strip().lower())
+        if column is None or value is None:
+            continue
+        value = value.strip()
+        if column == 'description':
+            out['description'] = value
+        elif column == 'count':
+            out['count'] = int(_to_number(value))
+        elif column == 'eecu_s':
+            out['eecu_s'] = _to_number(value)
+        else:
+            out['peak_mem'] = _to_bytes(value)
+    return out
+
+
+def parse_profile(text):
+    """
+    Parse the text returned by Earth Engine's Profile.getProfiles.
+
+    Both the comma separated form and the whitespace aligned table printed by
+    ``ee.profilePrinting`` are accepted. In the aligned table the description
+    is the last column and may contain spaces.
+
+    Parameters
+    ----------
+    text : string
+        The profile table
+
+    Returns
+    -------
+    list
+        One dictionary per row with the keys description, count, eecu_s
+        and peak_mem (bytes)
+
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return []
+
+    if ',' in lines[0]:
+        reader = csv.DictReader(io.StringIO('\n'.join(lines)))
+        return [_normalise_row(row) for row in reader]
+
+    header = lines[0].split()
+    # "Peak Mem" may be printed as two words
+    header = ' '.join(header).replace('Peak Mem', 'PeakMem').split()
+    rows = []
+    for line in lines[1:]:
+        fields = line.split(None, len(header) - 1)
+        if len(fields) < len(header):
+            continue
+        rows.append(_normalise_row(dict(zip(header, fields))))
+    return rows
+
+
+def aggregate(rows):
+    """
+    Sum profile rows by description.
+
+    Parameters
+    ----------
+    rows : list
+        Rows as returned by parse_profile, possibly of several profiles
+
+    Returns
+    -------
+    dict
+        description -> {'count', 'eecu_s', 'peak_mem'} where peak_mem is the
+        maximum over the rows
+
+    """
+    out = {}
+    for row in rows:
+        entry = out.setdefault(row['description'], {'count': 0, 'eecu_s': 0.0, 'peak_mem': 0.0})
+        entry['count'] += row['count']
+        entry['eecu_s'] += row['eecu_s']
+        entry['peak_mem'] = max(entry['peak_mem'], row['peak_mem'])
+    return out
+
+
+def attribute_stages(stage_profiles, top=5):
+    """
+    Map the profiles of cumulative evaluations onto the pipeline stages.
+
+    The evaluation after stage k contains the work of all stages up to k, so
+    the cost of stage k is the difference to the evaluation after stage k-1.
+    Negative differences (e.g. from server side caching) are clipped to zero.
+
+    Parameters
+    ----------
+    stage_profiles : list
+        Ordered (stage name, rows) tuples, rows as returned by parse_profile
+    top : integer
+        Number of algorithms listed per stage
+
+    Returns
+    -------
+    list
+        One dictionary per stage with the keys stage, eecu_s, cumulative_eecu_s,
+        share and algorithms (the most expensive algorithms added by the stage)
+
+    """
+    report = []
+    previous = {}
+    for stage, rows in stage_profiles:
+        current = aggregate(rows)
+        cumulative = sum(entry['eecu_s'] for entry in current.values())
+        added = []
+        for description, entry in current.items():
+            delta = entry['eecu_s'] - previous.get(description, {}).get('eecu_s', 0.0)
+            if delta > 0:
+                added.append({'description': description, 'eecu_s': delta,
+                              'count': entry['count'] - previous.get(description, {}).get('count', 0)})
+        added.sort(key=lambda entry: entry['eecu_s'], reverse=True)
+        stage_cost = max(0.0, cumulative - sum(entry['eecu_s'] for entry in previous.values()))
+        report.append({'stage': stage,
+                       'eecu_s': stage_cost,
+                       'cumulative_eecu_s': cumulative,
+                       'algorithms': added[:top]})
+        previous = current
+
+    total = sum(entry['eecu_s'] for entry in report)
+    for entry in report:
+        entry['share'] = entry['eecu_s'] / total if total > 0 else 0.0
+    return report
+
+
+def format_report(report):
+    """
+    Render a stage report as a text table.
+
+    Parameters
+    ----------
+    report : list
+        As returned by attribute_stages
+
+    Returns
+    -------
+    string
+        The formatted report
+
+    """
+    lines = ['{:<26}{:>12}{:>9}  {}'.format('stage', 'EECU-s', 'share', 'top algorithms')]
+    for entry in report:
+        algorithms = ', '.join('{} ({:.3g})'.format(a['description'], a['eecu_s'])
+                               for a in entry['algorithms'][:3])
+        lines.append('{:<26}{:>12.4g}{:>8.1f}%  {}'.format(entry['stage'], entry['eecu_s'],
+                                                          100 * entry['share'], algorithms))
+    return '\n'.join(lines)
+
+
+# ---------------------------------------------------------------------------//
+# Profile capture
+# ---------------------------------------------------------------------------//
+
+def capture_profile(obj):
+    """
+    Evaluate an Earth Engine object with profiling enabled.
+
+    Parameters
+    ----------
+    obj : ee.ComputedObject
+        The object to evaluate
+
+    Returns
+    -------
+    string
+        The profile table of the evaluation
+
+    """
+    profile_ids = []
+    with ee.data.profiling(profile_ids.append):
+        tracing.get_info(obj)
+    get_profiles = ee.ApiFunction.lookup('Profile.getProfiles').call
+    return tracing.get_info(get_profiles(ids=profile_ids))
+
+
+def _probe(collection, region, scale):
+    image = ee.Image(collection.first())
+    return image.reduceRegion(reducer=ee.Reducer.mean(),
+                              geometry=region,
+                              scale=scale,
+                              maxPixels=1e9,
+                              bestEffort=True)
+
+
+def profile_s1_preproc(params, region=None, scale=10, probe_radius=1000):
+    """
+    Profile the stages of s1_preproc on a representative evaluation.
+
+    After every stage the mean of the first processed image over a small
+    region is evaluated with profiling enabled. Exports are not started.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by wrapper.s1_preproc
+    region : ee.Geometry, optional
+        Region of the probe. Defaults to a disc of probe_radius meters around
+        the centroid of the ROI.
+    scale : float
+        Scale of the probe in meters
+    probe_radius : float
+        Radius of the default probe region in meters
+
+    Returns
+    -------
+    tuple
+        (report, profiles) where report is the stage report of
+        attribute_stages and profiles the raw profile text per stage
+
+    """
+    # wrapper initialises Earth Engine on import, the parsing above works offline
+    import wrapper
+
+    params = wrapper.check_params(params)
+    if region is None:
+        region = params['ROI'].centroid(1).buffer(probe_radius)
+
+    profiles = []
+    with tracing.span('profile_s1_preproc', kind='run', backend='ee'):
+        for stage, collection in wrapper.preproc_stages(params):
+            with tracing.span('profile_' + stage):
+                profiles.append((stage, capture_profile(_probe(collection, region, scale))))
+
+    report = attribute_stages([(stage, parse_profile(text)) for stage, text in profiles])
+    return report, profiles
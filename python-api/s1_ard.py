@@ -39,9 +39,32 @@ License: This code is distributed under the MIT License.
         DEM : digital elevation model (DEM) to use (as EE asset)
         TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER : additional buffer parameter for passive layover/shadow mask in meters
         FORMAT : the output format for the processed collection. this can be 'LINEAR' or 'DB'.
+        OUTPUT_ENCODING : (Optional) 'FLOAT' (default) or 'QUANTIZED'. QUANTIZED stores the dB backscatter as int16 in 0.01 dB
+                          steps and the angle as uint16 in 0.001 degree steps, with the scale and offset in the image
+                          properties (see encoding.py, decode with helper.dequantize). Requires FORMAT 'DB'.
         CLIP_TO_ROI: (Optional) Clip the processed image to the region of interest.
         SAVE_ASSETS : (Optional) Exports the processed collection to an asset.
         ASSET_ID : (Optional) The user id path to save the assets
+        ANGLE_SCALE : (Optional) Export the smooth angle band at this coarser scale in meters as a separate asset
+                      '<ASSET_ID>/<image id>_angle' instead of at 10 m with the backscatter bands
+        CHECK_GRAPH : (Optional) Analyze the size of the expression graph before submission and warn when it
+                      is likely to fail with "computation too complex" (see graph_analyzer.py)
+        EXCLUDE_SCENES : (Optional) List of scene ids (system:index) not to process
+        INCREMENTAL : (Optional) Append the hash of the processing parameters to the asset names
+                      ('<ASSET_ID>/<image id>_<hash>') and skip the scenes already exported with the same
+                      parameters, so that a rerun processes only the new acquisitions. Requires SAVE_ASSET.
+        SHARD_DEGREES : (Optional) Export every image in shards, the cells of a global longitude/latitude grid of
+                        this size in degrees, as independent tasks to '<ASSET_ID>/<image id>_r<row>_c<col>'. A rerun
+                        exports only the missing and failed shards (see sharded_export.py, sharded_export.assemble
+                        mosaics the shards afterwards).
+        SHARD_MANIFEST : (Optional) JSON file tracking the shard tasks, so that a rerun does not resubmit the
+                         shards that are still running
+        PREVIEW_FACTOR : (Optional) Process at a resolution this many times coarser (10 m x factor) for a quick look:
+                         the backscatter is averaged over blocks of factor x factor pixels, the DEM is averaged to the
+                         same resolution and the speckle filter kernel is scaled down (see preview.py). 1 by default.
+        TRACK_AFFINE : (Optional) Submit the export tasks track by track (relative orbit and pass), each track in time
+                       order, instead of in the order of the collection; the local backend processes every track
+                       on its own worker (see scheduling.py).
         
     Returns:
         An ee.ImageCollection with an analysis ready Sentinel 1 imagery with the specified polarization images and angle band.
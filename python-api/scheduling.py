@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Track-affine scheduling (TRACK_AFFINE).
+
+    The DEM on the footprint of a relative orbit, its gradient, the terrain geometry seen
+    from the heading of the track and the temporal neighbours of the multi-temporal filter
+    are specific to a track (relativeOrbitNumber_start, orbitProperties_pass). With ORBIT
+    'BOTH' the scenes come in date order, ascending and descending interleaved, so a cache
+    of these intermediates drops the entries of one track to make room for the other.
+
+    partition groups the scenes by track, each in time order, assign pins every track to
+    one worker (the tracks with the most scenes first, to the least loaded worker) and
+    run_pinned processes the tracks of a worker one after the other on its own thread.
+    TrackCache is the cache of the track specific intermediates, a least recently used
+    cache with a byte budget that counts its hits and misses per track. Does not import ee.
+"""
+
+import collections
+import concurrent.futures
+import threading
+import time
+
+# budget of a TrackCache created by the local pipeline
+TRACK_CACHE_MB = 1024
+
+# ---------------------------------------------------------------------------//
+# Tracks
+# ---------------------------------------------------------------------------//
+
+def track(properties):
+    """(relativeOrbitNumber_start, orbitProperties_pass) of a scene."""
+    return (properties.get('relativeOrbitNumber_start'), properties.get('orbitProperties_pass'))
+
+
+def track_name(key):
+    """Printable name of a track, e.g. '37_DESCENDING'."""
+    return '{}_{}'.format(*('?' if part is None else part for part in key))
+
+
+def partition(items, properties=lambda item: item['properties']):
+    """
+    Group scenes by track.
+
+    Parameters
+    ----------
+    items : list
+        Local images, catalog entries or anything properties() maps to the scene properties
+    properties : function, optional
+        Properties of an item, item['properties'] by default
+
+    Returns
+    -------
+    OrderedDict
+        Track -> items of the track in time order ('system:time_start'); the tracks are
+        ordered by their first acquisition
+
+    """
+    tracks = collections.OrderedDict()
+    ordered = sorted(items, key=lambda item: properties(item).get('system:time_start', 0))
+    for item in ordered:
+        tracks.setdefault(track(properties(item)), []).append(item)
+    return tracks
+
+
+def assign(tracks, WORKERS):
+    """
+    Pin every track to a worker, balancing the number of scenes.
+
+    Parameters
+    ----------
+    tracks : dict
+        Track -> scenes, see partition
+    WORKERS : integer
+        Number of workers
+
+    Returns
+    -------
+    dict
+        Track -> worker index
+
+    """
+    load = [0] * max(int(WORKERS), 1)
+    workers = {}
+    for key in sorted(tracks, key=lambda key: -len(tracks[key])):
+        worker = load.index(min(load))
+        workers[key] = worker
+        load[worker] += len(tracks[key])
+    return workers
+
+
+def run_pinned(tracks, process, WORKERS):
+    """
+    Process every track on the worker it is pinned to.
+
+    Parameters
+    ----------
+    tracks : dict
+        Track -> scenes in time order, see partition
+    process : function
+        Called as process(track, scenes) on the thread of the worker of the track
+    WORKERS : integer
+        Number of workers, each a single thread running its tracks one after the other
+
+    Returns
+    -------
+    OrderedDict
+        Track -> {'result': return value of process, 'worker', 'scenes', 'seconds'},
+        in the order of tracks
+
+    """
+    workers = assign(tracks, WORKERS)
+    pools = [concurrent.futures.ThreadPoolExecutor(max_workers=1)
+             for _ in range(max(workers.values(), default=0) + 1)]
+
+    def timed(key):
+        t0 = time.perf_counter()
+        result = process(key, tracks[key])
+        return result, time.perf_counter() - t0
+
+    try:
+        futures = collections.OrderedDict((key, pools[workers[key]].submit(timed, key)) for key in tracks)
+        out = collections.OrderedDict()
+        for key, future in futures.items():
+            result, seconds = future.result()
+            out[key] = {'result': result, 'worker': workers[key], 'scenes': len(tracks[key]), 'seconds': seconds}
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=True)
+    return out
+
+
+# ---------------------------------------------------------------------------//
+# Cache
+# ---------------------------------------------------------------------------//
+
+def _nbytes(value):
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return getattr(value, 'nbytes', 0)
+
+
+class TrackCache(object):
+    """
+    Thread-safe least recently used cache of track specific intermediates with a byte
+    budget and hit counters per track.
+
+    Parameters
+    ----------
+    max_bytes : integer
+        Budget, the least recently used entries (of any track) are dropped beyond it
+    """
+
+    def __init__(self, max_bytes=TRACK_CACHE_MB * 2**20):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = collections.Counter()
+        self.misses = collections.Counter()
+        self.lock = threading.Lock()
+
+    def get(self, key, item, compute):
+        """
+        Value of item for the track key, computed with compute() on a miss.
+
+        A value is computed outside of the lock; two threads missing the same item
+        compute it both, which does not happen when every track is pinned to a worker.
+        """
+        with self.lock:
+            if (key, item) in self.entries:
+                self.hits[key] += 1
+                self.entries.move_to_end((key, item))
+                return self.entries[(key, item)][0]
+            self.misses[key] += 1
+        value = compute()
+        size = _nbytes(value)
+        with self.lock:
+            if size <= self.max_bytes and (key, item) not in self.entries:
+                self.entries[(key, item)] = (value, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, dropped) = self.entries.popitem(last=False)
+                    self.bytes -= dropped
+        return value
+
+    def scoped(self, scope):
+        """View of the cache whose items are prefixed with scope, e.g. a hash of the DEM."""
+        return _Scoped(self, scope)
+
+    def stats(self):
+        """Hits, misses and hit rate of every track, by track name."""
+        with self.lock:
+            out = {}
+            for key in sorted(set(self.hits) | set(self.misses), key=track_name):
+                lookups = self.hits[key] + self.misses[key]
+                out[track_name(key)] = {'hits': self.hits[key], 'misses': self.misses[key],
+                                        'hit_rate': self.hits[key] / float(lookups) if lookups else 0.0}
+            return out
+
+
+class _Scoped(object):
+
+    def __init__(self, cache, scope):
+        self.cache = cache
+        self.scope = scope
+
+    def get(self, key, item, compute):
+        return self.cache.get(key, (self.scope, item), compute)
+
+    def scoped(self, scope):
+        return _Scoped(self.cache, (self.scope, scope))
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+File: service.py
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Resident ARD processing service.
+
+    The service imports the modules, initializes Earth Engine (ee backend) or indexes the
+    scene catalog (local backend) once, and keeps the loaded scenes and DEMs in memory
+    caches and a pool of worker threads running, so that an on-demand job does not pay
+    for the start-up. Jobs are accepted over HTTP on a TCP port or on a local (Unix)
+    socket and the results are streamed back as newline-delimited JSON events.
+
+    POST /jobs                 submit a job, returns {"id": ...}
+                               local backend: a job of the batch.py job file format,
+                               {"name", "roi", "start_date", "stop_date", "params"}
+                               ee backend: s1_preproc parameters overriding the common ones
+    GET  /jobs/<id>            state of the job
+    GET  /jobs/<id>/events     stream of the job events, one JSON object per line, up
+                               to the final {"event": "done"} or {"event": "failed"}
+    GET  /status               queue depth, running and finished jobs, cache hit rates (per
+                               track for the jobs with TRACK_AFFINE)
+
+    The backends are plain objects with run(job, emit) and stats(); the ee backend takes
+    the preprocessing function as an argument, so that the service can be run against a
+    stub Earth Engine.
+
+    Usage:
+        python service.py --backend local --catalog scenes/ --output ard/ --params params.json --port 8765
+        python service.py --backend ee --params params.json --socket /tmp/s1_ard.sock
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import http.server
+import itertools
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+
+import numpy as np
+
+import local_helper
+import scheduling
+import tracing
+
+# ---------------------------------------------------------------------------//
+# Caches
+# ---------------------------------------------------------------------------//
+
+def _nbytes(value):
+    if isinstance(value, dict) and 'bands' in value:
+        return sum(getattr(band, 'nbytes', 0) for band in value['bands'].values())
+    return getattr(value, 'nbytes', 0)
+
+
+class LRUCache(object):
+    """
+    Thread-safe least recently used cache with a byte budget and hit counters.
+
+    Parameters
+    ----------
+    max_bytes : integer
+        Budget, the least recently used entries are dropped beyond it
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        self.pending = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        """
+        Value of key, computed with compute() on a miss; concurrent requests of a
+        key that is being computed wait for it.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key][0]
+            pending = self.pending.get(key)
+            if pending is None:
+                self.misses += 1
+                self.pending[key] = pending = concurrent.futures.Future()
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+        if not owner:
+            return pending.result()
+        try:
+            value = compute()
+        except Exception as error:
+            with self.lock:
+                del self.pending[key]
+            pending.set_exception(error)
+            raise
+        size = _nbytes(value)
+        with self.lock:
+            del self.pending[key]
+            if size <= self.max_bytes:
+                self.entries[key] = (value, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, dropped) = self.entries.popitem(last=False)
+                    self.bytes -= dropped
+        pending.set_result(value)
+        return value
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'hit_rate': self.hits / float(lookups) if lookups else 0.0,
+                    'entries': len(self.entries), 'mb': self.bytes / 2**20}
+
+
+# ---------------------------------------------------------------------------//
+# Backends
+# ---------------------------------------------------------------------------//
+
+class LocalBackend(object):
+    """
+    Jobs of the local backend, run like the jobs of batch.py on a scene catalog.
+
+    Parameters
+    ----------
+    catalog : string
+        Directory of the scenes (local_helper.save files)
+    output : string
+        Directory of the outputs, <output>/<job id>/<scene id>.npz
+    params : Dictionary
+        Parameters common to all jobs
+    CACHE_MB : float
+        Budget of the scene cache
+    """
+
+    def __init__(self, catalog, output, params, CACHE_MB=2048):
+        import batch
+        self.batch = batch
+        self.folder = catalog
+        self.output = output
+        self.params = params
+        self.scenes = LRUCache(CACHE_MB * 2**20)
+        # DEMs are memory mapped, the cache holds the maps
+        self.dems = LRUCache(float('inf'))
+        # terrain geometry of the tracks, used by the jobs with TRACK_AFFINE
+        self.tracks = scheduling.TrackCache()
+        self.index = None
+        self.index_hits = 0
+        self.index_misses = 0
+        self.lock = threading.Lock()
+
+    def catalog(self):
+        """Scene headers, read again only when the catalog directory changed."""
+        mtime = os.stat(self.folder).st_mtime_ns
+        with self.lock:
+            if self.index is not None and self.index[0] == mtime:
+                self.index_hits += 1
+                return self.index[1]
+            self.index_misses += 1
+        index = (mtime, self.batch.scan_catalog(self.folder))
+        with self.lock:
+            self.index = index
+        return index[1]
+
+    def _load(self, path):
+        return self.scenes.get((path, os.stat(path).st_mtime_ns), lambda: local_helper.load(path))
+
+    def _load_dem(self, path):
+        return self.dems.get((path, os.stat(path).st_mtime_ns), lambda: np.load(path, mmap_mode='r'))
+
+    def run(self, job, emit):
+        import local_wrapper
+        catalog = self.catalog()
+        groups = self.batch.plan({'params': self.params, 'jobs': [job]}, catalog)
+        group = groups[0]
+        emit({'event': 'planned', 'scenes': group['scenes']})
+        if not group['scenes']:
+            return
+        params, tiles = self.batch.load_group(group, catalog, self._load, self._load_dem)
+        if (params['TRACK_AFFINE']):
+            params['TRACK_CACHE'] = self.tracks
+        output, report = local_wrapper.run(params, tiles)
+        for name, track in report.get('tracks', {}).items():
+            emit(dict(track, event='track', track=name))
+        outputs = self.batch.group_outputs(group, params, output)
+        self.batch.write_job(group['jobs'][0], outputs, group['window'],
+                             os.path.join(self.output, job['name']),
+                             lambda scene_id, path: emit({'event': 'scene', 'scene': scene_id, 'path': path}))
+
+    def stats(self):
+        lookups = self.index_hits + self.index_misses
+        return {'scenes': self.scenes.stats(), 'dems': self.dems.stats(), 'tracks': self.tracks.stats(),
+                'catalog': {'hits': self.index_hits, 'misses': self.index_misses,
+                            'hit_rate': self.index_hits / float(lookups) if lookups else 0.0}}
+
+
+class EEBackend(object):
+    """
+    Jobs of the Earth Engine backend, run with wrapper.s1_preproc in the initialized
+    Earth Engine session of the service.
+
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters common to all jobs
+    preproc : function, optional
+        The preprocessing function, wrapper.s1_preproc by default (imported, and
+        Earth Engine initialized, once); a stub for testing without Earth Engine
+    get_info : function, optional
+        Evaluation of a computed object, tracing.get_info by default
+    """
+
+    def __init__(self, params, preproc=None, get_info=None):
+        if preproc is None:
+            import wrapper
+            preproc = wrapper.s1_preproc
+        self.params = params
+        self.preproc = preproc
+        self.get_info = get_info or tracing.get_info
+        self.jobs = 0
+
+    def run(self, job, emit):
+        params = dict(self.params)
+        params.update(job)
+        s1 = self.preproc(params)
+        self.jobs += 1
+        scenes = self.get_info(s1.aggregate_array('system:index'))
+        emit({'event': 'planned', 'scenes': scenes})
+        for scene_id in scenes:
+            emit({'event': 'scene', 'scene': scene_id,
+                  'asset_id': params['ASSET_ID'] + '/' + scene_id if params.get('SAVE_ASSET') else None})
+
+    def stats(self):
+        return {'session': {'jobs': self.jobs}}
+
+
+# ---------------------------------------------------------------------------//
+# Job queue
+# ---------------------------------------------------------------------------//
+
+class Job(object):
+
+    def __init__(self, job_id, request):
+        self.id = job_id
+        self.request = request
+        self.state = 'queued'
+        self.events = []
+        self.submitted = time.time()
+        self.condition = threading.Condition()
+
+    def emit(self, event):
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def finish(self, state, event):
+        with self.condition:
+            self.state = state
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def stream(self):
+        """The events of the job, blocking until the next one up to the end of the job."""
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.events) and self.state in ('queued', 'running'):
+                    self.condition.wait()
+                events = self.events[index:]
+                finished = self.state not in ('queued', 'running')
+            for event in events:
+                yield event
+            index += len(events)
+            if finished and index >= len(self.events):
+                return
+
+
+class Service(object):
+    """
+    Queue of ARD jobs processed by a pool of worker threads.
+
+    Parameters
+    ----------
+    backend : LocalBackend or EEBackend
+        Runs the jobs
+    WORKERS : integer
+        Number of jobs processed in parallel
+    """
+
+    def __init__(self, backend, WORKERS=1):
+        self.backend = backend
+        self.WORKERS = WORKERS
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS)
+        self.jobs = {}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def submit(self, request):
+        """Queue a copy of a job (a dict), named after its id unless it has a name."""
+        if not isinstance(request, dict):
+            raise ValueError("ERROR!!! A job must be a JSON object")
+        job = Job(str(next(self.ids)), dict(request))
+        job.request.setdefault('name', job.id)
+        with self.lock:
+            self.jobs[job.id] = job
+        self.pool.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        job.state = 'running'
+        t0 = time.perf_counter()
+        try:
+            with tracing.span('service_job', kind='run', job_id=job.id):
+                self.backend.run(job.request, job.emit)
+        except Exception as error:
+            job.finish('failed', {'event': 'failed', 'error': str(error)})
+            return
+        job.finish('done', {'event': 'done', 'seconds': time.perf_counter() - t0})
+
+    def status(self):
+        with self.lock:
+            states = collections.Counter(job.state for job in self.jobs.values())
+        return {'queue_depth': states['queued'], 'running': states['running'],
+                'done': states['done'], 'failed': states['failed'], 'workers': self.WORKERS,
+                'uptime_seconds': time.time() - self.started, 'caches': self.backend.stats()}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+
+# ---------------------------------------------------------------------------//
+# HTTP interface
+# ---------------------------------------------------------------------------//
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    service = None
+
+    def address_string(self):
+        # Unix sockets have no client address
+        return str(self.client_address[0]) if self.client_address else 'local'
+
+    def _send(self, code, body):
+        data = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _job(self, job_id):
+        job = self.service.jobs.get(job_id)
+        if job is None:
+            self._send(404, {'error': 'unknown job ' + job_id})
+        return job
+
+    def do_GET(self):
+        parts = self.path.strip('/').split('/')
+        if parts == ['status']:
+            return self._send(200, self.service.status())
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = self._job(parts[1])
+            if job is not None:
+                self._send(200, {'id': job.id, 'state': job.state, 'events': len(job.events)})
+            return
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+            job = self._job(parts[1])
+            if job is None:
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for event in job.stream():
+                line = (json.dumps(event, default=str) + '\n').encode('utf-8')
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+                self.wfile.flush()
+            self.wfile.write(b'0\r\n\r\n')
+            return
+        self._send(404, {'error': 'unknown path ' + self.path})
+
+    def do_POST(self):
+        if self.path.strip('/') != 'jobs':
+            return self._send(404, {'error': 'unknown path ' + self.path})
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return self._send(400, {'error': 'the job is not valid JSON'})
+        if not isinstance(request, dict):
+            return self._send(400, {'error': 'the job is not a JSON object'})
+        job = self.service.submit(request)
+        self._send(202, {'id': job.id})
+
+
+class _TCPServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(service, port=None, socket_path=None, host='127.0.0.1'):
+    """
+    Create the HTTP server of a service on a TCP port or a local socket; call
+    serve_forever() on the result to accept requests.
+    """
+    handler = type('ServiceHandler', (Handler,), {'service': service})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return _UnixServer(socket_path, handler)
+    return _TCPServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the resident ARD processing service.')
+    parser.add_argument('--backend', choices=['local', 'ee'], default='local')
+    parser.add_argument('--params', help='JSON file of the parameters common to all jobs')
+    parser.add_argument('--catalog', help='scene directory of the local backend')
+    parser.add_argument('--output', help='output directory of the local backend')
+    parser.add_argument('--cache-mb', type=float, default=2048, help='scene cache of the local backend')
+    parser.add_argument('--workers', type=int, default=1, help='jobs processed in parallel')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', help='listen on this local socket instead of the port')
+    args = parser.parse_args(argv)
+
+    params = {}
+    if args.params:
+        with open(args.params) as f:
+            params = json.load(f)
+    if args.backend == 'local':
+        if not (args.catalog and args.output):
+            raise ValueError("ERROR!!! The local backend needs --catalog and --output")
+        backend = LocalBackend(args.catalog, args.output, params, args.cache_mb)
+        backend.catalog()
+    else:
+        backend = EEBackend(params)
+
+    service = Service(backend, args.workers)
+    server = serve(service, args.port, args.socket)
+    print('Serving the {} backend on {}'.format(args.backend, args.socket or 'port {}'.format(args.port)))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
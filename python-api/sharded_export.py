@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Sharded asset export of the processed collection (SHARD_DEGREES).
+
+    Instead of one task per image over the whole region, the footprint of every image (clipped
+    to the ROI) is split into the cells of a global longitude/latitude grid of SHARD_DEGREES
+    and every cell is exported by an independent task to '<ASSET_ID>/<image id>_r<row>_c<col>'.
+    The grid is anchored at (-180, 90), so the names of the shards of an image do not
+    depend on the run. A rerun skips the shards whose asset exists (one listAssets request)
+    and, with a manifest file (SHARD_MANIFEST), the shards whose task is still ready or
+    running; only the missing and failed shards are exported again. assemble mosaics the
+    shards of the complete images, optionally exporting the mosaic as a single asset.
+
+    With TRACK_AFFINE the export tasks (of the shards or of the whole images, see
+    wrapper._export) are submitted track by track, each track in time order (track_order).
+"""
+
+import json
+import math
+import os
+
+import ee
+
+import scheduling
+import tracing
+
+# ---------------------------------------------------------------------------//
+# Grid
+# ---------------------------------------------------------------------------//
+
+def grid_cells(bounds, SHARD_DEGREES):
+    """
+    Cells of the global grid that intersect a bounding box.
+
+    Parameters
+    ----------
+    bounds : list
+        [west, south, east, north] in degrees
+    SHARD_DEGREES : float
+        Size of the cells in degrees
+
+    Returns
+    -------
+    list
+        (row, col, [west, south, east, north]) of every cell, row 0 starting at 90 degrees
+        north and col 0 at 180 degrees west
+
+    """
+    west, south, east, north = bounds
+    col0 = int(math.floor((west + 180.0) / SHARD_DEGREES))
+    col1 = int(math.ceil((east + 180.0) / SHARD_DEGREES))
+    row0 = int(math.floor((90.0 - north) / SHARD_DEGREES))
+    row1 = int(math.ceil((90.0 - south) / SHARD_DEGREES))
+    cells = []
+    for row in range(row0, max(row1, row0 + 1)):
+        for col in range(col0, max(col1, col0 + 1)):
+            cells.append((row, col, [-180.0 + col * SHARD_DEGREES, 90.0 - (row + 1) * SHARD_DEGREES,
+                                     -180.0 + (col + 1) * SHARD_DEGREES, 90.0 - row * SHARD_DEGREES]))
+    return cells
+
+
+def shard_name(name, row, col):
+    return '{}_r{}_c{}'.format(name, row, col)
+
+
+def _bounds(coordinates):
+    xs = [point[0] for point in coordinates[0]]
+    ys = [point[1] for point in coordinates[0]]
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+# ---------------------------------------------------------------------------//
+# Manifest
+# ---------------------------------------------------------------------------//
+
+class Manifest(object):
+    """
+    Shards submitted by the runs, kept in a JSON file: shard name -> scene, cell and task id.
+
+    Parameters
+    ----------
+    path : string, optional
+        The manifest file; without it the shards are tracked with the assets only
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.shards = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.shards = json.load(f)['shards']
+
+    def add(self, name, record):
+        self.shards[name] = record
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump({'shards': self.shards}, f, indent=1)
+        os.replace(self.path + '.tmp', self.path)
+
+    def in_flight(self):
+        """Names of the shards whose task is ready or running, one request for all tasks."""
+        ids = {record['task_id']: name for name, record in self.shards.items() if record.get('task_id')}
+        if not ids:
+            return set()
+        with tracing.span('getTaskStatus', kind='rpc', tasks=len(ids)):
+            statuses = ee.data.getTaskStatus(list(ids))
+            tracing.record_rpc(bytes_received=tracing.json_size(statuses))
+        for status in statuses:
+            self.shards[ids[status['id']]]['state'] = status.get('state')
+        return {ids[status['id']] for status in statuses if status.get('state') in ('READY', 'RUNNING')}
+
+
+def existing_assets(ASSET_ID):
+    """Names of the assets in the ASSET_ID folder, listed with a single request."""
+    with tracing.span('listAssets', kind='rpc', asset_id=ASSET_ID):
+        try:
+            response = ee.data.listAssets({'parent': ASSET_ID})
+            tracing.record_rpc(bytes_received=tracing.json_size(response))
+        except ee.EEException:
+            # the folder does not exist yet
+            response = {}
+            tracing.record_rpc()
+        assets = response.get('assets', [])
+    return {(asset.get('id') or asset['name']).split('/')[-1] for asset in assets}
+
+
+# ---------------------------------------------------------------------------//
+# Export
+# ---------------------------------------------------------------------------//
+
+def track_order(collection):
+    """
+    Indices of the images of a collection grouped by track, each track in time order,
+    with a single request.
+
+    Parameters
+    ----------
+    collection : ee.ImageCollection
+        The processed collection
+
+    Returns
+    -------
+    OrderedDict
+        Track (relativeOrbitNumber_start, orbitProperties_pass) -> indices into the collection
+
+    """
+    info = tracing.get_info(ee.Dictionary({'orbit': collection.aggregate_array('relativeOrbitNumber_start'),
+                                           'pass': collection.aggregate_array('orbitProperties_pass'),
+                                           'time': collection.aggregate_array('system:time_start')}))
+    scenes = [{'index': idx, 'properties': {'relativeOrbitNumber_start': orbit, 'orbitProperties_pass': orbit_pass,
+                                           'system:time_start': millis}}
+              for idx, (orbit, orbit_pass, millis) in enumerate(zip(info['orbit'], info['pass'], info['time']))]
+    tracks = scheduling.partition(scenes)
+    for key, members in tracks.items():
+        tracks[key] = [scene['index'] for scene in members]
+    return tracks
+
+
+def export(collection, ASSET_ID, ROI, SHARD_DEGREES, SHARD_MANIFEST=None, suffix='', scale=10,
+           TRACK_AFFINE=False):
+    """
+    Export every image of the processed collection in shards.
+
+    Parameters
+    ----------
+    collection : ee.ImageCollection
+        The processed collection
+    ASSET_ID : string
+        The user id path to save the assets
+    ROI : ee.Geometry
+        Region of interest, the shards cover the footprint of every image within it
+    SHARD_DEGREES : float
+        Size of the grid cells in degrees
+    SHARD_MANIFEST : string, optional
+        JSON file tracking the submitted tasks
+    suffix : string, optional
+        Appended to the image names, the parameter hash in incremental mode
+    scale : float
+        Export scale in meters
+    TRACK_AFFINE : boolean, optional
+        Submit the shards track by track, each track in time order
+
+    Returns
+    -------
+    dict
+        Numbers of shards 'submitted', 'complete' (asset exists) and 'running'
+
+    """
+    manifest = Manifest(SHARD_MANIFEST)
+    complete = existing_assets(ASSET_ID)
+    running = manifest.in_flight() - complete
+    counts = {'submitted': 0, 'complete': 0, 'running': 0}
+
+    size = tracing.get_info(collection.size())
+    imlist = collection.toList(size)
+    order = [idx for indices in track_order(collection).values() for idx in indices] if TRACK_AFFINE \
+        else range(0, size)
+    for idx in order:
+        img = ee.Image(imlist.get(idx))
+        footprint = img.geometry().intersection(ROI, 1)
+        with tracing.span('export_scene', kind='scene', index=idx) as scene_span:
+            info = tracing.get_info(ee.Dictionary({'id': img.id(), 'bounds': footprint.bounds(1).coordinates()}))
+            name = str(info['id']) + suffix
+            cells = grid_cells(_bounds(info['bounds']), SHARD_DEGREES)
+            regions = [ee.Geometry.Rectangle(cell, 'EPSG:4326', False) for _, _, cell in cells]
+            # cells of the bounding box that miss the footprint are not exported
+            hits = tracing.get_info(ee.List([footprint.intersects(region, 1) for region in regions]))
+            submitted = 0
+            for (row, col, cell), region, hit in zip(cells, regions, hits):
+                shard = shard_name(name, row, col)
+                if not hit:
+                    continue
+                if shard in complete:
+                    counts['complete'] += 1
+                    continue
+                if shard in running:
+                    counts['running'] += 1
+                    continue
+                task = ee.batch.Export.image.toAsset(image=img,
+                                                     assetId=ASSET_ID + '/' + shard,
+                                                     description=shard,
+                                                     region=region,
+                                                     scale=scale,
+                                                     maxPixels=1e13)
+                task.start()
+                # the request is serialized by start(), its size is not known here
+                tracing.record_rpc()
+                manifest.add(shard, {'scene': name, 'row': row, 'col': col, 'region': cell,
+                                     'task_id': task.id, 'state': 'READY'})
+                submitted += 1
+            counts['submitted'] += submitted
+            scene_span.set(scene_id=name, shards=int(sum(hits)), submitted=submitted)
+        print('Exporting {} shard(s) of {} to {}'.format(submitted, name, ASSET_ID))
+        manifest.save()
+    return counts
+
+
+def assemble(ASSET_ID, SHARD_MANIFEST, EXPORT=False, scale=10):
+    """
+    Mosaic the shards of the images whose shards are all complete.
+
+    Parameters
+    ----------
+    ASSET_ID : string
+        The folder of the shards
+    SHARD_MANIFEST : string
+        The manifest written by export
+    EXPORT : boolean
+        Also export every mosaic to '<ASSET_ID>/<image id>_mosaic'
+
+    Returns
+    -------
+    dict
+        image name -> ee.Image mosaic of its shards
+
+    """
+    manifest = Manifest(SHARD_MANIFEST)
+    complete = existing_assets(ASSET_ID)
+    scenes = {}
+    for shard, record in manifest.shards.items():
+        scenes.setdefault(record['scene'], []).append(shard)
+
+    mosaics = {}
+    for name, shards in sorted(scenes.items()):
+        if not all(shard in complete for shard in shards):
+            print('{}: {} of {} shard(s) complete'.format(name, sum(s in complete for s in shards), len(shards)))
+            continue
+        images = ee.ImageCollection([ee.Image(ASSET_ID + '/' + shard) for shard in sorted(shards)])
+        mosaic = images.mosaic().copyProperties(images.first()).set('shards', len(shards))
+        mosaics[name] = mosaic
+        if EXPORT and name + '_mosaic' not in complete:
+            region = ee.Geometry.Rectangle(_union([manifest.shards[s]['region'] for s in shards]), 'EPSG:4326', False)
+            task = ee.batch.Export.image.toAsset(image=mosaic, assetId=ASSET_ID + '/' + name + '_mosaic',
+                                                 description=name + '_mosaic', region=region,
+                                                 scale=scale, maxPixels=1e13)
+            task.start()
+            tracing.record_rpc()
+            print('Exporting the mosaic of {} shard(s) of {}'.format(len(shards), name))
+    return mosaics
+
+
+def _union(cells):
+    return [min(c[0] for c in cells), min(c[1] for c in cells), max(c[2] for c in cells), max(c[3] for c in cells)]
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Deterministic generator of synthetic Sentinel-1 like scenes for benchmarks.
+             A piecewise constant reflectivity with straight edges and point scatterers is
+             multiplied by gamma distributed speckle of a given equivalent number of looks
+             (ENL). Scenes carry a smooth incidence angle band and a synthetic DEM can be
+             generated on the same grid.
+"""
+
+import datetime
+
+import numpy as np
+
+import local_helper
+
+# pixel spacing of the synthetic grid in meters
+PIXEL_SIZE = 10
+
+# backscatter levels (linear) of the reflectivity classes per polarization
+_LEVELS = {'VV': (0.02, 0.05, 0.12, 0.3),
+           'VH': (0.004, 0.01, 0.03, 0.07)}
+
+
+def reflectivity(shape, seed=0, n_edges=6, n_points=40, band='VV'):
+    """
+    Noise free reflectivity of a synthetic scene.
+
+    The scene is split into regions by n_edges random straight lines and every
+    region gets one of the backscatter levels of the band. Point scatterers are
+    single pixels 20 dB above the brightest level.
+
+    Parameters
+    ----------
+    shape : tuple
+        (rows, cols)
+    seed : integer
+        Seed of the random generator; the same seed gives the same scene
+    n_edges : integer
+        Number of straight edges
+    n_points : integer
+        Number of point scatterers
+    band : string
+        'VV' or 'VH'
+
+    Returns
+    -------
+    tuple
+        (reflectivity as float32 array, boolean array of the point scatterers)
+
+    """
+    rng = np.random.default_rng(seed)
+    rows, cols = shape
+    y, x = np.mgrid[0:rows, 0:cols]
+    region = np.zeros(shape, np.int64)
+    for bit in range(n_edges):
+        angle = rng.uniform(0, np.pi)
+        cy, cx = rng.uniform(0, rows), rng.uniform(0, cols)
+        region += ((np.cos(angle) * (x - cx) + np.sin(angle) * (y - cy)) > 0) << bit
+    levels = np.asarray(_LEVELS[band], np.float32)
+    out = levels[region % len(levels)]
+
+    points = np.zeros(shape, bool)
+    points[rng.integers(0, rows, n_points), rng.integers(0, cols, n_points)] = True
+    out[points] = levels.max() * 100
+    return out, points
+
+
+def incidence_angle(shape, near=30.0, far=46.0, ascending=True):
+    """
+    Smooth incidence angle band increasing across range (columns).
+
+    Parameters
+    ----------
+    shape : tuple
+        (rows, cols)
+    near, far : float
+        Incidence angle in degrees at the first and last column
+    ascending : boolean
+        If False the angle decreases with the column, as in flipped scenes
+
+    Returns
+    -------
+    numpy array
+        float32 incidence angle in degrees
+
+    """
+    rows, cols = shape
+    t = np.linspace(0, 1, cols)
+    if not ascending:
+        t = t[::-1]
+    # slight curvature in range and a small drift in azimuth
+    profile = near + (far - near) * (t + 0.03 * t * (1 - t))
+    drift = np.linspace(0, 0.05, rows)[:, None]
+    return (profile[None, :] + drift).astype(np.float32)
+
+
+def speckle(shape, enl, rng):
+    """Unit mean gamma distributed multiplicative speckle."""
+    return rng.gamma(shape=enl, scale=1.0/enl, size=shape).astype(np.float32)
+
+
+def synthetic_scene(shape=(512, 512), enl=5, seed=0, bands=('VV', 'VH'), time_start=None,
+                    relative_orbit=37, orbit_pass='DESCENDING', scene_seed=None):
+    """
+    Generate a synthetic scene as a local image.
+
+    Parameters
+    ----------
+    shape : tuple
+        (rows, cols)
+    enl : float
+        Equivalent number of looks of the speckle
+    seed : integer
+        Seed of the reflectivity; scenes with the same seed are co-registered
+        acquisitions of the same area
+    bands : tuple
+        Polarizations to generate
+    time_start : datetime.datetime, optional
+        Acquisition time, defaults to 2018-01-01
+    relative_orbit : integer
+        Relative orbit number
+    orbit_pass : string
+        'ASCENDING' or 'DESCENDING'
+    scene_seed : integer, optional
+        Seed of the speckle, defaults to seed
+
+    Returns
+    -------
+    tuple
+        (local image, dict band name -> noise free reflectivity)
+
+    """
+    if time_start is None:
+        time_start = datetime.datetime(2018, 1, 1, tzinfo=datetime.timezone.utc)
+    rng = np.random.default_rng(seed if scene_seed is None else scene_seed + 1000003)
+
+    data = {}
+    truth = {}
+    for name in bands:
+        truth[name], _ = reflectivity(shape, seed, band=name)
+        data[name] = truth[name] * speckle(shape, enl, rng)
+    data['angle'] = incidence_angle(shape, ascending=(orbit_pass == 'ASCENDING'))
+
+    millis = int(time_start.timestamp() * 1000)
+    properties = {'system:index': 'SYNTH_{}_{:03d}_{}'.format(time_start.strftime('%Y%m%dT%H%M%S'),
+                                                             relative_orbit, seed),
+                  'system:time_start': millis,
+                  'relativeOrbitNumber_start': relative_orbit,
+                  'relativeOrbitNumber_stop': relative_orbit,
+                  'orbitProperties_pass': orbit_pass,
+                  'transmitterReceiverPolarisation': list(bands),
+                  'instrumentMode': 'IW',
+                  'crs': 'EPSG:32633',
+                  'transform': (500000.0, PIXEL_SIZE, 0.0, 5000000.0, 0.0, -PIXEL_SIZE)}
+    return local_helper.make_image(data, properties), truth
+
+
+def synthetic_stack(n_images, shape=(512, 512), enl=5, seed=0, bands=('VV', 'VH'),
+                    repeat_days=12, **kwargs):
+    """
+    Generate a co-registered time series of synthetic scenes of one track.
+
+    Parameters
+    ----------
+    n_images : integer
+        Number of acquisitions
+    shape, enl, seed, bands :
+        See synthetic_scene
+    repeat_days : integer
+        Days between acquisitions
+
+    Returns
+    -------
+    tuple
+        (list of local images, dict band name -> noise free reflectivity)
+
+    """
+    start = datetime.datetime(2018, 1, 1, 5, 30, tzinfo=datetime.timezone.utc)
+    coll = []
+    for i in range(n_images):
+        image, truth = synthetic_scene(shape, enl, seed, bands,
+                                       time_start=start + datetime.timedelta(days=repeat_days * i),
+                                       scene_seed=seed * 100003 + i, **kwargs)
+        coll.append(image)
+    return coll, truth
+
+
+def synthetic_dem(shape=(512, 512), seed=0, relief=400.0, n_hills=12):
+    """
+    Smooth synthetic DEM on the pixel grid of the synthetic scenes.
+
+    Parameters
+    ----------
+    shape : tuple
+        (rows, cols)
+    seed : integer
+        Seed of the random generator
+    relief : float
+        Approximate height of the hills in meters
+    n_hills : integer
+        Number of Gaussian hills
+
+    Returns
+    -------
+    numpy array
+        float32 elevation in meters
+
+    """
+    rng = np.random.default_rng(seed + 7)
+    rows, cols = shape
+    y, x = np.mgrid[0:rows, 0:cols].astype(np.float32)
+    dem = 100 + 0.02 * x + 0.01 * y
+    for _ in range(n_hills):
+        cy, cx = rng.uniform(0, rows), rng.uniform(0, cols)
+        width = rng.uniform(0.05, 0.2) * max(rows, cols)
+        height = rng.uniform(0.3, 1.0) * relief
+        dem = dem + height * np.exp(-((y - cy)**2 + (x - cx)**2) / (2 * width**2))
+    return dem.astype(np.float32)
@@ -18,7 +18,7 @@ import math
 # ---------------------------------------------------------------------------//
 
 def slope_correction(collection, TERRAIN_FLATTENING_MODEL
-                                 ,DEM, TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER):
+                                 ,DEM, TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER, SCALE=10):
     """
 
     Parameters
@@ -31,6 +31,8 @@ def slope_correction(collection, TERRAIN_FLATTENING_MODEL
         The DEM to be used
     TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER : integer
         The additional buffer to account for the passive layover and shadow
+    SCALE : float
+        Scale in meters at which the DEM is resampled, 10 m unless previewing
 
     Returns
     -------
@@ -163,7 +165,7 @@ def slope_correction(collection, TERRAIN_FLATTENING_MODEL
         geom = image.geometry()
         proj = image.select(1).projection()
 
-        elevation = DEM.resample('bilinear').reproject(proj,None, 10).clip(geom)
+        elevation = DEM.resample('bilinear').reproject(proj,None, SCALE).clip(geom)
 
         # calculate the look direction
         heading = ee.Terrain.aspect(image.select('angle')).reduceRegion(ee.Reducer.mean(), image.geometry(), 1000)
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+# the modules of the Python API are flat modules of the parent directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def local_params():
+    """Parameters of a multi-temporal Lee run of the local pipeline without terrain flattening."""
+    return {'START_DATE': '2018-01-01', 'STOP_DATE': '2019-01-01', 'ORBIT': 'BOTH',
+            'POLARIZATION': 'VVVH', 'APPLY_BORDER_NOISE_CORRECTION': False,
+            'APPLY_SPECKLE_FILTERING': True, 'SPECKLE_FILTER_FRAMEWORK': 'MULTI',
+            'SPECKLE_FILTER': 'LEE', 'SPECKLE_FILTER_KERNEL_SIZE': 5, 'SPECKLE_FILTER_NR_OF_IMAGES': 3,
+            'APPLY_TERRAIN_FLATTENING': False, 'DEM': None, 'TERRAIN_FLATTENING_MODEL': 'VOLUME',
+            'TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER': 0, 'FORMAT': 'DB',
+            'CLIP_TO_ROI': False, 'ROI': None, 'SAVE_ASSET': False, 'ASSET_ID': None}
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    """Scene catalog directory of batch.py with three synthetic scenes, and their ids."""
+    import local_helper
+    import synthetic
+    folder = tmp_path / 'scenes'
+    folder.mkdir()
+    collection, _ = synthetic.synthetic_stack(3, shape=(48, 40))
+    for image in collection:
+        local_helper.save(image, str(folder / (image['properties']['system:index'] + '.npz')))
+    return str(folder), [image['properties']['system:index'] for image in collection]
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+import batch
+import local_helper
+import synthetic
+
+ROI = [500000, 5000000 - 20 * synthetic.PIXEL_SIZE, 500000 + 20 * synthetic.PIXEL_SIZE, 5000000]
+
+
+def _jobs(catalog, tmp_path, local_params, jobs):
+    params = {key: value for key, value in local_params.items()
+              if key not in ('START_DATE', 'STOP_DATE', 'ROI', 'CLIP_TO_ROI', 'SAVE_ASSET', 'ASSET_ID')}
+    return {'catalog': catalog[0], 'output': str(tmp_path / 'ard'), 'params': params,
+            'jobs': [dict({'roi': ROI, 'start_date': '2018-01-01', 'stop_date': '2019-01-01'}, **job)
+                     for job in jobs]}
+
+
+def _written(tmp_path, name):
+    folder = tmp_path / 'ard' / name
+    return sorted(f[:-len('.npz')] for f in os.listdir(str(folder))) if folder.exists() else []
+
+
+def test_exclude_scenes(catalog, tmp_path, local_params):
+    _, scenes = catalog
+    jobs = _jobs(catalog, tmp_path, local_params,
+                 [{'name': 'all'}, {'name': 'some', 'params': {'EXCLUDE_SCENES': [scenes[1]]}}])
+    groups = batch.plan(jobs, batch.scan_catalog(catalog[0]))
+    # the excluded scenes are not the neighbours of the scenes of the other job
+    assert len(groups) == 2
+    batch.run_batch(jobs)
+    assert _written(tmp_path, 'all') == scenes
+    assert _written(tmp_path, 'some') == [scenes[0], scenes[2]]
+
+
+def test_execution_parameters_of_a_group(catalog, tmp_path, local_params):
+    jobs = _jobs(catalog, tmp_path, local_params,
+                 [{'name': 'a'}, {'name': 'b', 'params': {'MEMORY_BUDGET_MB': 64}}])
+    with pytest.raises(ValueError):
+        batch.plan(jobs, batch.scan_catalog(catalog[0]))
+    # the dates and the orbit may differ
+    jobs = _jobs(catalog, tmp_path, local_params,
+                 [{'name': 'a'}, {'name': 'b', 'stop_date': '2018-01-20', 'params': {'ORBIT': 'DESCENDING'}}])
+    assert len(batch.plan(jobs, batch.scan_catalog(catalog[0]))) == 1
+
+
+def test_incremental_rerun(catalog, tmp_path, local_params):
+    _, scenes = catalog
+    jobs = _jobs(catalog, tmp_path, local_params, [{'name': 'site'}])
+    jobs['params']['INCREMENTAL_STORE'] = str(tmp_path / 'store')
+    first = batch.run_batch(jobs)
+    written = {scene_id: local_helper.load(str(tmp_path / 'ard' / 'site' / (scene_id + '.npz')))
+               for scene_id in scenes}
+    second = batch.run_batch(jobs)
+    assert first['scenes_processed'] == len(scenes) and second['scenes_processed'] == 0
+    assert _written(tmp_path, 'site') == scenes
+    for scene_id in scenes:
+        again = local_helper.load(str(tmp_path / 'ard' / 'site' / (scene_id + '.npz')))
+        for name in ('VV', 'VH'):
+            np.testing.assert_array_equal(again['bands'][name], written[scene_id]['bands'][name])
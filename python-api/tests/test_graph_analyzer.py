@@ -0,0 +1,103 @@
+import json
+import os
+
+import pytest
+
+import graph_analyzer
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def _load(name):
+    with open(os.path.join(DATA, name), encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def stage_graphs():
+    # serialized cumulative graphs after the data selection and a boxcar filter
+    return [(entry['stage'], json.dumps(entry['graph'])) for entry in _load('graph_stages.json')]
+
+
+def _chain(n):
+    """Serialized graph of n nodes, each applying Image.abs to the next one."""
+    values = {str(i): {'functionInvocationValue': {'functionName': 'Image.abs',
+                                                   'arguments': {'value': {'valueReference': str(i + 1)}}}}
+              for i in range(n - 1)}
+    values[str(n - 1)] = {'functionInvocationValue': {'functionName': 'Image.load',
+                                                      'arguments': {'id': {'constantValue': 'S1'}}}}
+    return {'result': '0', 'values': values}
+
+
+def test_selection(stage_graphs):
+    stats = graph_analyzer.analyze(stage_graphs[0][1])
+    assert stats['nodes'] == 5
+    assert stats['expanded_nodes'] == 11
+    assert stats['depth'] == 5
+    assert stats['nesting'] == 0
+    assert stats['evaluated_nodes'] == 11
+    assert stats['repeated'] == []
+    assert stats['functions']['Filter.equals'] == 1
+
+
+def test_shared_reference_is_expanded(stage_graphs):
+    stats = graph_analyzer.analyze(stage_graphs[1][1], fanout=10)
+    # Image.select (3 nodes) is referenced by Image.addBands and Image.reduceNeighborhood
+    assert stats['nodes'] == 11
+    assert stats['expanded_nodes'] == 26
+    assert [(r['function'], r['references'], r['size'], r['saved_nodes']) for r in stats['repeated']] == \
+        [('Image.select', 2, 3, 3)]
+    # the body of the mapped function (13 nodes) is evaluated for every element
+    assert stats['nesting'] == 1
+    assert stats['evaluated_nodes'] == 1 + (1 + 10 * 13) + 11
+
+
+def test_nested_mapped_functions():
+    nested = _load('graph_nested.json')
+    stats = graph_analyzer.analyze(nested, fanout=10)
+    assert stats['nodes'] == 8
+    assert stats['expanded_nodes'] == 14
+    assert stats['depth'] == 8
+    assert stats['nesting'] == 2
+    assert stats['evaluated_nodes'] == 374
+    assert graph_analyzer.analyze(nested, fanout=1)['evaluated_nodes'] == stats['expanded_nodes']
+    assert stats['repeated'][0]['function'] == 'ImageCollection.load'
+
+
+def test_stage_attribution(stage_graphs):
+    report = graph_analyzer.analyze_stages(stage_graphs)
+    assert [entry['stage'] for entry in report] == ['data_selection', 'speckle_filtering']
+    assert [entry['added_nodes'] for entry in report] == [5, 6]
+    assert [entry['added_expanded_nodes'] for entry in report] == [11, 15]
+    assert [r['function'] for r in report[1]['repeated']] == ['Image.select']
+    assert all(entry['warnings'] == [] for entry in report)
+    assert 'speckle_filtering' in graph_analyzer.format_report(report)
+
+
+def test_deep_graph():
+    # deeper than the recursion limit
+    stats = graph_analyzer.analyze(_chain(5000))
+    assert stats['depth'] == 5001
+    assert stats['expanded_nodes'] == 5001
+
+
+def test_check_limits(stage_graphs):
+    stats = graph_analyzer.analyze(stage_graphs[1][1])
+    assert graph_analyzer.check_limits(stats) == []
+    warnings = graph_analyzer.check_limits(stats, {'depth': 5, 'evaluated_nodes': 100})
+    assert len(warnings) == 2
+    assert warnings[0].startswith('depth = 6 exceeds the limit of 5')
+    assert warnings[1].startswith('evaluated_nodes = 143 exceeds the limit of 100')
+    assert 'computation too complex' in warnings[0]
+
+    deep = graph_analyzer.analyze_stages([('chain', _chain(2000))])
+    assert len(deep[0]['warnings']) == 1 and deep[0]['warnings'][0].startswith('depth = 2,001')
+    assert 'WARNING!!! depth' in graph_analyzer.format_report(deep)
+
+
+def test_cyclic_reference():
+    graph = {'result': '0', 'values': {
+        '0': {'functionInvocationValue': {'functionName': 'Image.abs', 'arguments': {'value': {'valueReference': '1'}}}},
+        '1': {'functionInvocationValue': {'functionName': 'Image.abs', 'arguments': {'value': {'valueReference': '0'}}}}}}
+    with pytest.raises(ValueError):
+        graph_analyzer.analyze(graph)
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import local_cog
+import local_helper
+import synthetic
+
+tifffile = pytest.importorskip('tifffile')
+
+
+@pytest.mark.parametrize('COMPRESSION', ['DEFLATE', 'ZSTD'])
+def test_round_trip(tmp_path, COMPRESSION):
+    if COMPRESSION == 'ZSTD' and local_cog.zstandard is None and (
+            local_cog.imagecodecs is None or not local_cog.imagecodecs.ZSTD.available):
+        pytest.skip('no ZSTD codec')
+    image = local_helper.lin_to_db(synthetic.synthetic_scene((300, 260))[0])
+    image['bands']['VV'][:7, :9] = np.nan
+    path = str(tmp_path / 'scene.tif')
+    files = local_cog.write_cog(image, path, COMPRESSION=COMPRESSION, TILE=128)
+    assert files[0] == path
+    with tifffile.TiffFile(path) as tif:
+        assert tif.pages[0].compression == local_cog.COMPRESSIONS[COMPRESSION]
+        data = tif.pages[0].asarray()
+    for i, name in enumerate(local_helper.band_names(image)):
+        np.testing.assert_array_equal(data[..., i], image['bands'][name])
+
+
+def test_zstd_without_codec(monkeypatch):
+    monkeypatch.setattr(local_cog, 'zstandard', None)
+    monkeypatch.setattr(local_cog, 'imagecodecs', None)
+    with pytest.raises(ValueError):
+        local_cog._compressor('ZSTD', 9)
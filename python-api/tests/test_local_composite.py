@@ -0,0 +1,44 @@
+import numpy as np
+
+import local_composite
+import local_wrapper
+import synthetic
+
+REDUCERS = ('mean', 'median', 'stdDev')
+
+
+def _collection():
+    # two interleaved tracks
+    first, _ = synthetic.synthetic_stack(5, shape=(90, 70))
+    second, _ = synthetic.synthetic_stack(3, shape=(90, 70), relative_orbit=88, orbit_pass='ASCENDING',
+                                          repeat_days=5)
+    return first + second
+
+
+def test_multi_composite_matches_run(local_params):
+    collection = _collection()
+    for SPECKLE_FILTER in ('LEE', 'LEE SIGMA'):
+        params = dict(local_params, SPECKLE_FILTER=SPECKLE_FILTER)
+        processed, _ = local_wrapper.run(params, collection)
+        # the quantile estimator depends on the order of the scenes
+        processed.sort(key=lambda image: image['properties']['system:time_start'])
+        expected = local_composite.composite(processed, REDUCERS, FORMAT='DB')
+        result = local_composite.composite_processed(params, collection, REDUCERS, TILE=32)
+        assert sorted(result['bands']) == sorted(expected['bands'])
+        for name, band in expected['bands'].items():
+            np.testing.assert_allclose(result['bands'][name], band, rtol=0, atol=1e-5)
+
+
+def test_multi_composite_keeps_the_temporal_neighbours(local_params, monkeypatch):
+    process_window = local_wrapper.process_window
+    windows = []
+
+    def recording(params, selected, window, headings, dems, history=None, ratio_sink=None):
+        windows.append((len(selected), len(history or [])))
+        return process_window(params, selected, window, headings, dems, history, ratio_sink)
+
+    monkeypatch.setattr(local_wrapper, 'process_window', recording)
+    local_composite.composite_processed(local_params, _collection(), REDUCERS, TILE=64)
+    NR_OF_IMAGES = local_params['SPECKLE_FILTER_NR_OF_IMAGES']
+    assert windows and all(scenes == 1 for scenes, _ in windows)
+    assert max(history for _, history in windows) == NR_OF_IMAGES - 1
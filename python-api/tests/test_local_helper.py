@@ -0,0 +1,58 @@
+import numpy as np
+
+import encoding
+import local_helper
+
+
+def _image(seed=0, shape=(40, 30)):
+    rng = np.random.default_rng(seed)
+    bands = {'VV': rng.uniform(-30, 10, shape).astype(np.float32),
+             'VH': rng.uniform(-40, 0, shape).astype(np.float32),
+             'angle': rng.uniform(29, 46, shape).astype(np.float32)}
+    for band in bands.values():
+        band[rng.random(shape) < 0.1] = np.nan
+    return local_helper.make_image(bands, {'system:index': 'scene'})
+
+
+def test_round_trip_error():
+    image = _image()
+    encoded = local_helper.quantize(image)
+    assert encoded['bands']['VV'].dtype == np.int16 and encoded['bands']['angle'].dtype == np.uint16
+    decoded = local_helper.dequantize(encoded)
+    for name, tolerance in (('VV', 0.005), ('VH', 0.005), ('angle', 0.0005)):
+        valid = ~np.isnan(image['bands'][name])
+        error = np.abs(decoded['bands'][name][valid] - image['bands'][name][valid]).max()
+        # half a step, up to the float32 rounding of the decoded value
+        assert error <= tolerance * (1 + 1e-3)
+    errors = local_helper.quantization_error(image)
+    assert errors['VV'][0] <= 0.005 * (1 + 1e-3) and errors['angle'][0] <= 0.0005 * (1 + 1e-3)
+
+
+def test_nodata_and_nan():
+    image = _image(1)
+    encoded = local_helper.quantize(image)
+    decoded = local_helper.dequantize(encoded)
+    for name, band in image['bands'].items():
+        nodata = encoding.band_encoding(name)['nodata']
+        masked = np.isnan(band)
+        np.testing.assert_array_equal(encoded['bands'][name] == nodata, masked)
+        np.testing.assert_array_equal(np.isnan(decoded['bands'][name]), masked)
+    assert all(preserved for _, preserved in local_helper.quantization_error(image).values())
+    # the encoding is described in the properties, and removed again when decoding
+    assert encoded['properties']['backscatter_nodata'] == -32768
+    assert 'encoding' not in decoded['properties']
+
+
+def test_clamping():
+    values = np.array([[400.0, 327.67, -327.67, -400.0, -np.inf, np.inf]], dtype=np.float32)
+    image = local_helper.make_image({'VV': values}, {'system:index': 'scene'})
+    encoded = local_helper.quantize(image)
+    # out of range values are clamped, they never become nodata
+    np.testing.assert_array_equal(encoded['bands']['VV'], [[32767, 32767, -32767, -32767, -32767, 32767]])
+    decoded = local_helper.dequantize(encoded)['bands']['VV']
+    np.testing.assert_allclose(decoded, [[327.67, 327.67, -327.67, -327.67, -327.67, 327.67]], rtol=1e-6)
+
+
+def test_dequantize_unencoded():
+    image = _image(2)
+    assert local_helper.dequantize(image) is image
@@ -0,0 +1,39 @@
+import tracemalloc
+
+import numpy as np
+
+import local_kernels
+import synthetic
+
+
+def _band(shape, seed=0):
+    image, _ = synthetic.synthetic_scene(shape, seed=seed, bands=('VV',))
+    x = image['bands']['VV'].astype(np.float64)
+    x[10:30, 40:45] = np.nan
+    return x
+
+
+def test_leesigma_tiles_match_one_tile():
+    x = _band((150, 170))
+    for K in (3, 5, 9):
+        whole = local_kernels.leesigma(x, K, tile_shape=x.shape)
+        tiled = local_kernels.leesigma(x, K, tile_shape=(32, 48))
+        # the summed-area tables of the tiles start at other pixels
+        np.testing.assert_allclose(tiled, whole, rtol=1e-6)
+        variants = local_kernels.filter_variants(x, [('LEE SIGMA', K), ('LEE SIGMA', 3)], tile_shape=(32, 48))
+        np.testing.assert_array_equal(variants[('LEE SIGMA', K)], tiled)
+
+
+def test_leesigma_keeps_no_scene_sized_mask():
+    x = _band((1000, 1200))
+    out = np.empty_like(x)
+    # the first call allocates the workspace buffers
+    local_kernels.leesigma(x, 7, out=out)
+    tracemalloc.start()
+    try:
+        local_kernels.leesigma(x, 7, out=out)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    # a boolean mask of the scene takes one byte per pixel
+    assert peak < x.size // 4
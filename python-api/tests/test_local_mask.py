@@ -0,0 +1,49 @@
+import math
+
+import numpy as np
+
+import local_terrain_flattening as ltf
+import synthetic
+from local_mask import PackedMask
+
+
+def _disc_erosion(mask, radius):
+    """Brute force erosion with a disc, pixels outside of the mask do not erode."""
+    rows, cols = mask.shape
+    R = int(math.floor(radius))
+    out = mask.copy()
+    for dy in range(-R, R + 1):
+        w = int(math.floor(math.sqrt(max(radius * radius - dy * dy, 0))))
+        for dx in range(-w, w + 1):
+            shifted = np.ones_like(mask)
+            src_r = slice(max(dy, 0), rows + min(dy, 0))
+            dst_r = slice(max(-dy, 0), rows - max(dy, 0))
+            src_c = slice(max(dx, 0), cols + min(dx, 0))
+            dst_c = slice(max(-dx, 0), cols - max(dx, 0))
+            if abs(dy) < rows and abs(dx) < cols:
+                shifted[dst_r, dst_c] = mask[src_r, src_c]
+            out &= shifted
+    return out
+
+
+def test_erode_matches_disc():
+    rng = np.random.default_rng(0)
+    mask = rng.random((40, 53)) > 0.02
+    for radius in (0.5, 1.5, 3.2, 7.0):
+        eroded = PackedMask.from_bool(mask).erode(radius).to_bool()
+        np.testing.assert_array_equal(eroded, _disc_erosion(mask, radius))
+
+
+def test_erode_radius_larger_than_height():
+    rng = np.random.default_rng(1)
+    mask = rng.random((2, 25)) > 0.1
+    for radius in (2.0, 5.5, 30.0):
+        eroded = PackedMask.from_bool(mask).erode(radius).to_bool()
+        np.testing.assert_array_equal(eroded, _disc_erosion(mask, radius))
+
+
+def test_slope_correction_short_scene_large_buffer():
+    image = synthetic.synthetic_scene((6, 200))[0]
+    dem = synthetic.synthetic_dem((6, 200), relief=3000)
+    out = ltf.slope_correction([image], 'VOLUME', dem, 100)[0]
+    assert out['bands']['VV'].shape == (6, 200)
@@ -0,0 +1,34 @@
+import numpy as np
+
+import local_helper
+import local_precision
+import synthetic
+
+
+def _db_scene(seed=0):
+    image, _ = synthetic.synthetic_scene((64, 48), seed=seed)
+    bands = {name: (10 * np.log10(image['bands'][name])).astype(np.float32)
+             for name in local_helper.band_names(image)}
+    for band in bands.values():
+        band[:3, :5] = np.nan
+    return local_helper.add_bands(image, bands)
+
+
+def test_error_report_dequantizes():
+    reference = [_db_scene(0), _db_scene(1)]
+    reduced = [local_helper.quantize(image) for image in reference]
+    report = local_precision.error_report(reference, reduced, 'DB')
+    for name in ('VV', 'VH'):
+        # half a quantization step (float32 decoding), not the difference of counts and dB
+        assert report[name]['max_abs_db'] <= 0.005 + 1e-5
+        # nodata is decoded as NaN, the masks agree
+        assert report[name]['mask_mismatch'] == 0
+        assert report[name]['valid'] == 2 * (64 * 48 - 15)
+
+
+def test_compare_quantized(local_params):
+    collection, _ = synthetic.synthetic_stack(3, shape=(48, 40))
+    report = local_precision.compare(dict(local_params, OUTPUT_ENCODING='QUANTIZED'), collection)
+    for entry in report['errors'].values():
+        assert entry['mask_mismatch'] == 0
+        assert entry['max_abs_db'] < 0.1
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+import local_helper
+import local_speckle_filter as lsf
+import synthetic
+
+
+@pytest.mark.parametrize('SPECKLE_FILTER', ['BOXCAR', 'LEE', 'GAMMA MAP', 'REFINED LEE', 'LEE SIGMA'])
+def test_stacked_filter_matches_per_image(SPECKLE_FILTER):
+    # two chunks of filter_stack
+    collection, _ = synthetic.synthetic_stack(7, shape=(60, 50))
+    for t, image in enumerate(collection):
+        # masked pixels that differ between the scenes
+        for name in local_helper.band_names(image):
+            image['bands'][name][3 * t:3 * t + 4, 10:20] = np.nan
+    if SPECKLE_FILTER != 'REFINED LEE':
+        assert lsf._stackable(collection, SPECKLE_FILTER)
+    for KERNEL_SIZE in (3, 5, 7):
+        stacked = lsf.MonoTemporal_Filter(collection, KERNEL_SIZE, SPECKLE_FILTER)
+        for image, result in zip(collection, stacked):
+            expected = lsf._filter(image, KERNEL_SIZE, SPECKLE_FILTER)
+            assert result['properties'] == expected['properties']
+            assert sorted(result['bands']) == sorted(expected['bands'])
+            for name, band in expected['bands'].items():
+                assert result['bands'][name].dtype == band.dtype
+                np.testing.assert_array_equal(result['bands'][name], band)
@@ -0,0 +1,39 @@
+import pytest
+
+import local_wrapper
+import synthetic
+
+
+def test_plan_tiles_rejects_constant_over_budget():
+    # a stage without a slope still has to fit the budget
+    with pytest.raises(ValueError):
+        local_wrapper.plan_tiles({'s': (0.0, 10 * 2**20)}, (200, 180), 4, 4)
+    with pytest.raises(ValueError):
+        local_wrapper.plan_tiles({'a': (8.0, 0.0), 's': (0.0, 10 * 2**20)}, (200, 180), 4, 4)
+
+
+def test_plan_tiles_fits_budget():
+    model = {'a': (64.0, 2**20), 'b': (16.0, 3 * 2**20), 'c': (0.0, 2**20)}
+    budget = 8 * 2**20 * local_wrapper.BUDGET_FRACTION
+    tile = local_wrapper.plan_tiles(model, (2000, 1500), 4, 8)
+    assert local_wrapper.estimate_peak(model, tile, 4) <= budget
+    assert tile[0] <= 2000 and tile[1] <= 1500
+
+
+def test_plan_tiles_whole_scene_without_slope():
+    assert local_wrapper.plan_tiles({'s': (0.0, 2**20)}, (200, 180), 4, 4) == (200, 180)
+
+
+def test_plan_tiles_too_small():
+    with pytest.raises(ValueError):
+        local_wrapper.plan_tiles({'a': (1024.0, 0.0)}, (2000, 1500), 4, 1)
+
+
+@pytest.mark.parametrize('SPECKLE_FILTER', ['BOXCAR', 'LEE', 'GAMMA MAP', 'REFINED LEE', 'LEE SIGMA'])
+def test_measured_peak_within_budget(local_params, SPECKLE_FILTER):
+    # a scene smaller than the calibration probes, with two workers
+    collection, _ = synthetic.synthetic_stack(4, shape=(300, 260))
+    params = dict(local_params, SPECKLE_FILTER=SPECKLE_FILTER, MEMORY_BUDGET_MB=6, WORKERS=2)
+    _, report = local_wrapper.run(params, collection)
+    assert report['tiles'] > 1
+    assert report['measured_peak_mb'] <= report['budget_mb']
@@ -0,0 +1,62 @@
+import json
+import os
+
+import pytest
+
+import profiler
+
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+@pytest.fixture
+def stage_profiles():
+    # Profile.getProfiles payloads of the evaluations after every stage of s1_preproc
+    with open(os.path.join(DATA, 'profile_stages.json'), encoding='utf-8') as f:
+        return [(entry['stage'], entry['profile']) for entry in json.load(f)]
+
+
+def test_parse_aligned_table(stage_profiles):
+    rows = profiler.parse_profile(stage_profiles[0][1])
+    assert rows == [
+        {'description': 'Loading assets: COPERNICUS/S1_GRD', 'count': 96, 'eecu_s': 0.412, 'peak_mem': 1.2e6},
+        {'description': 'Algorithm Image.select', 'count': 12, 'eecu_s': 0.051, 'peak_mem': 310e3},
+        {'description': 'Algorithm Image.reduceRegion', 'count': 4, 'eecu_s': 0.020, 'peak_mem': 88e3}]
+
+
+def test_parse_comma_separated(stage_profiles):
+    rows = profiler.parse_profile(stage_profiles[3][1])
+    assert len(rows) == 10
+    assert rows[8] == {'description': 'Algorithm Terrain.slope', 'count': 48, 'eecu_s': 0.690, 'peak_mem': 22e6}
+
+
+def test_parse_empty():
+    assert profiler.parse_profile('') == []
+    assert profiler.parse_profile('\n  \n') == []
+
+
+def test_aggregate(stage_profiles):
+    totals = profiler.aggregate(profiler.parse_profile(stage_profiles[3][1]))
+    # the two expression rows are summed, the peak is the larger one
+    assert totals['Algorithm Image.expression']['count'] == 144
+    assert totals['Algorithm Image.expression']['eecu_s'] == pytest.approx(0.404)
+    assert totals['Algorithm Image.expression']['peak_mem'] == 6.5e6
+    assert len(totals) == 9
+
+
+def test_attribute_stages(stage_profiles):
+    report = profiler.attribute_stages([(stage, profiler.parse_profile(text)) for stage, text in stage_profiles],
+                                       top=2)
+    assert [entry['stage'] for entry in report] == ['data_selection', 'border_noise_correction',
+                                                    'speckle_filtering', 'terrain_flattening', 'output']
+    costs = [entry['eecu_s'] for entry in report]
+    # the output stage costs less than the cached terrain flattening: clipped to zero
+    assert costs == pytest.approx([0.483, 0.455, 2.167, 1.056, 0.0])
+    assert report[3]['cumulative_eecu_s'] == pytest.approx(4.161)
+    assert sum(entry['share'] for entry in report) == pytest.approx(1.0)
+    assert report[2]['share'] == pytest.approx(2.167 / 4.161)
+    assert [a['description'] for a in report[2]['algorithms']] == ['Algorithm Image.reduceNeighborhood',
+                                                                  'Algorithm Image.expression']
+    assert [a['description'] for a in report[3]['algorithms']] == ['Algorithm Terrain.slope',
+                                                                  'Loading assets: USGS/SRTMGL1_003']
+    assert report[4]['algorithms'] == [{'description': 'Algorithm Image.log10', 'eecu_s': 0.003, 'count': 48}]
+    assert 'speckle_filtering' in profiler.format_report(report)
@@ -0,0 +1,119 @@
+import http.client
+import json
+import os
+import threading
+
+import pytest
+
+import service
+import synthetic
+
+
+def _request(server, method, path, body=None):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=60)
+    try:
+        connection.request(method, path, body=body)
+        response = connection.getresponse()
+        data = response.read()
+    finally:
+        connection.close()
+    if response.getheader('Content-Type') == 'application/x-ndjson':
+        return response.status, [json.loads(line) for line in data.decode('utf-8').splitlines()]
+    return response.status, json.loads(data)
+
+
+@pytest.fixture
+def serving():
+    servers = []
+
+    def start(backend):
+        server = service.serve(service.Service(backend), port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.RequestHandlerClass.service.shutdown()
+
+
+def test_local_backend(serving, catalog, tmp_path, local_params):
+    folder, scenes = catalog
+    backend = service.LocalBackend(folder, str(tmp_path / 'ard'), local_params, CACHE_MB=64)
+    server = serving(backend)
+    size = synthetic.PIXEL_SIZE
+    job = {'name': 'site', 'roi': [500000, 5000000 - 20 * size, 500000 + 20 * size, 5000000],
+           'start_date': '2018-01-01', 'stop_date': '2019-01-01'}
+
+    status, body = _request(server, 'POST', '/jobs', json.dumps(job))
+    assert status == 202
+    status, events = _request(server, 'GET', '/jobs/{}/events'.format(body['id']))
+    assert status == 200
+    assert [event['event'] for event in events] == ['planned'] + ['scene'] * len(scenes) + ['done']
+    assert events[0]['scenes'] == scenes
+    for event in events[1:-1]:
+        assert os.path.exists(event['path'])
+
+    status, state = _request(server, 'GET', '/jobs/' + body['id'])
+    assert status == 200 and state['state'] == 'done'
+    # the second job reads the scenes from the cache
+    status, second = _request(server, 'POST', '/jobs', json.dumps(dict(job, name='again')))
+    _request(server, 'GET', '/jobs/{}/events'.format(second['id']))
+    status, report = _request(server, 'GET', '/status')
+    assert status == 200
+    assert report['done'] == 2 and report['failed'] == 0
+    assert report['caches']['scenes']['hits'] == len(scenes)
+
+
+class _Collection(object):
+
+    def aggregate_array(self, name):
+        return ['S1A_1', 'S1A_2']
+
+
+def test_ee_backend(serving):
+    calls = []
+
+    def preproc(params):
+        calls.append(params)
+        return _Collection()
+
+    backend = service.EEBackend({'ORBIT': 'BOTH', 'SAVE_ASSET': True, 'ASSET_ID': 'users/me/ard'},
+                                preproc=preproc, get_info=lambda value: value)
+    server = serving(backend)
+    status, body = _request(server, 'POST', '/jobs', json.dumps({'ORBIT': 'ASCENDING'}))
+    assert status == 202
+    status, events = _request(server, 'GET', '/jobs/{}/events'.format(body['id']))
+    assert [event['event'] for event in events] == ['planned', 'scene', 'scene', 'done']
+    assert events[1]['asset_id'] == 'users/me/ard/S1A_1'
+    assert calls[0]['ORBIT'] == 'ASCENDING' and calls[0]['name'] == body['id']
+    status, report = _request(server, 'GET', '/status')
+    assert report['caches'] == {'session': {'jobs': 1}}
+
+
+def test_errors(serving):
+    server = serving(service.EEBackend({}, preproc=lambda params: _Collection(), get_info=lambda value: value))
+    assert _request(server, 'GET', '/jobs/17')[0] == 404
+    assert _request(server, 'GET', '/jobs/17/events')[0] == 404
+    assert _request(server, 'GET', '/nowhere')[0] == 404
+    assert _request(server, 'POST', '/elsewhere', '{}')[0] == 404
+    assert _request(server, 'POST', '/jobs', '{not json')[0] == 400
+    for body in ('[1, 2]', '"job"', '3', 'null'):
+        assert _request(server, 'POST', '/jobs', body)[0] == 400
+    assert _request(server, 'GET', '/status')[1]['queue_depth'] == 0
+
+
+def test_submit_copies_the_request():
+    jobs = service.Service(service.EEBackend({}, preproc=lambda params: _Collection(),
+                                             get_info=lambda value: value))
+    request = {'ORBIT': 'BOTH'}
+    job = jobs.submit(request)
+    list(job.stream())
+    jobs.shutdown()
+    assert request == {'ORBIT': 'BOTH'}
+    assert job.request['name'] == job.id
+    with pytest.raises(ValueError):
+        jobs.submit(['not', 'a', 'job'])
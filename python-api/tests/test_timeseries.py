@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import timeseries
+
+
+class _List(object):
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def slice(self, start, stop):
+        return _List(self.rows[start:stop])
+
+
+class _Collection(object):
+    """Stub of a processed ee.ImageCollection whose samples are given."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def sort(self, key):
+        return self
+
+    def size(self):
+        return len(self.rows)
+
+    def toList(self, size):
+        return _List(self.rows)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(timeseries.tracing, 'get_info', lambda obj: obj)
+    monkeypatch.setattr(timeseries, '_sample_chunk', lambda images, points, bands, scale: images.rows)
+    monkeypatch.setattr(timeseries, 'point_collection', lambda points: (points, len(points)))
+
+
+def test_point_outside_of_the_footprint(stub):
+    points = [(11.0, 45.0), (11.5, 45.0), (12.0, 45.0)]
+    rows = [[1000, 'S1_A', [0, 1, 2], [-10.0, timeseries.NODATA, -12.0], [-16.0, timeseries.NODATA, -18.0]],
+            # point 1 is outside of this scene and not returned by reduceRegions
+            [2000, 'S1_B', [0, 2], [-11.0, -13.0], [-17.0, -19.0]]]
+    out = timeseries.extract(_Collection(rows), points, ['VV', 'VH'], WORKERS=1)
+    assert out['values'].shape == (3, 2, 2)
+    np.testing.assert_array_equal(out['values'][:, 1, 0], [-11.0, np.nan, -13.0])
+    np.testing.assert_array_equal(out['values'][:, 1, 1], [-17.0, np.nan, -19.0])
+    np.testing.assert_array_equal(out['values'][:, 0, 0], [-10.0, np.nan, -12.0])
+    assert out['ids'] == ['S1_A', 'S1_B'] and list(out['times']) == [1000, 2000]
+
+
+def test_misaligned_samples(stub):
+    # points without a 'point' index cannot be placed
+    rows = [[1000, 'S1_A', [], [-10.0, -12.0]]]
+    with pytest.raises(ValueError):
+        timeseries.extract(_Collection(rows), [(11.0, 45.0), (12.0, 45.0)], ['VV'], WORKERS=1)
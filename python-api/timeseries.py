@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Bulk extraction of point time series from a processed collection (the output of
+             wrapper.s1_preproc).
+
+    Instead of a reduceRegion or sample request per image and point, the points are sampled
+    with reduceRegions on every image of a chunk of the collection, server side, and the
+    values of every band are returned as one list per image (aggregate_array), so that a
+    request carries the values of all the points for many images. The chunks are sized to
+    keep the response below MAX_VALUES values and are requested in parallel threads.
+    The local counterpart is local_timeseries.py.
+
+    Masked pixels, and the points outside of the footprint of a scene (the other track with
+    ORBIT 'BOTH', CLIP_TO_ROI), are sampled as NODATA (unmask without the footprint of the
+    image) and returned as NaN. The values are scattered to the points by their 'point'
+    index, which is sampled with them, so that a point dropped by reduceRegions cannot shift
+    the values of the points after it.
+"""
+
+import concurrent.futures
+
+import ee
+import numpy as np
+
+import tracing
+
+# value of the masked pixels in the sampled lists
+NODATA = -9999
+# values per request
+MAX_VALUES = 250000
+
+
+def point_collection(points):
+    """
+    Feature collection of points.
+
+    Parameters
+    ----------
+    points : list or ee.FeatureCollection
+        (lon, lat) pairs, or a feature collection, e.g. an uploaded table (recommended
+        for large point sets, the pairs are sent with every request), whose features
+        carry their index 0 .. P-1 in the 'point' property
+
+    Returns
+    -------
+    tuple
+        (ee.FeatureCollection, number of points)
+
+    """
+    if isinstance(points, ee.FeatureCollection):
+        return points, tracing.get_info(points.size())
+    features = [ee.Feature(ee.Geometry.Point([float(x), float(y)]), {'point': i})
+                for i, (x, y) in enumerate(points)]
+    return ee.FeatureCollection(features), len(features)
+
+
+def _sample_chunk(images, points, bands, scale):
+    """
+    [time, index, point indices, values of band 1, values of band 2, ...] of every image
+    of an ee.List.
+    """
+    def sample(image):
+        image = ee.Image(image)
+        # without the footprint, the points outside of the scene are sampled as NODATA too
+        samples = image.select(bands).unmask(NODATA, False).reduceRegions(collection=points,
+                                                                          reducer=ee.Reducer.first(),
+                                                                          scale=scale)
+        if len(bands) == 1:
+            samples = samples.map(lambda feature: feature.set(bands[0], feature.get('first')))
+        return ee.List([image.get('system:time_start'), image.get('system:index'),
+                        samples.aggregate_array('point')]) \
+            .cat([samples.aggregate_array(name) for name in bands])
+    return images.map(sample)
+
+
+def extract(collection, points, bands, scale=10, WORKERS=4):
+    """
+    Time series of points in a processed collection.
+
+    Parameters
+    ----------
+    collection : ee.ImageCollection
+        Processed collection
+    points : list or ee.FeatureCollection
+        See point_collection
+    bands : list
+        Bands to extract, e.g. ['VV', 'VH']
+    scale : float
+        Sampling scale in meters
+    WORKERS : integer
+        Number of requests in flight
+
+    Returns
+    -------
+    dict
+        'values': (P, T, B) float32 array, NaN where masked or outside of the scene;
+        'times': (T,) system:time_start in milliseconds, in increasing order;
+        'ids': (T,) system:index; 'bands': the B band names
+
+    """
+    points, n_points = point_collection(points)
+    collection = collection.sort('system:time_start')
+    size = tracing.get_info(collection.size())
+    images = collection.toList(size)
+    chunk = max(1, MAX_VALUES // max(n_points * len(bands), 1))
+
+    def request(start):
+        with tracing.span('sample_chunk', kind='rpc', start=start, images=min(chunk, size - start)):
+            return tracing.get_info(_sample_chunk(images.slice(start, start + chunk), points, bands, scale))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        rows = []
+        for result in pool.map(request, range(0, size, chunk)):
+            rows += result
+
+    values = np.full((n_points, len(rows), len(bands)), np.nan, np.float32)
+    for t, row in enumerate(rows):
+        index = np.asarray(row[2], np.int64)
+        for b in range(len(bands)):
+            sampled = np.asarray(row[3 + b], np.float32)
+            if sampled.size != index.size:
+                raise ValueError("ERROR!!! The samples of {} are not aligned with the points".format(row[1]))
+            values[index, t, b] = np.where(sampled == NODATA, np.nan, sampled)
+    return {'values': values, 'times': np.array([row[0] for row in rows], np.int64),
+            'ids': [row[1] for row in rows], 'bands': list(bands)}
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Version: v1.3
+Date: 2026-10-19
+Authors: Mullissa A., Vollrath A., Braun, C., Slagter B., Balling J., Gou Y., Gorelick N.,  Reiche J.
+Description: Structured tracing of the ARD pipeline. Spans are opened per stage, scene and tile
+             and record wall time, the number of Earth Engine RPCs and the bytes transferred.
+             Finished spans are handed to pluggable exporters (e.g. JSON lines).
+"""
+
+import contextlib
+import itertools
+import json
+import sys
+import threading
+import time
+
+# ---------------------------------------------------------------------------//
+# Exporters
+# ---------------------------------------------------------------------------//
+
+class JsonLinesExporter:
+    """
+    Write every finished span as one JSON object per line.
+
+    Parameters
+    ----------
+    destination : string or file-like object
+        Path of the output file (opened in append mode) or an open text stream
+
+    """
+
+    def __init__(self, destination=sys.stderr):
+        self._lock = threading.Lock()
+        if isinstance(destination, str):
+            self._stream = open(destination, 'a')
+            self._owned = True
+        else:
+            self._stream = destination
+            self._owned = False
+
+    def export(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._stream.write(line + '\n')
+            self._stream.flush()
+
+    def close(self):
+        if self._owned:
+            self._stream.close()
+
+
+class MemoryExporter:
+    """
+    Keep finished spans in memory, e.g. to build a report after a run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = []
+
+    def export(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def close(self):
+        pass
+
+
+# ---------------------------------------------------------------------------//
+# Spans
+# ---------------------------------------------------------------------------//
+
+class Span:
+    """
+    A timed unit of work (a stage, a scene, a tile or a single RPC).
+
+    RPC counts and byte counters recorded on a span are added to its parent
+    when the span ends, so the stage spans report the totals of their scenes
+    and tiles.
+
+    """
+
+    def __init__(self, name, kind, trace_id, span_id, parent, attributes):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent = parent
+        self.attributes = dict(attributes)
+        self.rpc_count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.error = None
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self.wall_time = None
+
+    def set(self, **attributes):
+        """Attach additional attributes to the span."""
+        self.attributes.update(attributes)
+
+    def add_rpc(self, bytes_sent=0, bytes_received=0, count=1):
+        """Record RPCs issued while the span was active."""
+        self.rpc_count += count
+        self.bytes_sent += bytes_sent
+        self.bytes_received += bytes_received
+
+    def _finish(self):
+        self.wall_time = time.perf_counter() - self._t0
+        if self.parent is not None:
+            self.parent.add_rpc(self.bytes_sent, self.bytes_received, self.rpc_count)
+
+    def to_dict(self):
+        return {'trace_id': self.trace_id,
+                'span_id': self.span_id,
+                'parent_id': None if self.parent is None else self.parent.span_id,
+                'name': self.name,
+                'kind': self.kind,
+                'start': self.start,
+                'wall_time_s': self.wall_time,
+                'rpc_count': self.rpc_count,
+                'bytes_sent': self.bytes_sent,
+                'bytes_received': self.bytes_received,
+                'error': self.error,
+                'attributes': self.attributes}
+
+
+class Tracer:
+    """
+    Create spans and dispatch them to the configured exporters.
+
+    Parameters
+    ----------
+    exporters : list, optional
+        Objects with an ``export(record)`` method receiving each finished span
+        as a dictionary. A tracer without exporters still measures spans but
+        discards them.
+
+    """
+
+    def __init__(self, exporters=None):
+        self.exporters = list(exporters or [])
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    def current(self):
+        """Return the innermost active span of the calling thread."""
+        stack = getattr(self._local, 'stack', None)
+        return stack[-1] if stack else None
+
+    @contextlib.contextmanager
+    def span(self, name, kind='stage', parent=None, **attributes):
+        """
+        Open a span for the duration of the ``with`` block.
+
+        Parameters
+        ----------
+        name : string
+            Name of the span, e.g. the stage name
+        kind : string
+            One of 'run', 'stage', 'scene', 'tile' or 'rpc'
+        parent : Span, optional
+            Explicit parent, used when work is handed to another thread.
+            Defaults to the innermost active span of the calling thread.
+
+        """
+        if parent is None:
+            parent = self.current()
+        span_id = next(self._ids)
+        trace_id = span_id if parent is None else parent.trace_id
+        s = Span(name, kind, trace_id, span_id, parent, attributes)
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(s)
+        try:
+            yield s
+        except BaseException as exc:
+            s.error = '{}: {}'.format(type(exc).__name__, exc)
+            raise
+        finally:
+            stack.pop()
+            s._finish()
+            record = s.to_dict()
+            for exporter in self.exporters:
+                exporter.export(record)
+
+
+# ---------------------------------------------------------------------------//
+# Module level tracer
+# ---------------------------------------------------------------------------//
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    """Return the tracer used by the pipeline modules."""
+    return _tracer
+
+
+def set_tracer(tracer):
+    """
+    Replace the tracer used by the pipeline modules.
+
+    Parameters
+    ----------
+    tracer : Tracer
+        The new tracer
+
+    Returns
+    -------
+    Tracer
+        The previously installed tracer
+
+    """
+    global _tracer
+    previous = _tracer
+    _tracer = tracer
+    return previous
+
+
+def span(name, kind='stage', **attributes):
+    """Open a span on the module level tracer."""
+    return _tracer.span(name, kind, **attributes)
+
+
+def record_rpc(bytes_sent=0, bytes_received=0):
+    """Account one RPC to the innermost active span, if any; 0 bytes when a size is not known."""
+    current = _tracer.current()
+    if current is not None:
+        current.add_rpc(bytes_sent, bytes_received)
+
+
+def json_size(result):
+    """Size of a decoded RPC response, the length of its JSON encoding."""
+    return len(json.dumps(result, default=str))
+
+
+def get_info(obj):
+    """
+    Evaluate an Earth Engine object with ``getInfo`` and account the RPC.
+
+    The request size is the length of the serialized expression graph and the
+    response size the length of the JSON encoded result.
+
+    Parameters
+    ----------
+    obj : ee.ComputedObject
+        The object to evaluate
+
+    Returns
+    -------
+    object
+        The result of ``obj.getInfo()``
+
+    """
+    with _tracer.span('getInfo', kind='rpc') as s:
+        sent = len(obj.serialize())
+        result = obj.getInfo()
+        s.add_rpc(sent, json_size(result))
+    return result
@@ -13,9 +13,17 @@ import border_noise_correction as bnc
 import speckle_filter as sf
 import terrain_flattening as trf
 import helper
+import parameters
+import graph_analyzer
+import scheduling
+import sharded_export
+import tracing
 
 ee.Initialize()
 
+# kept here for existing callers
+check_params = parameters.check_params
+
 
 ###########################################
 # DO THE JOB
@@ -40,14 +48,38 @@ def s1_preproc(params):
     ee.ImageCollection
         A processed Sentinel-1 image collection
 
+    Notes
+    -----
+    Every stage runs inside a span of the tracer configured with
+    ``tracing.set_tracer``. Building the stages is lazy, so the stage spans
+    measure graph construction; the Earth Engine work is accounted to the
+    ``getInfo`` RPC spans and to the per-scene export spans.
+
+    """
+    with tracing.span('s1_preproc', kind='run', backend='ee'):
+        return _s1_preproc(params)
+
+
+def preproc_stages(params):
     """
+    Build the processing chain stage by stage without evaluating it.
 
+    Parameters
+    ----------
+    params : Dictionary
+        Parameters as accepted by s1_preproc, already passed through check_params
+
+    Yields
+    ------
+    tuple
+        (stage name, ee.ImageCollection) where the collection is the cumulative
+        result of all stages up to and including the named one
+
+    """
 
     APPLY_BORDER_NOISE_CORRECTION = params['APPLY_BORDER_NOISE_CORRECTION']
     APPLY_TERRAIN_FLATTENING = params['APPLY_TERRAIN_FLATTENING']
     APPLY_SPECKLE_FILTERING = params['APPLY_SPECKLE_FILTERING']
-    POLARIZATION = params['POLARIZATION']
-    ORBIT = params['ORBIT']
     SPECKLE_FILTER_FRAMEWORK = params['SPECKLE_FILTER_FRAMEWORK']
     SPECKLE_FILTER = params['SPECKLE_FILTER']
     SPECKLE_FILTER_KERNEL_SIZE = params['SPECKLE_FILTER_KERNEL_SIZE']
@@ -56,80 +88,133 @@ def s1_preproc(params):
     DEM = params['DEM']
     TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER = params['TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER']
     FORMAT = params['FORMAT']
-    START_DATE = params['START_DATE']
-    STOP_DATE = params['STOP_DATE']
     ROI = params['ROI']
     CLIP_TO_ROI = params['CLIP_TO_ROI']
-    SAVE_ASSET = params['SAVE_ASSET']
-    ASSET_ID = params['ASSET_ID']
+    PREVIEW_FACTOR = params['PREVIEW_FACTOR']
 
     ###########################################
-    # 0. CHECK PARAMETERS
+    # 1. DATA SELECTION
     ###########################################
 
-    if APPLY_BORDER_NOISE_CORRECTION is None:
-        APPLY_BORDER_NOISE_CORRECTION = True
-    if APPLY_TERRAIN_FLATTENING is None:
-        APPLY_TERRAIN_FLATTENING = True
-    if APPLY_SPECKLE_FILTERING is None:
-        APPLY_SPECKLE_FILTERING = True
-    if POLARIZATION is None:
-        POLARIZATION = 'VVVH'
-    if ORBIT is None:
-        ORBIT = 'BOTH'
-    if SPECKLE_FILTER_FRAMEWORK is None:
-        SPECKLE_FILTER_FRAMEWORK = 'MULTI BOXCAR'
-    if SPECKLE_FILTER is None:
-        SPECKLE_FILTER = 'GAMMA MAP'
-    if SPECKLE_FILTER_KERNEL_SIZE is None:
-        SPECKLE_FILTER_KERNEL_SIZE = 7
-    if SPECKLE_FILTER_NR_OF_IMAGES is None:
-        SPECKLE_FILTER_NR_OF_IMAGES = 10
-    if TERRAIN_FLATTENING_MODEL is None:
-        TERRAIN_FLATTENING_MODEL = 'VOLUME'
-    if TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER is None:
-        TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER = 0
-    if FORMAT is None:
-        FORMAT = 'DB'
-    if ORBIT is None:
-        ORBIT = 'DESCENDING'
-
-    pol_required = ['VV', 'VH', 'VVVH']
-    if (POLARIZATION not in pol_required):
-        raise ValueError("ERROR!!! Parameter POLARIZATION not correctly defined")
-
-    orbit_required = ['ASCENDING', 'DESCENDING', 'BOTH']
-    if (ORBIT not in orbit_required):
-        raise ValueError("ERROR!!! Parameter ORBIT not correctly defined")
-
-    model_required = ['DIRECT', 'VOLUME']
-    if (TERRAIN_FLATTENING_MODEL not in model_required):
-        raise ValueError("ERROR!!! Parameter TERRAIN_FLATTENING_MODEL not correctly defined")
-
-    format_required = ['LINEAR', 'DB']
-    if (FORMAT not in format_required):
-        raise ValueError("ERROR!!! FORMAT not correctly defined")
-
-    frame_needed = ['MONO', 'MULTI']
-    if (SPECKLE_FILTER_FRAMEWORK not in frame_needed):
-        raise ValueError("ERROR!!! SPECKLE_FILTER_FRAMEWORK not correctly defined")
-
-    format_sfilter = ['BOXCAR', 'LEE', 'GAMMA MAP'
-              ,'REFINED LEE', 'LEE SIGMA']
-    if (SPECKLE_FILTER not in format_sfilter):
-        raise ValueError("ERROR!!! SPECKLE_FILTER not correctly defined")
-
-    if (TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER < 0):
-        raise ValueError("ERROR!!! TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER not correctly defined")
-
-    if (SPECKLE_FILTER_KERNEL_SIZE <= 0):
-        raise ValueError("ERROR!!! SPECKLE_FILTER_KERNEL_SIZE not correctly defined")
+    with tracing.span('data_selection'):
+        s1 = _select(params['START_DATE'], params['STOP_DATE'], ROI,
+                     params['POLARIZATION'], params['ORBIT'], params['EXCLUDE_SCENES'])
+        if (PREVIEW_FACTOR > 1):
+            # coarse level: block means of the backscatter and of the DEM,
+            # kernel scaled to about the same ground size
+            s1 = s1.map(lambda image: helper.downsample(image, PREVIEW_FACTOR))
+            DEM = DEM.reduceResolution(ee.Reducer.mean(), False, 65535)
+            SPECKLE_FILTER_KERNEL_SIZE = parameters.preview_params(params)['SPECKLE_FILTER_KERNEL_SIZE']
+    yield 'data_selection', s1
 
     ###########################################
-    # 1. DATA SELECTION
+    # 2. ADDITIONAL BORDER NOISE CORRECTION
     ###########################################
 
-    # select S-1 image collection
+    if (APPLY_BORDER_NOISE_CORRECTION):
+        with tracing.span('border_noise_correction'):
+            s1 = s1.map(bnc.f_mask_edges)
+        yield 'border_noise_correction', s1
+
+    ########################
+    # 3. SPECKLE FILTERING
+    #######################
+
+    if (APPLY_SPECKLE_FILTERING):
+        with tracing.span('speckle_filtering', framework=SPECKLE_FILTER_FRAMEWORK,
+                          filter=SPECKLE_FILTER, kernel_size=SPECKLE_FILTER_KERNEL_SIZE):
+            if (SPECKLE_FILTER_FRAMEWORK == 'MONO'):
+                s1 = ee.ImageCollection(sf.MonoTemporal_Filter(s1, SPECKLE_FILTER_KERNEL_SIZE, SPECKLE_FILTER))
+            else:
+                s1 = ee.ImageCollection(sf.MultiTemporal_Filter(s1, SPECKLE_FILTER_KERNEL_SIZE, SPECKLE_FILTER, SPECKLE_FILTER_NR_OF_IMAGES))
+        yield 'speckle_filtering', s1
+
+    ########################
+    # 4. TERRAIN CORRECTION
+    #######################
+
+    if (APPLY_TERRAIN_FLATTENING):
+        with tracing.span('terrain_flattening', model=TERRAIN_FLATTENING_MODEL):
+            s1 = (trf.slope_correction(s1 
+                                       ,TERRAIN_FLATTENING_MODEL
+                                           ,DEM
+                                               ,TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER
+                                                   ,10 * PREVIEW_FACTOR))
+        yield 'terrain_flattening', s1
+
+    ########################
+    # 5. OUTPUT
+    #######################
+
+    with tracing.span('output', format=FORMAT):
+        if (FORMAT == 'DB'):
+            s1 = s1.map(helper.lin_to_db)
+
+        #clip to roi
+        if (CLIP_TO_ROI):
+            s1 = s1.map(lambda image: image.clip(ROI))
+
+        if (params['OUTPUT_ENCODING'] == 'QUANTIZED'):
+            s1 = s1.map(helper.quantize)
+    yield 'output', s1
+
+
+def _s1_preproc(params):
+
+    params = check_params(params)
+
+    # incremental mode: the scenes exported before with the same parameters are not processed again
+    suffix = ''
+    if (params['INCREMENTAL']):
+        key = parameters.param_hash(params)
+        suffix = '_' + key
+        done = _existing_scenes(params['ASSET_ID'], suffix)
+        print('Incremental mode: {} scene(s) already exported ({})'.format(len(done), key))
+        params['EXCLUDE_SCENES'] = sorted(set(params['EXCLUDE_SCENES']) | done)
+
+    for stage, s1_1 in preproc_stages(params):
+        if stage == 'data_selection':
+            print('Number of images in collection: ', tracing.get_info(s1_1.size()))
+        elif stage == 'border_noise_correction':
+            print('Additional border noise correction is completed')
+        elif stage == 'speckle_filtering':
+            if (params['SPECKLE_FILTER_FRAMEWORK'] == 'MONO'):
+                print('Mono-temporal speckle filtering is completed')
+            else:
+                print('Multi-temporal speckle filtering is completed')
+        elif stage == 'terrain_flattening':
+            print('Radiometric terrain normalization is completed')
+
+    # warn before submission if the graph is likely to be too complex
+    if (params.get('CHECK_GRAPH', False)):
+        stats = graph_analyzer.analyze(s1_1.serialize(), fanout=params['SPECKLE_FILTER_NR_OF_IMAGES'])
+        for warning in graph_analyzer.check_limits(stats):
+            print('WARNING!!! ' + warning)
+
+    if (params['SAVE_ASSET']): 
+        with tracing.span('export', asset_id=params['ASSET_ID']):
+            if (params['SHARD_DEGREES']):
+                counts = sharded_export.export(s1_1, params['ASSET_ID'], params['ROI'], params['SHARD_DEGREES'],
+                                               params.get('SHARD_MANIFEST'), suffix, 10 * params['PREVIEW_FACTOR'],
+                                               params['TRACK_AFFINE'])
+                print('Shards: {submitted} submitted, {complete} complete, {running} running'.format(**counts))
+            else:
+                _export(s1_1, params['ASSET_ID'], params.get('ANGLE_SCALE'), suffix, 10 * params['PREVIEW_FACTOR'],
+                        params['TRACK_AFFINE'])
+    return s1_1
+
+
+def _select(START_DATE, STOP_DATE, ROI, POLARIZATION, ORBIT, EXCLUDE_SCENES=None):
+    """
+    Select the Sentinel-1 GRD scenes matching the parameters, without the scenes
+    whose system:index is in EXCLUDE_SCENES.
+
+    Returns
+    -------
+    ee.ImageCollection
+        The selected scenes with the requested polarization and angle bands
+
+    """
     s1 = ee.ImageCollection('COPERNICUS/S1_GRD_FLOAT')\
         .filter(ee.Filter.eq('instrumentMode', 'IW'))\
         .filter(ee.Filter.eq('resolution_meters', 10)) \
@@ -145,6 +230,9 @@ def s1_preproc(params):
     if (ORBIT != 'BOTH'):
         s1 = s1.filter(ee.Filter.eq('orbitProperties_pass', ORBIT))
 
+    if (EXCLUDE_SCENES):
+        s1 = s1.filter(ee.Filter.inList('system:index', list(EXCLUDE_SCENES)).Not())
+
     # select polarization
     if (POLARIZATION == 'VV'):
         s1 = s1.select(['VV', 'angle'])
@@ -152,72 +240,75 @@ def s1_preproc(params):
         s1 = s1.select(['VH', 'angle'])
     elif (POLARIZATION == 'VVVH'):
         s1 = s1.select(['VV', 'VH', 'angle'])
-        
-    print('Number of images in collection: ', s1.size().getInfo())
-
-    ###########################################
-    # 2. ADDITIONAL BORDER NOISE CORRECTION
-    ###########################################
+    return s1
 
-    if (APPLY_BORDER_NOISE_CORRECTION):
-        s1_1 = s1.map(bnc.f_mask_edges)
-        print('Additional border noise correction is completed')
-    else:
-        s1_1 = s1
-    ########################
-    # 3. SPECKLE FILTERING
-    #######################
 
-    if (APPLY_SPECKLE_FILTERING):
-        if (SPECKLE_FILTER_FRAMEWORK == 'MONO'):
-            s1_1 = ee.ImageCollection(sf.MonoTemporal_Filter(s1_1, SPECKLE_FILTER_KERNEL_SIZE, SPECKLE_FILTER))
-            print('Mono-temporal speckle filtering is completed')
-        else:
-            s1_1 = ee.ImageCollection(sf.MultiTemporal_Filter(s1_1, SPECKLE_FILTER_KERNEL_SIZE, SPECKLE_FILTER, SPECKLE_FILTER_NR_OF_IMAGES))
-            print('Multi-temporal speckle filtering is completed')
+def _existing_scenes(ASSET_ID, suffix):
+    """
+    Ids of the scenes exported to the ASSET_ID folder with the given asset name
+    suffix, listed with a single request (see sharded_export.existing_assets).
+    """
+    return {name[:-len(suffix)] for name in sharded_export.existing_assets(ASSET_ID) if name.endswith(suffix)}
 
-    ########################
-    # 4. TERRAIN CORRECTION
-    #######################
 
-    if (APPLY_TERRAIN_FLATTENING):
-        s1_1 = (trf.slope_correction(s1_1 
-                                    ,TERRAIN_FLATTENING_MODEL
-                                        ,DEM
-                                                ,TERRAIN_FLATTENING_ADDITIONAL_LAYOVER_SHADOW_BUFFER))
-        print('Radiometric terrain normalization is completed')
+def _export(collection, ASSET_ID, ANGLE_SCALE=None, suffix='', scale=10, TRACK_AFFINE=False):
+    """
+    Start one asset export task per image of the processed collection.
 
-    ########################
-    # 5. OUTPUT
-    #######################
+    Parameters
+    ----------
+    collection : ee.ImageCollection
+        The processed collection
+    ASSET_ID : string
+        The user id path to save the assets
+    ANGLE_SCALE : float, optional
+        If given, the smooth angle band is exported at this scale in meters to a
+        separate asset '<name>_angle' instead of at 10 m with the backscatter
+    suffix : string, optional
+        Appended to the asset names, the parameter hash in incremental mode
+    scale : float
+        Export scale in meters
+    TRACK_AFFINE : boolean, optional
+        Submit the tasks track by track, each track in time order (sharded_export.track_order)
 
-    if (FORMAT == 'DB'):
-        s1_1 = s1_1.map(helper.lin_to_db)
-        
-        
-    #clip to roi
-    if (CLIP_TO_ROI):
-        s1_1 = s1_1.map(lambda image: image.clip(ROI))
-        
-        
-    if (SAVE_ASSET): 
-            
-        size = s1_1.size().getInfo()
-        imlist = s1_1.toList(size)
-        for idx in range(0, size):
-            img = imlist.get(idx)
-            img = ee.Image(img)
-            name = str(img.id().getInfo())
+    """
+    size = tracing.get_info(collection.size())
+    imlist = collection.toList(size)
+    order = range(0, size)
+    if (TRACK_AFFINE):
+        tracks = sharded_export.track_order(collection)
+        for key, indices in tracks.items():
+            print('Track {}: {} scene(s)'.format(scheduling.track_name(key), len(indices)))
+        order = [idx for indices in tracks.values() for idx in indices]
+    for idx in order:
+        img = imlist.get(idx)
+        img = ee.Image(img)
+        with tracing.span('export_scene', kind='scene', index=idx) as scene_span:
+            name = str(tracing.get_info(img.id()))
             #name = str(idx)
             description = name           
-            assetId = ASSET_ID+'/'+name
+            assetId = ASSET_ID+'/'+name+suffix
+
+            if (ANGLE_SCALE):
+                angle = img.select('angle')
+                img = img.select(img.bandNames().remove('angle'))
+                angle_task = ee.batch.Export.image.toAsset(image=angle,
+                                                           assetId=assetId+'_angle',
+                                                           description=description+'_angle',
+                                                           region=collection.geometry(),
+                                                           scale=ANGLE_SCALE,
+                                                           maxPixels=1e13)
+                angle_task.start()
+                # the request is serialized by start(), its size is not known here
+                tracing.record_rpc()
 
             task = ee.batch.Export.image.toAsset(image=img,
                                                  assetId=assetId,
                                                  description=description,
-                                                 region=s1_1.geometry(),
-                                                 scale=10,
+                                                 region=collection.geometry(),
+                                                 scale=scale,
                                                  maxPixels=1e13)
             task.start()
-            print('Exporting {} to {}'.format(name, assetId))
-    return s1_1
+            tracing.record_rpc()
+            scene_span.set(scene_id=name, asset_id=assetId, task_id=task.id)
+        print('Exporting {} to {}'.format(name, assetId))